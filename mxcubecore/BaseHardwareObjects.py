@@ -22,9 +22,11 @@ from __future__ import absolute_import
 
 import ast
 import enum
+import inspect
 import logging
 import typing
 import warnings
+import weakref
 from collections import OrderedDict
 from typing import (
     TYPE_CHECKING,
@@ -226,6 +228,10 @@ class HardwareObjectNode:
 
     user_file_directory: str
 
+    # Incremented whenever an object is added to any node, to invalidate the
+    # role lookups cached by get_object_by_role
+    _tree_generation: int = 0
+
     def __init__(self, node_name: str) -> None:
         """
         Args:
@@ -235,7 +241,13 @@ class HardwareObjectNode:
         self._property_set: PropertySet
         self.__objects_names: List[Union[str, None]] = []
         self.__objects: List[List[Union["HardwareObject", None]]] = []
+        # Index of the first position of each name in __objects_names
+        self.__names_index: Dict[Union[str, None], int] = {}
+        self.__indexed_names: List[Union[str, None]] = self.__objects_names
         self._objects_by_role: Dict[str, "HardwareObject"] = {}
+        # Objects found by role in the subtree, for _roles_generation
+        self._roles_cache: Dict[str, Union["HardwareObject", None]] = {}
+        self._roles_generation: int = -1
         self._path: str = ""
         self.__name: str = node_name
         self.__references: List[Tuple[str, str, str, int, int, int]] = []
@@ -291,6 +303,47 @@ class HardwareObjectNode:
         """
         return self._xml_path
 
+    def _index_of(self, object_name: Union[str, None]) -> int:
+        """Get the position of a name in the object names.
+
+        Args:
+            object_name (Union[str, None]): Name.
+
+        Returns:
+            int: Index in __objects_names and __objects.
+
+        Raises:
+            ValueError: Name not found.
+        """
+        names = self.__objects_names
+        if self.__indexed_names is not names:
+            self._reindex()
+        index = self.__names_index.get(object_name)
+        if index is not None and (index >= len(names) or names[index] != object_name):
+            # The names were modified in place
+            self._reindex()
+            index = self.__names_index.get(object_name)
+        if index is None:
+            raise ValueError(object_name)
+        return index
+
+    def _reindex(self) -> None:
+        """Rebuild the index of the object names."""
+        self.__names_index = {}
+        for index, name in enumerate(self.__objects_names):
+            self.__names_index.setdefault(name, index)
+        self.__indexed_names = self.__objects_names
+
+    def _append_name(self, name: Union[str, None]) -> None:
+        """Append a name to the object names, keeping the index up to date.
+
+        Args:
+            name (Union[str, None]): Name.
+        """
+        if self.__indexed_names is self.__objects_names:
+            self.__names_index.setdefault(name, len(self.__objects_names))
+        self.__objects_names.append(name)
+
     def __iter__(self) -> Generator[Union["HardwareObject", None], None, None]:
         for i in range(len(self.__objects_names)):
             for object in self.__objects[i]:
@@ -325,7 +378,7 @@ class HardwareObjectNode:
             object_name = key
 
             try:
-                index = self.__objects_names.index(object_name)
+                index = self._index_of(object_name)
             except Exception:
                 raise KeyError
             else:
@@ -364,10 +417,10 @@ class HardwareObjectNode:
         role = str(role).lower()
 
         try:
-            index = self.__objects_names.index(name)
+            index = self._index_of(name)
         except ValueError:
             objects_names_index = len(self.__objects_names)
-            self.__objects_names.append(None)
+            self._append_name(None)
             objects_index = len(self.__objects)
             self.__objects.append(None)
             objects_index2 = -1
@@ -386,6 +439,9 @@ class HardwareObjectNode:
         # NB Must be here - importing at top level leads to circular imports
         from .HardwareRepository import get_hardware_repository
 
+        if self.__references:
+            HardwareObjectNode._tree_generation += 1
+
         while len(self.__references) > 0:
             (
                 reference,
@@ -415,6 +471,7 @@ class HardwareObjectNode:
                     del self.__objects[objects_index][objects_index2]
                     if len(self.__objects[objects_index]) == 0:
                         del self.__objects[objects_index]
+        self._reindex()
 
         for hw_object in self:
             hw_object.resolve_references()
@@ -438,11 +495,12 @@ class HardwareObjectNode:
             role = str(role).lower()
             self._objects_by_role[role] = hw_object
             hw_object.__role = role
+        HardwareObjectNode._tree_generation += 1
 
         try:
-            index = self.__objects_names.index(name)
+            index = self._index_of(name)
         except ValueError:
-            self.__objects_names.append(name)
+            self._append_name(name)
             self.__objects.append([hw_object])
         else:
             self.__objects[index].append(hw_object)
@@ -456,7 +514,11 @@ class HardwareObjectNode:
         Returns:
             bool: True if object name in hardware object node, otherwise False.
         """
-        return object_name in self.__objects_names
+        try:
+            self._index_of(object_name)
+        except ValueError:
+            return False
+        return True
 
     def get_objects(
         self,
@@ -471,7 +533,7 @@ class HardwareObjectNode:
             Union[HardwareObject, None]: Hardware object.
         """
         try:
-            index = self.__objects_names.index(object_name)
+            index = self._index_of(object_name)
         except ValueError:
             pass
         else:
@@ -488,15 +550,30 @@ class HardwareObjectNode:
             Union[HardwareObject, None]: Hardware object.
         """
         role = str(role).lower()
-        objects = [self]
+        result = self._objects_by_role.get(role)
+        if result is not None:
+            return result
+
+        # Search the subtree breadth first, caching the result until an object
+        # is added anywhere
+        if self._roles_generation != HardwareObjectNode._tree_generation:
+            self._roles_cache = {}
+            self._roles_generation = HardwareObjectNode._tree_generation
+        try:
+            return self._roles_cache[role]
+        except KeyError:
+            pass
 
+        objects = [self]
         for curr in objects:
             result = curr._objects_by_role.get(role)
             if result is None:
                 objects.extend(obj for obj in curr if obj)
 
             else:
-                return result
+                break
+        self._roles_cache[role] = result
+        return result
 
     def objects_names(self) -> List[Union[str, None]]:
         """Return hardware object names.
@@ -573,6 +650,32 @@ class HardwareObjectNode:
             getattr(logging.getLogger(log_type), level)(msg)
 
 
+# Caches of the exported methods, see HardwareObjectMixin.init
+# class: names of the methods flagged with __exported__
+_EXPORTED_METHODS: "weakref.WeakKeyDictionary[type, Tuple[str, ...]]" = (
+    weakref.WeakKeyDictionary()
+)
+# function: (signature, pydantic model, JSON schema) of an exported method
+_METHOD_MODELS: "weakref.WeakKeyDictionary[Callable, Tuple[Any, ...]]" = (
+    weakref.WeakKeyDictionary()
+)
+# class: {((method name, model), ...): pydantic model of all exported methods}
+_CLASS_MODELS: "weakref.WeakKeyDictionary[type, Dict[tuple, Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def clear_exports_cache() -> None:
+    """Forget the cached exported methods and models.
+
+    Only needed if methods are flagged as exported after the first instance
+    of their class was initialised; redefined methods are detected anyway.
+    """
+    _EXPORTED_METHODS.clear()
+    _METHOD_MODELS.clear()
+    _CLASS_MODELS.clear()
+
+
 class HardwareObjectMixin(CommandContainer):
     """Functionality for either xml- or yaml-configured HardwareObjects
 
@@ -640,15 +743,68 @@ class HardwareObjectMixin(CommandContainer):
         self._exports = dict.fromkeys(self._exports_config_list, {})
 
         # Add methods that are exported programatically
-        for attr_name in dir(self):
-            _attr = getattr(self, attr_name)
-
-            if getattr(_attr, "__exported__", False):
-                self._exports[attr_name] = []
+        for attr_name in self._exported_methods():
+            self._exports[attr_name] = []
 
         if self._exports:
             self._get_type_annotations()
 
+    def _exported_methods(self) -> Tuple[str, ...]:
+        """Names of the methods flagged with __exported__, found once per class.
+
+        Returns:
+            Tuple[str, ...]: Method names.
+        """
+        cls = self.__class__
+        names = _EXPORTED_METHODS.get(cls)
+        if names is None:
+            names = tuple(
+                attr_name
+                for attr_name in dir(cls)
+                if getattr(
+                    inspect.getattr_static(cls, attr_name, None), "__exported__", False
+                )
+            )
+            _EXPORTED_METHODS[cls] = names
+        return names
+
+    def _export_model(self, attr_name: str) -> Tuple[List[str], Type["BaseModel"], str]:
+        """Signature, pydantic model and JSON schema of an exported method.
+
+        Models of methods defined in a class are created once, and shared by
+        all the instances of the classes using the same function.
+
+        Args:
+            attr_name (str): Method name.
+
+        Returns:
+            Tuple[List[str], Type[BaseModel], str]: Argument names, model, schema.
+
+        Raises:
+            AttributeError: No such method.
+        """
+        function = inspect.getattr_static(self.__class__, attr_name, None)
+        cacheable = inspect.isfunction(function)
+        if cacheable:
+            entry = _METHOD_MODELS.get(function)
+            if entry is not None:
+                return list(entry[0]), entry[1], entry[2]
+
+        _attr = getattr(self, attr_name)
+        signature = []
+        fdict = {}
+        for _n, _t in typing.get_type_hints(_attr).items():
+            # Skipp return typehint
+            if _n != "return":
+                signature.append(_n)
+                fdict[_n] = (_t, Field(alias=_n))
+        model = create_model(attr_name, **fdict)
+        schema = model.schema_json()
+
+        if cacheable:
+            _METHOD_MODELS[function] = (tuple(signature), model, schema)
+        return signature, model, schema
+
     def _get_type_annotations(self) -> None:
         """Retrieve typehints and create pydantic models for each argument."""
         _models = {}
@@ -657,35 +813,31 @@ class HardwareObjectMixin(CommandContainer):
             self._exported_attributes[attr_name] = {}
             self._exports[attr_name] = []
             self._pydantic_models[attr_name] = {}
-            fdict = {}
 
             try:
-                _attr = getattr(self, attr_name)
+                signature, model, schema = self._export_model(attr_name)
             except AttributeError:
                 logging.getLogger("HWR").error(
                     f"{attr_name} configured as exported for {self.name} but not implemented"
                 )
                 continue
 
-            for _n, _t in typing.get_type_hints(_attr).items():
-                # Skipp return typehint
-                if _n != "return":
-                    self._exports[attr_name].append(_n)
-                    fdict[_n] = (_t, Field(alias=_n))
-
-            _models[attr_name] = (
-                create_model(attr_name, **fdict),
-                Field(alias=attr_name),
-            )
+            self._exports[attr_name] = signature
+            _models[attr_name] = (model, Field(alias=attr_name))
 
-            self._pydantic_models[attr_name] = _models[attr_name][0]
+            self._pydantic_models[attr_name] = model
             self._exported_attributes[attr_name]["display"] = True
-            self._exported_attributes[attr_name]["signature"] = self._exports[attr_name]
-            self._exported_attributes[attr_name]["schema"] = self._pydantic_models[
-                attr_name
-            ].schema_json()
-
-        model = create_model(self.__class__.__name__, **_models)
+            self._exported_attributes[attr_name]["signature"] = signature
+            self._exported_attributes[attr_name]["schema"] = schema
+
+        # The model of all the methods is shared by the instances of a class
+        # exporting the same methods
+        models = _CLASS_MODELS.setdefault(self.__class__, {})
+        key = tuple((name, model) for name, (model, _) in _models.items())
+        model = models.get(key)
+        if model is None:
+            model = create_model(self.__class__.__name__, **_models)
+            models[key] = model
         self._pydantic_models["all"] = model
 
     def execute_exported_command(self, cmd_name: str, args: Dict[str, Any]) -> Any:
@@ -40,11 +40,11 @@ __license__ = "LGPLv3+"
 EXPORTER_CLIENTS = {}
 
 
-def start_exporter(address, port, timeout=3, retries=1):
+def start_exporter(address, port, timeout=3, retries=1, pipelining=False):
     """Start the exporter"""
     global EXPORTER_CLIENTS
     if (address, port) not in EXPORTER_CLIENTS:
-        client = Exporter(address, port, timeout)
+        client = Exporter(address, port, timeout, pipelining=pipelining)
         EXPORTER_CLIENTS[(address, port)] = client
         client.start()
         return client
@@ -75,8 +75,10 @@ class Exporter(ExporterClient.ExporterClient, object):
     STATE_FAULT = "Fault"
     STATE_UNKNOWN = "Unknown"
 
-    def __init__(self, address, port, timeout=3, retries=1):
-        super(Exporter, self).__init__(address, port, PROTOCOL.STREAM, timeout, retries)
+    def __init__(self, address, port, timeout=3, retries=1, pipelining=False):
+        super(Exporter, self).__init__(
+            address, port, PROTOCOL.STREAM, timeout, retries, pipelining
+        )
 
         self.started = False
         self.callbacks = {}
@@ -186,7 +188,9 @@ class ExporterCommand(CommandObject):
     ):
         CommandObject.__init__(self, name, username, **kwargs)
         self.command = command
-        self.__exporter = start_exporter(address, port, timeout)
+        self.__exporter = start_exporter(
+            address, port, timeout, pipelining=kwargs.get("pipelining", False)
+        )
         msg = "Attaching Exporter command: {} {}".format(address, name)
         logging.getLogger("HWR").debug(msg)
 
@@ -235,7 +239,9 @@ class ExporterChannel(ChannelObject):
     ):
         ChannelObject.__init__(self, name, username, **kwargs)
 
-        self.__exporter = start_exporter(address, port, timeout)
+        self.__exporter = start_exporter(
+            address, port, timeout, pipelining=kwargs.get("pipelining", False)
+        )
         self.attribute_name = attribute_name
         self.value = None
 
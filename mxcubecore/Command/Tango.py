@@ -19,6 +19,8 @@
 #  along with MXCuBE. If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import time
+import weakref
 
 import gevent
 import gevent.event
@@ -55,6 +57,115 @@ __license__ = "LGPLv3+"
 log = logging.getLogger("HWR")
 
 
+class DeviceProxyPool:
+    """Process wide cache of Tango device proxies.
+
+    Proxies are shared by all the commands and channels of a device (and
+    client timeout); the attribute list of each device is queried once.
+    The cost of creating a proxy or querying the attributes is measured on
+    each miss and counted as time saved on each subsequent hit.
+    """
+
+    def __init__(self):
+        self._proxies = {}
+        self._attribute_names = {}
+        self._costs = {}
+        self.statistics = {
+            "hits": 0,
+            "misses": 0,
+            "attribute_hits": 0,
+            "attribute_misses": 0,
+            "time_saved": 0.0,
+        }
+
+    def get_proxy(self, device_name, timeout=None):
+        """Get the (pinged) proxy of a device, creating it if needed.
+        Args:
+            device_name (str): Tango device name
+            timeout (int): client timeout [ms], None for the Tango default
+        Returns:
+            (DeviceProxy): device proxy
+        Raises:
+            ConnectionError: the device does not answer to ping
+        """
+        key = (device_name.lower(), timeout)
+        proxy = self._proxies.get(key)
+        if proxy is not None:
+            self._hit("hits", key)
+            return proxy
+
+        start = time.perf_counter()
+        proxy = DeviceProxy(device_name)
+        try:
+            proxy.ping()
+        except PyTango.ConnectionFailed:
+            raise ConnectionError
+        if timeout is not None:
+            proxy.set_timeout_millis(timeout)
+        self._miss("misses", key, start)
+        self._proxies[key] = proxy
+        return proxy
+
+    def get_attribute_names(self, device_name, timeout=None):
+        """Get the attribute names of a device.
+        Args:
+            device_name (str): Tango device name
+            timeout (int): client timeout of the proxy used for the query [ms]
+        Returns:
+            (set): lower case attribute names
+        """
+        key = device_name.lower()
+        names = self._attribute_names.get(key)
+        if names is not None:
+            self._hit("attribute_hits", key)
+            return names
+
+        proxy = self.get_proxy(device_name, timeout)
+        start = time.perf_counter()
+        names = {attr.name.lower() for attr in proxy.attribute_list_query()}
+        self._miss("attribute_misses", key, start)
+        self._attribute_names[key] = names
+        return names
+
+    def has_proxy(self, device_name, timeout=None):
+        """Tell if the proxy of a device (and client timeout) is cached"""
+        return (device_name.lower(), timeout) in self._proxies
+
+    def invalidate(self, device_name=None):
+        """Forget the proxies and attributes of a device, or of all devices.
+        To be called when a device server restarted.
+        Args:
+            device_name (str): Tango device name, None for all devices
+        """
+        if device_name is None:
+            self._proxies.clear()
+            self._attribute_names.clear()
+            self._costs.clear()
+            return
+
+        name = device_name.lower()
+        for key in [key for key in self._proxies if key[0] == name]:
+            del self._proxies[key]
+            self._costs.pop(key, None)
+        self._attribute_names.pop(name, None)
+        self._costs.pop(name, None)
+
+    def get_statistics(self):
+        """Hits and misses counters and time saved [s] by the cache"""
+        return dict(self.statistics, devices=len(self._attribute_names))
+
+    def _hit(self, counter, key):
+        self.statistics[counter] += 1
+        self.statistics["time_saved"] += self._costs.get(key, 0.0)
+
+    def _miss(self, counter, key, start):
+        self.statistics[counter] += 1
+        self._costs[key] = time.perf_counter() - start
+
+
+proxy_pool = DeviceProxyPool()
+
+
 class TangoCommand(CommandObject):
     def __init__(self, name, command, tangoname=None, username=None, **kwargs):
         CommandObject.__init__(self, name, username, **kwargs)
@@ -65,19 +176,16 @@ class TangoCommand(CommandObject):
 
     def init_device(self):
         try:
-            self.device = DeviceProxy(self.device_name)
+            self.device = proxy_pool.get_proxy(self.device_name)
         except PyTango.DevFailed as traceback:
             last_error = traceback[-1]
             logging.getLogger("HWR").error(
                 "%s: %s", str(self.name()), last_error["desc"]
             )
             self.device = None
-        else:
-            try:
-                self.device.ping()
-            except PyTango.ConnectionFailed:
-                self.device = None
-                raise ConnectionError
+        except ConnectionError:
+            self.device = None
+            raise
 
     def __call__(self, *args, **kwargs):
         self.emit("commandBeginWaitReply", (str(self.name()),))
@@ -143,6 +251,179 @@ class E:
         self.event = event
 
 
+class TangoPollGroup:
+    """Polled channels of one Tango device sharing the same polling period.
+
+    All the attributes of the group are read with a single
+    ``read_attributes()`` call per period; each value which changed is then
+    dispatched to the ``update()`` of the channels reading that attribute.
+    If that call fails while the device is reachable (an attribute cannot be
+    read), the attributes are read one by one, so that only the channels of
+    the failing attributes get the error, once. A failed attribute is left
+    out of the ``read_attributes()`` call and read alone, with a growing
+    delay, until it can be read again.
+    """
+
+    _groups = {}
+
+    #: First and maximum delay between the reads of a failed attribute [s]
+    RETRY_DELAY = 1.0
+    MAX_RETRY_DELAY = 30.0
+
+    def __init__(self, device_name, polling_period, timeout=None):
+        self.device_name = device_name
+        self.polling_period = polling_period
+        self.timeout = timeout
+        self.raw_device = proxy_pool.get_proxy(device_name, timeout)
+        self.attribute_names = []
+        self._channels = {}
+        self._values = {}
+        # attribute name: (time of the next read, retry delay [s])
+        self._failed = {}
+        self._poller = None
+
+    @classmethod
+    def add_channel(cls, channel):
+        """Add a channel to the poll group of its device, polling period and
+        client timeout, creating the group if needed.
+        Args:
+            channel (TangoChannel): polled channel
+        Returns:
+            (TangoPollGroup): the poll group of the channel
+        """
+        key = (channel.device_name.lower(), channel.polling, channel.timeout)
+        group = cls._groups.get(key)
+        if group is None:
+            group = cls(channel.device_name, channel.polling, channel.timeout)
+            cls._groups[key] = group
+        group.add(channel)
+        return group
+
+    def add(self, channel):
+        """Add a channel and (re)start polling"""
+        attribute_name = channel.attribute_name
+        if attribute_name not in self._channels:
+            self._channels[attribute_name] = []
+            self.attribute_names = list(self._channels)
+        self._channels[attribute_name].append(weakref.ref(channel))
+        # make sure the new channel gets the current value (or error) at
+        # next read
+        self._values.pop(attribute_name, None)
+        self._failed.pop(attribute_name, None)
+
+        if self._poller is None or self._poller.is_stopped():
+            self._poller = Poller.poll(
+                self.read,
+                polling_period=self.polling_period,
+                value_changed_callback=self.dispatch,
+                error_callback=self.read_failed,
+                compare=False,
+            )
+
+    def read(self):
+        """Read all the attributes of the group (called in a poller thread).
+        Returns:
+            (dict): attribute name: value of the attributes which changed,
+                    PollingException for the attributes which could not be read
+        """
+        if not proxy_pool.has_proxy(self.device_name, self.timeout):
+            # the pool forgot the device (device server restarted)
+            self.raw_device = proxy_pool.get_proxy(self.device_name, self.timeout)
+
+        now = time.monotonic()
+        failed = self._failed
+        attribute_names = [name for name in self.attribute_names if name not in failed]
+        attributes = {}
+        if attribute_names:
+            try:
+                attributes.update(
+                    zip(
+                        attribute_names,
+                        self._retry(self.raw_device.read_attributes, attribute_names),
+                    )
+                )
+            except PyTango.ConnectionFailed:
+                raise
+            except PyTango.DevFailed:
+                # the whole call fails if one of the attributes cannot be read
+                for name in attribute_names:
+                    attributes[name] = self._read_attribute(name)
+        for name, (retry_time, _) in list(failed.items()):
+            if retry_time <= now:
+                attributes[name] = self._read_attribute(name)
+
+        changes = {}
+        for name, attr in attributes.items():
+            if isinstance(attr, Exception) or attr.has_failed:
+                if name in failed:
+                    # already reported
+                    delay = min(2 * failed[name][1], self.MAX_RETRY_DELAY)
+                    failed[name] = (now + delay, delay)
+                    continue
+                failed[name] = (now + self.RETRY_DELAY, self.RETRY_DELAY)
+                self._values.pop(name, None)
+                changes[name] = Poller.PollingException(
+                    (
+                        attr
+                        if isinstance(attr, Exception)
+                        else RuntimeError(f"{self.device_name}/{name}: read failed")
+                    ),
+                    self._poller.get_id(),
+                )
+                continue
+            failed.pop(name, None)
+            value = attr.value
+            if name in self._values:
+                old_value = self._values[name]
+                if isinstance(value, numpy.ndarray) or isinstance(
+                    old_value, numpy.ndarray
+                ):
+                    if numpy.array_equal(value, old_value):
+                        continue
+                elif value == old_value:
+                    continue
+            self._values[name] = value
+            changes[name] = value
+        return changes
+
+    def _read_attribute(self, name):
+        try:
+            return self._retry(self.raw_device.read_attribute, name)
+        except PyTango.DevFailed as e:
+            return e
+
+    def _retry(self, read, *args):
+        while True:
+            try:  # in case of tango communication errors, retry reading
+                return read(*args)
+            except PyTango.CommunicationFailed:
+                log.warning(
+                    f"error polling {self.device_name} {args[0]}, retrying.",
+                    exc_info=True,
+                )
+
+    def _channels_of(self, attribute_name):
+        channels = [ref() for ref in self._channels.get(attribute_name, ())]
+        return [channel for channel in channels if channel is not None]
+
+    def dispatch(self, changes):
+        """Fan out the changed values to the channels"""
+        for name, value in changes.items():
+            for channel in self._channels_of(name):
+                if isinstance(value, Poller.PollingException):
+                    channel.poll_failed(value.original_exception, value.poller_id)
+                else:
+                    channel.update(value)
+
+    def read_failed(self, e, poller_id):
+        """The whole read failed: notify every channel"""
+        self._values.clear()
+        self._failed.clear()
+        for name in self.attribute_names:
+            for channel in self._channels_of(name):
+                channel.poll_failed(e, poller_id)
+
+
 class TangoChannel(ChannelObject):
     _tangoEventsQueue = queue.Queue()
     _eventReceivers = {}
@@ -173,6 +454,8 @@ class TangoChannel(ChannelObject):
         self.polling_events = False
         self.timeout = int(timeout)
         self.read_as_str = kwargs.get("read_as_str", False)
+        self.batch_polling = kwargs.get("batch_polling", True)
+        self.poll_group = None
         self._device_initialized = gevent.event.Event()
         self.init_device()
         self.continue_init(None)
@@ -197,8 +480,18 @@ class TangoChannel(ChannelObject):
     def continue_init(self, _):
         # self.init_poller.stop()
 
-        if isinstance(self.polling, int):
-            self.raw_device = DeviceProxy(self.device_name)
+        if (
+            isinstance(self.polling, int)
+            and self.batch_polling
+            and not self.read_as_str
+            and self.device is not None
+        ):
+            # share one read_attributes() call with the other polled
+            # attributes of the device (a missing attribute would fail it)
+            self.poll_group = TangoPollGroup.add_channel(self)
+            self.raw_device = self.poll_group.raw_device
+        elif isinstance(self.polling, int):
+            self.raw_device = proxy_pool.get_proxy(self.device_name, self.timeout)
 
             Poller.poll(
                 self.poll,
@@ -227,33 +520,29 @@ class TangoChannel(ChannelObject):
 
     def init_device(self):
         try:
-            self.device = DeviceProxy(self.device_name)
+            self.device = proxy_pool.get_proxy(self.device_name, self.timeout)
         except PyTango.DevFailed as traceback:
             self.imported = False
             last_error = traceback[-1]
             logging.getLogger("HWR").error(
                 "%s: %s", str(self.name()), last_error["desc"]
             )
+        except ConnectionError:
+            self.imported = True
+            self.device = None
+            raise
         else:
             self.imported = True
-            try:
-                self.device.ping()
-            except PyTango.ConnectionFailed:
+            # check that the attribute exists (to avoid Abort in PyTango grrr)
+            if self.attribute_name.lower() not in proxy_pool.get_attribute_names(
+                self.device_name, self.timeout
+            ):
+                logging.getLogger("HWR").error(
+                    "no attribute %s in Tango device %s",
+                    self.attribute_name,
+                    self.device_name,
+                )
                 self.device = None
-                raise ConnectionError
-            else:
-                self.device.set_timeout_millis(self.timeout)
-
-                # check that the attribute exists (to avoid Abort in PyTango grrr)
-                if not self.attribute_name.lower() in [
-                    attr.name.lower() for attr in self.device.attribute_list_query()
-                ]:
-                    logging.getLogger("HWR").error(
-                        "no attribute %s in Tango device %s",
-                        self.attribute_name,
-                        self.device_name,
-                    )
-                    self.device = None
 
     def push_event(self, event):
         # logging.getLogger("HWR").debug("%s | attr_value=%s, event.errors=%s, quality=%s", self.name(), event.attr_value, event.errors,event.attr_value is None and "N/A" or event.attr_value.quality)
@@ -19,10 +19,12 @@
 #  along with MXCuBE. If not, see <http://www.gnu.org/licenses/>.
 
 """ ProtocolError and StandardClient implementation"""
+import collections
 import socket
 import sys
 
 import gevent
+import gevent.event
 import gevent.lock
 
 __copyright__ = """ Copyright © 2019 by the MXCuBE collaboration """
@@ -68,6 +70,76 @@ else:
 MAX_SIZE_STREAM_MSG = 500000
 
 
+class StreamFramer:
+    """Split a byte stream into STX ... ETX delimited messages.
+
+    Bytes outside a message are ignored, an STX inside a message starts a
+    new one and a message growing beyond MAX_SIZE_STREAM_MSG is dropped.
+    The delimiters are searched with bytes.find, so each received chunk is
+    scanned once whatever the size of the message.
+    """
+
+    STX = b"\x02"
+    ETX = b"\x03"
+
+    def __init__(self, max_size=MAX_SIZE_STREAM_MSG):
+        self.max_size = max_size
+        self._buffer = bytearray()
+        self._in_message = False
+
+    def reset(self):
+        """Forget the message being received"""
+        self._buffer.clear()
+        self._in_message = False
+
+    def feed(self, data):
+        """Process received bytes.
+        Args:
+            data (bytes): received chunk
+        Returns:
+            (list): the messages (str) completed by this chunk
+        Raises:
+            ProtocolError: a message is not valid utf-8
+        """
+        messages = []
+        view = memoryview(data)
+        pos = 0
+        size = len(data)
+        while pos < size:
+            if not self._in_message:
+                stx = data.find(self.STX, pos)
+                if stx < 0:
+                    break
+                self._in_message = True
+                self._buffer.clear()
+                pos = stx + 1
+                continue
+
+            etx = data.find(self.ETX, pos)
+            end = size if etx < 0 else etx
+            stx = data.find(self.STX, pos, end)
+            if stx >= 0:
+                # message restarted before being terminated
+                self._buffer.clear()
+                pos = stx + 1
+                continue
+
+            self._buffer += view[pos:end]
+            if etx < 0:
+                break
+            pos = etx + 1
+            try:
+                messages.append(self._buffer.decode())
+            except UnicodeDecodeError:
+                self.reset()
+                raise ProtocolError("UnicodeDecodeError: %s" % (sys.exc_info(),))
+            self.reset()
+
+        if len(self._buffer) > self.max_size:
+            self.reset()
+        return messages
+
+
 class PROTOCOL:
     """Protocol"""
 
@@ -76,9 +148,19 @@ class PROTOCOL:
 
 
 class StandardClient:
-    """Standard JLib client"""
-
-    def __init__(self, server_ip, server_port, protocol, timeout, retries):
+    """Standard JLib client.
+
+    With pipelining enabled (stream protocol only), send_receive does not
+    wait for the reply of the previous request before sending: the socket
+    is only locked while sending. The protocol carries no request id, so
+    the replies, which the server sends in order, are matched to the
+    pending requests first in, first out. A request which timed out keeps
+    its place in the queue to absorb its late reply.
+    """
+
+    def __init__(
+        self, server_ip, server_port, protocol, timeout, retries, pipelining=False
+    ):
         self.server_ip = server_ip
         self.server_port = server_port
         self.timeout = timeout
@@ -94,6 +176,8 @@ class StandardClient:
         self.__sock = None
         self.__constant_local_port = True
         self._is_connected = False
+        self.pipelining = pipelining and protocol == PROTOCOL.STREAM
+        self._pending = collections.deque()
 
     def __create_socket(self):
         """Create socket"""
@@ -112,6 +196,13 @@ class StandardClient:
         self._is_connected = False
         self.__sock = None
         self.received_msg = None
+        self.__fail_pending()
+
+    def __fail_pending(self):
+        """Fail the pipelined requests waiting for a reply"""
+        while self._pending:
+            result = self._pending.popleft()
+            result.set_exception(SocketError("Socket error:" + str(self.error)))
 
     def connect(self):
         """Socket connect"""
@@ -240,6 +331,11 @@ class StandardClient:
         Args:
             msg(str): Message
         """
+        if self.pipelining:
+            if self._pending:
+                result = self._pending.popleft()
+                result.set(msg)
+            return
         self.received_msg = msg
         self.msg_received_event.set()
 
@@ -249,8 +345,7 @@ class StandardClient:
             self.on_connected()
         except Exception:
             pass
-        buffer = empty_buffer()
-        mReceivedSTX = False
+        framer = StreamFramer()
         while True:
             ret = self.__sock.recv(4096)
             if not ret:
@@ -258,32 +353,8 @@ class StandardClient:
                 self.error = "Disconnected"
                 self.__close_socket()
                 break
-            for b in ret:
-                if b == STX:
-                    buffer = empty_buffer()
-                    mReceivedSTX = True
-                elif b == ETX:
-                    if mReceivedSTX:
-                        try:
-                            # Unicode decoding exception catching,
-                            # consider errors='ignore'
-                            buffer_utf8 = buffer.decode()
-                        except UnicodeDecodeError as e:
-                            # Syntax not allowed in Python 2
-                            # raise ProtocolError from e
-                            raise ProtocolError(
-                                "UnicodeDecodeError: %s" % (sys.exc_info(),)
-                            )
-                        self.on_message_received(buffer_utf8)
-                        mReceivedSTX = False
-                        buffer = empty_buffer()
-                else:
-                    if mReceivedSTX:
-                        buffer += _bytes([b])
-
-            if len(buffer) > MAX_SIZE_STREAM_MSG:
-                mReceivedSTX = False
-                buffer = empty_buffer()
+            for msg in framer.feed(ret):
+                self.on_message_received(msg)
         try:
             self.on_disconnected()
         except Exception:
@@ -323,6 +394,31 @@ class StandardClient:
                 self.msg_received_event.wait()
             return self.received_msg
 
+    def __send_receive_pipelined(self, cmd, timeout):
+        """Send a command and wait for its reply, without waiting for the
+        replies of the other pending commands.
+        Args:
+            cmd(str): command
+            timeout(float): timeout [s], None for no timeout, -1 for default
+        Returns:
+            (str): reply form the socket
+        Raises:
+            TimeoutError, SocketError
+        """
+        if timeout is not None and timeout < 0:
+            timeout = self.timeout
+        result = gevent.event.AsyncResult()
+        with self._lock:
+            self.error = None
+            if not self.is_connected():
+                self.connect()
+            self._pending.append(result)
+            self.__send_stream(cmd)
+        try:
+            return result.get(timeout=timeout)
+        except gevent.Timeout:
+            raise TimeoutError("Timeout error: no reply to %s" % cmd)
+
     def send_receive(self, cmd, timeout=-1):
         """Send/receive command, locking the socket.
         Args:
@@ -330,6 +426,9 @@ class StandardClient:
         Returns:
             (str): reply form the socket
         """
+        if self.pipelining:
+            return self.__send_receive_pipelined(cmd, timeout)
+
         self._lock.acquire()
         try:
             if (timeout is None) or (timeout >= 0):
@@ -27,6 +27,7 @@ import xml.sax
 from xml.sax.handler import ContentHandler
 
 from mxcubecore import BaseHardwareObjects
+from mxcubecore.utils import config_cache
 
 CURRENT_XML = None
 
@@ -61,23 +62,113 @@ def parse(filename, name):
     return cur_handler.get_hardware_object()
 
 
-def parse_string(xml_hardware_object, name):
-    """[summary]
+def parse_string(xml_hardware_object, name, file_path=None):
+    """Create a Hardware Object from its XML string
 
     Args:
-        xml_hardware_object ([type]): [description]
-        name ([type]): [description]
+        xml_hardware_object (str): XML string
+        name (str): Hardware Object name
+        file_path (str): path of the XML file; if given, the parsing result is
+            taken from / stored to the parsed configuration cache
 
     Returns:
-        [type]: [description]
+        Union[HardwareObject, str, None]: the Hardware Object, or the name of
+            the object to import for 'hwr_import' files
     """
     global CURRENT_XML
     CURRENT_XML = xml_hardware_object
     cur_handler = HardwareObjectHandler(name)
-    xml.sax.parseString(str.encode(xml_hardware_object), cur_handler)
+    if file_path is not None and config_cache.get_cache() is not None:
+        events = config_cache.get_cache().get(
+            file_path, record_events, xml_hardware_object
+        )
+        replay_events(events, cur_handler)
+    else:
+        xml.sax.parseString(str.encode(xml_hardware_object), cur_handler)
     return cur_handler.get_hardware_object()
 
 
+def coerce_attributes(attrs):
+    """Convert XML attribute values to None, int, float or bool when possible
+
+    Args:
+        attrs (Mapping): SAX attributes
+
+    Returns:
+        dict: attribute name: converted value
+    """
+    result = {}
+    for k in list(attrs.keys()):
+        v = str(attrs[k])
+
+        if v == "None":
+            result[str(k)] = None
+        else:
+            try:
+                result[str(k)] = int(v)
+            except Exception:
+                try:
+                    result[str(k)] = float(v)
+                except Exception:
+                    if v == "False":
+                        result[str(k)] = False
+                    elif v == "True":
+                        result[str(k)] = True
+                    else:
+                        result[str(k)] = v
+    return result
+
+
+class EventRecorder(ContentHandler):
+    """Record the SAX events of a file, with converted attributes"""
+
+    def __init__(self):
+        ContentHandler.__init__(self)
+        self.events = []
+
+    def startElement(self, name, attrs):
+        self.events.append(("start", str(name), coerce_attributes(attrs)))
+
+    def characters(self, content):
+        if self.events and self.events[-1][0] == "characters":
+            self.events[-1] = ("characters", self.events[-1][1] + str(content))
+        else:
+            self.events.append(("characters", str(content)))
+
+    def endElement(self, name):
+        self.events.append(("end", str(name)))
+
+
+def record_events(xml_hardware_object):
+    """Parse an XML string into a (picklable) list of SAX events
+
+    Args:
+        xml_hardware_object (str): XML string
+
+    Returns:
+        list: ("start", name, attributes), ("characters", text), ("end", name)
+    """
+    recorder = EventRecorder()
+    xml.sax.parseString(str.encode(xml_hardware_object), recorder)
+    return recorder.events
+
+
+def replay_events(events, handler):
+    """Send recorded SAX events to a HardwareObjectHandler
+
+    Args:
+        events (list): events, as returned by record_events
+        handler (HardwareObjectHandler): receiving handler
+    """
+    for event in events:
+        if event[0] == "start":
+            handler.start_element(event[1], dict(event[2]))
+        elif event[0] == "characters":
+            handler.characters(event[1])
+        else:
+            handler.endElement(event[1])
+
+
 def load_module(hardware_object_name):
     """[summary]
 
@@ -181,6 +272,15 @@ class HardwareObjectHandler(ContentHandler):
             name ([type]): [description]
             attrs ([type]): [description]
         """
+        self.start_element(name, coerce_attributes(attrs))
+
+    def start_element(self, name, attrs):
+        """Process an element start
+
+        Args:
+            name (str): element name
+            attrs (dict): attributes, with converted values
+        """
         if self.class_error:
             return
 
@@ -211,27 +311,6 @@ class HardwareObjectHandler(ContentHandler):
 
         self.path %= object_index
 
-        _attrs = attrs
-        attrs = {}
-
-        for k in list(_attrs.keys()):
-            v = str(_attrs[k])
-
-            if v == "None":
-                attrs[str(k)] = None
-            else:
-                try:
-                    attrs[str(k)] = int(v)
-                except Exception:
-                    try:
-                        attrs[str(k)] = float(v)
-                    except Exception:
-                        if v == "False":
-                            attrs[str(k)] = False
-                        elif v == "True":
-                            attrs[str(k)] = True
-                        else:
-                            attrs[str(k)] = v
         if name == "hwr_import":
             self.hwr_import_reference = attrs["href"]
 
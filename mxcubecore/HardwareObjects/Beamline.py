@@ -150,6 +150,8 @@ class Beamline(ConfiguredObject):
         # and the "dotted/attribute path" to hardwareobject from the
         # Beamline object
         self._hardware_object_id_dict = {}
+        # Reverse of _hardware_object_id_dict
+        self._hardware_object_by_id = {}
 
     def init(self):
         """Object initialisation - executed *after* loading contents"""
@@ -178,6 +180,9 @@ class Beamline(ConfiguredObject):
         (when all HardwareObjects have been created and initialized)
         """
         self._hardware_object_id_dict = self._get_id_dict()
+        self._hardware_object_by_id = {
+            _id: ho for ho, _id in self._hardware_object_id_dict.items()
+        }
 
     def get_id(self, ho: HardwareObject) -> str:
         """
@@ -201,13 +206,7 @@ class Beamline(ConfiguredObject):
         Returns:
             HardwareObject with the given id
         """
-        found_ho = None
-
-        for current_ho, current_id in self._hardware_object_id_dict.items():
-            if current_id == _id:
-                found_ho = current_ho
-
-        return found_ho
+        return self._hardware_object_by_id.get(_id)
 
     def _get_id_dict(self) -> dict:
         """
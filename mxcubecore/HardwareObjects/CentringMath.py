@@ -61,15 +61,35 @@ class CentringMath(Procedure):
 
     def listOfCentringsToScreen(self, list_of_centring_dicts):
         self.factorize()
-        lst = []
         logging.getLogger("HWR").debug(
             " in listOfCentringToScreen - %s points in list "
             % len(list_of_centring_dicts)
         )
-        for centring in list_of_centring_dicts:
-            lst.append(self.centringToScreen(centring, factorized=True))
+        screen = self.centringsToScreen(list_of_centring_dicts, factorized=True)
+        lst = []
+        for coordinates in screen:
+            if numpy.isnan(coordinates).any():
+                lst.append(None)
+            else:
+                lst.append(self.vector_to_camera_coordinates(coordinates))
         return lst
 
+    def centringsToScreen(self, list_of_centring_dicts, factorized=False):
+        """
+        Projects all the centred positions in one step, against one reading
+        of the goniostat motors (see factorize).
+        Returns an N x (number of camera axes) array of camera coordinates,
+        in the cameraAxes order; rows of incomplete positions are NaN.
+        """
+        if not factorized:
+            self.factorize()
+        if self.tau is None:
+            return numpy.full(
+                (len(list_of_centring_dicts), len(self.cameraAxes)), numpy.nan
+            )
+        tau_cntrd = self.centred_positions_to_array(list_of_centring_dicts)
+        return numpy.dot(numpy.asarray(self.tau) - tau_cntrd, self.F)
+
     def factorize(self):
         # this should be automatic, on the gonio both rot and trans datum update
         self.F = self.factor_matrix()
@@ -90,22 +110,15 @@ class CentringMath(Procedure):
 
     def centeredPosition(self, return_by_name=False):
         # call after appending the last click. Returns a {motorHO:position} dictionary.
-        M = numpy.zeros(shape=(self.translationAxesCount, self.translationAxesCount))
-        V = numpy.zeros(shape=(self.translationAxesCount))
-
-        for l in range(0, self.translationAxesCount):
-            for i in range(0, len(self.centringDataMatrix)):
-                for k in range(0, len(self.cameraAxes)):
-                    V[l] += (
-                        self.centringDataTensor[i][l][k] * self.centringDataMatrix[i][k]
-                    )
-            for m in range(0, self.translationAxesCount):
-                for i in range(0, len(self.centringDataMatrix)):
-                    for k in range(0, len(self.cameraAxes)):
-                        M[l][m] += (
-                            self.centringDataTensor[i][l][k]
-                            * self.centringDataTensor[i][m][k]
-                        )
+        # T[i, l, k]: factor matrix of click i, D[i, k]: camera coordinates of click i
+        T = numpy.asarray(self.centringDataTensor, dtype=float).reshape(
+            -1, self.translationAxesCount, len(self.cameraAxes)
+        )
+        D = numpy.asarray(self.centringDataMatrix, dtype=float).reshape(
+            -1, len(self.cameraAxes)
+        )
+        V = numpy.einsum("ilk,ik->l", T, D)
+        M = numpy.einsum("ilk,imk->lm", T, T)
         tau_cntrd = numpy.dot(numpy.linalg.pinv(M, rcond=1e-6), V)
 
         # print tau_cntrd
@@ -197,6 +210,23 @@ class CentringMath(Procedure):
                 index += 1
         return vector
 
+    def centred_positions_to_array(self, list_of_centrings_dictionaries):
+        """
+        Returns an N x translationAxesCount array of the translation motor
+        positions, with NaN rows for the positions with a missing motor.
+        """
+        names = [
+            axis["motor_name"]
+            for axis in self.gonioAxes
+            if axis["type"] == "translation"
+        ]
+        array = numpy.full((len(list_of_centrings_dictionaries), len(names)), numpy.nan)
+        for row, centrings_dictionary in enumerate(list_of_centrings_dictionaries):
+            values = [centrings_dictionary[name] for name in names]
+            if None not in values:
+                array[row] = [float(value) for value in values]
+        return array
+
     def vector_to_centred_positions(self, vector, return_by_name=False):
         dic = {}
         index = 0
@@ -23,6 +23,7 @@ GenericDiffractometer
 
 import copy
 import enum
+import functools
 import json
 import logging
 import math
@@ -48,6 +49,8 @@ from mxcubecore import HardwareRepository as HWR
 from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore.HardwareObjects import sample_centring
 from mxcubecore.model import queue_model_objects
+from mxcubecore.utils.motion_group import MotionGroup
+from mxcubecore.utils.position_snapshot import PositionSnapshot
 
 try:
     unicode
@@ -207,6 +210,24 @@ class GonioHeadConfiguration(BaseModel):
     available: Dict[str, ChipLayout]
 
 
+#: Motors of the projection of centred positions to the screen
+CENTRING_POSITION_NAMES = ("phi", "sampx", "sampy", "phiy", "phiz")
+
+
+@functools.lru_cache(maxsize=64)
+def _inverse_rotation_matrix(phi_angle):
+    """Inverse of the 2D rotation matrix of angle phi_angle (radians)"""
+    rot_matrix = numpy.array(
+        [
+            [math.cos(phi_angle), -math.sin(phi_angle)],
+            [math.sin(phi_angle), math.cos(phi_angle)],
+        ]
+    )
+    inv_rot_matrix = numpy.linalg.inv(rot_matrix)
+    inv_rot_matrix.setflags(write=False)
+    return inv_rot_matrix
+
+
 class GenericDiffractometer(HardwareObject):
     """
     Abstract base class for diffractometers
@@ -280,6 +301,11 @@ class GenericDiffractometer(HardwareObject):
         )
         # not updating state inmediately after cmd started
 
+        # motors moved together by move_motors
+        self.motion_group = MotionGroup()
+        # positions of the centring motors, updated by their signals
+        self.position_snapshot = PositionSnapshot()
+
         # Internal values -----------------------------------------------------
         self.ready_event = None
         self.head_type = GenericDiffractometer.HEAD_TYPE_MINIKAPPA
@@ -416,6 +442,7 @@ class GenericDiffractometer(HardwareObject):
                 #)
 
                 self.motor_hwobj_dict[motor_name] = temp_motor_hwobj
+                self.position_snapshot.add_motor(motor_name, temp_motor_hwobj)
                 self.connect(temp_motor_hwobj, "stateChanged", self.motor_state_changed)
                 self.connect(
                     temp_motor_hwobj, "valueChanged", self.centring_motor_moved
@@ -481,6 +508,17 @@ class GenericDiffractometer(HardwareObject):
         except Exception:
             pass
 
+        # sets of motor roles which must not move together, e.g.
+        # [("phiy", "sampx")]: moved one after the other by move_motors
+        try:
+            self.motion_group = MotionGroup(
+                eval(self.get_property("exclusive_motors", "[]"))
+            )
+        except Exception:
+            logging.getLogger("HWR").warning(
+                "Diffractometer: invalid exclusive_motors, motors moved together"
+            )
+
         # Other parameters ---------------------------------------------------
         try:
             self.zoom_centre = eval(self.get_property("zoom_centre"))
@@ -1044,47 +1082,80 @@ class GenericDiffractometer(HardwareObject):
 
     def motor_positions_to_screen(self, centred_positions_dict):
         """ """
-        if self.use_sample_centring:
-            self.update_zoom_calibration()
-            if None in (self.pixels_per_mm_x, self.pixels_per_mm_y):
-                return 0, 0
-            phi_angle = math.radians(
-                self.centring_phi.direction * self.centring_phi.get_value()
-            )
-            sampx = self.centring_sampx.direction * (
-                centred_positions_dict["sampx"] - self.centring_sampx.get_value()
-            )
-            sampy = self.centring_sampy.direction * (
-                centred_positions_dict["sampy"] - self.centring_sampy.get_value()
-            )
-            phiy = self.centring_phiy.direction * (
-                centred_positions_dict["phiy"] - self.centring_phiy.get_value()
-            )
-            phiz = self.centring_phiz.direction * (
-                centred_positions_dict["phiz"] - self.centring_phiz.get_value()
-            )
-            rot_matrix = numpy.matrix(
-                [
-                    math.cos(phi_angle),
-                    -math.sin(phi_angle),
-                    math.sin(phi_angle),
-                    math.cos(phi_angle),
-                ]
-            )
-            rot_matrix.shape = (2, 2)
-            inv_rot_matrix = numpy.array(rot_matrix.I)
-            dx, dy = (
-                numpy.dot(numpy.array([sampx, sampy]), inv_rot_matrix)
-                * self.pixels_per_mm_x
-            )
+        return tuple(self.motor_positions_list_to_screen([centred_positions_dict])[0])
 
-            x = (phiy * self.pixels_per_mm_x) + self.beam_position[0]
-            y = dy + (phiz * self.pixels_per_mm_y) + self.beam_position[1]
+    def motor_positions_list_to_screen(
+        self, centred_positions_list, motor_positions=None
+    ):
+        """
+        Screen coordinates of several centred positions, projected against
+        one reading of the centring motors and of the zoom calibration.
 
-            return x, y
-        else:
+        Args:
+            centred_positions_list (list): dictionaries with (at least) the
+                sampx, sampy, phiy and phiz positions
+            motor_positions (dict): snapshot of the phi, sampx, sampy, phiy
+                and phiz positions to project against, read if None
+        Returns:
+            (numpy.ndarray): N x 2 array of screen coordinates (x, y)
+        """
+        if (
+            type(self).motor_positions_to_screen
+            is not GenericDiffractometer.motor_positions_to_screen
+        ):
+            # Subclass with its own projection
+            return numpy.array(
+                [self.motor_positions_to_screen(cpos) for cpos in centred_positions_list]
+            ).reshape(-1, 2)
+
+        if not self.use_sample_centring:
             raise NotImplementedError
 
+        self.update_zoom_calibration()
+        if None in (self.pixels_per_mm_x, self.pixels_per_mm_y):
+            return numpy.zeros((len(centred_positions_list), 2))
+
+        if motor_positions is None:
+            motor_positions = self.get_centring_motor_positions()
+        motors = (
+            self.centring_sampx,
+            self.centring_sampy,
+            self.centring_phiy,
+            self.centring_phiz,
+        )
+        positions = numpy.array(
+            [
+                [cpos[name] for name in ("sampx", "sampy", "phiy", "phiz")]
+                for cpos in centred_positions_list
+            ],
+            dtype=float,
+        ).reshape(-1, 4)
+        current = numpy.array(
+            [motor_positions[name] for name in ("sampx", "sampy", "phiy", "phiz")],
+            dtype=float,
+        )
+        directions = numpy.array([motor.direction for motor in motors], dtype=float)
+        delta = directions * (positions - current)
+
+        inv_rot_matrix = _inverse_rotation_matrix(
+            math.radians(self.centring_phi.direction * motor_positions["phi"])
+        )
+        dy = numpy.dot(delta[:, :2], inv_rot_matrix)[:, 1] * self.pixels_per_mm_x
+
+        screen = numpy.empty((len(positions), 2))
+        screen[:, 0] = delta[:, 2] * self.pixels_per_mm_x + self.beam_position[0]
+        screen[:, 1] = dy + delta[:, 3] * self.pixels_per_mm_y + self.beam_position[1]
+        return screen
+
+    def get_centring_motor_positions(self):
+        """
+        Returns:
+            (Mapping): current positions of the phi, sampx, sampy, phiy and
+                phiz centring motors (and of the other centring motors), from
+                the position snapshot; read only
+        """
+        return self.position_snapshot.get_positions(CENTRING_POSITION_NAMES)
+
     def move_to_centred_position(self, centred_position):
         """ """
         self.move_motors(centred_position)
@@ -1099,38 +1170,41 @@ class GenericDiffractometer(HardwareObject):
         if wait:
             self.wait_device_ready(10)
 
-    def move_motors(self, motor_positions, timeout=15):
+    def move_motors(self, motor_positions, timeout=15, wait=False):
         """
         Moves diffractometer motors to the requested positions
 
         :param motors_dict: dictionary with motor names or hwobj
                             and target values.
         :type motors_dict: dict
+        :param wait: wait for the end of the moves of the motors, else
+                     return once the moves are started (and the
+                     diffractometer is ready)
+        :type wait: bool
         """
         if not isinstance(motor_positions, dict):
             motor_positions = motor_positions.as_dict()
 
         self.wait_device_ready(timeout)
 
-        for motor in motor_positions.keys():
-            position = motor_positions[motor]
-            self.log.debug(f"moving motor {motor} to position {position}")
-            """
-            if isinstance(motor, (str, unicode)):
-                logging.getLogger("HWR").debug(" Moving %s to %s" % (motor, position))
-            else:
-                logging.getLogger("HWR").debug(
-                    " Moving %s to %s" % (str(motor.name()), position)
-                )
-            """
+        moves = {}
+        for motor, position in motor_positions.items():
             if isinstance(motor, (str, unicode)):
                 motor_role = motor
                 motor = self.motor_hwobj_dict.get(motor_role)
-                # del motor_positions[motor_role]
-                if None in (motor, position):
-                    continue
-                # motor_positions[motor] = position
-            motor.set_value(position)
+            elif motor is not None:
+                motor_role = self.get_motor_role(motor)
+            if None in (motor, position):
+                continue
+            self.log.debug(f"moving motor {motor_role} to position {position}")
+            moves[motor_role] = (motor, position)
+
+        # all the motors at once: the time of the slowest one
+        moving = self.motion_group.start(moves, timeout)
+        moving.link_value(self.motors_moved)
+        moving.link_exception(self.motors_move_failed)
+        if wait:
+            moving.get()
         self.wait_device_ready(timeout)
 
         if self.delay_state_polling is not None and self.delay_state_polling > 0:
@@ -1140,6 +1214,29 @@ class GenericDiffractometer(HardwareObject):
 
         self.wait_device_ready(timeout)
 
+    def motors_moved(self, moving):
+        """End of the motors moves of move_motors"""
+        self.log.debug("motors moved: %s", self.motion_group.report())
+
+    def motors_move_failed(self, moving):
+        """Error of the motors moves of move_motors"""
+        logging.getLogger("HWR").error(
+            "Diffractometer: error moving motors: %s", moving.exception
+        )
+
+    def get_motor_role(self, motor):
+        """Role of a motor, its name if it is not a centring motor.
+
+        Args:
+            motor (AbstractMotor): Motor.
+        Returns:
+            (str): Role.
+        """
+        for role, hwobj in self.motor_hwobj_dict.items():
+            if hwobj is motor:
+                return role
+        return motor.name()
+
     def move_motors_done(self, move_motors_procedure):
         """
         Descript. :
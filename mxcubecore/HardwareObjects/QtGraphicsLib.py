@@ -47,15 +47,24 @@ import logging
 import math
 from datetime import datetime
 
+import numpy as np
+
 from mxcubecore.model import queue_model_objects
 from mxcubecore.utils import qt_import
 from mxcubecore.utils.conversion import string_types
+from mxcubecore.utils.grid_heatmap import GridHeatmap
+from mxcubecore.utils.grid_index import (
+    GridIndex,
+    grid_motor_positions,
+)
 
 SELECTED_COLOR = qt_import.Qt.green
 NORMAL_COLOR = qt_import.Qt.yellow
 SOLID_LINE_STYLE = qt_import.Qt.SolidLine
 SOLID_PATTERN_STYLE = qt_import.Qt.SolidPattern
 LIGHT_GREEN = qt_import.QColor(125, 181, 121)
+# Grid cells smaller than this (pix) are displayed without the image number
+GRID_LABEL_MIN_PIX = 30
 
 
 class GraphicsItem(qt_import.QGraphicsItem):
@@ -738,6 +747,10 @@ class GraphicsItemGrid(GraphicsItem):
         self.__draw_mode = False
         self.__draw_projection = False
         self.__coordinate_map = []
+        self.__coordinate_map_version = 0
+        # Index and motor position tables of the images, built on demand
+        self.__grid_index = None
+        self.__motor_pos_table = None
 
         self.__osc_start = None
         self.__osc_range = 0.1
@@ -756,6 +769,16 @@ class GraphicsItemGrid(GraphicsItem):
         self.__original_pixmap = None
         self.base_color = qt_import.QColor(70, 70, 165, self.__fill_alpha)
 
+        # Cells are rendered in cached images: the score colours (only the
+        # cells whose score changed) and the cell outlines and numbers
+        self.__heatmap = GridHeatmap(self.__fill_alpha, self.base_color.rgba())
+        self.__heatmap_key = None
+        self.__heatmap_image = None
+        self.__heatmap_version = None
+        self.__labels_image = None
+        self.__labels_origin = (0, 0)
+        self.__labels_key = None
+
     @staticmethod
     def set_grid_direction(grid_direction):
         """Sets grids direction."""
@@ -868,6 +891,7 @@ class GraphicsItemGrid(GraphicsItem):
         :return:
         """
         self.__osc_range = osc_range
+        self.__motor_pos_table = None
 
     def set_end_position(self, pos_x, pos_y):
         """Actual drawing moment, when grid size is defined"""
@@ -970,6 +994,7 @@ class GraphicsItemGrid(GraphicsItem):
         self.__num_images_per_line = abs(
             self.grid_direction["fast"][0] * self.__num_cols
         ) + abs(self.grid_direction["slow"][0] * self.__num_rows)
+        self.invalidate_tables()
 
         if min(self.__spacing_pix) >= 20:
             self.update_coordinate_map()
@@ -981,12 +1006,49 @@ class GraphicsItemGrid(GraphicsItem):
         Updates coordinated of the corner points
         :return:
         """
-        self.__coordinate_map = []
-        for image_index in range(self.__num_cols * self.__num_rows):
-            line, image = self.get_line_image_num(image_index + self.__first_image_num)
-            pos_x, pos_y = self.get_coord_from_line_image(line, image)
-            col, row = self.get_col_row_from_line_image(line, image)
-            self.__coordinate_map.append((line, image, pos_x, pos_y, col, row))
+        grid_index = self.get_grid_index()
+        pos_x, pos_y = grid_index.image_centres(
+            (self.__center_coord.x(), self.__center_coord.y()),
+            self.__grid_range_pix,
+        )
+        self.__coordinate_map = list(
+            zip(
+                grid_index.lines.tolist(),
+                grid_index.images.tolist(),
+                pos_x.tolist(),
+                pos_y.tolist(),
+                grid_index.cols.tolist(),
+                grid_index.rows.tolist(),
+            )
+        )
+        self.__coordinate_map_version += 1
+
+    def invalidate_tables(self):
+        """
+        Discards the index and motor position tables, after a change of
+        the grid geometry
+        :return:
+        """
+        self.__grid_index = None
+        self.__motor_pos_table = None
+
+    def get_grid_index(self):
+        """
+        Returns the index tables of the images (line, image, col and row
+        of every image serial number)
+        :return: GridIndex
+        """
+        if self.__grid_index is None:
+            self.__grid_index = GridIndex(
+                self.__num_cols,
+                self.__num_rows,
+                self.__num_lines,
+                self.__num_images_per_line,
+                self.grid_direction,
+                first_image_num=self.__first_image_num,
+                reversing_rotation=self.__reversing_rotation,
+            )
+        return self.__grid_index
 
     def set_corner_coord(self, corner_coord):
         """
@@ -1137,6 +1199,7 @@ class GraphicsItemGrid(GraphicsItem):
         self.__num_images_per_line = abs(
             self.grid_direction["fast"][0] * self.__num_cols
         ) + abs(self.grid_direction["slow"][0] * self.__num_rows)
+        self.invalidate_tables()
 
         self.set_center_coord(self.beam_position)
 
@@ -1198,6 +1261,7 @@ class GraphicsItemGrid(GraphicsItem):
         """
         self.__centred_position = centred_position
         self.__osc_start = self.__centred_position.phi
+        self.__motor_pos_table = None
 
     def get_centred_position(self):
         """
@@ -1240,6 +1304,8 @@ class GraphicsItemGrid(GraphicsItem):
             self.__overlay_pixmap.setOpacity(self.__fill_alpha / 255.0)
         else:
             self.base_color.setAlpha(self.__fill_alpha)
+        self.__heatmap.set_alpha(self.__fill_alpha)
+        self.__heatmap.set_base_color(self.base_color.rgba())
 
     def set_display_overlay(self, state):
         """
@@ -1257,6 +1323,7 @@ class GraphicsItemGrid(GraphicsItem):
         """
         self.base_color = color
         self.base_color.setAlpha(self.__fill_alpha)
+        self.__heatmap.set_base_color(self.base_color.rgba())
         self.scene().update()
 
     def paint(self, painter, option, widget):
@@ -1287,64 +1354,23 @@ class GraphicsItemGrid(GraphicsItem):
             # In projection mode, just the frame is displayed
             painter.drawPolygon(self.__frame_polygon, qt_import.Qt.OddEvenFill)
         else:
-            # Draws beam shape and displays number of image if
-            # less than 1000 cells and size is greater than 20px
+            # Draws the cached score colours, beam shapes and image numbers
+            # if the cell size is greater than 20px
             if min(self.__spacing_pix) < 20:
                 painter.drawPolygon(self.__frame_polygon, qt_import.Qt.OddEvenFill)
-            else:
-                for image_index in range(self.__num_cols * self.__num_rows):
-                    # Estimate area where frame number or score will be displayed
-                    (line, image, pos_x, pos_y, col, row) = self.__coordinate_map[
-                        image_index
-                    ]
-                    paint_rect = qt_import.QRect(
-                        pos_x - self.__spacing_pix[0] / 2,
-                        pos_y - self.__spacing_pix[1] / 2,
-                        self.__spacing_pix[0],
-                        self.__spacing_pix[1],
-                    )
-
-                    # If score exists overlay color may change
-                    cell_score = None
-                    if self.__display_overlay:
-                        cell_score = 1.0
-                        if self.__score is not None:
-                            cell_score = self.__score[image_index]
-
-                            if self.__score.max() > 0:
-                                cell_score = float(cell_score) / self.__score.max()
-                                brush_color.setHsv(
-                                    0 + 60 * cell_score,
-                                    255,
-                                    255 * cell_score,
-                                    self.__fill_alpha,
-                                )
-                                self.custom_brush.setColor(brush_color)
-                                painter.setBrush(self.custom_brush)
-                            else:
-                                painter.setBrush(qt_import.Qt.transparent)
-                    else:
-                        painter.setBrush(qt_import.Qt.transparent)
-
-                    painter.drawText(
-                        paint_rect,
-                        qt_import.Qt.AlignCenter,
-                        str(image_index + self.__first_image_num),
-                    )
-                    if self.beam_is_rectangle:
-                        painter.drawRect(
-                            int(pos_x - self.beam_size_pix[0] / 2),
-                            int(pos_y - self.beam_size_pix[1] / 2),
-                            int(self.beam_size_pix[0]),
-                            int(self.beam_size_pix[1]),
-                        )
-                    else:
-                        painter.drawEllipse(
-                            int(pos_x - self.beam_size_pix[0] / 2),
-                            int(pos_y - self.beam_size_pix[1] / 2),
-                            int(self.beam_size_pix[0]),
-                            int(self.beam_size_pix[1]),
-                        )
+            elif self.__coordinate_map:
+                self.update_heatmap()
+                self.update_labels()
+                painter.drawImage(
+                    self.__heatmap.origin[0],
+                    self.__heatmap.origin[1],
+                    self.__heatmap_image,
+                )
+                painter.drawImage(
+                    self.__labels_origin[0],
+                    self.__labels_origin[1],
+                    self.__labels_image,
+                )
 
         # Draws x in the middle of the grid
         coordx = int(self.__center_coord.x())
@@ -1373,6 +1399,112 @@ class GraphicsItemGrid(GraphicsItem):
             "%d frames per line" % self.__num_images_per_line,
         )
 
+    def update_heatmap(self):
+        """
+        Renders the score colours of the cells whose score changed
+        :return:
+        """
+        key = (
+            self.__coordinate_map_version,
+            tuple(self.__spacing_pix),
+            tuple(self.beam_size_pix),
+            self.beam_is_rectangle,
+        )
+        if key != self.__heatmap_key:
+            self.__heatmap_key = key
+            self.__heatmap.set_cells(
+                [cell[2] for cell in self.__coordinate_map],
+                [cell[3] for cell in self.__coordinate_map],
+                self.__spacing_pix,
+                self.beam_size_pix,
+                ellipse=not self.beam_is_rectangle,
+            )
+        self.__heatmap.update(self.__score, self.__display_overlay)
+
+        if self.__heatmap.version != self.__heatmap_version:
+            self.__heatmap_version = self.__heatmap.version
+            image = self.__heatmap.image
+            # QImage shares the heatmap buffer, kept alive by the heatmap
+            self.__heatmap_image = qt_import.QImage(
+                image.data,
+                image.shape[1],
+                image.shape[0],
+                image.strides[0],
+                qt_import.QImage.Format_ARGB32,
+            )
+
+    def update_labels(self):
+        """
+        Renders the cell outlines and image numbers (if cells are large
+        enough), when the grid geometry or pen change
+        :return:
+        """
+        show_numbers = min(self.__spacing_pix) >= GRID_LABEL_MIN_PIX
+        key = (
+            self.__heatmap_key,
+            self.custom_pen.color().rgba(),
+            self.custom_pen.style(),
+            show_numbers,
+            self.__first_image_num,
+        )
+        if key == self.__labels_key:
+            return
+        self.__labels_key = key
+
+        # beam shapes may be larger than the cells
+        margin = 1 + int(
+            max(
+                0,
+                self.beam_size_pix[0] - self.__spacing_pix[0],
+                self.beam_size_pix[1] - self.__spacing_pix[1],
+            )
+            / 2
+        )
+        self.__labels_origin = (
+            self.__heatmap.origin[0] - margin,
+            self.__heatmap.origin[1] - margin,
+        )
+        height, width = self.__heatmap.image.shape
+        self.__labels_image = qt_import.QImage(
+            width + 2 * margin,
+            height + 2 * margin,
+            qt_import.QImage.Format_ARGB32_Premultiplied,
+        )
+        self.__labels_image.fill(qt_import.Qt.transparent)
+        painter = qt_import.QPainter(self.__labels_image)
+        painter.translate(-self.__labels_origin[0], -self.__labels_origin[1])
+        painter.setPen(self.custom_pen)
+        painter.setBrush(qt_import.Qt.NoBrush)
+        for image_index, cell in enumerate(self.__coordinate_map):
+            pos_x, pos_y = cell[2], cell[3]
+            if show_numbers:
+                paint_rect = qt_import.QRect(
+                    int(pos_x - self.__spacing_pix[0] / 2),
+                    int(pos_y - self.__spacing_pix[1] / 2),
+                    int(self.__spacing_pix[0]),
+                    int(self.__spacing_pix[1]),
+                )
+                painter.drawText(
+                    paint_rect,
+                    qt_import.Qt.AlignCenter,
+                    str(image_index + self.__first_image_num),
+                )
+            if self.beam_is_rectangle:
+                painter.drawRect(
+                    int(pos_x - self.beam_size_pix[0] / 2),
+                    int(pos_y - self.beam_size_pix[1] / 2),
+                    int(self.beam_size_pix[0]),
+                    int(self.beam_size_pix[1]),
+                )
+            else:
+                painter.drawEllipse(
+                    int(pos_x - self.beam_size_pix[0] / 2),
+                    int(pos_y - self.beam_size_pix[1] / 2),
+                    int(self.beam_size_pix[0]),
+                    int(self.beam_size_pix[1]),
+                )
+        painter.end()
+
     def move_by_pix(self, move_direction):
         """Moves grid by one pixel"""
         move_delta_x = 0
@@ -1496,8 +1628,15 @@ class GraphicsItemGrid(GraphicsItem):
         :param image_serial: int, int
         :return:
         """
-        line, image = self.get_line_image_num(image_serial)
-        return self.get_col_row_from_line_image(line, image)
+        return self.get_grid_index().col_row(image_serial)
+
+    def get_cols_rows_from_image_serials(self, image_serials):
+        """
+        Returns cols and rows of many images
+        :param image_serials: np array of serial image numbers
+        :return: np array, np array
+        """
+        return self.get_grid_index().cols_rows(image_serials)
 
     def get_col_row_from_image(self, image_num):
         """
@@ -1505,8 +1644,7 @@ class GraphicsItemGrid(GraphicsItem):
         :param image_num: int
         :return: int, int
         """
-        (line, image, pos_x, pos_y, col, row) = self.__coordinate_map[image_num]
-        return col, row
+        return self.get_grid_index().col_row(image_num + self.__first_image_num)
 
     def get_col_row_from_line_image(self, line, image):
         """converts frame grid coordinates from scan grid "slow","fast") to screen grid
@@ -1531,41 +1669,56 @@ class GraphicsItemGrid(GraphicsItem):
         )
         return int(col), int(row)
 
+    def get_motor_pos_from_cols_rows(self, cols, rows):
+        """
+        Returns motor positions of many points of the grid
+        :param cols: np array of (fractional) cols
+        :param rows: np array of (fractional) rows
+        :return: dict with np arrays for the grid motors
+        """
+        return grid_motor_positions(
+            self.__centred_position.as_dict(),
+            cols,
+            rows,
+            self.__num_cols,
+            self.__num_rows,
+            self.get_grid_size_mm(),
+            self.__osc_start,
+            self.__osc_range,
+            self.grid_direction,
+        )
+
+    def get_motor_pos_table(self):
+        """
+        Returns the motor positions of the centres of the cells of all the
+        images, as reported for the best positions of the online processing
+        (col + 0.5, num_rows - row - 0.5)
+        :return: dict with np arrays indexed by image index
+        """
+        if self.__motor_pos_table is None:
+            grid_index = self.get_grid_index()
+            self.__motor_pos_table = self.get_motor_pos_from_cols_rows(
+                grid_index.cols + 0.5, self.__num_rows - grid_index.rows - 0.5
+            )
+        return self.__motor_pos_table
+
+    def get_motor_pos_from_image_serial(self, image_serial):
+        """
+        Returns motor positions of the centre of the cell of an image
+        :param image_serial: int
+        :return: dict
+        """
+        image_index = image_serial - self.__first_image_num
+        return {
+            motor: (float(pos[image_index]) if np.ndim(pos) else pos)
+            for motor, pos in self.get_motor_pos_table().items()
+        }
+
     def get_motor_pos_from_col_row(self, col, row, as_cpos=False):
         """x = x(click - x_middle_of_the_plot), y== the same"""
-        new_point = copy.deepcopy(self.__centred_position.as_dict())
-        (hor_range, ver_range) = self.get_grid_size_mm()
-        hor_range = -hor_range * (self.__num_cols / 2.0 - col) / self.__num_cols
-        ver_range = -ver_range * (self.__num_rows / 2.0 - row) / self.__num_rows
-
-        if self.grid_direction["fast"][0] == 1:
-            # MD2 when fast direction is horizontal direction
-            new_point["sampx"] = new_point["sampx"] + ver_range * math.sin(
-                math.pi * (self.__osc_start - self.grid_direction["omega_ref"]) / 180.0
-            )
-            new_point["sampy"] = new_point["sampy"] - ver_range * math.cos(
-                math.pi * (self.__osc_start - self.grid_direction["omega_ref"]) / 180.0
-            )
-            new_point["phiy"] = new_point["phiy"] - hor_range
-            new_point["phi"] = (
-                new_point["phi"]
-                - self.__osc_range * self.__num_cols / 2
-                + (self.__num_cols - col) * self.__osc_range
-            )
-        else:
-            # MD3
-            new_point["sampx"] = new_point["sampx"] - hor_range * math.sin(
-                math.pi * (self.__osc_start - self.grid_direction["omega_ref"]) / 180.0
-            )
-            new_point["sampy"] = new_point["sampy"] + hor_range * math.cos(
-                math.pi * (self.__osc_start - self.grid_direction["omega_ref"]) / 180.0
-            )
-            new_point["phiy"] = new_point["phiy"] + ver_range
-            new_point["phi"] = (
-                new_point["phi"]
-                - self.__osc_range * self.__num_rows / 2
-                + (self.__num_rows - row) * self.__osc_range
-            )
+        new_point = self.get_motor_pos_from_cols_rows(col, row)
+        for motor in ("sampx", "sampy", "phiy", "phi"):
+            new_point[motor] = float(new_point[motor])
 
         if as_cpos:
             return queue_model_objects.CentredPosition(new_point)
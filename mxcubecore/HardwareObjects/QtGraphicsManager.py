@@ -78,6 +78,12 @@ __credits__ = ["MXCuBE collaboration"]
 __category__ = "Graphics"
 
 
+def is_projected(coord):
+    """Tells if a position could be projected to the screen: the screen
+    coordinates are None, or NaN in a batch projection, if it could not"""
+    return coord is not None and bool(np.isfinite(np.asarray(coord, float)).all())
+
+
 class QtGraphicsManager(AbstractSampleView):
     def __init__(self, name):
         """
@@ -653,55 +659,76 @@ class QtGraphicsManager(AbstractSampleView):
                 if isinstance(graphics_item, GraphicsLib.GraphicsItem):
                     graphics_item.set_beam_info(beam_info)
 
+    def motor_positions_list_to_screen(self, positions):
+        """Returns the screen coordinates of a list of motor positions
+
+        :param positions: motor positions
+        :type positions: list of dict
+        :returns: list of (x, y) tuples
+        """
+        to_screen = getattr(
+            self.diffractometer_hwobj, "motor_positions_list_to_screen", None
+        )
+        if to_screen is None:
+            return [
+                self.diffractometer_hwobj.motor_positions_to_screen(motor_pos)
+                for motor_pos in positions
+            ]
+        return [tuple(coord) for coord in to_screen(positions)]
+
     def diffractometer_state_changed(self, *args):
         """Method called when diffractometer state changed.
         Updates point screen coordinates and grid coorner coordinates.
         If diffractometer not ready then hides all shapes.
         """
         if self.diffractometer_hwobj.is_ready() and not self.in_centring_state:
+            # Project all the points, grid centres and corners in one call
+            points = []
+            grids = []
+            positions = []
             for shape in self.get_shapes():
                 if isinstance(shape, GraphicsLib.GraphicsItemPoint):
-                    cpos = shape.get_centred_position()
-                    new_x, new_y = self.diffractometer_hwobj.motor_positions_to_screen(
-                        cpos.as_dict()
-                    )
-                    shape.set_start_position(new_x, new_y)
+                    points.append(shape)
+                    positions.append(shape.get_centred_position().as_dict())
                 elif isinstance(shape, GraphicsLib.GraphicsItemGrid):
                     grid_cpos = shape.get_centred_position()
                     if grid_cpos is not None:
-                        current_cpos = queue_model_objects.CentredPosition(
-                            self.diffractometer_hwobj.get_positions()
-                        )
+                        motor_pos_corner = shape.get_motor_pos_corner()
+                        grids.append((shape, grid_cpos, len(motor_pos_corner)))
+                        positions.append(grid_cpos.as_dict())
+                        positions.extend(motor_pos_corner)
 
-                        current_cpos.set_motor_pos_delta(0.1)
-                        grid_cpos.set_motor_pos_delta(0.1)
+            screen_coords = self.motor_positions_list_to_screen(positions)
 
-                        if hasattr(grid_cpos, "zoom"):
-                            current_cpos.zoom = grid_cpos.zoom
+            for index, shape in enumerate(points):
+                if is_projected(screen_coords[index]):
+                    new_x, new_y = screen_coords[index]
+                    shape.set_start_position(new_x, new_y)
 
-                        center_coord = (
-                            self.diffractometer_hwobj.motor_positions_to_screen(
-                                grid_cpos.as_dict()
-                            )
-                        )
-                        if center_coord:
-                            shape.set_center_coord(center_coord)
-
-                            corner_coord = []
-                            for motor_pos in shape.get_motor_pos_corner():
-                                corner_coord.append(
-                                    (
-                                        self.diffractometer_hwobj.motor_positions_to_screen(
-                                            motor_pos
-                                        )
-                                    )
-                                )
-                            shape.set_corner_coord(corner_coord)
-
-                            if current_cpos == grid_cpos:
-                                shape.set_projection_mode(False)
-                            else:
-                                shape.set_projection_mode(True)
+            if grids:
+                current_cpos = queue_model_objects.CentredPosition(
+                    self.diffractometer_hwobj.get_positions()
+                )
+                current_cpos.set_motor_pos_delta(0.1)
+
+            index = len(points)
+            for shape, grid_cpos, corner_count in grids:
+                grid_cpos.set_motor_pos_delta(0.1)
+
+                if hasattr(grid_cpos, "zoom"):
+                    current_cpos.zoom = grid_cpos.zoom
+
+                center_coord = screen_coords[index]
+                corner_coord = screen_coords[index + 1 : index + 1 + corner_count]
+                index += 1 + corner_count
+                if is_projected(center_coord):
+                    shape.set_center_coord(center_coord)
+                    shape.set_corner_coord(corner_coord)
+
+                    if current_cpos == grid_cpos:
+                        shape.set_projection_mode(False)
+                    else:
+                        shape.set_projection_mode(True)
 
             self.show_all_items()
             self.graphics_view.graphics_scene.update()
@@ -63,6 +63,10 @@ class QueueModel(HardwareObject):
 
         self._selected_model = self._ispyb_model
 
+        # Model root: (node id: node, PathTemplateIndex) for the nodes of
+        # the model, see _get_index
+        self._indexes = {}
+
     def __getstate__(self):
         d = dict(self.__dict__)
         return d
@@ -112,10 +116,12 @@ class QueueModel(HardwareObject):
         :returns: None
         :rtype: NoneType
         """
+        self._drop_index(self._models.get(name))
         self._models[name] = queue_model_objects.RootNode()
 
         if not name:
             for name in self._models.keys():
+                self._drop_index(self._models[name])
                 self._models[name] = queue_model_objects.RootNode()
 
         HWR.beamline.queue_manager.clear()
@@ -146,6 +152,59 @@ class QueueModel(HardwareObject):
             self.emit("child_added", (parent_node, child_node))
             self._re_emit(child_node)
 
+    def _get_index(self, root=None):
+        """
+        Returns the index of the nodes of the model <root>, built on first use
+        and kept up to date by add_child and del_child.
+
+        :param root: The model root, the selected model if None.
+        :type root: RootNode
+
+        :returns: The map of node ids to nodes and the index of the path
+                  templates of the nodes.
+        :rtype: tuple
+        """
+        if root is None:
+            root = self._selected_model
+
+        index = self._indexes.get(root)
+
+        if index is None:
+            index = self._indexes[root] = ({}, queue_model_objects.PathTemplateIndex())
+
+            for child in root.get_children():
+                self._index_subtree(index, child)
+
+        return index
+
+    def _drop_index(self, root):
+        index = self._indexes.pop(root, None)
+
+        if index is not None:
+            index[1].clear()
+
+    def _index_subtree(self, index, node):
+        nodes, path_templates = index
+
+        if node._node_id is not None:
+            nodes.setdefault(node._node_id, node)
+
+        path_templates.add(node)
+
+        for child in node.get_children():
+            self._index_subtree(index, child)
+
+    def _unindex_subtree(self, index, node):
+        nodes, path_templates = index
+
+        if nodes.get(node._node_id) is node:
+            del nodes[node._node_id]
+
+        path_templates.remove(node)
+
+        for child in node.get_children():
+            self._unindex_subtree(index, child)
+
     def add_child(self, parent, child):
         """
         Adds the child node <child>. Raises the exception TypeError
@@ -161,10 +220,18 @@ class QueueModel(HardwareObject):
         """
         if True:
             # if isinstance(child, queue_model_objects.TaskNode):
+            index = self._get_index(parent.get_root())
+            nodes = index[0]
+
+            if nodes.get(child._node_id) is child:
+                del nodes[child._node_id]
+
             self._selected_model._total_node_count += 1
             child._parent = parent
             child._node_id = self._selected_model._total_node_count
             parent._children.append(child)
+            nodes[child._node_id] = child
+            self._index_subtree(index, child)
             child._set_name(child._name)
             self.emit("child_added", (parent, child))
         else:
@@ -203,11 +270,29 @@ class QueueModel(HardwareObject):
         if parent is None:
             parent = self._selected_model
 
+        node = self._get_index(parent.get_root())[0].get(_id)
+
+        if node is not None and node._node_id == _id:
+            ancestor = node._parent
+
+            while ancestor is not None:
+                if ancestor is parent:
+                    return node
+
+                ancestor = ancestor._parent
+
+        # Not indexed, e.g. duplicated node ids in a model loaded from a file
+        return self._find_node(_id, parent)
+
+    def _find_node(self, _id, parent):
+        """
+        Searches the subtree of <parent> for the node with the node id <_id>
+        """
         for node in parent._children:
             if node._node_id == _id:
                 return node
             else:
-                result = self.get_node(_id, node)
+                result = self._find_node(_id, node)
 
                 if result:
                     return result
@@ -224,6 +309,11 @@ class QueueModel(HardwareObject):
         """
         if child in parent._children:
             parent._children.remove(child)
+            index = self._indexes.get(parent.get_root())
+
+            if index is not None:
+                self._unindex_subtree(index, child)
+
             self.emit("child_removed", (parent, child))
 
     def _detach_child(self, parent, child):
@@ -291,9 +381,10 @@ class QueueModel(HardwareObject):
 
     def get_next_run_number(self, new_path_template, exclude_current=True):
         """
-        Iterates through all the path templates of the tasks
-        in the model and returns the next available run number
-        for the path template <new_path_template>.
+        Returns the next available run number for the path template
+        <new_path_template>, after the run numbers of the path templates
+        of the tasks in the model writing to the same directory with the
+        same prefix.
 
         :param new_path_template: PathTempalte to match with.
         :type new_path_template: PathTemplate
@@ -304,19 +395,8 @@ class QueueModel(HardwareObject):
         :returns: The next available run number for the given path_template.
         :rtype: int
         """
-        all_path_templates = self.get_path_templates()
-        conflicting_path_templates = [0]
-
-        for pt in all_path_templates:
-            if exclude_current:
-                if pt[1] is not new_path_template:
-                    if pt[1] == new_path_template:
-                        conflicting_path_templates.append(pt[1].run_number)
-            else:
-                if pt[1] == new_path_template:
-                    conflicting_path_templates.append(pt[1].run_number)
-
-        return max(conflicting_path_templates) + 1
+        path_templates = self._get_index()[1]
+        return path_templates.get_max_run_number(new_path_template, exclude_current) + 1
 
     def get_path_templates(self):
         """
@@ -350,15 +430,7 @@ class QueueModel(HardwareObject):
 
         :returns: True if there is a potential path collision.
         """
-        result = False
-        path_template_list = self.get_path_templates()
-
-        for pt in path_template_list:
-            if pt[1] is not new_path_template:
-                if new_path_template.intersection(pt[1]):
-                    result = True
-
-        return result
+        return self._get_index()[1].intersects(new_path_template)
 
     def copy_node(self, node):
         """
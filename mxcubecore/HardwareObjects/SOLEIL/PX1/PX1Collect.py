@@ -5,7 +5,6 @@
 
 import logging
 import os
-import socket
 import subprocess
 import sys
 import time
@@ -18,6 +17,13 @@ from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore.Command.Tango import DeviceProxy
 from mxcubecore.HardwareObjects.abstract.AbstractCollect import AbstractCollect
 from mxcubecore.TaskUtils import task
+from mxcubecore.utils.adxv_client import AdxvClient
+from mxcubecore.utils.image_watcher import ImageWatcher
+from mxcubecore.utils.thumbnails import (
+    JPEG_SCALE,
+    THUMBNAIL_SCALE,
+    ThumbnailEngine,
+)
 
 __author__ = "Vicente Rey Bakaikoa"
 __credits__ = ["MXCuBE collaboration"]
@@ -57,6 +63,9 @@ class PX1Collect(AbstractCollect, HardwareObject):
         self.mxlocal = None
 
         self.helical_positions = None
+        self.image_watcher = None
+        self.thumbnail_engine = None
+        self.adxv_client = None
 
     def init(self):
         """
@@ -77,6 +86,13 @@ class PX1Collect(AbstractCollect, HardwareObject):
         self.mxlocal_object = self.get_object_by_role("beamline_configuration")
 
         self.img2jpeg = self.get_property("imgtojpeg")
+        self.thumbnail_engine = ThumbnailEngine(
+            workers=self.get_property("thumbnail_workers", 2),
+            every=self.get_property("thumbnail_every", 100),
+        )
+        self.adxv_client = AdxvClient(
+            self.adxv_host, self.adxv_port, min_interval=self.adxv_interval
+        )
         undulators = self.get_undulators()
 
         self.exp_type_dict = {"Mesh": "raster", "Helical": "Helical"}
@@ -232,31 +248,68 @@ class PX1Collect(AbstractCollect, HardwareObject):
         last_image_jpegpath = os.path.join(archive_dir, jpeg_template % last_imgno)
         last_image_thumbpath = os.path.join(archive_dir, thumb_template % last_imgno)
 
-        # wait for first image
-        self.adxv_latest_refresh = 0
-        self.is_firstimg = True
-
-        self.file_waiting_display = first_image_fullpath  # for showing on adxv
-        self.wait_image_on_disk(first_image_fullpath)
-        thumbs_up = self.generate_thumbnails(
-            first_image_fullpath, first_image_jpegpath, first_image_thumbpath
+        # follow the arrival of all the images
+        self.image_watcher = ImageWatcher.from_template(
+            basedir, template, first_imgno, nb_images, callback=self.images_progress
         )
-        if thumbs_up:
-            self._store_image_in_lims(first_imgno)
+        self.image_watcher.start()
 
-        # update display while collect is running
-        while self.is_moving() or self.is_firstimg:
-            self.adxv_show_latest(fileinfo)
-            time.sleep(0.1)
+        try:
+            # wait for first image
+            self.wait_image_on_disk(first_image_fullpath)
+            thumbs_up = self.generate_thumbnails(
+                first_image_fullpath, first_image_jpegpath, first_image_thumbpath
+            )
+            if thumbs_up:
+                self._store_image_in_lims(first_imgno)
 
-        # wait for last image
-        self.wait_image_on_disk(last_image_fullpath)
-        thumbs_up = self.generate_thumbnails(
-            last_image_fullpath, last_image_jpegpath, last_image_thumbpath
-        )
-        self.adxv_sync_image(first_image_fullpath)
-        if thumbs_up:
-            self._store_image_in_lims(last_imgno)
+            # the display follows the images as they arrive (images_progress)
+            while self.is_moving():
+                time.sleep(0.1)
+
+            # wait for last image
+            self.wait_image_on_disk(last_image_fullpath)
+            thumbs_up = self.generate_thumbnails(
+                last_image_fullpath, last_image_jpegpath, last_image_thumbpath
+            )
+            self.adxv_sync_image(first_image_fullpath)
+            if thumbs_up:
+                self._store_image_in_lims(last_imgno)
+        finally:
+            self.image_watcher.stop()
+            self.image_watcher = None
+            logging.getLogger("HWR").debug(
+                "PX1Collect: thumbnails %s" % self.thumbnail_engine.get_statistics()
+            )
+            logging.getLogger("HWR").debug(
+                "PX1Collect: ADXV display %s" % self.adxv_client.get_statistics()
+            )
+
+    def images_progress(self, progress):
+        """Batch of images arrived on disk (ImageWatcher callback)"""
+        self.emit("progressStep", progress.arrived)
+        # newest image only, at most every adxv_interval
+        self.adxv_sync_image(self.image_watcher.latest.path)
+        osc_seq = self.current_dc_parameters["oscillation_sequence"][0]
+        for arrival in progress.arrivals:
+            # skipped while the thumbnail pool is busy, except the first,
+            # last and every Nth images
+            self.thumbnail_engine.submit(
+                arrival.path,
+                self.get_thumbnail_targets(arrival.number),
+                arrival.number - osc_seq["start_image_number"],
+                progress.expected,
+            )
+        latencies = [
+            arrival.latency
+            for arrival in progress.arrivals
+            if arrival.latency is not None
+        ]
+        if latencies:
+            logging.getLogger("HWR").debug(
+                "PX1Collect: %d of %d images on disk, arrival latency up to %.3f secs"
+                % (progress.arrived, progress.expected, max(latencies))
+            )
 
     def prepare_characterization(self):
         osc_seq = self.current_dc_parameters["oscillation_sequence"][0]
@@ -434,6 +487,20 @@ class PX1Collect(AbstractCollect, HardwareObject):
         HWR.beamline.sample_view.save_snapshot(filename)
         logging.getLogger("HWR").debug("PX1Collect:  - snapshot saved to %s" % filename)
 
+    def get_thumbnail_targets(self, imgno):
+        """JPEG image and thumbnail files of an image of the collection,
+        with their scale factors"""
+        fileinfo = self.current_dc_parameters["fileinfo"]
+        archive_dir = fileinfo["archive_directory"]
+        prefix = os.path.splitext(fileinfo["template"])[0]
+        return [
+            (os.path.join(archive_dir, (prefix + ".jpeg") % imgno), JPEG_SCALE),
+            (
+                os.path.join(archive_dir, (prefix + ".thumb.jpeg") % imgno),
+                THUMBNAIL_SCALE,
+            ),
+        ]
+
     def generate_thumbnails(self, filename, jpeg_filename, thumbnail_filename):
         #
         # write info on LIMS
@@ -444,9 +511,26 @@ class PX1Collect(AbstractCollect, HardwareObject):
             logging.info("PX1Collect:  thumbnail file: %s" % thumbnail_filename)
 
             self.wait_image_on_disk(filename)
-            if os.path.exists(filename):
-                subprocess.Popen([self.img2jpeg, filename, jpeg_filename, "0.4"])
-                subprocess.Popen([self.img2jpeg, filename, thumbnail_filename, "0.1"])
+            if self.is_image_on_disk(filename):
+                # same job if already submitted as the images arrived
+                job = self.thumbnail_engine.submit(
+                    filename,
+                    [
+                        (jpeg_filename, JPEG_SCALE),
+                        (thumbnail_filename, THUMBNAIL_SCALE),
+                    ],
+                )
+                if job.get():
+                    return True
+                if not self.img2jpeg:
+                    return False
+                # format not supported in process: external converter
+                subprocess.Popen(
+                    [self.img2jpeg, filename, jpeg_filename, str(JPEG_SCALE)]
+                )
+                subprocess.Popen(
+                    [self.img2jpeg, filename, thumbnail_filename, str(THUMBNAIL_SCALE)]
+                )
                 return True
             else:
                 logging.info(
@@ -463,13 +547,20 @@ class PX1Collect(AbstractCollect, HardwareObject):
     ## generate snapshots and data thumbnails (END) ##
 
     ## FILE SYSTEM ##
+    def is_image_on_disk(self, filename):
+        if self.image_watcher is not None and self.image_watcher.is_expected(filename):
+            return self.image_watcher.has_arrived(filename)
+        return os.path.exists(filename)
+
     def wait_image_on_disk(self, filename, timeout=20.0):
         start_wait = time.time()
-        while not os.path.exists(filename):
-            if time.time() - start_wait > timeout:
-                logging.info("PX1Collect: Giving up waiting for image. Timeout")
-                break
-            time.sleep(0.1)
+        if self.image_watcher is not None and self.image_watcher.is_expected(filename):
+            arrived = self.image_watcher.wait_for(filename, timeout)
+        else:
+            with ImageWatcher([filename]) as watcher:
+                arrived = watcher.wait_for(filename, timeout)
+        if not arrived:
+            logging.info("PX1Collect: Giving up waiting for image. Timeout")
         logging.info(
             "PX1Collect: Waiting for image %s ended in  %3.2f secs"
             % (filename, time.time() - start_wait)
@@ -861,66 +952,11 @@ class PX1Collect(AbstractCollect, HardwareObject):
 
     ## ADXV display images ##
     def adxv_connect(self):
-
-        #  connect every time?? maybe we can do better
-        try:
-            res = socket.getaddrinfo(
-                self.adxv_host, self.adxv_port, 0, socket.SOCK_STREAM
-            )
-            af, socktype, proto, canonname, sa = res[0]
-            self.adxv_socket = socket.socket(af, socktype, proto)
-            self.adxv_socket.connect((self.adxv_host, self.adxv_port))
-            logging.getLogger().info("PX1Collect: ADXV Visualization connected.")
-        except Exception:
-            self.adxv_socket = None
-            logging.getLogger().info("PX1Collect: WARNING: Can't connect to ADXV.")
-
-    def adxv_show_latest(self, fileinfo):
-
-        now = time.time()
-        elapsed = now - self.adxv_latest_refresh
-
-        template = fileinfo["template"]
-        basedir = fileinfo["directory"]
-
-        if self.file_waiting_display is not None:
-            if os.path.exists(self.file_waiting_display):
-                self.adxv_sync_image(self.file_waiting_display)
-                self.file_waiting_display = None
-                self.is_firstimg = False
-
-        # find next file to display
-        if elapsed >= self.adxv_interval and self.file_waiting_display is None:
-            _current_img_no = self.collect_device.currentImageSpi
-            self.file_waiting_display = os.path.join(
-                basedir, template % _current_img_no
-            )
-            self.adxv_last_refresh = time.time()
+        return self.adxv_client.connect()
 
     def adxv_sync_image(self, filename):
-
-        adxv_send_cmd = "\nload_image %s\n" + chr(32)
-
-        try:
-            if not self.adxv_socket:
-                try:
-                    self.adxv_connect()
-                except Exception as err:
-                    self.adxv_socket = None
-                    logging.info(
-                        "PX1Collect: ADXV: Warning: Can't connect to adxv socket to follow collect."
-                    )
-                    logging.error("PX1Collect: ADXV0: msg= %s" % err)
-            else:
-                logging.info(("PX1Collect: ADXV: " + adxv_send_cmd[1:-2]) % imgname)
-                self.adxv_socket.send(adxv_send_cmd % imgname)
-        except Exception:
-            try:
-                del self.adxv_socket
-                self.adxv_connect()
-            except Exception as err:
-                self.adxv_socket = None
-                logging.error("PX1Collect: ADXV1: msg= %s" % err)
+        logging.getLogger("HWR").debug("PX1Collect: ADXV: load_image %s" % filename)
+        self.adxv_client.show(filename)
 
     ## ADXV display images (END) ##
 
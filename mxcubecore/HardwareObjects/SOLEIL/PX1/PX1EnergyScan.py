@@ -14,14 +14,11 @@ Notes:
 import logging
 import math
 import os
-import subprocess
 import time
 
 import gevent
 import numpy
 from AbstractEnergyScan import AbstractEnergyScan
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-from matplotlib.figure import Figure
 from xabs_lib import McMaster
 
 from mxcubecore import HardwareRepository as HWR
@@ -31,6 +28,16 @@ from mxcubecore.TaskUtils import (
     cleanup,
     task,
 )
+from mxcubecore.utils.edge_analysis import (
+    analyse_edge,
+    edge_fpp,
+    render_plot_async,
+    write_efs,
+)
+from mxcubecore.utils.energy_scan import (
+    ON_THE_FLY,
+    EnergyScanEngine,
+)
 
 
 class PX1EnergyScan(AbstractEnergyScan, Equipment):
@@ -95,6 +102,20 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
         if self.number_of_steps is None:
             self.number_of_steps = self.default_steps
 
+        # sequential, overlapped or on_the_fly
+        self.scan_mode = self.get_property("scan_mode", "overlapped")
+        # on the fly: MCA frame time [s] and mono speed [keV/s]
+        self.fly_frame_time = self.get_property("fly_frame_time", 0.1)
+        self.fly_speed = self.get_property("fly_speed")
+        # attribute of the monochromator device setting the fly speed
+        self.mono_speed_attribute = self.get_property(
+            "mono_speed_attribute", "velocity"
+        )
+        self.scan_engine = EnergyScanEngine(
+            self,
+            keep_shutter_open=self.get_property("keep_shutter_open", 0.5),
+        )
+
     def is_connected(self):
         return True
 
@@ -130,7 +151,7 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
         points *= self.scan_range
         points -= self.before_edge
         points += self.e_edge
-        points = numpy.array(map(self.round_egy, points))
+        points = numpy.array(list(map(self.round_egy, points)))
 
         return points
 
@@ -141,9 +162,24 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
 
     # HARDWARE ACCESS
     def move_mono(self, energy):
-        self.mono_dp.energy = float(energy)
+        self.start_mono_move(energy)
         self.wait_device(self.mono_dp)
 
+    def start_mono_move(self, energy):
+        self.mono_dp.energy = float(energy)
+
+    def is_mono_moving(self):
+        return self.mono_dp.state().name in ["MOVING", "RUNNING"]
+
+    def get_mono_energy(self):
+        return self.mono_dp.energy
+
+    def get_mono_speed(self):
+        return self.mono_dp.read_attribute(self.mono_speed_attribute).value
+
+    def set_mono_speed(self, speed):
+        self.mono_dp.write_attribute(self.mono_speed_attribute, float(speed))
+
     def wait_device(self, device):
         while device.state().name in ["MOVING", "RUNNING"]:
             time.sleep(0.1)
@@ -184,7 +220,22 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
         HWR.beamline.safety_shutter.closeShutter()
 
     def fluodet_prepare(self):
-        self.fluodet_hwo.set_preset(float(self.integration_time))
+        if self.scan_mode == ON_THE_FLY:
+            self.fluodet_hwo.set_preset(float(self.fly_frame_time))
+        else:
+            self.fluodet_hwo.set_preset(float(self.integration_time))
+
+    def start_mca(self):
+        self.fluodet_hwo.start()
+
+    def wait_mca(self):
+        self.fluodet_hwo.wait()
+
+    def read_roi_counts(self):
+        return self.fluodet_hwo.get_roi_counts()
+
+    def read_intensity(self):
+        return self.norm_diode_dev.intensity
 
     def set_mca_roi(self):
         # calibration
@@ -219,6 +270,7 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
 
     def stop(self):
         self.stopping = True
+        self.scan_engine.stop()
 
     def abort(self):
         self.stop()
@@ -305,13 +357,16 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
 
             self.move_beamline_energy(self.ble_value)
 
-            for en in self.points:
-                if self.stopping:
-                    break
-
-                self.move_mono(en)
-                point_value = self.acquire_point(en)
-                self.new_data_point(en, point_value)
+            kwargs = {}
+            if self.scan_mode == ON_THE_FLY:
+                kwargs["speed"] = self.fly_speed
+            self.scan_engine.scan(
+                self.points,
+                self.scan_mode,
+                callback=lambda point: self.new_data_point(point.energy, point.value),
+                **kwargs
+            )
+            self.log.debug("EnergyScan: %s" % self.scan_engine.statistics)
 
             self.ready_event.set()
 
@@ -447,76 +502,46 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
 
         self.scan_info["scanFileFullPath"] = str(scan_file_raw_filename)
 
-        # run chooch command
-        self.log.info(
-            "EnergyScan. running chooch %s %s %s %s"
-            % (self.chooch_cmd, scan_file_efs_filename, elt, edge)
-        )
+        # edge analysis, in process (results as from chooch)
+        self.log.info("EnergyScan. analysing edge %s %s" % (elt, edge))
         self.log.info(
             "   on success efs file should be saved : %s" % scan_file_efs_filename
         )
         try:
-            p = subprocess.Popen(
-                [
-                    self.chooch_cmd,
-                    scan_file_raw_filename,
-                    elt,
-                    edge,
-                    scan_file_efs_filename,
-                ],
-                stdout=subprocess.PIPE,
-            )
-            #
-            chooch_result_lines = p.communicate()[0].split("\n")
-
-            # there could messages in stdout. results are identified with -chooch_results- header line
-            # produced by command (look for run_chooch in [..]/MXCuBE/tools
-            next_lineno = 0
-            found = 0
-            for line in chooch_result_lines:
-                next_lineno += 1
-                if line == "chooch_results":
-                    result_line = self.clean_chooch_line(
-                        chooch_result_lines[next_lineno]
-                    )
-                    found = 1
-                    break
-
-            if found:
-                self.log.debug("chooch got data back. %s" % result_line)
-                result_data = eval(result_line)
-                (
-                    pk,
-                    fppPeak,
-                    fpPeak,
-                    ip,
-                    fppInfl,
-                    fpInfl,
-                    chooch_graph_data,
-                ) = result_data
+            scan_energies, scan_counts = zip(*self.get_scan_data())
+            # f' and f'' in electrons only with the f'' of the element edge
+            fpp_edge = edge_fpp(elt, edge)
+            if fpp_edge is None:
+                logging.getLogger("HWR").warning(
+                    "EnergyScan: no f'' values for %s, f' and f'' not determined"
+                    % symbol
+                )
+                result = analyse_edge(scan_energies, scan_counts, self.e_edge)
             else:
-                self.store_energy_scan()
-                logging.getLogger("HWR").error(
-                    "Energy scan: Chooch cannot parse results"
+                result = analyse_edge(
+                    scan_energies, scan_counts, self.e_edge, *fpp_edge
                 )
-                return
-            # scan_data = self.get_scan_data()
-            # self.log.debug("running chooch with values: element=%s, element=%s" % (elt,edge))
-            # self.log.debug("                   data is: %s" % str(scan_data))
-
-            # result = PyChooch.calc(scan_data, elt, edge)
-            # self.log.debug("          chooch returns : %s" % str(result))
-            # pk, fppPeak, fpPeak, ip, fppInfl, fpInfl, chooch_graph_data = \
-            #       result
+            write_efs(scan_file_efs_filename, result)
+            (
+                pk,
+                fppPeak,
+                fpPeak,
+                ip,
+                fppInfl,
+                fpInfl,
+                chooch_graph_data,
+            ) = result.as_chooch()
+            if fpp_edge is None:
+                fppPeak = fpPeak = fppInfl = fpInfl = 0
         except Exception:
             import traceback
 
             self.log.debug(traceback.format_exc())
             self.store_energy_scan()
-            logging.getLogger("HWR").error("Energy scan: Chooch failed")
+            logging.getLogger("HWR").error("Energy scan: edge analysis failed")
             return
 
-        self.log.info("EnergyScan. running chooch done")
+        self.log.info("EnergyScan. edge analysis done")
 
         # scanData = self.get_scan_data()
         # logging.info('scanData %s' % scanData)
@@ -570,11 +595,14 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
         self.scan_info["peakEnergy"] = pk
         self.scan_info["inflectionEnergy"] = ip
         self.scan_info["remoteEnergy"] = rm
-        self.scan_info["peakFPrime"] = fpPeak
-        self.scan_info["peakFDoublePrime"] = fppPeak
-        self.scan_info["inflectionFPrime"] = fpInfl
-        self.scan_info["inflectionFDoublePrime"] = fppInfl
-        self.scan_info["comments"] = ""
+        if fpp_edge is None:
+            self.scan_info["comments"] = "f' and f'' not determined"
+        else:
+            self.scan_info["peakFPrime"] = fpPeak
+            self.scan_info["peakFDoublePrime"] = fppPeak
+            self.scan_info["inflectionFPrime"] = fpInfl
+            self.scan_info["inflectionFDoublePrime"] = fppInfl
+            self.scan_info["comments"] = ""
 
         self.scan_info["choochFileFullPath"] = scan_file_efs_filename
         self.scan_info["filename"] = archive_file_raw_filename
@@ -604,45 +632,18 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
             fppInfl,
         )
 
-        scan_data = self.get_scan_data()
-
-        fig = Figure(figsize=(15, 11))
-        ax = fig.add_subplot(211)
-        ax.set_title("%s\n%s" % (scan_file_efs_filename, title))
-        ax.grid(True)
-        ax.plot(*(zip(*scan_data)), **{"color": "black"})
-        ax.set_xlabel("Energy")
-        ax.set_ylabel("MCA counts")
-        ax2 = fig.add_subplot(212)
-        ax2.grid(True)
-        ax2.set_xlabel("Energy")
-        ax2.set_ylabel("")
-        handles = []
-        handles.append(ax2.plot(chooch_graph_x, chooch_graph_y1, color="blue"))
-        handles.append(ax2.plot(chooch_graph_x, chooch_graph_y2, color="red"))
-        canvas = FigureCanvasAgg(fig)
-
         escan_ispyb_path = HWR.beamline.session.path_to_ispyb(archive_file_png_filename)
         self.scan_info["jpegChoochFileFullPath"] = str(escan_ispyb_path)
 
-        try:
-            logging.getLogger("HWR").info(
-                "Rendering energy scan and Chooch graphs to PNG file : %s",
-                scan_file_png_filename,
-            )
-            canvas.print_figure(scan_file_png_filename, dpi=80)
-        except Exception:
-            logging.getLogger("HWR").exception("could not print figure")
-        try:
-            logging.getLogger("HWR").info(
-                "Rendering energy scan and Chooch graphs to PNG file : %s",
-                archive_file_png_filename,
-            )
-            canvas.print_figure(archive_file_png_filename, dpi=80)
-        except Exception:
-            logging.getLogger("HWR").exception("could not save figure")
-
-        self.store_energy_scan()
+        # graphs rendered in a thread, the scan is stored once they are saved
+        plot = render_plot_async(
+            [scan_file_png_filename, archive_file_png_filename],
+            scan_energies,
+            scan_counts,
+            result,
+            "%s\n%s" % (scan_file_efs_filename, title),
+        )
+        gevent.spawn(self.store_energy_scan_after_plot, plot)
 
         self.emit(
             "choochFinished",
@@ -675,9 +676,12 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
             title,
         )
 
-    def clean_chooch_line(self, result_line):
-        line = result_line.replace("nan", "0")
-        return line
+    def store_energy_scan_after_plot(self, plot):
+        try:
+            plot.get()
+        except Exception:
+            logging.getLogger("HWR").exception("could not save figure")
+        self.store_energy_scan()
 
     def save_raw(self, scan_filename, archive_filename):
         try:
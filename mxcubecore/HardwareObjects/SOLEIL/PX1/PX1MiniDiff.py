@@ -1,6 +1,7 @@
 import logging
 import math
 import time
+import traceback
 
 import gevent
 import numpy as np
@@ -32,6 +33,13 @@ class PX1MiniDiff(GenericDiffractometer):
 
         GenericDiffractometer.init(self)
 
+        self.motion_group.mover = self.sync_move_motor
+        # the Smargon has always moved one motor at a time: move_motors moves
+        # the motors together only if exclusive_motors declares those which
+        # must not move together
+        if self.get_property("exclusive_motors") is None:
+            self.motion_group.serial = True
+
         self.centring_methods = {
             GenericDiffractometer.CENTRING_METHOD_MANUAL: self.px1_manual_centring,
             GenericDiffractometer.CENTRING_METHOD_AUTO: self.px1_automatic_centring,
@@ -549,45 +557,23 @@ class PX1MiniDiff(GenericDiffractometer):
         omega_mot = self.motor_hwobj_dict.get("phi")
         omega_mot.sync_move(target_position)
 
-    def move_motors(self, motor_positions, timeout=15):
-        """
-        Moves diffractometer motors to the requested positions
-
-        :param motors_dict: dictionary with motor names or hwobj
-                            and target values.
-        :type motors_dict: dict
-        """
-        from queue_model_objects_v1 import CentredPosition
-
-        if isinstance(motor_positions, CentredPosition):
-            motor_positions = motor_positions.as_dict()
-
-        self.wait_device_ready(timeout)
-        # logging.getLogger("HWR").info("PX1MiniDiff.move_motors: motor_positions= %s" % motor_positions)
-        for motor in motor_positions.keys():
-            # logging.getLogger("HWR").info("PX1MiniDiff.move_motors: INP motor= %s name= %s" % (motor, motor.name()))
-            position = motor_positions[motor]
-            if type(motor) in (str, unicode):
-                motor_role = motor
-                motor = self.motor_hwobj_dict.get(motor_role)
-                del motor_positions[motor_role]
-                if None in (motor, position):
-                    continue
-                motor_positions[motor] = position
-            # logging.getLogger("HWR").info("PX1MiniDiff.move_motors: OUT motor= %s" % motor)
-            self.wait_device_ready(timeout)
-            try:
-                motor.sync_move(position)
-            except:
-                import traceback
+    def move_motors(self, motor_positions, timeout=15, wait=True):
+        """Move the motors, by default waiting for the end of the moves (the
+        motors have always been moved synchronously on PX1)"""
+        GenericDiffractometer.move_motors(self, motor_positions, timeout, wait)
 
-                logging.getLogger("HWR").debug(
-                    "  / error moving motor on diffractometer. state is %s"
-                    % (self.smargon_state)
-                )
-                logging.getLogger("HWR").debug("     / %s " % traceback.format_exc())
-
-        self.wait_device_ready(timeout)
+    def sync_move_motor(self, motor, position):
+        """Move a motor of move_motors and wait for the end of its move
+        (move_motors waits for the device to be ready before the moves)"""
+        try:
+            motor.sync_move(position)
+        except Exception:
+            logging.getLogger("HWR").error(
+                "  / error moving motor %s on diffractometer. state is %s"
+                % (motor.name(), self.smargon_state)
+            )
+            logging.getLogger("HWR").error("     / %s " % traceback.format_exc())
+            raise
 
     def motor_positions_to_screen(self, centred_positions_dict):
         """ """
@@ -606,11 +592,14 @@ class PX1MiniDiff(GenericDiffractometer):
         beam_x = self.beam_position[0]
         beam_y = self.beam_position[1]
 
-        phi_angle = self.get_omega_position()
+        positions = self.position_snapshot.get_positions(
+            ("phi", "sampx", "sampy", "phiy")
+        )
+        phi_angle = positions["phi"]
 
-        sampx_pos = self.motor_hwobj_dict["sampx"].get_position()
-        sampy_pos = self.motor_hwobj_dict["sampy"].get_position()
-        phiy_pos = self.motor_hwobj_dict["phiy"].get_position()
+        sampx_pos = positions["sampx"]
+        sampy_pos = positions["sampy"]
+        phiy_pos = positions["phiy"]
 
         sampx = sampx_c - sampx_pos
         sampy = sampy_c - sampy_pos
@@ -671,13 +660,14 @@ class PX1MiniDiff(GenericDiffractometer):
         return ret_dict
 
     def get_motor_positions(self, motor_names=None):
-        motor_pos = {}
-        for motor in self.motor_hwobj_dict.keys():
-            if motor_names is not None and motor not in motor_names:
-                continue
-            mot = self.motor_hwobj_dict.get(motor)
-            motor_pos[motor] = mot.get_position()
-        return motor_pos
+        names = [
+            motor
+            for motor in self.motor_hwobj_dict.keys()
+            if motor_names is None or motor in motor_names
+        ]
+        # from the position snapshot, updated by the motor signals
+        positions = self.position_snapshot.get_positions(names)
+        return {motor: positions[motor] for motor in names}
 
     def get_phi_position(self):
         mot = self.motor_hwobj_dict.get("phi", None)
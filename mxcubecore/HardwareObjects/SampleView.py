@@ -34,30 +34,28 @@ from mxcubecore.HardwareObjects.abstract.AbstractSampleView import (
     ShapeState,
 )
 from mxcubecore.model import queue_model_objects
+from mxcubecore.utils import compositing
+from mxcubecore.utils.rotation_capture import RotationCapture
 
 
-def combine_images(img1, img2):
+def combine_images(img1, img2, out=None):
+    """Overlay img2 on img1; the img2 pixels with all the channels at or
+    below compositing.BACKGROUND_THRESHOLD are transparent.
+
+    Args:
+        img1 (Image): RGB background image
+        img2 (Image): RGB overlay, of the same size
+        out (numpy.ndarray): (height, width, 3) uint8 buffer for the result
+    Returns:
+        (Image): combined image
+    """
     if img1.size != img2.size:
         raise ValueError("Images must be the same size")
 
-    combined_img = Image.new("RGB", img1.size)
-
-    pixels1 = img1.load()
-    pixels2 = img2.load()
-    combined_pixels = combined_img.load()
-
-    width, height = img1.size
-    for x in range(width):
-        for y in range(height):
-            pixel1 = pixels1[x, y]
-            pixel2 = pixels2[x, y]
-
-            if pixel2[0] <= 200 and pixel2[1] <= 60 and pixel2[2] <= 140:
-                combined_pixels[x, y] = pixel1
-            else:
-                combined_pixels[x, y] = pixel2
-
-    return combined_img
+    overlay = np.asarray(img2)
+    layer = compositing.Layer(overlay, mask=compositing.threshold_mask(overlay))
+    combined = compositing.composite(np.asarray(img1), [layer], out=out)
+    return Image.fromarray(combined, "RGB")
 
 
 class SampleView(AbstractSampleView):
@@ -168,6 +166,28 @@ class SampleView(AbstractSampleView):
 
         return img
 
+    def take_rotation_snapshots(self, motor, angles, timeout=60):
+        """
+        Get snapshots at several angles, taken during a single move of the
+        rotation motor (see mxcubecore.utils.rotation_capture).
+
+        Args:
+            motor (AbstractMotor): The rotation motor (phi).
+            angles (list): Motor positions, ordered in the move direction.
+            timeout (float): Maximum time for the move [s].
+
+        Returns:
+            (list) (motor position of the image, rgb Image) per angle
+        """
+        frames = RotationCapture(motor, self.camera).capture(angles, timeout)
+        return [
+            (
+                frame.angle,
+                Image.frombytes("RGB", (frame.width, frame.height), frame.data),
+            )
+            for frame in frames
+        ]
+
     def get_last_image_path(self):
         return self._last_oav_image
 
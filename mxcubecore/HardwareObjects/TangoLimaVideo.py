@@ -11,41 +11,37 @@ Example configuration:
 </object>
 
 If video mode is not specified, BAYER_RG16 is used by default.
+
+The frames are kept in a FrameRing (see mxcubecore.utils.video_frames) of
+<frame_ring_size> frames (default 4), shared by the consumers: the data
+emitted with imageReceived is a read only view of the ring, not a copy.
 """
 
-import io
 import logging
-import struct
 import time
 
 import gevent
 import PyTango
-from PIL import Image
 from PyTango.gevent import DeviceProxy
 
 from mxcubecore import BaseHardwareObjects
+from mxcubecore.utils.video_frames import (
+    FrameRing,
+    decode_lima_image,
+)
 
 
 def poll_image(lima_tango_device, video_mode, FORMATS):
-    img_data = lima_tango_device.video_last_image
-
-    hfmt = ">IHHqiiHHHH"
-    hsize = struct.calcsize(hfmt)
-    _, _, _, _, width, height, _, _, _, _ = struct.unpack(hfmt, img_data[1][:hsize])
-
-    raw_data = img_data[1][hsize:]
-    _from, _to = FORMATS.get(video_mode, (None, None))
-
-    if _from and _to:
-        img = Image.frombuffer(_from, (height, width), raw_data, "raw", _from, 0, 1)
+    """Read the last video image of a Lima device
 
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format=_to)
-        img = img.tobytes()
-    else:
-        img = raw_data
+    The pixels are returned as they are sent by the device, whatever the
+    video mode (the conversions of FORMATS give back the same pixels).
 
-    return img, width, height
+    Returns:
+        (tuple): pixel data (memoryview), width, height
+    """
+    header, raw_data = decode_lima_image(lima_tango_device.video_last_image[1])
+    return raw_data, header.width, header.height
 
 
 class TangoLimaVideo(BaseHardwareObjects.HardwareObject):
@@ -54,6 +50,7 @@ class TangoLimaVideo(BaseHardwareObjects.HardwareObject):
         self.__polling = None
         self._video_mode = None
         self._last_image = (0, 0, 0)
+        self._frames = None
 
         # Dictionary containing conversion information for a given
         # video_mode. The camera video mode is the key and the first
@@ -69,6 +66,7 @@ class TangoLimaVideo(BaseHardwareObjects.HardwareObject):
 
     def init(self):
         self.device = None
+        self._frames = FrameRing(int(self.get_property("frame_ring_size", 4)))
 
         try:
             self._video_mode = self.get_property("video_mode", "RGB24")
@@ -102,19 +100,48 @@ class TangoLimaVideo(BaseHardwareObjects.HardwareObject):
 
         self.update_state(BaseHardwareObjects.HardwareObjectState.READY)
 
+    def get_frames(self):
+        """
+        Returns:
+            (FrameRing): the last frames read from the device
+        """
+        return self._frames
+
+    def get_frame_statistics(self):
+        """
+        Returns:
+            (dict): frames received, frames dropped by the device between two
+            reads and frame rate (see FrameRing.get_statistics)
+        """
+        return self._frames.get_statistics()
+
     def get_last_image(self):
+        if self.__polling is not None:
+            frame = self._frames.latest()
+            if frame is not None:
+                return frame.data, frame.width, frame.height
         return poll_image(self.device, self.video_mode, self._FORMATS)
 
-    def _do_polling(self, sleep_time):
-        lima_tango_device = self.device
+    def read_frame(self):
+        """Read the last image of the device into the frame ring
 
+        Returns:
+            (Frame): the new frame, None if the device has no new image
+        """
+        header, data = decode_lima_image(self.device.video_last_image[1])
+        if header.frame_number == self._frames.last_frame_number:
+            return None
+        return self._frames.publish(
+            data, header.width, header.height, header.frame_number, header.image_mode
+        )
+
+    def _do_polling(self, sleep_time):
         while True:
-            data, width, height = poll_image(
-                lima_tango_device, self.video_mode, self._FORMATS
-            )
+            frame = self.read_frame()
 
-            self._last_image = data, width, height
-            self.emit("imageReceived", data, width, height, False)
+            if frame is not None:
+                self._last_image = frame.data, frame.width, frame.height
+                self.emit("imageReceived", frame.data, frame.width, frame.height, False)
             time.sleep(sleep_time)
 
     def connect_notify(self, signal):
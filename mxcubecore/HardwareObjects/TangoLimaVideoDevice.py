@@ -70,6 +70,10 @@ import numpy as np
 import PyTango
 
 from mxcubecore.HardwareObjects.abstract.AbstractVideoDevice import AbstractVideoDevice
+from mxcubecore.utils.video_frames import (
+    LIMA_HEADER_FORMAT,
+    decode_lima_image,
+)
 
 
 class TangoLimaVideoDevice(AbstractVideoDevice):
@@ -93,9 +97,10 @@ class TangoLimaVideoDevice(AbstractVideoDevice):
         endian = self.get_property("endian")
 
         if endian in ["small", "Small", "Little", "little"]:
-            self.header_fmt = "<IHHqiiHHHH"
+            self.endian = "<"
         else:
-            self.header_fmt = ">IHHqiiHHHH"
+            self.endian = ">"
+        self.header_fmt = self.endian + LIMA_HEADER_FORMAT
 
         self.header_size = struct.calcsize(self.header_fmt)
 
@@ -133,12 +138,10 @@ class TangoLimaVideoDevice(AbstractVideoDevice):
         img_data = self.device.video_last_image
 
         if img_data[0] == "VIDEO_IMAGE":
-            _ = img_data[1][: self.header_size]
-            raw_buffer = np.fromstring(img_data[1][self.header_size :], np.uint16)
-            _, _, _, _, width, height, _, _, _, _ = struct.unpack(
-                self.header_fmt, img_data[1][: self.header_size]
-            )
-            return raw_buffer, width, height
+            header, data = decode_lima_image(img_data[1], self.endian)
+            # a read only view of the device data, not a copy
+            raw_buffer = np.frombuffer(data, np.uint16)
+            return raw_buffer, header.width, header.height
         else:
             return None, 0, 0
 
@@ -27,6 +27,7 @@ from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore.HardwareObjects.SecureXMLRpcRequestHandler import (
     SecureXMLRpcRequestHandler,
 )
+from mxcubecore.utils.rotation_capture import minimal_sweep
 
 if sys.version_info > (3, 0):
     from xmlrpc.server import SimpleXMLRPCServer
@@ -464,12 +465,23 @@ class XMLRPCServer(HardwareObject):
         logging.getLogger("HWR").info("Taking snapshot %s " % str(path_list))
 
         try:
-            for angle, path in path_list:
-                HWR.beamline.diffractometer.phiMotor.set_value(angle)
-                # give some time to get the snapshot
-                time.sleep(1)
-                HWR.beamline.diffractometer.wait_ready()
-                self.save_snapshot(path, show_scale, handle_light=False)
+            if show_scale:
+                # the scale is drawn by the diffractometer, angle by angle
+                for angle, path in path_list:
+                    HWR.beamline.diffractometer.phiMotor.set_value(angle)
+                    # give some time to get the snapshot
+                    time.sleep(1)
+                    HWR.beamline.diffractometer.wait_ready()
+                    self.save_snapshot(path, show_scale, handle_light=False)
+            else:
+                # all the snapshots during the shortest rotation of phi
+                sweep = minimal_sweep([angle for angle, _ in path_list])
+                snapshots = HWR.beamline.sample_view.take_rotation_snapshots(
+                    HWR.beamline.diffractometer.phiMotor,
+                    [position for _, position in sweep],
+                )
+                for (index, _), (_, image) in zip(sweep, snapshots):
+                    image.save(path_list[index][1])
         except Exception as ex:
             logging.getLogger("HWR").exception("Could not take snapshot %s " % str(ex))
 
@@ -723,23 +723,22 @@ class AbstractOnlineProcessing(HardwareObject):
         Function also extracts 10 (if they exist) best positions
         """
         # Each result array is realigned
+        if self.grid:
+            cell_indexes = np.arange(start_index, end_index + 1)
+            cols, rows = self.grid.get_cols_rows_from_image_serials(
+                cell_indexes + self.params_dict["first_image_num"]
+            )
 
         for score_key in self.results_raw:
             if (
                 self.grid
                 and self.results_raw[score_key].size == self.params_dict["images_num"]
             ):
-                for cell_index in range(start_index, end_index + 1):
-                    col, row = self.grid.get_col_row_from_image_serial(
-                        cell_index + self.params_dict["first_image_num"]
-                    )
-                    if (
-                        col < self.results_aligned[score_key].shape[0]
-                        and row < self.results_aligned[score_key].shape[1]
-                    ):
-                        self.results_aligned[score_key][col][row] = self.results_raw[
-                            score_key
-                        ][cell_index]
+                aligned = self.results_aligned[score_key]
+                in_grid = (cols < aligned.shape[0]) & (rows < aligned.shape[1])
+                aligned[cols[in_grid], rows[in_grid]] = self.results_raw[score_key][
+                    cell_indexes[in_grid]
+                ]
             else:
                 self.results_aligned[score_key] = self.results_raw[score_key]
                 if self.interpolate_results:
@@ -806,12 +805,11 @@ class AbstractOnlineProcessing(HardwareObject):
 
                     cpos = None
                     if self.grid:
-                        col, row = self.grid.get_col_row_from_image_serial(
-                            index + self.params_dict["first_image_num"]
-                        )
+                        image_serial = index + self.params_dict["first_image_num"]
+                        col, row = self.grid.get_col_row_from_image_serial(image_serial)
                         col += 0.5
                         row = self.params_dict["steps_y"] - row - 0.5
-                        cpos = self.grid.get_motor_pos_from_col_row(col, row)
+                        cpos = self.grid.get_motor_pos_from_image_serial(image_serial)
                     else:
                         col = index
                         row = 0
@@ -34,17 +34,14 @@ import os
 import sys
 import time
 import warnings
-from io import BytesIO
 
 import gevent
 import numpy as np
 
-try:
-    import cv2
-except ImportError:
-    pass
-
 from mxcubecore.BaseHardwareObjects import HardwareObject
+from mxcubecore.dispatcher import has_receivers
+from mxcubecore.utils import video_decoders
+from mxcubecore.utils.jpeg_encoder import JpegEncoder
 
 module_names = ["qt", "PyQt5", "PyQt4"]
 
@@ -57,7 +54,6 @@ if any(mod in sys.modules for mod in module_names):
     )
 else:
     USEQT = False
-    from PIL import Image
 
 
 class AbstractVideoDevice(HardwareObject):
@@ -78,6 +74,7 @@ class AbstractVideoDevice(HardwareObject):
         self.cam_type = None
         self.cam_scale_factor = None
         self.cam_name = None
+        self.cam_auto_contrast = None
 
         self.raw_image_dimensions = [None, None]
         self.image_dimensions = [None, None]
@@ -88,6 +85,15 @@ class AbstractVideoDevice(HardwareObject):
 
         self.decoder = None
         self.scale = None
+        # frame decoders, with their output buffers, per encoding
+        self._frame_decoders = {}
+        # JPEG encoding thread pool; the imageReceived signal is one of its
+        # subscriptions, active while connected
+        self.jpeg_encoder = JpegEncoder()
+        self.jpeg_encoder.subscribe(
+            self._jpeg_image_encoded,
+            active=lambda: has_receivers("imageReceived", self),
+        )
 
     def init(self):
         """Initialise the values from config and set default values,
@@ -131,6 +137,12 @@ class AbstractVideoDevice(HardwareObject):
 
         self.scale = self.get_property("scale", 1.0)
 
+        self.jpeg_encoder.workers = self.get_property("encoder_workers", 2)
+        self.jpeg_encoder.quality = self.get_property("jpeg_quality", 75)
+
+        # y16 frames: scale the frame contrast to 8 bit, or the full range
+        self.cam_auto_contrast = self.get_property("auto_contrast", True)
+
         try:
             self.cam_type = self.get_property("type").lower()
         except AttributeError:
@@ -190,22 +202,31 @@ class AbstractVideoDevice(HardwareObject):
             else:
                 qimage = QImage(raw_buffer, width, height, QImage.Format_RGB888)
 
-            if self.cam_mirror is not None:
+            # qimage refers to raw_buffer until it is transformed (copied)
+            copied = False
+            if self.cam_mirror is not None and any(self.cam_mirror):
                 qimage = qimage.mirrored(self.cam_mirror[0], self.cam_mirror[1])
+                copied = True
 
             if self.scale != 1:
                 dims = self.get_image_dimensions()  # should be already scaled
                 qimage = qimage.scaled(QSize(dims[0], dims[1]))
+                copied = True
+
+            if not copied:
+                qimage = qimage.copy()
 
             qpixmap = QPixmap(qimage)
             self.emit("imageReceived", qpixmap)
-            return qimage.copy()
+            return qimage
 
     def get_jpg_image(self):
         """Reads`raw_data` image `[1D numpy array of np.uint16]` from
         `self.get_image()` and convert it to .jpg image.
         For now this function allows to deal with any RGB encoded
         video data. Emit imageReceived signal with the jpeg image.
+        The image is encoded in the encoder thread pool, only the calling
+        greenlet waits for it.
 
         Returns:
             (bytes): Coverted to jpeg image.
@@ -213,15 +234,58 @@ class AbstractVideoDevice(HardwareObject):
         raw_buffer, width, height = self.get_image()
 
         if raw_buffer is not None and raw_buffer.any():
-            image = Image.frombytes("RGB", (width, height), raw_buffer)
-            buffer = BytesIO()
-            image.save(buffer, "JPEG")
-            jpg_img = buffer.getvalue()
-            if jpg_img is not None:
-                self.emit("imageReceived", jpg_img, width, height)
+            jpg_img = self.jpeg_encoder.encode(raw_buffer, width, height)
+            self.emit("imageReceived", jpg_img, width, height)
             return jpg_img
         return None
 
+    def stream_jpg_image(self):
+        """Reads the image from `self.get_image()` and submits it to the
+        encoder, which encodes it in the background, once per target, for
+        the connected imageReceived receivers and the JPEG stream
+        subscriptions. Frames are skipped when nobody consumes them and
+        dropped while the previous one is being encoded.
+
+        Returns:
+            (gevent.Greenlet): Delivering the image, None if not encoded.
+        """
+        raw_buffer, width, height = self.get_image()
+
+        if raw_buffer is not None and raw_buffer.any():
+            return self.jpeg_encoder.submit(raw_buffer, width, height)
+        return None
+
+    def _jpeg_image_encoded(self, jpg_img, width, height):
+        self.emit("imageReceived", jpg_img, width, height)
+
+    def subscribe_jpeg_stream(self, callback, bytes_per_second=None, quality=None):
+        """Receive the polled images as JPEG.
+        Args:
+            callback (Callable): called with the JPEG data, width and height.
+            bytes_per_second (float): Budget of the client; the quality and
+                resolution are adapted to it. None for all the images, full
+                resolution.
+            quality (int): JPEG quality, when there is no budget.
+        Returns:
+            (Subscription): To pass to unsubscribe_jpeg_stream.
+        """
+        return self.jpeg_encoder.subscribe(callback, bytes_per_second, quality)
+
+    def unsubscribe_jpeg_stream(self, subscription):
+        """Stop receiving the JPEG images.
+        Args:
+            subscription (Subscription): from subscribe_jpeg_stream.
+        """
+        self.jpeg_encoder.unsubscribe(subscription)
+
+    def get_jpeg_statistics(self):
+        """Get the JPEG encoding statistics.
+        Returns:
+            (dict): Frames submitted, encoded, skipped and dropped, queue
+                depth, mean and maximum encoding time [s].
+        """
+        return self.jpeg_encoder.get_statistics()
+
     def get_cam_type(self):
         """Get the camera type
         Returns:
@@ -229,57 +293,62 @@ class AbstractVideoDevice(HardwareObject):
         """
         return self.cam_type
 
+    def get_frame_decoder(self, decoder_class, **kwargs):
+        """Get the decoder of the current raw image size, created on first
+        use. The decoders reuse their output buffer for all the frames.
+        Args:
+            decoder_class (type): video_decoders.FrameDecoder subclass
+            kwargs: decoder options
+        Returns:
+            (FrameDecoder): The decoder.
+        """
+        width, height = self.get_raw_image_size()
+        decoder = self._frame_decoders.get(decoder_class)
+        if decoder is None or decoder.shape != (width, height):
+            decoder = decoder_class(width, height, **kwargs)
+            self._frame_decoders[decoder_class] = decoder
+        return decoder
+
     def y8_2_rgb(self, raw_buffer):
         """Convert Y8 to RGB.
         Args:
             raw_buffer: Image
         Returns:
-            (): Converted image.
+            (numpy.ndarray): Converted image, overwritten by the next one.
         """
-        image = np.fromstring(raw_buffer, dtype=np.uint8)
-        raw_dims = self.get_raw_image_size()
-        image.resize(raw_dims[1], raw_dims[0], 1)
-        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        return self.get_frame_decoder(video_decoders.Y8Decoder).decode(raw_buffer)
 
     def y16_2_rgb(self, raw_buffer):
         """Convert Y16 to RGB.
         Args:
             raw_buffer: Image
         Returns:
-            (): Converted image.
+            (numpy.ndarray): Converted image, overwritten by the next one.
         """
-        image = np.fromstring(raw_buffer, dtype=np.uint8)
-        raw_dims = self.get_raw_image_size()
-        np.resize(image, (raw_dims[1], raw_dims[0], 2))
-        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        decoder = self.get_frame_decoder(
+            video_decoders.Y16Decoder, auto_contrast=bool(self.cam_auto_contrast)
+        )
+        return decoder.decode(raw_buffer)
 
     def yuv_2_rgb(self, raw_buffer):
         """Convert YUV to RGB.
         Args:
             raw_buffer: Image
         Returns:
-            (): Converted image.
+            (numpy.ndarray): Converted image, overwritten by the next one.
         """
-        image = np.fromstring(raw_buffer, dtype=np.uint8)
-        raw_dims = self.get_raw_image_size()
-        image.resize(raw_dims[1], raw_dims[0], 2)
-        return cv2.cvtColor(image, cv2.COLOR_YUV2RGB_UYVY)
+        decoder = self.get_frame_decoder(video_decoders.YUV422Decoder)
+        return decoder.decode(raw_buffer)
 
     def bayer_rg16_2_rgb(self, raw_buffer):
         """Convert BAYER RG16 to RGB.
         Args:
             raw_buffer: Image
         Returns:
-            (): Converted image.
+            (numpy.ndarray): Converted image, overwritten by the next one.
         """
-        image = np.fromstring(raw_buffer, dtype=np.uint16)
-        raw_dims = self.get_raw_image_size()
-        image.resize(raw_dims[1], raw_dims[0])
-        out_buffer = cv2.cvtColor(image, cv2.COLOR_BayerRG2BGR)
-        if out_buffer.ndim == 3 and out_buffer.itemsize > 1:
-            # decoding bayer16 gives 12 bit values => scale to 8 bit
-            out_buffer = np.right_shift(out_buffer, 4).astype(np.uint8)
-        return out_buffer
+        decoder = self.get_frame_decoder(video_decoders.BayerRG16Decoder)
+        return decoder.decode(raw_buffer)
 
     def save_snapshot(self, filename, image_type="PNG"):
         """Save snapshot image"""
@@ -381,11 +450,13 @@ class AbstractVideoDevice(HardwareObject):
         Descript. :
         """
         while self.get_video_live() is True:
+            start = time.monotonic()
             if USEQT:
                 self.get_new_image()
-            else:
-                self.get_jpg_image()
-            time.sleep(sleep_time)
+            elif self.jpeg_encoder.has_consumers():
+                self.stream_jpg_image()
+            # one image per period, whatever the time spent reading it
+            time.sleep(max(sleep_time - (time.monotonic() - start), 0))
 
     def connect_notify(self, signal):
         """
@@ -4,10 +4,20 @@ import os
 import tempfile
 import time
 
+import gevent
 import gevent.event
+import gevent.queue
 import numpy
 from scipy import optimize
 
+from mxcubecore.utils.loop_finder import (
+    NOT_FOUND,
+    LoopFinder,
+    LoopResult,
+    frame_from_image,
+)
+from mxcubecore.utils.rotation_capture import RotationCapture
+
 try:
     import lucid3 as lucid
 except ImportError:
@@ -36,6 +46,14 @@ CURRENT_CENTRING = None
 SAVED_INITIAL_POSITIONS = {}
 READY_FOR_NEXT_POINT = gevent.event.Event()
 NUM_CENTRING_ROUNDS = 1
+# find the loop in memory with utils.loop_finder.LoopFinder instead of lucid;
+# to be validated against lucid on the snapshots of the beamline first (see
+# test/benchmarks/compare_loop_finders.py)
+USE_LOOP_FINDER = False
+# auto_center: find the loop at all the angles during one rotation of phi,
+# instead of stopping phi at each angle
+ROTATION_SCAN = False
+LOOP_FINDER = LoopFinder()
 
 
 class CentringMotor:
@@ -455,6 +473,40 @@ def center(
         raise RuntimeError("Exception while centring")
 
     # logging.info("X=%s,Y=%s", X, Y)
+    return centred_position(
+        X,
+        Y,
+        phi_positions,
+        phi,
+        phiy,
+        phiz,
+        sampx,
+        sampy,
+        pixelsPerMm_Hor,
+        pixelsPerMm_Ver,
+        beam_xc,
+        beam_yc,
+        chi_angle,
+    )
+
+
+def centred_position(
+    X,
+    Y,
+    phi_positions,
+    phi,
+    phiy,
+    phiz,
+    sampx,
+    sampy,
+    pixelsPerMm_Hor,
+    pixelsPerMm_Ver,
+    beam_xc,
+    beam_yc,
+    chi_angle,
+):
+    """Centred motor positions from the sample positions at several phi
+    angles: X, Y [mm] and phi_positions [rad]"""
     chi_angle = math.radians(chi_angle)
     chiRotMatrix = numpy.matrix(
         [
@@ -545,12 +597,15 @@ def start_auto(
     return CURRENT_CENTRING
 
 
-def find_loop(sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb):
-    snapshot_filename = os.path.join(
-        tempfile.gettempdir(), "mxcube_sample_snapshot.png"
-    )
-    sample_view.save_snapshot(snapshot_filename, overlay=False, bw=True)
+def lucid_find_loop(image, chi_angle):
+    """Find the loop with lucid.
 
+    Args:
+        image (str or numpy.ndarray): image file name, or grey level frame
+        chi_angle (float): chi [deg]
+    Returns:
+        (LoopResult): loop position [pixels], without score
+    """
     # Lucid does not accept 0 degree rotation and
     # has a reference frame that is reversed to the one used
     # in MXCuBE
@@ -560,23 +615,174 @@ def find_loop(sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb):
         chi_angle = -chi_angle
 
     info, x, y = lucid.find_loop(
-        snapshot_filename, rotation=chi_angle, debug=False, IterationClosing=6
+        image, rotation=chi_angle, debug=False, IterationClosing=6
     )
 
     try:
         x = float(x)
         y = float(y)
     except Exception:
+        return NOT_FOUND
+    return LoopResult(x, y, None, info)
+
+
+def find_loop_in_frame(frame, chi_angle):
+    """Find the loop in a video frame, with lucid or LoopFinder (see
+    USE_LOOP_FINDER).
+
+    Args:
+        frame (numpy.ndarray): (height, width[, channels]) frame
+        chi_angle (float): chi [deg]
+    Returns:
+        (LoopResult): loop position [pixels] and score (None with lucid)
+    """
+    if USE_LOOP_FINDER:
+        # same reference frame as lucid
+        return LOOP_FINDER.find(frame, -chi_angle)
+    if frame.ndim == 3:
+        frame = frame.mean(axis=2).astype(numpy.uint8)
+    return lucid_find_loop(frame, chi_angle)
+
+
+def find_loop_result(sample_view, chi_angle):
+    """Find the loop in the sample view: in a black and white snapshot with
+    lucid, or in the last video image, in memory, with LoopFinder (see
+    USE_LOOP_FINDER).
+
+    Args:
+        sample_view: sample view, with the camera
+        chi_angle (float): chi [deg], the direction of the pin in the image
+    Returns:
+        (LoopResult): loop position [pixels] and score (None with lucid)
+    """
+    if not USE_LOOP_FINDER:
+        snapshot_filename = os.path.join(
+            tempfile.gettempdir(), "mxcube_sample_snapshot.png"
+        )
+        sample_view.save_snapshot(snapshot_filename, overlay=False, bw=True)
+        return lucid_find_loop(snapshot_filename, chi_angle)
+
+    data, width, height = sample_view.camera.get_last_image()
+    if data is None:
+        return NOT_FOUND
+    return find_loop_in_frame(frame_from_image(data, width, height), chi_angle)
+
+
+def find_loop(sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb):
+    result = find_loop_result(sample_view, chi_angle)
+    if result.x < 0:
         return -1, -1
+    x, y = result.x, result.y
 
     if callable(msg_cb):
-        msg_cb("Loop found: %s (%d, %d)" % (info, x, y))
+        if result.score is None:
+            msg_cb("Loop found: %s (%d, %d)" % (result.info, x, y))
+        else:
+            msg_cb(
+                "Loop found: %s (%d, %d), score %.2f"
+                % (result.info, x, y, result.score)
+            )
     if callable(new_point_cb):
         new_point_cb((x, y))
 
     return x, y
 
 
+def find_loops_while_rotating(sample_view, phi, phi_positions, chi_angle, timeout=60):
+    """Move phi to the last position in one move, and find the loop at each
+    position while phi moves on. The frames are tagged with the phi position
+    at their timestamp (see RotationCapture), and analysed in a thread, one
+    after the other, while the next positions are awaited.
+
+    Args:
+        sample_view: sample view, with the camera
+        phi: phi motor
+        phi_positions (list): phi positions [deg], in the move direction
+        chi_angle (float): chi [deg]
+        timeout (float): maximum time for the move [s]
+    Returns:
+        (list): (phi position of the image, LoopResult) per position
+    """
+    frames = gevent.queue.Queue()
+    threadpool = gevent.get_hub().threadpool
+
+    def analyse():
+        results = []
+        for frame in frames:
+            image = frame_from_image(frame.data, frame.width, frame.height)
+            results.append(
+                (frame.angle, threadpool.apply(find_loop_in_frame, (image, chi_angle)))
+            )
+        return results
+
+    analysis = gevent.spawn(analyse)
+    capture = RotationCapture(phi, sample_view.camera)
+    try:
+        capture.capture(phi_positions, timeout, frame_cb=frames.put)
+    except BaseException:
+        analysis.kill()
+        raise
+    finally:
+        frames.put(StopIteration)
+    return analysis.get()
+
+
+def rotation_scan_centre(
+    sample_view,
+    phi,
+    phiy,
+    phiz,
+    sampx,
+    sampy,
+    pixelsPerMm_Hor,
+    pixelsPerMm_Ver,
+    beam_xc,
+    beam_yc,
+    chi_angle,
+    n_points,
+    new_point_cb=None,
+    phi_range=180,
+):
+    """Centred position from the loop found at n_points angles during one
+    rotation of phi; None if the loop was not found at one of the angles."""
+    start = phi.get_value()
+    step = phi.direction * phi_range / (n_points - 1)
+    positions = [start + i * step for i in range(n_points)]
+    results = find_loops_while_rotating(sample_view, phi, positions, chi_angle)
+
+    X, Y, phi_positions = [], [], []
+    for angle, result in results:
+        if result.x < 0:
+            return None
+        if callable(new_point_cb):
+            new_point_cb((result.x, result.y))
+        X.append(result.x / float(pixelsPerMm_Hor))
+        Y.append(result.y / float(pixelsPerMm_Ver))
+        phi_positions.append(phi.direction * math.radians(angle))
+    return centred_position(
+        X,
+        Y,
+        phi_positions,
+        phi,
+        phiy,
+        phiz,
+        sampx,
+        sampy,
+        pixelsPerMm_Hor,
+        pixelsPerMm_Ver,
+        beam_xc,
+        beam_yc,
+        chi_angle,
+    )
+
+
+def wait_phi_stopped(phi, timeout=30):
+    """Wait for the end of a phi move, e.g. after a failed rotation scan"""
+    with gevent.Timeout(timeout, RuntimeError("Timeout waiting for phi")):
+        while not phi.is_ready():
+            gevent.sleep(0.02)
+
+
 def auto_center(
     sample_view,
     phi,
@@ -595,6 +801,8 @@ def auto_center(
 ):
     imgWidth = sample_view.camera.get_width()
     imgHeight = sample_view.camera.get_height()
+    # new sample: forget the background of the previous one
+    LOOP_FINDER.reset()
 
     # check if loop is there at the beginning
     i = 0
@@ -612,6 +820,34 @@ def auto_center(
         if callable(msg_cb):
             msg_cb("Doing automatic centring")
 
+        if ROTATION_SCAN:
+            try:
+                centred_pos = rotation_scan_centre(
+                    sample_view,
+                    phi,
+                    phiy,
+                    phiz,
+                    sampx,
+                    sampy,
+                    pixelsPerMm_Hor,
+                    pixelsPerMm_Ver,
+                    beam_xc,
+                    beam_yc,
+                    chi_angle,
+                    n_points,
+                    new_point_cb,
+                )
+            except Exception:
+                logging.getLogger("HWR").exception("Centring during rotation failed")
+                centred_pos = None
+                wait_phi_stopped(phi)
+            if centred_pos is not None:
+                end(centred_pos)
+                continue
+            # loop lost at an angle, or scan failed: centre point by point
+            if callable(msg_cb):
+                msg_cb("Loop not found during rotation, centring point by point")
+
         centring_greenlet = gevent.spawn(
             center,
             phi,
@@ -34,6 +34,7 @@ from __future__ import (
 import importlib
 import logging
 import os
+import re
 import sys
 import time
 import traceback
@@ -44,6 +45,9 @@ from typing import (
     Union,
 )
 
+import gevent
+import gevent.event
+import gevent.pool
 from ruamel.yaml import YAML
 
 from mxcubecore import (
@@ -51,6 +55,7 @@ from mxcubecore import (
     HardwareObjectFileParser,
 )
 from mxcubecore.dispatcher import dispatcher
+from mxcubecore.utils import config_cache
 from mxcubecore.utils.conversion import (
     make_table,
     string_types,
@@ -77,6 +82,113 @@ TIMERS = []
 beamline = None
 BEAMLINE_CONFIG_FILE = "beamline_config.yml"
 
+# Loading of the objects contained in a yaml configuration:
+# "serial" loads them one after the other in file order,
+# "parallel" loads them concurrently, respecting the dependencies
+LOAD_MODES = ("serial", "parallel")
+load_mode = os.environ.get("MXCUBE_HWR_LOAD_MODE", "serial")
+# Maximum number of objects loaded concurrently in parallel mode
+MAX_PARALLEL_LOADS = 8
+
+XML_REFERENCE = re.compile(r"""\b(?:href|hwrid)\s*=\s*["']([^"']+)["']""")
+
+
+def _referenced_files(config_file, _seen=None):
+    """Configuration files loaded, directly or not, when loading config_file
+
+    Args:
+        config_file (str): yaml file name or xml object name
+        _seen (set): Internal, files already visited
+
+    Returns:
+        set: xml object names ("/name") and yaml file names
+    """
+    if _seen is None:
+        _seen = set()
+    fname, fext = os.path.splitext(config_file)
+    if fext in (".yaml", ".yml"):
+        name = config_file
+    else:
+        name = "/" + fname.lstrip("/")
+    if name in _seen:
+        return _seen
+    _seen.add(name)
+
+    if fext in (".yaml", ".yml"):
+        path = _instance.find_in_repository(config_file)
+        if path is not None:
+            configuration = config_cache.load_yaml(path) or {}
+            for child_file in (configuration.get("_objects") or {}).values():
+                _referenced_files(child_file, _seen)
+    else:
+        path = _instance.find_in_repository(name + os.path.extsep + "xml")
+        if path is not None:
+            with open(path, "r") as fp0:
+                for reference in XML_REFERENCE.findall(fp0.read()):
+                    _referenced_files(reference, _seen)
+    return _seen
+
+
+def _dependency_graph(objects, declared=None):
+    """Dependencies between the objects contained in a configuration
+
+    An object depends on an object listed before it if they load common
+    configuration files (e.g. one references the other), or if it is
+    declared in the '_dependencies' section - for dependencies which exist
+    in the code only (signal connections, use of beamline objects in init).
+
+    Args:
+        objects (dict): role: configuration file, in loading order
+        declared (dict): role: list of roles it depends on
+
+    Returns:
+        dict: role: list of the roles it depends on
+    """
+    declared = declared or {}
+    files = {
+        role: _referenced_files(config_file) for role, config_file in objects.items()
+    }
+    roles = list(objects)
+    graph = {}
+    for index, role in enumerate(roles):
+        graph[role] = [
+            role0
+            for role0 in roles[:index]
+            if files[role0] & files[role] or role0 in declared.get(role, ())
+        ]
+    return graph
+
+
+def _critical_path(graph, load_times):
+    """Longest chain of dependent loads
+
+    Args:
+        graph (dict): role: list of the roles it depends on (in loading order)
+        load_times (dict): role: load time (ms)
+
+    Returns:
+        tuple: list of roles, total load time (ms)
+    """
+    finish = {}
+    previous = {}
+    for role, dependencies in graph.items():
+        start = 0
+        for role0 in dependencies:
+            if finish[role0] > start:
+                start = finish[role0]
+                previous[role] = role0
+        finish[role] = start + load_times.get(role, 0)
+
+    if not finish:
+        return [], 0
+    role = max(finish, key=finish.get)
+    total = finish[role]
+    path = [role]
+    while role in previous:
+        role = previous[role]
+        path.insert(0, role)
+    return path, total
+
 
 def load_from_yaml(configuration_file, role, _container=None, _table=None):
     """
@@ -111,8 +223,7 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
 
     if not msg0:
         # Load the configuration file
-        with open(configuration_path, "r") as fp0:
-            configuration = yaml.load(fp0)
+        configuration = config_cache.load_yaml(configuration_path)
 
         # Get actual class
         initialise_class = configuration.pop("_initialise_class", None)
@@ -190,33 +301,13 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
                 (role, class_name, configuration_file, "%.1d" % load_time, msg1)
             )
             msg0 = "Done loading contents"
-        for role1, config_file in _objects.items():
-            fname, fext = os.path.splitext(config_file)
-            if fext in (".yaml", ".yml"):
-                load_from_yaml(
-                    config_file, role=role1, _container=result, _table=_table
-                )
-            elif fext == ".xml":
-                msg1 = ""
-                time0 = time.time()
-                try:
-                    hwobj = _instance.get_hardware_object(fname)
-                    if hwobj is None:
-                        msg1 = "No object loaded"
-                        class_name1 = "None"
-                    else:
-                        class_name1 = hwobj.__class__.__name__
-                        if hasattr(result, role1):
-                            result.replace_object(role1, hwobj)
-                        else:
-                            msg1 = "No such role: %s.%s" % (class_name, role1)
-                except Exception as ex:
-                    msg1 = "Loading error (%s)" % str(ex)
-                    class_name = ""
-                load_time = 1000 * (time.time() - time0)
-                _table.append(
-                    (role1, class_name1, config_file, "%.1d" % load_time, msg1)
-                )
+        _load_contents(
+            result,
+            class_name,
+            _objects,
+            configuration.pop("_dependencies", None),
+            _table,
+        )
 
         # Set simple, miscellaneous properties.
         # NB the attribute must have been initialied in the class __init__ first.
@@ -256,6 +347,115 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
     return result
 
 
+def _load_content(container, class_name, role, config_file, table):
+    """Load one object contained in a yaml configuration
+
+    Args:
+        container (ConfiguredObject): Container object
+        class_name (str): Class name of the container
+        role (str): Role name of the contained object
+        config_file (str): Configuration file of the contained object
+        table (List): Collecting summary output
+
+    Returns:
+        float: load time (ms)
+    """
+    time0 = time.time()
+    fname, fext = os.path.splitext(config_file)
+    if fext in (".yaml", ".yml"):
+        load_from_yaml(config_file, role=role, _container=container, _table=table)
+    elif fext == ".xml":
+        msg1 = ""
+        class_name1 = ""
+        try:
+            hwobj = _instance.get_hardware_object(fname)
+            if hwobj is None:
+                msg1 = "No object loaded"
+                class_name1 = "None"
+            else:
+                class_name1 = hwobj.__class__.__name__
+                if hasattr(container, role):
+                    container.replace_object(role, hwobj)
+                else:
+                    msg1 = "No such role: %s.%s" % (class_name, role)
+        except Exception as ex:
+            msg1 = "Loading error (%s)" % str(ex)
+        load_time = 1000 * (time.time() - time0)
+        table.append((role, class_name1, config_file, "%.1d" % load_time, msg1))
+    return 1000 * (time.time() - time0)
+
+
+def _load_contents(container, class_name, objects, dependencies, table):
+    """Load the objects contained in a yaml configuration
+
+    In "parallel" load_mode each object is loaded in its own greenlet as
+    soon as the objects it depends on are loaded; the first loading error
+    is raised once all the greenlets are done. The summary rows are added
+    in configuration order whatever the mode, followed by the critical path
+    of the dependency graph in "parallel" mode (the graph is not built in
+    "serial" mode) or the total load time in "serial" mode.
+
+    Args:
+        container (ConfiguredObject): Container object
+        class_name (str): Class name of the container
+        objects (dict): role: configuration file, in loading order
+        dependencies (dict): role: roles it depends on ('_dependencies')
+        table (List): Collecting summary output
+    """
+    if not objects:
+        return
+
+    if load_mode not in LOAD_MODES:
+        raise ValueError(
+            "Unknown load mode %r, should be one of %s" % (load_mode, LOAD_MODES)
+        )
+
+    start_time = time.time()
+    tables = {role: [] for role in objects}
+    load_times = {}
+
+    if load_mode == "parallel":
+        graph = _dependency_graph(objects, dependencies)
+        loaded = {role: gevent.event.Event() for role in objects}
+        pool = gevent.pool.Pool(MAX_PARALLEL_LOADS)
+
+        def load(role, config_file):
+            try:
+                for role0 in graph[role]:
+                    loaded[role0].wait()
+                load_times[role] = _load_content(
+                    container, class_name, role, config_file, tables[role]
+                )
+            finally:
+                loaded[role].set()
+
+        # Greenlets are started in configuration order and only wait for
+        # objects listed before them, so a full pool cannot deadlock
+        greenlets = [
+            pool.spawn(load, role, config_file) for role, config_file in objects.items()
+        ]
+        pool.join()
+        for greenlet in greenlets:
+            # raise the first error, as a serial load would
+            greenlet.get()
+    else:
+        for role, config_file in objects.items():
+            load_times[role] = _load_content(
+                container, class_name, role, config_file, tables[role]
+            )
+
+    for role in objects:
+        table.extend(tables[role])
+
+    wall_time = 1000 * (time.time() - start_time)
+    if load_mode == "parallel":
+        path, path_time = _critical_path(graph, load_times)
+        summary = ("critical path", "", " > ".join(path), "%.1d" % path_time)
+    else:
+        summary = ("all contents", "", "", "%.1d" % sum(load_times.values()))
+    table.append(summary + ("%s load of contents: %.1d ms" % (load_mode, wall_time),))
+
+
 def add_hardware_objects_dirs(ho_dirs):
     """Adds directories with xml/yaml config files
 
@@ -279,18 +479,24 @@ def set_user_file_directory(user_file_directory):
     BaseHardwareObjects.HardwareObjectNode.set_user_file_directory(user_file_directory)
 
 
-def init_hardware_repository(configuration_path):
+def init_hardware_repository(configuration_path, mode=None):
     """Initialise hardware repository - must be run at program start
 
     Args:
         configuration_path (str): PATHSEP-separated string of directories
         giving configuration file lookup path
+        mode (str): load mode, "serial" or "parallel" (see LOAD_MODES).
+        Defaults to the MXCUBE_HWR_LOAD_MODE environment variable, or "serial"
 
     Returns:
 
     """
     global _instance
     global beamline
+    global load_mode
+
+    if mode is not None:
+        load_mode = mode
 
     if _instance is not None or beamline is not None:
         raise RuntimeError(
@@ -316,6 +522,7 @@ def init_hardware_repository(configuration_path):
     _instance.connect()
     beamline = load_from_yaml(BEAMLINE_CONFIG_FILE, role="beamline")
     beamline._hwr_init_done()
+    config_cache.save()
 
 
 def uninit_hardware_repository():
@@ -360,6 +567,8 @@ class __HardwareRepositoryClient:
         self.hwobj_info_list = []
         self.invalid_hardware_objects = None
         self.hardware_objects = None
+        # object name: (loading greenlet, event set when loaded)
+        self._loading = {}
 
     def connect(self):
         if self.__connected:
@@ -423,15 +632,17 @@ class __HardwareRepositoryClient:
         class_name = ""
         hwobj_instance = None
         xml_data = ""
+        file_path = None
 
         for xml_files_path in self.server_address:
             file_name = (
                 hwobj_name[1:] if hwobj_name.startswith(os.path.sep) else hwobj_name
             )
-            file_path = os.path.join(xml_files_path, file_name) + os.path.extsep + "xml"
-            if os.path.exists(file_path):
+            path = os.path.join(xml_files_path, file_name) + os.path.extsep + "xml"
+            if os.path.exists(path):
                 try:
-                    xml_data = open(file_path, "r").read()
+                    xml_data = open(path, "r").read()
+                    file_path = path
                 except Exception:
                     pass
                 break
@@ -440,7 +651,7 @@ class __HardwareRepositoryClient:
 
         if xml_data:
             try:
-                hwobj_instance = self.parse_xml(xml_data, hwobj_name)
+                hwobj_instance = self.parse_xml(xml_data, hwobj_name, file_path)
                 if isinstance(hwobj_instance, string_types):
                     # We have redirection to another file
                     # Enter in dictionaries also under original names
@@ -542,18 +753,21 @@ class __HardwareRepositoryClient:
 
         dispatcher.send("hardwareObjectDiscarded", ho_name, self)
 
-    def parse_xml(self, xml_string, ho_name):
+    def parse_xml(self, xml_string, ho_name, file_path=None):
         """Load a Hardware Object from its XML string representation
 
         Parameters :
           xml_string -- the XML string
           ho_name -- the name of the Hardware Object to load (i.e. '/motors/m0')
+          file_path -- the XML file, to use the parsed configuration cache
 
         Return :
           the Hardware Object, or None if it fails
         """
         try:
-            hardware_obj = HardwareObjectFileParser.parse_string(xml_string, ho_name)
+            hardware_obj = HardwareObjectFileParser.parse_string(
+                xml_string, ho_name, file_path
+            )
         except Exception:
             logging.getLogger("HWR").exception(
                 "Cannot parse Hardware Repository file %s", ho_name
@@ -675,13 +889,35 @@ class __HardwareRepositoryClient:
                 if object_name in self.hardware_objects:
                     hardware_obj = self.hardware_objects[object_name]
                 else:
-                    hardware_obj = self._load_hardware_object(object_name)
+                    hardware_obj = self._load_once(object_name)
                 return hardware_obj
         except TypeError as err:
             logging.getLogger("HWR").exception(
                 "could not get Hardware Object %s", object_name
             )
 
+    def _load_once(self, object_name):
+        """Load a Hardware Object, or wait for the greenlet already loading it
+
+        Args:
+            object_name (str): The name of the Hardware Object
+
+        Returns:
+            Union[HardwareObject, None]: The loaded Hardware Object
+        """
+        loading = self._loading.get(object_name)
+        if loading is not None and loading[0] is not gevent.getcurrent():
+            loading[1].wait()
+            return self.hardware_objects.get(object_name)
+
+        loaded = gevent.event.Event()
+        self._loading[object_name] = (gevent.getcurrent(), loaded)
+        try:
+            return self._load_hardware_object(object_name)
+        finally:
+            self._loading.pop(object_name, None)
+            loaded.set()
+
     def get_equipment(self, equipment_name):
         """Return an Equipment given its name (see get_hardware_object())"""
         return self.get_hardware_object(equipment_name)
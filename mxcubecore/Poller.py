@@ -1,24 +1,51 @@
+"""Polling of hardware values.
+
+All pollers are driven by a single scheduler: one timer thread keeps a heap
+of poll groups (one group per polling period) and hands due polls over to a
+small pool of worker threads. Results are sent back to the gevent hub through
+one async watcher, where the value changed / error callbacks are spawned.
+
+Pollers whose last call failed or was slower than ``SLOW_LATENCY`` (typically
+unreachable devices waiting for their timeout) run in a separate pool of
+workers, so that they cannot stall the other polls. The sizes of both pools
+can be changed with :func:`set_worker_count`.
+
+A poll that raises is not stopped for good: the error callback is called and
+the poller backs off exponentially (capped by ``MAX_BACKOFF``) before trying
+again. Every poller keeps latency and jitter statistics, see
+:meth:`_Poller.get_statistics` and :func:`get_statistics`.
+"""
+
+import collections
+import heapq
+import itertools
 import logging
+import time
 
 import gevent
-import gevent.monkey
 import numpy
 from dispatcher import saferef
 from gevent import _threading
 from gevent.event import Event
 
-try:
-    import Queue as queue
-except ImportError:
-    import queue
-
-
 log = logging.getLogger("HWR")
 
 POLLERS = {}
 
 gevent_version = list(map(int, gevent.__version__.split(".")))
 
+#: Number of worker threads executing the polled calls
+WORKER_COUNT = 4
+
+#: Number of worker threads executing the failing or slow polled calls
+SLOW_WORKER_COUNT = 2
+
+#: Duration above which a polled call is run by the slow workers [s]
+SLOW_LATENCY = 0.5
+
+#: Upper limit of the delay between two attempts of a failing poll [ms]
+MAX_BACKOFF = 30000
+
 
 class _NotInitializedValue:
     pass
@@ -37,6 +64,29 @@ def get_poller(poller_id):
     return POLLERS.get(poller_id)
 
 
+def get_statistics():
+    """Statistics of all the running pollers.
+    Returns:
+        (dict): poller id: statistics dictionary (see _Poller.get_statistics)
+    """
+    return {poller_id: poller.get_statistics() for poller_id, poller in POLLERS.items()}
+
+
+def set_worker_count(worker_count=None, slow_worker_count=None):
+    """Set the number of worker threads of the poll scheduler.
+    Args:
+        worker_count (int): number of workers of the regular polls
+        slow_worker_count (int): number of workers of the failing or slow polls
+    """
+    global WORKER_COUNT, SLOW_WORKER_COUNT
+    if worker_count is not None:
+        WORKER_COUNT = worker_count
+    if slow_worker_count is not None:
+        SLOW_WORKER_COUNT = slow_worker_count
+    if _SCHEDULER is not None:
+        _SCHEDULER.set_worker_count(WORKER_COUNT, SLOW_WORKER_COUNT)
+
+
 def poll(
     polled_call,
     polled_call_args=(),
@@ -47,15 +97,12 @@ def poll(
     start_delay=0,
     start_value=NotInitializedValue,
 ):
-    # logging.info(">>>> %s", POLLERS)
     for poller in POLLERS.values():
         poller_polled_call = poller.polled_call_ref()
-        # logging.info(">>>>> poller.poll_cmd=%s, poll_cmd=%s, poller.args=%s, args=%s", poller_polled_call, polled_call, poller.args, polled_call_args)
         if poller_polled_call == polled_call and poller.args == polled_call_args:
             poller.set_polling_period(min(polling_period, poller.get_polling_period()))
             return poller
 
-    # logging.info(">>>>> CREATING NEW POLLER for cmd %r, args=%s, polling time=%d", polled_call, polled_call_args, polling_period)
     poller = _Poller(
         polled_call,
         polled_call_args,
@@ -70,6 +117,191 @@ def poll(
     return poller
 
 
+class _PollGroup:
+    """Pollers sharing the same polling period, scheduled as one timer entry"""
+
+    def __init__(self, period):
+        self.period = period
+        # dict used as an insertion ordered set
+        self.pollers = {}
+
+
+class _PollScheduler:
+    """Timer thread and worker pool shared by all the pollers.
+
+    The timer thread wakes up when the first poll group is due, queues the
+    pollers of that group which are neither busy nor backing off, and
+    reschedules the group one period later. Worker threads run the polled
+    calls; their results are queued and delivered in the gevent hub. Slow
+    pollers (see _Poller.slow) are queued to their own workers.
+    """
+
+    def __init__(self, worker_count=None, slow_worker_count=None):
+        self._lock = _threading.Lock()
+        self._groups = {}
+        self._timers = []
+        self._sequence = itertools.count()
+        self._wakeup = _threading.Queue()
+        self._tasks = _threading.Queue()
+        self._slow_tasks = _threading.Queue()
+        self._worker_counts = {self._tasks: 0, self._slow_tasks: 0}
+        self._results = collections.deque()
+        self._async_watcher = gevent.get_hub().loop.async_()
+        self._async_watcher.start(self._dispatch_results)
+
+        _threading.start_new_thread(self._run_timer, ())
+        self.set_worker_count(
+            WORKER_COUNT if worker_count is None else worker_count,
+            SLOW_WORKER_COUNT if slow_worker_count is None else slow_worker_count,
+        )
+
+    def set_worker_count(self, worker_count, slow_worker_count):
+        """Start or stop worker threads to get the given numbers of workers;
+        a stopped worker finishes its current poll first."""
+        for tasks, count in (
+            (self._tasks, max(worker_count, 1)),
+            (self._slow_tasks, max(slow_worker_count, 1)),
+        ):
+            with self._lock:
+                change = count - self._worker_counts[tasks]
+                self._worker_counts[tasks] = count
+            for _ in range(change):
+                _threading.start_new_thread(self._run_worker, (tasks,))
+            for _ in range(-change):
+                tasks.put(None)
+
+    def get_worker_count(self):
+        """
+        Returns:
+            (tuple): numbers of regular and slow workers
+        """
+        return self._worker_counts[self._tasks], self._worker_counts[self._slow_tasks]
+
+    def add(self, poller, delay=0):
+        """Schedule a poller.
+        Args:
+            poller (_Poller): poller to schedule
+            delay (float): delay before the first poll [ms]
+        """
+        with self._lock:
+            self._insert(poller)
+            if delay:
+                poller.not_before = time.monotonic() + delay / 1000.0
+            else:
+                self._submit(poller, time.monotonic())
+        self._wakeup.put(None)
+
+    def remove(self, poller):
+        """Unschedule a poller; a poll already running is left to finish."""
+        with self._lock:
+            self._discard(poller)
+
+    def change_period(self, poller, polling_period):
+        """Move a poller to the group of its new polling period."""
+        with self._lock:
+            self._discard(poller)
+            poller.polling_period = polling_period
+            if not poller.is_stopped():
+                self._insert(poller)
+        self._wakeup.put(None)
+
+    def _insert(self, poller):
+        group = self._groups.get(poller.polling_period)
+        if group is None:
+            group = _PollGroup(poller.polling_period)
+            self._groups[group.period] = group
+            due = time.monotonic() + group.period / 1000.0
+            heapq.heappush(self._timers, (due, next(self._sequence), group))
+        group.pollers[poller] = None
+
+    def _discard(self, poller):
+        group = self._groups.get(poller.polling_period)
+        if group is not None:
+            group.pollers.pop(poller, None)
+            if not group.pollers:
+                # the timer entry of the group is dropped when it pops up
+                del self._groups[group.period]
+
+    def _submit(self, poller, due):
+        poller.busy = True
+        poller.due = due
+        if poller.slow:
+            self._slow_tasks.put(poller)
+        else:
+            self._tasks.put(poller)
+
+    def _run_timer(self):
+        cookie = self._wakeup.allocate_cookie()
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    due, _, group = heapq.heappop(self._timers)
+                    if self._groups.get(group.period) is not group:
+                        continue
+                    for poller in group.pollers:
+                        if poller.busy:
+                            poller.statistics["skipped"] += 1
+                        elif poller.not_before <= now:
+                            self._submit(poller, due)
+                    period = group.period / 1000.0
+                    next_due = due + period
+                    if next_due <= now:
+                        # late by more than a period: do not try to catch up
+                        next_due = now + period
+                    heapq.heappush(
+                        self._timers, (next_due, next(self._sequence), group)
+                    )
+                timeout = self._timers[0][0] - now if self._timers else -1
+
+            try:
+                self._wakeup.get(cookie, timeout)
+            except _threading.EmptyTimeout:
+                pass
+
+    def _run_worker(self, tasks):
+        cookie = tasks.allocate_cookie()
+
+        while True:
+            poller = tasks.get(cookie)
+            if poller is None:
+                return
+            try:
+                result = poller.poll_once()
+            except Exception:
+                log.exception("Poller: unexpected error in poller %r", poller)
+                result = None
+            poller.busy = False
+            if result is not None:
+                self._results.append((poller, result))
+                self._async_watcher.send()
+
+    def _dispatch_results(self):
+        while self._results:
+            poller, res = self._results.popleft()
+
+            if isinstance(res, PollingException):
+                cb = poller.error_callback_ref()
+                if cb is not None:
+                    gevent.spawn(cb, res.original_exception, res.poller_id)
+            else:
+                cb = poller.value_changed_callback_ref()
+                if cb is not None:
+                    gevent.spawn(cb, res)
+
+
+_SCHEDULER = None
+
+
+def get_scheduler():
+    """Get the poll scheduler, starting it on the first call"""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        _SCHEDULER = _PollScheduler()
+    return _SCHEDULER
+
+
 class _Poller:
     def __init__(
         self,
@@ -88,21 +320,35 @@ class _Poller:
         self.error_callback_ref = saferef.safe_ref(error_callback)
         self.compare = compare
         self.old_res = NotInitializedValue
-        self.queue = queue.Queue()
         self.delay = 0
         self.stop_event = Event()
 
-        #if gevent_version < [1,3,0]:
-            #self.async_watcher = gevent.get_hub().loop.async()
-        #else:
-        self.async_watcher = gevent.get_hub().loop.async_()
+        # scheduling state, handled by the poll scheduler
+        self.busy = False
+        self.due = 0
+        self.not_before = 0
+        self.failures = 0
+        #: last call failed or was slow: polled by the slow workers
+        self.slow = False
+
+        self.statistics = {
+            "count": 0,
+            "errors": 0,
+            "skipped": 0,
+            "latency_last": 0.0,
+            "latency_mean": 0.0,
+            "latency_max": 0.0,
+            "jitter_mean": 0.0,
+            "jitter_max": 0.0,
+        }
 
     def start_delayed(self, delay):
         self.delay = delay
-        _threading.start_new_thread(self.run, ())
+        get_scheduler().add(self, delay)
 
     def stop(self):
         self.stop_event.set()
+        get_scheduler().remove(self)
         del POLLERS[self.get_id()]
 
     def is_stopped(self):
@@ -115,101 +361,114 @@ class _Poller:
         return self.polling_period
 
     def set_polling_period(self, polling_period):
-        self.polling_period = polling_period
+        if polling_period != self.polling_period:
+            get_scheduler().change_period(self, polling_period)
+
+    def get_statistics(self):
+        """Polling statistics. Latency is the duration of the polled call,
+        jitter the delay between the scheduled and the actual start of a poll.
+        Returns:
+            (dict): count, errors and skipped (poll still running when due)
+                    counters, latency and jitter last/mean/max values [s]
+        """
+        return dict(self.statistics, period=self.polling_period)
 
     def restart(self, delay=0):
+        """Replace the poller by a new one, started after delay [ms] or
+        after the back off of the failures, whichever is longer. The new
+        poller keeps the failure count, so that the back off keeps growing.
+        """
         self.stop()
 
         polled_call = self.polled_call_ref()
         value_changed_cb = self.value_changed_callback_ref()
         error_cb = self.error_callback_ref()
         if polled_call is not None:
-            return poll(
+            backoff = (self.not_before - time.monotonic()) * 1000.0
+            poller = poll(
                 polled_call,
                 self.args,
                 self.polling_period,
                 value_changed_cb,
                 error_cb,
                 self.compare,
-                delay,
+                max(delay, backoff),
                 start_value=self.old_res,
             )
+            poller.failures = max(poller.failures, self.failures)
+            poller.slow = poller.slow or self.slow
+            return poller
 
-    def new_event(self):
-        while True:
-            try:
-                res = self.queue.get_nowait()
-            except queue.Empty:
-                break
-
-            if isinstance(res, PollingException):
-                cb = self.error_callback_ref()
-                if cb is not None:
-                    gevent.spawn(cb, res.original_exception, res.poller_id)
-            else:
-                cb = self.value_changed_callback_ref()
-                if cb is not None:
-                    gevent.spawn(cb, res)
-
-    def run(self):
-        sleep = gevent.monkey._get_original("time", ["sleep"])[0]
-
-        self.async_watcher.start(self.new_event)
-
-        err_callback_args = None
-        error_cb = None
-        first_run = True
-
-        while not self.stop_event.is_set():
-            if first_run and self.delay:
-                sleep(self.delay / 1000.0)
-            first_run = False
-
-            if self.stop_event.is_set():
-                break
-
-            polled_call = self.polled_call_ref()
-            if polled_call is None:
-                break
-
-            try:
-                res = polled_call(*self.args)
-            except Exception as e:
-                if self.stop_event.is_set():
-                    break
-                error_cb = self.error_callback_ref()
-                if error_cb is not None:
-                    self.queue.put(PollingException(e, self.get_id()))
-                break
-
-            del polled_call
+    def poll_once(self):
+        """Execute the polled call once, in a worker thread.
+        Returns:
+            The new value, a PollingException or None if there is nothing
+            to report.
+        """
+        if self.stop_event.is_set():
+            return None
 
+        polled_call = self.polled_call_ref()
+        if polled_call is None:
+            # the object owning the polled call has gone
+            gevent.get_hub().loop.run_callback_threadsafe(self._stop_if_running)
+            return None
+
+        start = time.monotonic()
+        try:
+            res = polled_call(*self.args)
+        except Exception as e:
             if self.stop_event.is_set():
-                break
-
-            if isinstance(res, numpy.ndarray):  # for arrays
-                comparison = res == self.old_res
-                if isinstance(comparison, bool):
-                    is_equal = comparison
-                else:
-                    is_equal = all(comparison)
-            else:
-                is_equal = res == self.old_res
-
-            if self.compare and is_equal:
-                # do nothing: previous value is the same as "new" value
-                pass
+                return None
+            self._update_statistics(start, error=True)
+            self.failures += 1
+            self.slow = True
+            # report the next good value, whatever it is
+            self.old_res = NotInitializedValue
+            backoff = min(self.polling_period * 2**self.failures, MAX_BACKOFF)
+            self.not_before = time.monotonic() + backoff / 1000.0
+            if self.error_callback_ref() is not None:
+                return PollingException(e, self.get_id())
+            return None
+
+        del polled_call
+        self._update_statistics(start)
+        self.failures = 0
+        self.slow = self.statistics["latency_last"] > SLOW_LATENCY
+
+        if self.stop_event.is_set():
+            return None
+
+        if isinstance(res, numpy.ndarray):  # for arrays
+            comparison = res == self.old_res
+            if isinstance(comparison, bool):
+                is_equal = comparison
             else:
-                new_value = True
-                if self.compare:
-                    new_value = not is_equal
-
-                if new_value:
-                    self.old_res = res
-                    self.queue.put(res)
-                    self.async_watcher.send()
-
-            sleep(self.polling_period / 1000.0)
-
-        if error_cb is not None:
-            self.async_watcher.send()
+                is_equal = all(comparison)
+        else:
+            is_equal = res == self.old_res
+
+        if self.compare and is_equal:
+            # do nothing: previous value is the same as "new" value
+            return None
+
+        self.old_res = res
+        return res
+
+    def _stop_if_running(self):
+        if not self.is_stopped():
+            self.stop()
+
+    def _update_statistics(self, start, error=False):
+        stats = self.statistics
+        latency = time.monotonic() - start
+        jitter = max(start - self.due, 0.0)
+        stats["count"] += 1
+        if error:
+            stats["errors"] += 1
+        count = stats["count"]
+        stats["latency_last"] = latency
+        stats["latency_mean"] += (latency - stats["latency_mean"]) / count
+        stats["latency_max"] = max(stats["latency_max"], latency)
+        stats["jitter_mean"] += (jitter - stats["jitter_mean"]) / count
+        stats["jitter_max"] = max(stats["jitter_max"], jitter)
@@ -34,3 +34,21 @@ if not hasattr(robustapply, "_robust_apply"):
         robustapply.robustApply = __my_robust_apply
     del louie
     del __my_robust_apply
+
+
+def has_receivers(signal, sender):
+    """Tell if a live receiver is connected to a signal of a sender (or to
+    any signal, or any sender).
+
+    Args:
+        signal (str): signal name
+        sender (object): signal sender
+    Returns:
+        (bool): True if a receiver would be called by dispatcher.send
+    """
+    get_all_receivers = getattr(dispatcher, "get_all_receivers", None)
+    if get_all_receivers is None:
+        get_all_receivers = dispatcher.getAllReceivers
+    for _ in get_all_receivers(sender, signal):
+        return True
+    return False
@@ -23,8 +23,10 @@ This module contain objects that combined make up the data model.
 Any object that inherhits from TaskNode can be added to and handled by
 the QueueModel.
 """
+import bisect
 import copy
 import logging
+import operator
 import os
 
 from mxcubecore.model import queue_model_enumerables
@@ -1690,6 +1692,215 @@ class PathTemplate(object):
         return copy.deepcopy(self)
 
 
+class PathTemplateIndex(object):
+    """
+    Index of the path templates of a queue model by directory and prefix,
+    run number and image numbers, to find the next run number and the
+    path collisions without comparing with all the path templates.
+
+    The index is kept by the queue model (one per model root) and holds the
+    path templates of its nodes. Path templates are changed and replaced in
+    place (by the tasks, the workflows and the user interfaces): before each
+    lookup the index checks the path template of each node, and the
+    attributes that determine the files it writes, and re-indexes those
+    which changed.
+    """
+
+    # Attributes of a path template that determine the files written
+    _state = operator.attrgetter(
+        "directory",
+        "base_prefix",
+        "mad_prefix",
+        "reference_image_prefix",
+        "wedge_prefix",
+        "run_number",
+        "start_num",
+        "num_files",
+    )
+
+    def __init__(self):
+        # id of node: [node, path template]
+        self._nodes = {}
+        # id of path template: [path template, ids of the nodes, indexed
+        #                       state, key, run number, image range]
+        self._entries = {}
+        # key: sorted run numbers
+        self._run_numbers = {}
+        # (key, run number): [sorted image ranges, longest range]
+        self._image_ranges = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(path_template):
+        """
+        :returns: Path templates with the same key write files in the same
+                  directory with the same prefix (see PathTemplate.__eq__)
+        :rtype: tuple
+        """
+        return (
+            os.path.normpath(path_template.directory),
+            path_template.get_prefix(),
+        )
+
+    def add(self, node):
+        """
+        Adds the path template of <node>, if any. Several nodes can share
+        a path template.
+
+        :param node: The node to add.
+        :type node: TaskNode
+        """
+        path_template = node.get_path_template()
+
+        if not path_template or id(node) in self._nodes:
+            return
+
+        self._nodes[id(node)] = [node, path_template]
+        entry = self._entries.get(id(path_template))
+
+        if entry is not None:
+            entry[1].add(id(node))
+            return
+
+        self._entries[id(path_template)] = [
+            path_template,
+            {id(node)},
+            None,
+            None,
+            None,
+            None,
+        ]
+        self._insert(path_template)
+
+    def remove(self, node):
+        """
+        Removes the path template of <node>, if no other node shares it.
+
+        :param node: The node to remove.
+        :type node: TaskNode
+        """
+        node_entry = self._nodes.pop(id(node), None)
+
+        if node_entry is None:
+            return
+
+        path_template = node_entry[1]
+        entry = self._entries[id(path_template)]
+        entry[1].discard(id(node))
+
+        if not entry[1]:
+            self._delete(path_template)
+            del self._entries[id(path_template)]
+
+    def clear(self):
+        """
+        Removes all the path templates
+        """
+        self._nodes.clear()
+        self._entries.clear()
+        self._run_numbers.clear()
+        self._image_ranges.clear()
+
+    def sync(self):
+        """
+        Re-indexes the nodes whose path template was replaced, and the path
+        templates which changed since they were indexed.
+        """
+        for node, path_template in list(self._nodes.values()):
+            if node.get_path_template() is not path_template:
+                self.remove(node)
+                self.add(node)
+
+        for entry in self._entries.values():
+            if self._state(entry[0]) != entry[2]:
+                self._delete(entry[0])
+                self._insert(entry[0])
+
+    def _insert(self, path_template):
+        entry = self._entries[id(path_template)]
+        key = self.key(path_template)
+        run_number = path_template.run_number
+        image_range = (
+            path_template.start_num,
+            path_template.start_num + path_template.num_files,
+            id(path_template),
+        )
+        entry[2:] = [self._state(path_template), key, run_number, image_range]
+
+        bisect.insort(self._run_numbers.setdefault(key, []), run_number)
+        ranges = self._image_ranges.setdefault((key, run_number), [[], 0])
+        bisect.insort(ranges[0], image_range)
+        ranges[1] = max(ranges[1], path_template.num_files)
+
+    def _delete(self, path_template):
+        _, _, _, key, run_number, image_range = self._entries[id(path_template)]
+
+        run_numbers = self._run_numbers[key]
+        del run_numbers[bisect.bisect_left(run_numbers, run_number)]
+
+        if not run_numbers:
+            del self._run_numbers[key]
+
+        ranges = self._image_ranges[key, run_number]
+        del ranges[0][bisect.bisect_left(ranges[0], image_range)]
+
+        if not ranges[0]:
+            del self._image_ranges[key, run_number]
+
+    def get_max_run_number(self, path_template, exclude_current=True):
+        """
+        :param path_template: PathTemplate to match with.
+        :type path_template: PathTemplate
+        :param exclude_current: Ignore <path_template> itself
+        :type exclude_current: bool
+
+        :returns: The highest run number of the path templates writing in
+                  the same directory with the same prefix, 0 if none.
+        :rtype: int
+        """
+        self.sync()
+        key = self.key(path_template)
+        run_numbers = self._run_numbers.get(key, [])
+        entry = self._entries.get(id(path_template))
+
+        if exclude_current and entry is not None and entry[3] == key:
+            # Only matters if it has the highest run number, alone
+            if bisect.bisect_left(run_numbers, entry[4]) == len(run_numbers) - 1:
+                run_numbers = run_numbers[-2:-1]
+
+        return max([0] + run_numbers[-1:])
+
+    def intersects(self, path_template):
+        """
+        :returns: True if another path template of the index writes some of
+                  the files of <path_template> (see PathTemplate.intersection)
+        :rtype: bool
+        """
+        self.sync()
+        ranges = self._image_ranges.get(
+            (self.key(path_template), path_template.run_number)
+        )
+
+        if ranges is None:
+            return False
+
+        image_ranges, longest = ranges
+        start = path_template.start_num
+        end = start + path_template.num_files
+        # Only the ranges starting less than the longest range before start
+        # can reach it
+        first = bisect.bisect_left(image_ranges, (start - longest,))
+        last = bisect.bisect_left(image_ranges, (end,))
+
+        for other_start, other_end, _id in image_ranges[first:last]:
+            if other_end > start and _id != id(path_template):
+                return True
+
+        return False
+
+
 class AcquisitionParameters(object):
     def __init__(self):
         object.__init__(self)
@@ -0,0 +1,217 @@
+"""
+Client of the ADXV image viewer, displaying the images of a collection.
+
+AdxvClient keeps one connection to the ADXV control socket (adxv -socket)
+and sends the load_image commands from a greenlet. show() only records the
+image to display: when images are requested faster than they are sent
+(bursts of images, ADXV not reachable, minimum interval between two
+refreshes), only the newest one is sent. The connection is opened again
+when it is lost, waiting longer after each failed attempt.
+"""
+
+import logging
+import socket
+import time
+
+import gevent
+import gevent.event
+import gevent.select
+import gevent.socket
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+class AdxvClient:
+    """Persistent connection to ADXV.
+
+    Args:
+        host (str): ADXV host
+        port (int): ADXV control port
+        min_interval (float): minimum time between two displayed images [s]
+        timeout (float): connection and send timeout [s]
+        min_retry (float): time before the first reconnection attempt [s]
+        max_retry (float): maximum time between reconnection attempts [s]
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8100,
+        min_interval=0.0,
+        timeout=1.0,
+        min_retry=0.5,
+        max_retry=10.0,
+    ):
+        self.host = host
+        self.port = port
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.min_retry = min_retry
+        self.max_retry = max_retry
+
+        self._socket = None
+        # newest image not sent yet, and its request time
+        self._pending = None
+        self._wakeup = gevent.event.Event()
+        self._idle = gevent.event.Event()
+        self._idle.set()
+        self._retry = min_retry
+        self._next_connect = 0.0
+        self._last_sent = 0.0
+        self._task = None
+        self.statistics = {
+            "requested": 0,
+            "sent": 0,
+            "coalesced": 0,
+            "connects": 0,
+            "errors": 0,
+            "lag": None,
+            "max_lag": 0.0,
+        }
+
+    @property
+    def connected(self):
+        return self._socket is not None
+
+    def connect(self):
+        """Connects to ADXV, if not connected.
+
+        Returns:
+            (bool): True if connected
+        """
+        if self._socket is not None and self._is_alive():
+            return True
+        self._disconnect()
+        try:
+            self._socket = gevent.socket.create_connection(
+                (self.host, self.port), self.timeout
+            )
+        except OSError as err:
+            self.statistics["errors"] += 1
+            self._next_connect = time.monotonic() + self._retry
+            logging.getLogger("HWR").debug(
+                "ADXV: cannot connect to %s:%s (%s), retry in %.1f s"
+                % (self.host, self.port, err, self._retry)
+            )
+            self._retry = min(2 * self._retry, self.max_retry)
+            return False
+
+        self.statistics["connects"] += 1
+        self._retry = self.min_retry
+        self._next_connect = 0.0
+        logging.getLogger("HWR").info(
+            "ADXV: connected to %s:%s" % (self.host, self.port)
+        )
+        return True
+
+    def close(self):
+        """Stops sending and closes the connection"""
+        if self._task is not None:
+            self._task.kill()
+            self._task = None
+        self._pending = None
+        self._idle.set()
+        self._disconnect()
+
+    def show(self, filename):
+        """Displays an image, replacing the image waiting to be displayed.
+
+        Args:
+            filename (str): image file
+        """
+        self.statistics["requested"] += 1
+        if self._pending is not None:
+            self.statistics["coalesced"] += 1
+        self._pending = (filename, time.monotonic())
+        self._idle.clear()
+        self._wakeup.set()
+        if self._task is None or self._task.dead:
+            self._task = gevent.spawn(self._send_loop)
+
+    def flush(self, timeout=None):
+        """Waits until the requested image is displayed.
+
+        Returns:
+            (bool): False on timeout
+        """
+        return self._idle.wait(timeout)
+
+    def get_statistics(self):
+        """Display statistics.
+
+        Returns:
+            (dict): numbers of images requested, sent and coalesced (replaced
+                by a newer image before being sent), of connections and of
+                connection or send errors, lag of the last image and maximum
+                lag [s]: time from the request to the sending of an image
+        """
+        statistics = dict(self.statistics)
+        statistics["connected"] = self.connected
+        return statistics
+
+    def _is_alive(self):
+        """Tells if the connection was not closed by ADXV"""
+        try:
+            readable, _, _ = gevent.select.select([self._socket], [], [], 0)
+            if not readable:
+                return True
+            data = self._socket.recv(1024, socket.MSG_PEEK)
+        except OSError:
+            return False
+        if data:
+            # nothing expected from ADXV
+            self._socket.recv(len(data))
+        return bool(data)
+
+    def _disconnect(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+    def _send(self, filename):
+        try:
+            self._socket.sendall(("load_image %s\n" % filename).encode())
+        except OSError as err:
+            self.statistics["errors"] += 1
+            logging.getLogger("HWR").debug("ADXV: cannot send (%s)" % err)
+            self._disconnect()
+            return False
+        return True
+
+    def _send_loop(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # refresh rate and reconnection backoff: newer images may
+            # replace the pending one meanwhile
+            delay = max(
+                self._last_sent + self.min_interval - time.monotonic(),
+                self._next_connect - time.monotonic(),
+            )
+            if delay > 0:
+                gevent.sleep(delay)
+            if self._pending is None:
+                continue
+            if not self.connect():
+                self._wakeup.set()
+                continue
+
+            pending = self._pending
+            filename, request_time = pending
+            if not self._send(filename):
+                # retried at once (new connection)
+                self._wakeup.set()
+                continue
+            if self._pending is pending:
+                self._pending = None
+                self._idle.set()
+
+            self._last_sent = time.monotonic()
+            lag = self._last_sent - request_time
+            self.statistics["sent"] += 1
+            self.statistics["lag"] = lag
+            self.statistics["max_lag"] = max(self.statistics["max_lag"], lag)
@@ -0,0 +1,145 @@
+"""
+Compositing of overlay layers (grid heatmaps, shapes, beam mark) on camera
+images, with numpy.
+
+Images are (height, width, 3) uint8 RGB arrays. Each layer is drawn in turn
+over the base image, at an offset, through a binary mask and/or an alpha
+(opacity) channel. composite writes into a caller provided buffer, which may
+be the base image itself, so that a snapshot can be composed without
+allocating a new image.
+"""
+
+import numpy
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Overlay pixels with all channels at or below these values are transparent
+#: (the background of the overlays drawn by the web client)
+BACKGROUND_THRESHOLD = (200, 60, 140)
+
+
+def threshold_mask(image, threshold=BACKGROUND_THRESHOLD):
+    """Mask of the pixels of an overlay which are not background.
+
+    Args:
+        image (numpy.ndarray): (height, width, 3) RGB image
+        threshold (tuple): background maximum value of each channel
+    Returns:
+        (numpy.ndarray): (height, width) bool, True where a channel is above
+            its threshold
+    """
+    # channel by channel: much faster than a comparison of the 3 channels
+    mask = image[..., 0] > threshold[0]
+    for channel in (1, 2):
+        mask |= image[..., channel] > threshold[channel]
+    return mask
+
+
+def _copy_masked(target, source, mask, casting="same_kind"):
+    """Copy source pixels to target where mask; channel by channel, with the
+    2D mask, is much faster than with a broadcasted one"""
+    for channel in range(target.shape[2]):
+        numpy.copyto(
+            target[..., channel], source[..., channel], casting=casting, where=mask
+        )
+
+
+class Layer:
+    """Overlay image drawn by composite.
+
+    Args:
+        image (numpy.ndarray): (height, width, 3) RGB or (height, width, 4)
+            RGBA uint8 image; the A channel is used as alpha if alpha is None
+        alpha (float or numpy.ndarray): opacity, 0 to 1 for the whole layer,
+            or (height, width) uint8 per pixel (255: opaque)
+        mask (numpy.ndarray): (height, width) bool, the pixels drawn
+        offset (tuple): (x, y) position of the layer in the output [pixels]
+    """
+
+    def __init__(self, image, alpha=None, mask=None, offset=(0, 0)):
+        image = numpy.asarray(image)
+        if image.ndim != 3 or image.shape[2] not in (3, 4):
+            raise ValueError("Layer image must be (height, width, 3 or 4)")
+        if alpha is None and image.shape[2] == 4:
+            alpha = image[..., 3]
+        self.image = image[..., :3]
+        self.alpha = alpha
+        self.mask = mask
+        self.offset = offset
+
+    def regions(self, shape):
+        """Overlapping slices of the output and of the layer.
+
+        Args:
+            shape (tuple): output (height, width, ...)
+        Returns:
+            (tuple): output and layer (row, col) slices, None if the layer is
+                outside the output
+        """
+        x_offset, y_offset = self.offset
+        height, width = self.image.shape[:2]
+        top, left = max(y_offset, 0), max(x_offset, 0)
+        bottom = min(y_offset + height, shape[0])
+        right = min(x_offset + width, shape[1])
+        if top >= bottom or left >= right:
+            return None
+        return (
+            (slice(top, bottom), slice(left, right)),
+            (
+                slice(top - y_offset, bottom - y_offset),
+                slice(left - x_offset, right - x_offset),
+            ),
+        )
+
+
+def composite(base, layers, out=None):
+    """Draw layers over an image.
+
+    Args:
+        base (numpy.ndarray): (height, width, 3) uint8 RGB image
+        layers (Iterable[Layer]): drawn in order, the last one on top
+        out (numpy.ndarray): output buffer, same shape as base; may be base.
+            Default: a new array.
+    Returns:
+        (numpy.ndarray): out
+    """
+    if out is None:
+        out = base.copy()
+    elif out is not base:
+        if out.shape != base.shape:
+            raise ValueError("Output buffer must have the shape of the base")
+        numpy.copyto(out, base)
+
+    for layer in layers:
+        regions = layer.regions(out.shape)
+        if regions is None:
+            continue
+        (out_region, layer_region) = regions
+        target = out[out_region]
+        image = layer.image[layer_region]
+        mask = None if layer.mask is None else layer.mask[layer_region]
+        alpha = layer.alpha
+
+        if alpha is None:
+            if mask is None:
+                numpy.copyto(target, image)
+            else:
+                _copy_masked(target, image, mask)
+            continue
+
+        if numpy.ndim(alpha):
+            alpha = alpha[layer_region].astype(numpy.uint16)[..., None]
+        else:
+            alpha = numpy.uint16(round(float(alpha) * 255))
+        # target + (image - target) * alpha / 255, in integers, rounded
+        blended = image.astype(numpy.uint16)
+        blended *= alpha
+        blended += numpy.multiply(target, 255 - alpha, dtype=numpy.uint16)
+        blended += 127
+        blended //= 255
+        if mask is None:
+            numpy.copyto(target, blended, casting="unsafe")
+        else:
+            _copy_masked(target, blended, mask, casting="unsafe")
+    return out
@@ -0,0 +1,240 @@
+"""
+Persistent cache of parsed configuration files.
+
+Parsing the XML (SAX, attribute conversion) and YAML (pure python ruamel)
+configuration files is a significant part of the start up time. The cache
+stores the parsing result of each file in a single pickle file, loaded in
+one step, keyed by absolute file path and validated against the file
+modification time and size, then against the SHA-1 of the file contents.
+
+The cache is used when the MXCUBE_CONFIG_CACHE environment variable gives
+the path of the cache file (or after set_cache_file). It can be warmed or
+cleared from the command line::
+
+    python -m mxcubecore.utils.config_cache warm mxcubecore/configuration/mockup
+    python -m mxcubecore.utils.config_cache clear
+"""
+
+import argparse
+import copy
+import hashlib
+import logging
+import os
+import pickle
+import sys
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+# Bump when the format of the cached data changes
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_FILE = os.path.join(
+    os.path.expanduser("~"), ".cache", "mxcube", "config_cache.pickle"
+)
+
+_cache = None
+_cache_file = os.environ.get("MXCUBE_CONFIG_CACHE")
+
+
+class ConfigCache:
+    """Parsed configuration files, persisted in a pickle file"""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self._entries = {}
+        self._dirty = False
+        self.statistics = {"hits": 0, "misses": 0, "stale": 0}
+        self.load()
+
+    def load(self):
+        """Read the cache file; a missing or incompatible file gives an
+        empty cache"""
+        self._entries = {}
+        try:
+            with open(self.cache_file, "rb") as fp0:
+                version, entries = pickle.load(fp0)
+        except FileNotFoundError:
+            return
+        except Exception:
+            logging.getLogger("HWR").warning(
+                "Ignoring unreadable configuration cache %s", self.cache_file
+            )
+            return
+        if version == CACHE_VERSION:
+            self._entries = entries
+
+    def save(self):
+        """Write the cache file, if anything changed"""
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = "%s.%d" % (self.cache_file, os.getpid())
+        with open(tmp_file, "wb") as fp0:
+            pickle.dump((CACHE_VERSION, self._entries), fp0, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.cache_file)
+        self._dirty = False
+
+    def clear(self):
+        """Empty the cache and remove the cache file"""
+        self._entries = {}
+        self._dirty = False
+        try:
+            os.remove(self.cache_file)
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, file_path, parse, text=None):
+        """Parsed contents of a file, parsing it if not cached or stale
+
+        Args:
+            file_path (str): configuration file path
+            parse (Callable): function parsing the file text
+            text (str): file text, if already read
+
+        Returns:
+            the (cached) result of parse(text); it must not be modified
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        entry = self._entries.get(file_path)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            self.statistics["hits"] += 1
+            return entry[3]
+
+        if text is None:
+            with open(file_path, "r") as fp0:
+                text = fp0.read()
+        digest = hashlib.sha1(text.encode()).hexdigest()
+        if entry is not None and entry[2] == digest:
+            # touched, but not modified
+            self.statistics["hits"] += 1
+            result = entry[3]
+        else:
+            self.statistics["stale" if entry is not None else "misses"] += 1
+            result = parse(text)
+        self._entries[file_path] = (stat.st_mtime_ns, stat.st_size, digest, result)
+        self._dirty = True
+        return result
+
+
+def set_cache_file(cache_file):
+    """Select the cache file, None to disable the cache
+
+    Args:
+        cache_file (str): cache file path
+    """
+    global _cache, _cache_file
+    _cache_file = cache_file
+    _cache = None
+
+
+def get_cache():
+    """The configuration cache, None if disabled"""
+    global _cache
+    if _cache is None and _cache_file:
+        _cache = ConfigCache(_cache_file)
+    return _cache
+
+
+def save():
+    """Persist the configuration cache, if enabled"""
+    if _cache is not None:
+        try:
+            _cache.save()
+        except OSError:
+            logging.getLogger("HWR").exception(
+                "Cannot write configuration cache %s", _cache.cache_file
+            )
+
+
+def load_yaml(file_path):
+    """Load a yaml configuration file, through the cache if enabled
+
+    Args:
+        file_path (str): yaml file path
+
+    Returns:
+        the file contents, that the caller may modify
+    """
+    # Imported here to avoid circular imports
+    from mxcubecore.HardwareRepository import yaml
+
+    cache = get_cache()
+    if cache is None:
+        with open(file_path, "r") as fp0:
+            return yaml.load(fp0)
+    return copy.deepcopy(cache.get(file_path, yaml.load))
+
+
+def warm(cache, paths):
+    """Parse all the configuration files found in directories into the cache
+
+    Args:
+        cache (ConfigCache): cache to fill
+        paths (Sequence[str]): configuration directories
+
+    Returns:
+        int: number of files
+    """
+    from mxcubecore.HardwareObjectFileParser import record_events
+    from mxcubecore.HardwareRepository import yaml
+
+    count = 0
+    for path in paths:
+        for dirpath, _, filenames in os.walk(path):
+            for filename in sorted(filenames):
+                ext = os.path.splitext(filename)[1]
+                if ext in (".yaml", ".yml"):
+                    parse = yaml.load
+                elif ext == ".xml":
+                    parse = record_events
+                else:
+                    continue
+                file_path = os.path.join(dirpath, filename)
+                try:
+                    cache.get(file_path, parse)
+                except Exception as ex:
+                    print("Skipping %s: %s" % (file_path, ex))
+                else:
+                    count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m mxcubecore.utils.config_cache",
+        description="Manage the cache of parsed MXCuBE configuration files",
+    )
+    parser.add_argument(
+        "--cache-file",
+        default=_cache_file or DEFAULT_CACHE_FILE,
+        help="cache file (default: $MXCUBE_CONFIG_CACHE or %(default)s)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warm_parser = subparsers.add_parser("warm", help="parse configuration files")
+    warm_parser.add_argument("paths", nargs="+", help="configuration directories")
+    subparsers.add_parser("clear", help="remove the cache file")
+    subparsers.add_parser("info", help="show the cache contents")
+    args = parser.parse_args(argv)
+
+    cache = ConfigCache(args.cache_file)
+    if args.command == "warm":
+        count = warm(cache, args.paths)
+        cache.save()
+        print("%d files cached in %s" % (count, args.cache_file))
+    elif args.command == "clear":
+        cache.clear()
+        print("Removed %s" % args.cache_file)
+    else:
+        print("%s: %d files" % (args.cache_file, len(cache)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
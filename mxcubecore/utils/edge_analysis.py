@@ -0,0 +1,368 @@
+"""
+Analysis of the absorption edge of an energy (fluorescence) scan, in
+process, as done by chooch.
+
+The fluorescence counts are normalised between the pre-edge and post-edge
+lines and scaled to f'' between its values below and above the edge of the
+element (edge_fpp: from xraylib if installed, else from FPP_EDGES). f' is
+computed from f'' with the Kramers-Kronig relation (on a uniform grid, f''
+extended outside the scan as E^-2, with FFT convolutions). The inflection
+energy is the minimum of f', the peak energy the maximum of f'' above the
+inflection, and the remote energy a fixed offset above the peak.
+
+The results can be given as PyChooch.calc gives them, printed as the
+run_chooch script prints them and written to an efs file, to validate them
+against chooch. The graphs of a scan are rendered to PNG files in a thread.
+"""
+
+import collections
+import logging
+import re
+
+import gevent.threadpool
+import numpy
+from scipy.signal import (
+    fftconvolve,
+    savgol_filter,
+)
+
+try:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+except ImportError:
+    Figure = None
+
+try:
+    import xraylib
+except ImportError:
+    xraylib = None
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Typical f'' (electrons) below and above a K edge of a medium Z element,
+#: only right for the energies: f' and f'' are in arbitrary units
+FPP_BELOW = 0.5
+FPP_ABOVE = 4.0
+
+#: Theoretical f'' (electrons) just below and above the edges commonly
+#: scanned (Cromer-Liberman, rounded), when xraylib is not installed
+FPP_EDGES = {
+    ("Mn", "K"): (0.4, 3.9),
+    ("Fe", "K"): (0.5, 3.9),
+    ("Co", "K"): (0.5, 3.9),
+    ("Ni", "K"): (0.5, 3.9),
+    ("Cu", "K"): (0.5, 3.9),
+    ("Zn", "K"): (0.5, 3.9),
+    ("Ga", "K"): (0.5, 3.9),
+    ("Se", "K"): (0.5, 3.8),
+    ("Br", "K"): (0.5, 3.8),
+    ("Kr", "K"): (0.5, 3.8),
+    ("Rb", "K"): (0.5, 3.7),
+    ("Sr", "K"): (0.5, 3.7),
+    ("W", "L3"): (3.6, 9.6),
+    ("Os", "L3"): (3.8, 9.8),
+    ("Ir", "L3"): (3.9, 9.9),
+    ("Pt", "L3"): (4.0, 10.0),
+    ("Au", "L3"): (4.1, 10.1),
+    ("Hg", "L3"): (4.1, 10.2),
+    ("Pb", "L3"): (4.2, 10.3),
+}
+
+#: Remote energy above the peak energy [eV]
+REMOTE_OFFSET = 30.0
+
+_plot_pool = None
+
+
+class EdgeResult(
+    collections.namedtuple(
+        "EdgeResult",
+        (
+            "peak",
+            "fpp_peak",
+            "fp_peak",
+            "inflection",
+            "fpp_inflection",
+            "fp_inflection",
+            "remote",
+            "energies",
+            "fpp",
+            "fp",
+        ),
+    )
+):
+    """Edge analysis result: peak, inflection and remote energies [eV], f''
+    and f' at the peak and inflection, and the energies [eV], f'' and f' of
+    the points of the scan"""
+
+    def as_chooch(self):
+        """
+        Returns:
+            (tuple): results as from PyChooch.calc: peak energy, f'' and f'
+                at the peak, inflection energy, f'' and f' at the
+                inflection [eV], and the (energy, f'', f') of the points
+        """
+        graph = [
+            (float(energy), float(fpp), float(fp))
+            for energy, fpp, fp in zip(self.energies, self.fpp, self.fp)
+        ]
+        return (
+            self.peak,
+            self.fpp_peak,
+            self.fp_peak,
+            self.inflection,
+            self.fpp_inflection,
+            self.fp_inflection,
+            graph,
+        )
+
+
+def to_ev(energies):
+    """Energies in eV, from eV or keV"""
+    energies = numpy.asarray(energies, float)
+    return energies * 1000.0 if numpy.max(energies) < 1000 else energies
+
+
+def read_scan(path):
+    """Read a scan file (raw file): energy and counts per line, separated
+    by spaces, tabs or a comma, after header lines (title, number of
+    points).
+
+    Returns:
+        (tuple): energies [eV] and counts (numpy arrays), by energy
+    """
+    points = []
+    with open(path) as scan_file:
+        for line in scan_file:
+            fields = re.split(r"[,\s]+", line.strip())
+            if len(fields) != 2:
+                continue
+            try:
+                points.append((float(fields[0]), float(fields[1])))
+            except ValueError:
+                continue
+    if not points:
+        raise ValueError("No scan points in %s" % path)
+    energies, counts = numpy.array(sorted(points)).T
+    return to_ev(energies), counts
+
+
+def _line(energies, counts, selected):
+    if numpy.count_nonzero(selected) >= 2:
+        return numpy.polyval(
+            numpy.polyfit(energies[selected], counts[selected], 1), energies
+        )
+    return numpy.full(len(energies), numpy.mean(counts[selected]))
+
+
+def edge_fpp(element, edge):
+    """f'' below and above an absorption edge, from xraylib if installed,
+    else from FPP_EDGES.
+
+    Args:
+        element (str): element symbol, e.g. Se
+        edge (str): edge, e.g. K or L3
+    Returns:
+        (tuple): f'' below and above the edge [electrons], None if unknown
+    """
+    element, edge = element.capitalize(), edge.upper()
+    if xraylib is not None:
+        try:
+            atomic_number = xraylib.SymbolToAtomicNumber(element)
+            edge_energy = xraylib.EdgeEnergy(
+                atomic_number, getattr(xraylib, "%s_SHELL" % edge)
+            )
+            return (
+                xraylib.Fii(atomic_number, edge_energy - 0.01),
+                xraylib.Fii(atomic_number, edge_energy + 0.01),
+            )
+        except (AttributeError, ValueError):
+            logging.getLogger("HWR").debug(
+                "xraylib has no f'' for the %s %s edge" % (element, edge)
+            )
+    return FPP_EDGES.get((element, edge))
+
+
+def normalise(energies, counts, edge=None, pre_margin=10.0, post_margin=20.0):
+    """Counts normalised between the pre-edge (0) and post-edge (1) lines.
+
+    Args:
+        energies (numpy.ndarray): energies [eV], increasing
+        counts (numpy.ndarray): counts
+        edge (float): approximate edge energy [eV], default: steepest rise
+        pre_margin (float): pre-edge points below edge - pre_margin [eV]
+        post_margin (float): post-edge points above edge + post_margin [eV]
+    Returns:
+        (numpy.ndarray): normalised counts
+    """
+    if edge is None:
+        edge = energies[numpy.argmax(numpy.gradient(counts, energies))]
+    quarter = max(len(energies) // 4, 2)
+    pre = energies < edge - pre_margin
+    if numpy.count_nonzero(pre) < 2:
+        pre = numpy.arange(len(energies)) < quarter
+    post = energies > edge + post_margin
+    if numpy.count_nonzero(post) < 2:
+        post = numpy.arange(len(energies)) >= len(energies) - quarter
+
+    pre_line = _line(energies, counts, pre)
+    post_line = _line(energies, counts, post)
+    jump = post_line - pre_line
+    jump[jump == 0] = 1.0
+    return (counts - pre_line) / jump
+
+
+def kramers_kronig(energies, fpp):
+    """f' from f'' (Kramers-Kronig), on a uniform energy grid.
+
+    f'(E) = 2 / pi P int E' f''(E') / (E^2 - E'^2) dE', as the Hilbert
+    transform of f'' extended to negative energies as an odd function: the
+    principal value with the alternate points (Maclaurin) rule, the negative
+    energies term directly, both as FFT convolutions.
+
+    Args:
+        energies (numpy.ndarray): uniform grid of energies [eV]
+        fpp (numpy.ndarray): f'' at the energies
+    Returns:
+        (numpy.ndarray): f' at the energies
+    """
+    size = len(energies)
+    step = energies[1] - energies[0]
+    offsets = numpy.arange(-(size - 1), size)
+    kernel = numpy.zeros(len(offsets))
+    odd = offsets % 2 == 1
+    kernel[odd] = 2.0 / offsets[odd]
+    principal = fftconvolve(fpp, kernel)[size - 1 : 2 * size - 1]
+
+    sums = 2 * energies[0] + step * numpy.arange(2 * size - 1)
+    negative = step * fftconvolve(fpp[::-1], 1.0 / sums)[size - 1 : 2 * size - 1]
+    return (principal - negative) / numpy.pi
+
+
+def analyse_edge(
+    energies,
+    counts,
+    edge=None,
+    fpp_below=FPP_BELOW,
+    fpp_above=FPP_ABOVE,
+    remote_offset=REMOTE_OFFSET,
+    smoothing=5,
+    step=0.5,
+):
+    """Inflection, peak and remote energies of an absorption edge scan.
+
+    Args:
+        energies (Iterable): scan energies [eV or keV]
+        counts (Iterable): fluorescence counts (normalised by the beam
+            intensity)
+        edge (float): theoretical edge energy [eV or keV]
+        fpp_below (float): f'' below the edge [electrons] (edge_fpp), the
+            default only gives the energies right
+        fpp_above (float): f'' above the edge [electrons] (edge_fpp)
+        remote_offset (float): remote energy above the peak [eV]
+        smoothing (int): Savitzky-Golay smoothing window [points], 0: none
+        step (float): energy grid step [eV]
+    Returns:
+        (EdgeResult): analysis result
+    """
+    energies = to_ev(energies)
+    counts = numpy.asarray(counts, float)
+    order = numpy.argsort(energies)
+    energies, counts = energies[order], counts[order]
+    if edge is not None:
+        edge = float(to_ev([edge])[0])
+
+    fpp = fpp_below + (fpp_above - fpp_below) * normalise(energies, counts, edge)
+    if smoothing > 2 and len(fpp) > smoothing:
+        fpp = savgol_filter(fpp, smoothing | 1, 2)
+
+    # f'' from E/2 to 2 E, as E^-2 outside the scan
+    first, last = energies[0], energies[-1]
+    grid = numpy.arange(numpy.floor(first / 2), 2 * last, step)
+    below = grid < first
+    above = grid > last
+    grid_fpp = numpy.interp(grid, energies, fpp)
+    grid_fpp[below] = fpp_below * (first / grid[below]) ** 2
+    grid_fpp[above] = fpp_above * (last / grid[above]) ** 2
+    grid_fp = kramers_kronig(grid, grid_fpp)
+
+    scan = ~below & ~above
+    scan_grid, scan_fpp, scan_fp = grid[scan], grid_fpp[scan], grid_fp[scan]
+    inflection = numpy.argmin(scan_fp)
+    peak = inflection + numpy.argmax(scan_fpp[inflection:])
+
+    return EdgeResult(
+        float(scan_grid[peak]),
+        float(scan_fpp[peak]),
+        float(scan_fp[peak]),
+        float(scan_grid[inflection]),
+        float(scan_fpp[inflection]),
+        float(scan_fp[inflection]),
+        float(scan_grid[peak] + remote_offset),
+        energies,
+        fpp,
+        numpy.interp(energies, scan_grid, scan_fp),
+    )
+
+
+def format_chooch_results(result):
+    """Results as printed by the run_chooch script: a chooch_results line
+    followed by the PyChooch.calc tuple"""
+    return "chooch_results\n%r\n" % (result.as_chooch(),)
+
+
+def write_efs(path, result, title="Chooch output file"):
+    """Write the f'' and f' of a scan as a chooch efs file: title, column
+    names and number of points, then energy [eV], f'' and f' per line"""
+    with open(path, "w") as efs_file:
+        efs_file.write("%s\n" % title)
+        efs_file.write("# energy f'' f'\n")
+        efs_file.write("%d\n" % len(result.energies))
+        for energy, fpp, fp in zip(result.energies, result.fpp, result.fp):
+            efs_file.write("%10.2f %8.3f %8.3f\n" % (energy, fpp, fp))
+
+
+def render_plot(png_files, energies, counts, result, title=""):
+    """Render the counts, f'' and f' of a scan to PNG files.
+
+    Args:
+        png_files (Iterable): PNG files to write
+        energies (Iterable): scan energies
+        counts (Iterable): scan counts
+        result (EdgeResult): edge analysis of the scan
+        title (str): graph title
+    """
+    if Figure is None:
+        raise RuntimeError("matplotlib is needed to render energy scans")
+    fig = Figure(figsize=(15, 11))
+    ax = fig.add_subplot(211)
+    ax.set_title(title)
+    ax.grid(True)
+    ax.plot(energies, counts, color="black")
+    ax.set_xlabel("Energy")
+    ax.set_ylabel("MCA counts")
+    ax2 = fig.add_subplot(212)
+    ax2.grid(True)
+    ax2.set_xlabel("Energy")
+    ax2.plot(result.energies / 1000.0, result.fpp, color="blue")
+    ax2.plot(result.energies / 1000.0, result.fp, color="red")
+    canvas = FigureCanvasAgg(fig)
+    for png_file in png_files:
+        canvas.print_figure(png_file, dpi=80)
+
+
+def render_plot_async(png_files, energies, counts, result, title=""):
+    """Render the graphs of a scan (render_plot) in a thread, without
+    blocking the gevent loop.
+
+    Returns:
+        (gevent.event.AsyncResult): rendering, raises the rendering error
+    """
+    global _plot_pool
+    if _plot_pool is None:
+        _plot_pool = gevent.threadpool.ThreadPool(1)
+    logging.getLogger("HWR").debug("Rendering energy scan graphs to %s" % png_files)
+    return _plot_pool.spawn(
+        render_plot, list(png_files), energies, counts, result, title
+    )
@@ -0,0 +1,220 @@
+"""
+Acquisition of the points of an energy (fluorescence) scan.
+
+EnergyScanEngine acquires the fluorescence counts (ROI counts of a
+multichannel analyser, MCA) normalised by the beam intensity (diode) at a
+series of monochromator energies:
+
+* sequential step scan: for each energy, move the monochromator and wait,
+  open the shutter, acquire, close the shutter, read out.
+* overlapped step scan: the move to the next energy starts as soon as the
+  acquisition of a point ends, while the MCA is read out. The shutter stays
+  open between points when the sample is exposed only briefly between two
+  acquisitions (time between two acquisitions at most keep_shutter_open);
+  this time is measured, with the shutter closed, on the first point.
+* on the fly scan: the monochromator moves continuously from the first to
+  the last energy, the MCA acquires short frames back to back, each frame
+  at the mean of the monochromator encoder energies at its start and end.
+
+The hardware is given as one object with the methods:
+start_mono_move(energy), is_mono_moving(), get_mono_energy(), start_mca(),
+wait_mca(), read_roi_counts(), read_intensity(), open_fast_shutter() and
+close_fast_shutter(), and for an on the fly scan at a given speed,
+get_mono_speed() and set_mono_speed(speed): the speed is restored at the
+end of the scan.
+"""
+
+import collections
+import time
+
+import gevent
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Point of an energy scan: energy, ROI counts, beam intensity, normalised
+#: counts and time of the point from the start of the scan [s]
+ScanPoint = collections.namedtuple(
+    "ScanPoint", ("energy", "roi_counts", "intensity", "value", "time")
+)
+
+SEQUENTIAL = "sequential"
+OVERLAPPED = "overlapped"
+ON_THE_FLY = "on_the_fly"
+SCAN_MODES = (SEQUENTIAL, OVERLAPPED, ON_THE_FLY)
+
+
+class EnergyScanEngine:
+    """Energy scan acquisition.
+
+    Args:
+        hardware: monochromator, MCA, diode and shutter methods (see module)
+        poll_interval (float): monochromator state polling interval [s]
+        keep_shutter_open (float): maximum time between two acquisitions
+            with the shutter kept open [s], 0: always closed
+    """
+
+    def __init__(self, hardware, poll_interval=0.01, keep_shutter_open=0.5):
+        self.hardware = hardware
+        self.poll_interval = poll_interval
+        self.keep_shutter_open = keep_shutter_open
+        self.stopping = False
+        self.statistics = {}
+
+    def stop(self):
+        """Stops the scan after the current point"""
+        self.stopping = True
+
+    def scan(self, energies, mode=OVERLAPPED, callback=None, **kwargs):
+        """Scan in one of the SCAN_MODES.
+
+        Args:
+            energies (Iterable): energies of a step scan, first and last
+                energies of an on the fly scan
+            mode (str): scan mode
+            callback (Callable): called with each ScanPoint
+        Returns:
+            (list): ScanPoint of each point
+        """
+        if mode == ON_THE_FLY:
+            energies = list(energies)
+            return self.fly_scan(energies[0], energies[-1], callback, **kwargs)
+        if mode not in SCAN_MODES:
+            raise ValueError("Unknown energy scan mode %s" % mode)
+        return self.step_scan(energies, callback, overlap=mode == OVERLAPPED)
+
+    def wait_mono(self):
+        while self.hardware.is_mono_moving():
+            gevent.sleep(self.poll_interval)
+
+    def _point(self, energy, roi_counts, intensity, start):
+        value = float(roi_counts) / intensity if intensity else 0.0
+        return ScanPoint(energy, roi_counts, intensity, value, time.monotonic() - start)
+
+    def _start_statistics(self):
+        self.stopping = False
+        self.statistics = {
+            "points": 0,
+            "shutter_operations": 0,
+            "max_gap": 0.0,
+            "duration": 0.0,
+        }
+        return time.monotonic()
+
+    def _set_shutter(self, shutter_open):
+        self.statistics["shutter_operations"] += 1
+        if shutter_open:
+            self.hardware.open_fast_shutter()
+        else:
+            self.hardware.close_fast_shutter()
+
+    def step_scan(self, energies, callback=None, overlap=True):
+        """Step scan.
+
+        Args:
+            energies (Iterable): energies of the points
+            callback (Callable): called with each ScanPoint
+            overlap (bool): move to the next energy during the read out,
+                shutter kept open between points if possible
+        Returns:
+            (list): ScanPoint of each point
+        """
+        energies = list(energies)
+        start = self._start_statistics()
+        hardware = self.hardware
+        points = []
+        shutter_open = False
+        # time between two acquisitions, unknown until the first point
+        gap = None
+        try:
+            for index, energy in enumerate(energies):
+                if self.stopping:
+                    break
+                if not overlap or index == 0:
+                    hardware.start_mono_move(energy)
+                    self.wait_mono()
+                if not shutter_open:
+                    self._set_shutter(True)
+                    shutter_open = True
+
+                hardware.start_mca()
+                hardware.wait_mca()
+                acquired = time.monotonic()
+                intensity = hardware.read_intensity()
+
+                last = index == len(energies) - 1
+                if last or not (
+                    overlap and gap is not None and gap <= self.keep_shutter_open
+                ):
+                    self._set_shutter(False)
+                    shutter_open = False
+                if overlap and not last:
+                    hardware.start_mono_move(energies[index + 1])
+
+                point = self._point(
+                    energy, hardware.read_roi_counts(), intensity, start
+                )
+                points.append(point)
+                if callback is not None:
+                    callback(point)
+
+                if overlap and not last:
+                    self.wait_mono()
+                    gap = time.monotonic() - acquired
+                    self.statistics["max_gap"] = max(self.statistics["max_gap"], gap)
+        finally:
+            if shutter_open:
+                self._set_shutter(False)
+            self.statistics["points"] = len(points)
+            self.statistics["duration"] = time.monotonic() - start
+        return points
+
+    def fly_scan(self, first_energy, last_energy, callback=None, speed=None):
+        """On the fly scan: the MCA acquires while the monochromator moves.
+
+        Args:
+            first_energy (float): start energy
+            last_energy (float): end energy
+            callback (Callable): called with each ScanPoint
+            speed (float): monochromator speed, None: current speed; the
+                previous speed is restored at the end of the scan
+        Returns:
+            (list): ScanPoint of each MCA frame
+        """
+        start = self._start_statistics()
+        hardware = self.hardware
+        points = []
+        hardware.start_mono_move(first_energy)
+        self.wait_mono()
+        previous_speed = None
+        try:
+            if speed is not None:
+                previous_speed = hardware.get_mono_speed()
+                hardware.set_mono_speed(speed)
+            self._set_shutter(True)
+            hardware.start_mono_move(last_energy)
+            while not self.stopping:
+                moving = hardware.is_mono_moving()
+                frame_start = hardware.get_mono_energy()
+                hardware.start_mca()
+                hardware.wait_mca()
+                frame_end = hardware.get_mono_energy()
+                intensity = hardware.read_intensity()
+                point = self._point(
+                    (frame_start + frame_end) / 2.0,
+                    hardware.read_roi_counts(),
+                    intensity,
+                    start,
+                )
+                points.append(point)
+                if callback is not None:
+                    callback(point)
+                if not moving:
+                    break
+        finally:
+            self._set_shutter(False)
+            if previous_speed is not None:
+                hardware.set_mono_speed(previous_speed)
+            self.statistics["points"] = len(points)
+            self.statistics["duration"] = time.monotonic() - start
+        return points
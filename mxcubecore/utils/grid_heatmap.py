@@ -0,0 +1,204 @@
+"""
+Heatmap of the scores of a grid (mesh) scan, for the display of the grid.
+
+The colour of a cell is taken from a lookup table of the score levels,
+instead of being computed for every cell on every repaint. The heatmap is
+rendered in an ARGB32 pixel buffer (one block of pixels per cell, the beam
+shape in the cell), which the graphics item draws as a single image. When
+the scores are updated, only the cells whose colour changed are rendered
+again.
+"""
+
+import numpy
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Number of colours of the score lookup table
+SCORE_LEVELS = 256
+
+TRANSPARENT = 0
+
+
+def argb(red, green, blue, alpha=255):
+    """ARGB32 pixel value (QColor.rgba) of a colour"""
+    return (alpha << 24) | (red << 16) | (green << 8) | blue
+
+
+def score_lut(alpha=255, levels=SCORE_LEVELS):
+    """Colours of the score levels: from black (score 0) through red to
+    yellow (maximum score), QColor.setHsv(60 * score, 255, 255 * score).
+
+    Args:
+        alpha (int): opacity of the colours, 0 - 255
+        levels (int): number of colours
+    Returns:
+        (numpy.ndarray): ARGB32 colour (uint32) of each level
+    """
+    score = numpy.linspace(0.0, 1.0, levels)
+    # saturation 255 and hue below 60: red = value, blue = 0
+    hue = (60 * score).astype(numpy.uint32)
+    value = (255 * score).astype(numpy.uint32)
+    green = value * hue // 60
+    return (numpy.uint32(alpha) << 24) | (value << 16) | (green << 8)
+
+
+def cell_mask(width, height, beam_width, beam_height, ellipse=True):
+    """Pixels of a cell covered by the beam, centred in the cell.
+
+    Args:
+        width (int): cell width [pix]
+        height (int): cell height [pix]
+        beam_width (float): beam width [pix]
+        beam_height (float): beam height [pix]
+        ellipse (bool): elliptic beam, rectangular if False
+    Returns:
+        (numpy.ndarray): boolean mask, height x width
+    """
+    pos_y, pos_x = numpy.ogrid[:height, :width]
+    pos_x = (pos_x + 0.5 - width / 2.0) / max(beam_width / 2.0, 0.5)
+    pos_y = (pos_y + 0.5 - height / 2.0) / max(beam_height / 2.0, 0.5)
+    if ellipse:
+        return pos_x**2 + pos_y**2 <= 1.0
+    return (abs(pos_x) <= 1.0) & (abs(pos_y) <= 1.0)
+
+
+class GridHeatmap:
+    """Score heatmap of the cells of a grid, rendered in a pixel buffer.
+
+    Args:
+        alpha (int): opacity of the score colours, 0 - 255
+        base_color (int): ARGB32 colour of the cells without score
+        levels (int): number of score colours
+    """
+
+    def __init__(self, alpha=255, base_color=TRANSPARENT, levels=SCORE_LEVELS):
+        self.levels = levels
+        #: rendered heatmap, ARGB32 (uint32) pixels
+        self.image = numpy.zeros((0, 0), numpy.uint32)
+        #: scene coordinates of the top left pixel of the image
+        self.origin = (0, 0)
+        #: incremented when the image changes
+        self.version = 0
+        #: number of cells rendered since the creation of the heatmap
+        self.rendered_cells = 0
+
+        self._lefts = numpy.zeros(0, int)
+        self._tops = numpy.zeros(0, int)
+        self._mask = numpy.zeros((0, 0), bool)
+        # colour index of each cell, -1: not rendered
+        self._indices = numpy.zeros(0, int)
+
+        self.alpha = None
+        # score colours, then the base colour and transparent
+        self.lut = numpy.zeros(levels + 2, numpy.uint32)
+        self.set_alpha(alpha)
+        self.set_base_color(base_color)
+
+    @property
+    def num_cells(self):
+        """Number of cells of the grid"""
+        return len(self._indices)
+
+    def set_alpha(self, alpha):
+        """Sets the opacity of the score colours (all cells are rendered
+        again)"""
+        if alpha != self.alpha:
+            self.alpha = alpha
+            self.lut[: self.levels] = score_lut(alpha, self.levels)
+            self.invalidate()
+
+    def set_base_color(self, color):
+        """Sets the ARGB32 colour of the cells without score"""
+        if color != self.lut[self.levels]:
+            self.lut[self.levels] = color
+            self.invalidate()
+
+    def invalidate(self):
+        """Renders all the cells on the next update"""
+        self._indices[:] = -1
+
+    def set_cells(self, centres_x, centres_y, cell_size, beam_size, ellipse=True):
+        """Sets the geometry of the grid; the image is allocated again and
+        all the cells are rendered on the next update.
+
+        Args:
+            centres_x (Sequence): x coordinate of the centre of each cell
+            centres_y (Sequence): y coordinate of the centre of each cell
+            cell_size (tuple): cell width and height [pix]
+            beam_size (tuple): beam width and height [pix]
+            ellipse (bool): elliptic beam, rectangular if False
+        """
+        width = max(int(round(cell_size[0])), 1)
+        height = max(int(round(cell_size[1])), 1)
+        lefts = numpy.rint(numpy.asarray(centres_x, float) - width / 2.0)
+        tops = numpy.rint(numpy.asarray(centres_y, float) - height / 2.0)
+        lefts = lefts.astype(int)
+        tops = tops.astype(int)
+
+        if len(lefts):
+            self.origin = (int(lefts.min()), int(tops.min()))
+            lefts -= self.origin[0]
+            tops -= self.origin[1]
+            shape = (tops.max() + height, lefts.max() + width)
+        else:
+            self.origin = (0, 0)
+            shape = (0, 0)
+
+        self.image = numpy.zeros(shape, numpy.uint32)
+        self._lefts = lefts
+        self._tops = tops
+        self._mask = cell_mask(width, height, beam_size[0], beam_size[1], ellipse)
+        self._indices = numpy.full(len(lefts), -1, int)
+        self.version += 1
+
+    def color_indices(self, score, visible=True):
+        """Colour index in the lookup table of each cell.
+
+        Args:
+            score (Sequence): score of each cell (missing scores: 0), None
+                for the base colour
+            visible (bool): False for transparent cells
+        Returns:
+            (numpy.ndarray): lookup table index of each cell
+        """
+        if not visible:
+            return numpy.full(self.num_cells, self.levels + 1, int)
+        if score is None:
+            return numpy.full(self.num_cells, self.levels, int)
+
+        values = numpy.zeros(self.num_cells)
+        score = numpy.asarray(score, float).ravel()[: self.num_cells]
+        values[: len(score)] = score
+        maximum = values.max(initial=0.0)
+        if maximum <= 0:
+            return numpy.full(self.num_cells, self.levels + 1, int)
+        indices = (values * ((self.levels - 1) / maximum)).astype(int)
+        return numpy.clip(indices, 0, self.levels - 1)
+
+    def update(self, score, visible=True):
+        """Renders the cells whose colour changed.
+
+        Args:
+            score (Sequence): score of each cell, None for the base colour
+            visible (bool): False for transparent cells
+        Returns:
+            (int): number of cells rendered
+        """
+        indices = self.color_indices(score, visible)
+        changed = numpy.flatnonzero(indices != self._indices)
+        if not len(changed):
+            return 0
+
+        height, width = self._mask.shape
+        rows = self._tops[changed, None] + numpy.arange(height)
+        cols = self._lefts[changed, None] + numpy.arange(width)
+        colors = self.lut[indices[changed]]
+        self.image[rows[:, :, None], cols[:, None, :]] = numpy.where(
+            self._mask, colors[:, None, None], numpy.uint32(TRANSPARENT)
+        )
+
+        self._indices[changed] = indices[changed]
+        self.rendered_cells += len(changed)
+        self.version += 1
+        return len(changed)
@@ -0,0 +1,220 @@
+"""
+Index tables of the images of a grid (mesh) scan.
+
+The images of a grid scan are acquired line after line along the slow
+direction, image after image along the fast direction, every other line in
+the reverse direction for a reversing (meander) scan. GridIndex computes
+once, with numpy, the line, image in the line, column and row of every
+image of a grid, so that placing the results of the images in the grid is a
+table lookup instead of a computation per image. grid_motor_positions
+computes the motor positions of many cells at once.
+
+The computations are the ones of GraphicsItemGrid (QtGraphicsLib), for the
+arrays of all the images.
+"""
+
+import math
+
+import numpy
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+class GridIndex:
+    """Line, image, column and row of every image of a grid scan.
+
+    Args:
+        num_cols (int): number of columns of the grid
+        num_rows (int): number of rows of the grid
+        num_lines (int): number of lines (slow direction)
+        num_images_per_line (int): number of images per line (fast direction)
+        grid_direction (dict): "fast" and "slow" scan directions, (col, row)
+            unit vectors
+        first_image_num (int): serial number of the first image
+        reversing_rotation (bool): every other line scanned backwards
+    """
+
+    def __init__(
+        self,
+        num_cols,
+        num_rows,
+        num_lines,
+        num_images_per_line,
+        grid_direction,
+        first_image_num=1,
+        reversing_rotation=True,
+    ):
+        self.num_cols = num_cols
+        self.num_rows = num_rows
+        self.num_lines = num_lines
+        self.num_images_per_line = num_images_per_line
+        self.grid_direction = grid_direction
+        self.first_image_num = first_image_num
+        self.reversing_rotation = reversing_rotation
+
+        serials = numpy.arange(num_cols * num_rows) + first_image_num
+        self.lines, self.images = self.lines_images(serials)
+        self.fast_ref, self.slow_ref = self.coord_refs(self.lines, self.images)
+        self.cols, self.rows = self._compute_cols_rows(serials)
+
+    @property
+    def num_images(self):
+        """Number of images of the grid"""
+        return len(self.cols)
+
+    def lines_images(self, serials):
+        """Line and image in the line of image serial numbers.
+
+        Args:
+            serials (numpy.ndarray): image serial numbers
+        Returns:
+            (tuple): line and image arrays (int)
+        """
+        index = numpy.asarray(serials) - self.first_image_num
+        lines = numpy.trunc(index / max(self.num_images_per_line, 1)).astype(int)
+        return lines, index - lines * self.num_images_per_line
+
+    def coord_refs(self, lines, images):
+        """Relative positions (-0.5 to 0.5) of images along the fast and
+        slow directions, from the centre of the grid.
+
+        Args:
+            lines (numpy.ndarray): lines of the images
+            images (numpy.ndarray): images in the lines
+        Returns:
+            (tuple): fast and slow position arrays
+        """
+        fast_ref = numpy.full(numpy.shape(images), 0.5)
+        if self.num_images_per_line > 1:
+            fast_ref = 0.5 - images / (self.num_images_per_line - 1.0)
+        if self.reversing_rotation:
+            fast_ref = numpy.where(numpy.asarray(lines) % 2, -fast_ref, fast_ref)
+
+        slow_ref = numpy.full(numpy.shape(lines), 0.5)
+        if self.num_lines > 1:
+            slow_ref = 0.5 - lines / (self.num_lines - 1.0)
+        return fast_ref, slow_ref
+
+    def cols_rows(self, serials):
+        """Columns and rows of image serial numbers, from the tables for the
+        images of the grid.
+
+        Args:
+            serials (numpy.ndarray): image serial numbers
+        Returns:
+            (tuple): column and row arrays (int)
+        """
+        index = numpy.asarray(serials) - self.first_image_num
+        if index.size and index.min() >= 0 and index.max() < self.num_images:
+            return self.cols[index], self.rows[index]
+        return self._compute_cols_rows(serials)
+
+    def _compute_cols_rows(self, serials):
+        fast_ref, slow_ref = self.coord_refs(*self.lines_images(serials))
+        fast = self.grid_direction["fast"]
+        slow = self.grid_direction["slow"]
+        cols = (
+            self.num_cols / 2.0
+            + (self.num_images_per_line - 1) * fast[0] * fast_ref
+            + (self.num_lines - 1) * slow[0] * slow_ref
+        )
+        rows = (
+            self.num_rows / 2.0
+            + (self.num_images_per_line - 1) * fast[1] * fast_ref
+            + (self.num_lines - 1) * slow[1] * slow_ref
+        )
+        return numpy.trunc(cols).astype(int), numpy.trunc(rows).astype(int)
+
+    def col_row(self, serial):
+        """Column and row of an image.
+
+        Args:
+            serial (int): image serial number
+        Returns:
+            (tuple): column and row (int)
+        """
+        index = serial - self.first_image_num
+        if 0 <= index < self.num_images:
+            return int(self.cols[index]), int(self.rows[index])
+        cols, rows = self._compute_cols_rows([serial])
+        return int(cols[0]), int(rows[0])
+
+    def image_centres(self, center, grid_range_pix):
+        """Screen coordinates of the centres of the cells of all the images.
+
+        Args:
+            center (tuple): screen coordinates of the centre of the grid
+            grid_range_pix (dict): "fast" and "slow" distances between the
+                first and last cell centres [pix]
+        Returns:
+            (tuple): x and y coordinate arrays
+        """
+        fast = self.grid_direction["fast"]
+        slow = self.grid_direction["slow"]
+        fast_pix = grid_range_pix["fast"] * self.fast_ref
+        slow_pix = grid_range_pix["slow"] * self.slow_ref
+        return (
+            center[0] + fast[0] * fast_pix + slow[0] * slow_pix,
+            center[1] + fast[1] * fast_pix + slow[1] * slow_pix,
+        )
+
+
+def grid_motor_positions(
+    centred_position,
+    cols,
+    rows,
+    num_cols,
+    num_rows,
+    grid_size_mm,
+    osc_start,
+    osc_range,
+    grid_direction,
+):
+    """Motor positions of points of a grid, given by (fractional) column and
+    row.
+
+    Args:
+        centred_position (dict): motor positions of the centre of the grid
+        cols (numpy.ndarray): columns of the points
+        rows (numpy.ndarray): rows of the points
+        num_cols (int): number of columns of the grid
+        num_rows (int): number of rows of the grid
+        grid_size_mm (tuple): horizontal and vertical size of the grid [mm]
+        osc_start (float): omega (phi) of the grid [deg]
+        osc_range (float): oscillation range per image [deg]
+        grid_direction (dict): "fast" and "slow" scan directions and
+            "omega_ref" reference omega
+    Returns:
+        (dict): new dict of the positions, with arrays of the positions of
+            the points for sampx, sampy, phiy and phi
+    """
+    cols = numpy.asarray(cols, float)
+    rows = numpy.asarray(rows, float)
+    hor_range = -grid_size_mm[0] * (num_cols / 2.0 - cols) / num_cols
+    ver_range = -grid_size_mm[1] * (num_rows / 2.0 - rows) / num_rows
+    angle = math.pi * (osc_start - grid_direction["omega_ref"]) / 180.0
+    sin_angle, cos_angle = math.sin(angle), math.cos(angle)
+
+    positions = dict(centred_position)
+    if grid_direction["fast"][0] == 1:
+        # MD2 when fast direction is horizontal direction
+        positions["sampx"] = centred_position["sampx"] + ver_range * sin_angle
+        positions["sampy"] = centred_position["sampy"] - ver_range * cos_angle
+        positions["phiy"] = centred_position["phiy"] - hor_range
+        positions["phi"] = (
+            centred_position["phi"]
+            - osc_range * num_cols / 2
+            + (num_cols - cols) * osc_range
+        )
+    else:
+        # MD3
+        positions["sampx"] = centred_position["sampx"] - hor_range * sin_angle
+        positions["sampy"] = centred_position["sampy"] + hor_range * cos_angle
+        positions["phiy"] = centred_position["phiy"] + ver_range
+        positions["phi"] = (
+            centred_position["phi"]
+            - osc_range * num_rows / 2
+            + (num_rows - rows) * osc_range
+        )
+    return positions
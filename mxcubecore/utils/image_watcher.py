@@ -0,0 +1,331 @@
+"""
+Watcher of the image files of a data collection.
+
+ImageWatcher follows the arrival of the expected image files of a
+collection (a PathTemplate or a file name template and image numbers). The
+directories are watched with inotify (Linux), which reports each file when
+it is closed after writing or moved in place. The directories are also
+listed periodically, once per directory instead of once per file: this
+catches the files written by other hosts on network filesystems (NFS),
+which inotify does not report. Without inotify, only the listing is done,
+more often.
+
+The arrivals are reported in batches to a callback, with the arrival latency
+of each image: the time between the last modification of the file and its
+detection by the watcher. The watcher runs in a greenlet.
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import os
+import socket
+import struct
+import sys
+import time
+
+import gevent
+import gevent.event
+import gevent.socket
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+#: Arrival of an image file
+ImageArrival = collections.namedtuple(
+    "ImageArrival", ("path", "number", "arrival_time", "latency")
+)
+
+#: Batch of image arrivals
+ImageProgress = collections.namedtuple(
+    "ImageProgress", ("arrivals", "arrived", "expected")
+)
+
+
+class Inotify:
+    """inotify instance (libc, through ctypes), read without blocking the
+    gevent loop.
+
+    Raises:
+        OSError: inotify is not available
+    """
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, directory, mask=IN_CLOSE_WRITE | IN_MOVED_TO):
+        """Watches a directory.
+
+        Args:
+            directory (str): directory to watch
+            mask (int): events to report
+        Returns:
+            (int): watch descriptor
+        """
+        watch = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), ctypes.c_uint32(mask)
+        )
+        if watch < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed", directory)
+        return watch
+
+    def read(self, timeout=None):
+        """Events, waiting at most timeout for the first ones.
+
+        Args:
+            timeout (float): timeout [s], None: no timeout
+        Returns:
+            (list): (watch descriptor, mask, file name) of each event
+        """
+        try:
+            gevent.socket.wait_read(self.fd, timeout)
+        except socket.timeout:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            watch, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((watch, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class ImageWatcher:
+    """Arrival of the image files of a collection.
+
+    Args:
+        files (Iterable): expected files, in acquisition order
+        numbers (Iterable): image numbers of the files, default: from 1
+        callback (Callable): called with an ImageProgress for each batch of
+            arrivals
+        batch_interval (float): minimum time between two callbacks [s]
+        poll_interval (float): time between two listings of the directories
+            [s]. Default: 1 s with inotify, 0.1 s without
+        use_inotify (bool): False to only list the directories
+    """
+
+    def __init__(
+        self,
+        files,
+        numbers=None,
+        callback=None,
+        batch_interval=0.5,
+        poll_interval=None,
+        use_inotify=True,
+    ):
+        files = [os.path.abspath(path) for path in files]
+        if numbers is None:
+            numbers = range(1, len(files) + 1)
+        self.numbers = dict(zip(files, numbers))
+        self.callback = callback
+        self.batch_interval = batch_interval
+        self.use_inotify = use_inotify
+        self.poll_interval = poll_interval
+
+        #: ImageArrival per arrived file
+        self.arrivals = {}
+        self.latest = None
+        # expected file names not arrived yet, per directory
+        self._pending = collections.defaultdict(set)
+        for path in files:
+            directory, name = os.path.split(path)
+            self._pending[directory].add(name)
+        self._batch = []
+        self._waiters = {}
+        self._complete = gevent.event.Event()
+        self._inotify = None
+        self._watches = {}
+        self._task = None
+
+    @classmethod
+    def from_template(cls, directory, template, start_num, num_files, **kwargs):
+        """Watcher of the files of a file name template.
+
+        Args:
+            directory (str): directory of the files
+            template (str): file name template, with the image number
+                format (e.g. "prefix_1_%04d.cbf")
+            start_num (int): first image number
+            num_files (int): number of images
+        """
+        numbers = range(start_num, start_num + num_files)
+        files = [os.path.join(directory, template % number) for number in numbers]
+        return cls(files, numbers, **kwargs)
+
+    @classmethod
+    def from_path_template(cls, path_template, **kwargs):
+        """Watcher of the files of a PathTemplate"""
+        numbers = range(
+            path_template.start_num, path_template.start_num + path_template.num_files
+        )
+        return cls(path_template.get_files_to_be_written(), numbers, **kwargs)
+
+    @property
+    def expected(self):
+        """Number of expected files"""
+        return len(self.numbers)
+
+    def is_expected(self, path):
+        return os.path.abspath(path) in self.numbers
+
+    def has_arrived(self, path):
+        return os.path.abspath(path) in self.arrivals
+
+    def is_complete(self):
+        return self._complete.is_set()
+
+    def start(self):
+        """Starts watching (the files already there arrive at once)"""
+        if self._task is not None:
+            return
+        if self.use_inotify:
+            try:
+                self._inotify = Inotify()
+                for directory in self._pending:
+                    self._watches[self._inotify.add_watch(directory)] = directory
+            except (OSError, AttributeError):
+                # no inotify, or directory not created yet: listing only
+                self._close_inotify()
+        if self.poll_interval is None:
+            self.poll_interval = 0.1 if self._inotify is None else 1.0
+        self._scan()
+        self._flush()
+        self._task = gevent.spawn(self._watch)
+
+    def stop(self):
+        """Stops watching"""
+        if self._task is not None:
+            self._task.kill()
+        self._close_inotify()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def wait_for(self, path, timeout=None):
+        """Waits for the arrival of an expected file.
+
+        Args:
+            path (str): expected file
+            timeout (float): timeout [s], None: no timeout
+        Returns:
+            (bool): True if the file arrived
+        """
+        path = os.path.abspath(path)
+        self.start()
+        if path not in self.arrivals:
+            waiter = self._waiters.setdefault(path, gevent.event.Event())
+            waiter.wait(timeout)
+        return path in self.arrivals
+
+    def wait_all(self, timeout=None):
+        """Waits for the arrival of all the expected files.
+
+        Returns:
+            (bool): True if all the files arrived
+        """
+        self.start()
+        return self._complete.wait(timeout)
+
+    def _close_inotify(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+            self._watches = {}
+
+    def _arrive(self, directory, name):
+        pending = self._pending.get(directory)
+        if not pending or name not in pending:
+            return
+        pending.discard(name)
+        path = os.path.join(directory, name)
+        now = time.time()
+        try:
+            latency = max(now - os.stat(path).st_mtime, 0.0)
+        except OSError:
+            latency = None
+        arrival = ImageArrival(path, self.numbers[path], now, latency)
+        self.arrivals[path] = arrival
+        if self.latest is None or arrival.number > self.latest.number:
+            self.latest = arrival
+        self._batch.append(arrival)
+
+        waiter = self._waiters.pop(path, None)
+        if waiter is not None:
+            waiter.set()
+        if len(self.arrivals) == self.expected:
+            self._complete.set()
+
+    def _scan(self):
+        """Lists the directories, once each"""
+        for directory, pending in list(self._pending.items()):
+            if not pending:
+                continue
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            arrived = [
+                os.path.join(directory, name) for name in pending.intersection(names)
+            ]
+            for path in sorted(arrived, key=self.numbers.get):
+                self._arrive(directory, os.path.basename(path))
+
+    def _flush(self):
+        if self._batch:
+            batch, self._batch = self._batch, []
+            if self.callback is not None:
+                self.callback(ImageProgress(batch, len(self.arrivals), self.expected))
+
+    def _watch(self):
+        next_scan = time.monotonic() + self.poll_interval
+        next_flush = time.monotonic() + self.batch_interval
+        try:
+            while not self.is_complete():
+                timeout = max(min(next_scan, next_flush) - time.monotonic(), 0)
+                if self._inotify is None:
+                    gevent.sleep(timeout)
+                else:
+                    for watch, mask, name in self._inotify.read(timeout):
+                        if mask & IN_Q_OVERFLOW:
+                            next_scan = 0
+                        elif watch in self._watches:
+                            self._arrive(self._watches[watch], name)
+
+                now = time.monotonic()
+                if now >= next_scan:
+                    self._scan()
+                    next_scan = now + self.poll_interval
+                if now >= next_flush:
+                    self._flush()
+                    next_flush = now + self.batch_interval
+        finally:
+            self._flush()
+            self._close_inotify()
@@ -0,0 +1,321 @@
+"""
+JPEG encoding of video frames in a pool of threads.
+
+PIL releases the GIL while compressing, so encoding in a gevent ThreadPool
+keeps the hub responsive and uses several cores. Frames are submitted by the
+producer (the video polling loop) and delivered to subscriptions:
+
+* a frame is not encoded when no subscription wants it, and is dropped
+  when the previous frame is still being encoded (no queue builds up);
+* each frame is encoded once per target (quality, scale), for all the
+  subscriptions sharing that target;
+* subscriptions with a bytes per second budget move along a ladder of
+  targets, from full resolution and quality down to a quarter of the
+  resolution, following the size of the frames they receive, and skip
+  frames while over budget.
+"""
+
+import collections
+import io
+import logging
+import time
+
+import gevent
+import gevent.threadpool
+from PIL import Image
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Encoding target: JPEG quality and scale factor of the frame dimensions
+Target = collections.namedtuple("Target", ("quality", "scale"))
+
+#: Targets of the subscriptions with a budget, from the best one
+TARGET_LADDER = (
+    Target(90, 1.0),
+    Target(75, 1.0),
+    Target(60, 1.0),
+    Target(45, 1.0),
+    Target(75, 0.5),
+    Target(60, 0.5),
+    Target(45, 0.5),
+    Target(60, 0.25),
+    Target(45, 0.25),
+)
+
+
+def encode_jpeg(image, width, height, quality=75, scale=1.0):
+    """Encode an RGB frame.
+
+    Args:
+        image (bytes-like): RGB pixels, 3 bytes per pixel
+        width (int): frame width [pixels]
+        height (int): frame height [pixels]
+        quality (int): JPEG quality (1 - 95)
+        scale (float): scale factor of the frame dimensions
+    Returns:
+        (tuple): JPEG data (bytes), width and height of the encoded image
+    """
+    img = Image.frombuffer("RGB", (width, height), image, "raw", "RGB", 0, 1)
+    if scale != 1:
+        width = max(int(width * scale), 1)
+        height = max(int(height * scale), 1)
+        img = img.resize((width, height), Image.BILINEAR)
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue(), width, height
+
+
+class Subscription:
+    """Receiver of encoded frames.
+
+    Args:
+        callback (Callable): called with the JPEG data, width and height
+        target (Target): encoding target, the first one with a budget
+        bytes_per_second (float): budget, None for every frame at target
+        active (Callable): returns False while the frames are not wanted
+    """
+
+    def __init__(self, callback, target, bytes_per_second=None, active=None):
+        self.callback = callback
+        self.target = target
+        self.bytes_per_second = bytes_per_second
+        self.active = active
+        self.delivered = 0
+        self.skipped = 0
+        # budget not spent [bytes]
+        self._credit = 0.0
+        self._credit_time = None
+
+    def wants_frame(self, now):
+        """Tell if the next frame should be encoded for this subscription"""
+        if self.active is not None and not self.active():
+            return False
+        if self.bytes_per_second is None:
+            return True
+        if self._credit_time is not None:
+            # at most one second of budget is kept
+            self._credit = min(
+                self._credit + (now - self._credit_time) * self.bytes_per_second,
+                self.bytes_per_second,
+            )
+        self._credit_time = now
+        if self._credit < 0:
+            # over budget: skip the frame, and reduce the next ones
+            self.skipped += 1
+            self._step(1)
+            return False
+        return True
+
+    def deliver(self, jpeg, width, height, frame_interval):
+        """Send a frame to the callback, and adapt the target to the budget.
+
+        Args:
+            jpeg (bytes): JPEG data
+            width (int): image width [pixels]
+            height (int): image height [pixels]
+            frame_interval (float): time between two submitted frames [s]
+        """
+        self.delivered += 1
+        if self.bytes_per_second is not None:
+            self._credit -= len(jpeg)
+            self._adapt(len(jpeg) / max(frame_interval, 1e-3))
+        try:
+            self.callback(jpeg, width, height)
+        except Exception:
+            logging.getLogger("HWR").exception("Error in JPEG frame callback")
+
+    def _adapt(self, rate):
+        """Move along TARGET_LADDER, for the stream rate [bytes/s] to fit in
+        the budget"""
+        if rate > self.bytes_per_second:
+            self._step(1)
+        elif rate < 0.5 * self.bytes_per_second:
+            self._step(-1)
+
+    def _step(self, step):
+        """Move by step along TARGET_LADDER (positive: smaller images)"""
+        try:
+            index = TARGET_LADDER.index(self.target)
+        except ValueError:
+            index = 0
+        index = min(max(index + step, 0), len(TARGET_LADDER) - 1)
+        self.target = TARGET_LADDER[index]
+
+
+class JpegEncoder:
+    """Pool of threads encoding frames for a set of subscriptions.
+
+    Args:
+        workers (int): number of encoding threads
+        quality (int): JPEG quality of the subscriptions without budget
+    """
+
+    def __init__(self, workers=2, quality=75):
+        self.workers = workers
+        self.quality = quality
+        self.subscriptions = []
+        self._pool = None
+        self._pending = 0
+        self._last_submit = None
+        self._frame_interval = 0.1
+        self.statistics = {
+            "submitted": 0,
+            "encoded": 0,
+            "skipped": 0,
+            "dropped": 0,
+            "latency": 0.0,
+            "max_latency": 0.0,
+        }
+
+    @property
+    def pool(self):
+        """Thread pool, created on first use"""
+        if self._pool is None:
+            self._pool = gevent.threadpool.ThreadPool(self.workers)
+        return self._pool
+
+    def close(self):
+        """Stop the encoding threads"""
+        if self._pool is not None:
+            self._pool.kill()
+            self._pool = None
+
+    def subscribe(self, callback, bytes_per_second=None, quality=None, active=None):
+        """Receive the encoded frames.
+
+        Args:
+            callback (Callable): called with the JPEG data, width and height
+            bytes_per_second (float): budget of the subscription, the quality
+                and resolution are adapted to it. None for all the frames at
+                full resolution.
+            quality (int): JPEG quality, default: the encoder one
+            active (Callable): returns False while the frames are not wanted
+        Returns:
+            (Subscription): to pass to unsubscribe
+        """
+        if bytes_per_second is None:
+            target = Target(quality or self.quality, 1.0)
+        else:
+            target = TARGET_LADDER[0]
+        subscription = Subscription(callback, target, bytes_per_second, active)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop receiving the encoded frames"""
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def has_consumers(self):
+        """Tell if a subscription wants frames"""
+        return any(sub.active is None or sub.active() for sub in self.subscriptions)
+
+    def _encode(self, image, width, height, target):
+        """Encode in a worker thread, with the encoding time"""
+        start = time.perf_counter()
+        result = encode_jpeg(image, width, height, target.quality, target.scale)
+        return result, time.perf_counter() - start
+
+    def _record_latency(self, latency):
+        statistics = self.statistics
+        statistics["encoded"] += 1
+        # exponential mean over about 20 frames
+        if statistics["encoded"] == 1:
+            statistics["latency"] = latency
+        else:
+            statistics["latency"] += 0.05 * (latency - statistics["latency"])
+        statistics["max_latency"] = max(statistics["max_latency"], latency)
+
+    def encode(self, image, width, height, quality=None, scale=1.0):
+        """Encode a frame in the pool, blocking the calling greenlet only.
+
+        Args:
+            image (bytes-like): RGB pixels, not modified until it returns
+            width (int): frame width [pixels]
+            height (int): frame height [pixels]
+            quality (int): JPEG quality, default: the encoder one
+            scale (float): scale factor of the frame dimensions
+        Returns:
+            (bytes): JPEG data
+        """
+        target = Target(quality or self.quality, scale)
+        self._pending += 1
+        try:
+            (jpeg, _, _), latency = self.pool.apply(
+                self._encode, (image, width, height, target)
+            )
+        finally:
+            self._pending -= 1
+        self._record_latency(latency)
+        return jpeg
+
+    def submit(self, image, width, height):
+        """Encode a frame for the subscriptions, in the background.
+
+        The frame is skipped when no subscription wants it and dropped when
+        the previous frame is still being encoded.
+
+        Args:
+            image (bytes-like): RGB pixels, copied
+            width (int): frame width [pixels]
+            height (int): frame height [pixels]
+        Returns:
+            (gevent.Greenlet): delivering the frame, None if not encoded
+        """
+        now = time.monotonic()
+        if self._last_submit is not None:
+            self._frame_interval += 0.2 * (
+                now - self._last_submit - self._frame_interval
+            )
+        self._last_submit = now
+        self.statistics["submitted"] += 1
+
+        if self._pending:
+            self.statistics["dropped"] += 1
+            return None
+        targets = collections.defaultdict(list)
+        for subscription in self.subscriptions:
+            if subscription.wants_frame(now):
+                targets[subscription.target].append(subscription)
+        if not targets:
+            self.statistics["skipped"] += 1
+            return None
+
+        # the producer may reuse its buffer while the frame is encoded
+        image = bytes(image)
+        self._pending = len(targets)
+        return gevent.spawn(self._deliver, image, width, height, targets)
+
+    def _deliver(self, image, width, height, targets):
+        try:
+            results = [
+                (self.pool.spawn(self._encode, image, width, height, target), subs)
+                for target, subs in targets.items()
+            ]
+            for result, subscriptions in results:
+                try:
+                    (jpeg, jpeg_width, jpeg_height), latency = result.get()
+                finally:
+                    self._pending -= 1
+                self._record_latency(latency)
+                for subscription in subscriptions:
+                    subscription.deliver(
+                        jpeg, jpeg_width, jpeg_height, self._frame_interval
+                    )
+        finally:
+            self._pending = 0
+
+    def get_statistics(self):
+        """Encoding statistics.
+
+        Returns:
+            (dict): numbers of frames submitted, encoded (one per target),
+                skipped (no consumer) and dropped (encoder busy), encodes in
+                progress (queue_depth), mean and maximum encoding time [s],
+                number of subscriptions
+        """
+        statistics = dict(self.statistics)
+        statistics["queue_depth"] = self._pending
+        statistics["subscriptions"] = len(self.subscriptions)
+        return statistics
@@ -0,0 +1,188 @@
+"""
+Detection of the sample loop in on axis video frames, in memory.
+
+The frames are binned, compared to a background model (the empty,
+illuminated field, brighter than the sample) and the darker pixels are
+closed into objects. The largest object is the pin and loop, the loop is
+its end opposite to the pin: its centre is returned, with a confidence
+score.
+
+LoopFinder keeps the background model and the morphology kernels between
+calls. The background model is the running maximum of the smoothed frames
+(slowly following illumination changes), so it converges to the empty field
+as the sample rotates.
+"""
+
+import collections
+import math
+
+import numpy
+from scipy import ndimage
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Loop position [pixels] in the frame, -1 if not found; score from 0 to 1
+LoopResult = collections.namedtuple("LoopResult", ("x", "y", "score", "info"))
+
+NOT_FOUND = LoopResult(-1, -1, 0.0, "No loop detected")
+
+
+def frame_from_image(data, width, height):
+    """Frame array of a video image.
+
+    Args:
+        data (bytes-like): RGB (3 bytes per pixel) or grey (1 byte) pixels
+        width (int): image width [pixels]
+        height (int): image height [pixels]
+    Returns:
+        (numpy.ndarray): (height, width[, 3]) uint8 array, without copy
+    """
+    frame = numpy.frombuffer(data, dtype=numpy.uint8)
+    if frame.size == width * height:
+        return frame.reshape(height, width)
+    return frame.reshape(height, width, -1)[..., :3]
+
+
+class LoopFinder:
+    """Loop detection, with the background model and kernels cached between
+    calls.
+
+    Args:
+        binning (int): frames are binned by binning x binning pixels
+        closing_iterations (int): size of the closing of the objects
+            [binned pixels]
+        threshold (float): minimum relative darkness of the objects
+        background_size (float): size of the background smoothing, as a
+            fraction of the frame width
+        background_decay (float): weight of each frame in the background
+            model, where it is brighter than the model
+        min_area (float): minimum object area, as a fraction of the frame
+    """
+
+    def __init__(
+        self,
+        binning=4,
+        closing_iterations=3,
+        threshold=0.12,
+        background_size=0.1,
+        background_decay=0.1,
+        min_area=0.002,
+    ):
+        self.binning = binning
+        self.threshold = threshold
+        self.background_size = background_size
+        self.background_decay = background_decay
+        self.min_area = min_area
+        self.closing_iterations = closing_iterations
+        self._structure = ndimage.iterate_structure(
+            ndimage.generate_binary_structure(2, 1), closing_iterations
+        )
+        self._background = None
+
+    def reset(self):
+        """Forget the background model (new sample, new illumination)"""
+        self._background = None
+
+    def bin_frame(self, frame):
+        """Binned grey level frame.
+
+        Args:
+            frame (numpy.ndarray): (height, width[, channels]) frame
+        Returns:
+            (numpy.ndarray): float32 (height // binning, width // binning)
+        """
+        bin_ = self.binning
+        height, width = frame.shape[0] // bin_, frame.shape[1] // bin_
+        frame = frame[: height * bin_, : width * bin_]
+        if frame.ndim == 2:
+            blocks = frame.reshape(height, bin_, width, bin_)
+            axes = (1, 3)
+        else:
+            blocks = frame.reshape(height, bin_, width, bin_, frame.shape[2])
+            axes = (1, 3, 4)
+        binned = blocks.sum(axis=axes, dtype=numpy.uint32).astype(numpy.float32)
+        binned *= 1.0 / (blocks.size // (height * width))
+        return binned
+
+    def update_background(self, binned):
+        """Update the background model with a binned frame.
+
+        Returns:
+            (numpy.ndarray): background model
+        """
+        size = max(int(binned.shape[1] * self.background_size), 3)
+        # the objects are darker than the background: a maximum filter
+        # removes those smaller than size, the mean filter smooths the result
+        estimate = ndimage.maximum_filter(binned, size=size)
+        ndimage.uniform_filter(estimate, size=size, output=estimate)
+        background = self._background
+        if background is None or background.shape != estimate.shape:
+            self._background = estimate
+        else:
+            background += self.background_decay * (estimate - background)
+            numpy.maximum(background, estimate, out=background)
+        return self._background
+
+    def find(self, frame, rotation=0.0):
+        """Find the loop in a frame.
+
+        Args:
+            frame (numpy.ndarray): (height, width[, channels]) frame
+            rotation (float): direction from the pin to the loop tip, in
+                degrees from the image x axis (clockwise, the y axis
+                pointing down); 0: pin on the left
+        Returns:
+            (LoopResult): loop centre [pixels] and confidence score
+        """
+        binned = self.bin_frame(frame)
+        background = self.update_background(binned)
+
+        contrast = 1.0 - binned / numpy.maximum(background, 1.0)
+        # noise estimate: median absolute deviation of the contrast
+        median = numpy.median(contrast)
+        noise = 1.4826 * numpy.median(numpy.abs(contrast - median))
+        threshold = max(self.threshold, median + 5 * noise)
+
+        objects = ndimage.binary_closing(
+            contrast > threshold, structure=self._structure, border_value=0
+        )
+        # the inside of the loop is not darker than the background
+        objects = ndimage.binary_fill_holes(objects)
+        labels, count = ndimage.label(objects)
+        if not count:
+            return NOT_FOUND
+        areas = numpy.bincount(labels.ravel())
+        areas[0] = 0
+        label = int(areas.argmax())
+        if areas[label] < self.min_area * labels.size:
+            return NOT_FOUND
+
+        rows, cols = numpy.nonzero(labels == label)
+        angle = math.radians(rotation)
+        axis = numpy.array([math.cos(angle), math.sin(angle)])
+        along = cols * axis[0] + rows * axis[1]
+        across = rows * axis[0] - cols * axis[1]
+        tip = along.max()
+
+        # the loop is about as long as it is wide: take its width near the
+        # tip, then the object over that length
+        near_tip = along >= tip - 0.1 * max(labels.shape)
+        length = max(numpy.ptp(across[near_tip]), 1.0)
+        loop = along >= tip - length
+        x = (cols[loop].mean() + 0.5) * self.binning - 0.5
+        y = (rows[loop].mean() + 0.5) * self.binning - 0.5
+
+        # confidence: contrast of the loop well above the threshold, and an
+        # object attached to the frame edge (the pin)
+        peak = numpy.percentile(contrast[rows[loop], cols[loop]], 90)
+        score = float(numpy.clip(1.0 - threshold / max(peak, 1e-6), 0.0, 1.0))
+        last_row, last_col = labels.shape[0] - 1, labels.shape[1] - 1
+        if not (
+            rows.min() == 0
+            or cols.min() == 0
+            or rows.max() == last_row
+            or cols.max() == last_col
+        ):
+            score *= 0.5
+        return LoopResult(float(x), float(y), score, "Loop found")
@@ -0,0 +1,149 @@
+"""
+Moves of several motors, started together and awaited together.
+
+MotionGroup.move starts the move of every axis at once, each in its own
+greenlet waiting for the readiness (ready event) of its motor, so that a
+multi-axis move takes the time of the slowest axis instead of the sum of
+the times of all the axes. Axes which must not move together (mechanical
+collisions, shared controller) are declared as exclusive: the axes of an
+exclusive set are moved one after the other, the others still in parallel.
+A serial group moves all the axes one after the other (controllers which
+do not accept concurrent moves). The start and end time of each axis are
+reported. MotionGroup.start starts the moves without waiting for their end.
+"""
+
+import collections
+import time
+
+import gevent
+import gevent.lock
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Move of an axis: start and end times [s] from the start of the group move
+AxisTiming = collections.namedtuple("AxisTiming", ("start", "end"))
+
+
+def move_and_wait(motor, position):
+    """Move a motor, and wait for it to be ready.
+
+    Args:
+        motor: motor, with set_value(value) and wait_ready() or is_ready()
+        position (float): target position
+    """
+    motor.set_value(position)
+    wait_ready = getattr(motor, "wait_ready", None)
+    if callable(wait_ready):
+        wait_ready()
+    else:
+        while not motor.is_ready():
+            gevent.sleep(0.01)
+
+
+class MotionGroup:
+    """Axes moved together.
+
+    Args:
+        exclusive (Iterable): sets of axis names which must not move together
+        mover (Callable): called with motor and position in the greenlet of
+            each axis, returns when the axis is in position. Default:
+            move_and_wait
+        serial (bool): move all the axes one after the other
+    """
+
+    def __init__(self, exclusive=(), mover=move_and_wait, serial=False):
+        self.mover = mover
+        self.serial = serial
+        self.exclusive = [frozenset(axes) for axes in exclusive]
+        self._locks = [gevent.lock.Semaphore() for _ in self.exclusive]
+        self._serial_lock = gevent.lock.Semaphore()
+        self.timings = {}
+
+    def _exclusive_locks(self, name):
+        """Locks of the exclusive sets of an axis, in a fixed order"""
+        if self.serial:
+            return [self._serial_lock]
+        return [lock for axes, lock in zip(self.exclusive, self._locks) if name in axes]
+
+    def _move_axis(self, name, motor, position, start, timings):
+        locks = self._exclusive_locks(name)
+        for lock in locks:
+            lock.acquire()
+        try:
+            axis_start = time.monotonic() - start
+            self.mover(motor, position)
+            timings[name] = AxisTiming(axis_start, time.monotonic() - start)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def start(self, moves, timeout=None):
+        """Start the moves of all the axes at once.
+
+        Args:
+            moves (dict): (motor, position) per axis name
+            timeout (float): timeout for the whole move [s], None: no timeout
+        Returns:
+            (gevent.Greenlet): waiting for the end of all the moves, its value
+                is the AxisTiming per axis name, its exception the timeout
+                (RuntimeError) or the first error of the axes
+        """
+        # timings of this move only (the axes of a previous move may still
+        # be moving)
+        timings = self.timings = {}
+        start = time.monotonic()
+        movers = [
+            gevent.spawn(self._move_axis, name, motor, position, start, timings)
+            for name, (motor, position) in moves.items()
+        ]
+        moving = gevent.spawn(self._wait, moves, movers, timeout, timings)
+        # let the axes start their move
+        gevent.sleep(0)
+        return moving
+
+    def move(self, moves, timeout=None):
+        """Move all the axes at once, wait for the end of all the moves.
+
+        Args:
+            moves (dict): (motor, position) per axis name
+            timeout (float): timeout for the whole move [s], None: no timeout
+        Returns:
+            (dict): AxisTiming per axis name
+        Raises:
+            RuntimeError: timeout
+            Exception: the first error of the axes, once all are done
+        """
+        moving = self.start(moves, timeout)
+        try:
+            return moving.get()
+        except BaseException:
+            moving.kill()
+            raise
+
+    def _wait(self, moves, movers, timeout, timings):
+        try:
+            with gevent.Timeout(
+                timeout,
+                RuntimeError("Timeout moving %s" % ", ".join(map(str, moves))),
+            ):
+                gevent.joinall(movers)
+        except BaseException:
+            gevent.killall(movers)
+            raise
+        for mover in movers:
+            if mover.exception is not None:
+                raise mover.exception
+        return timings
+
+    def report(self):
+        """
+        Returns:
+            (str): duration of the last move of each axis, slowest first
+        """
+        return ", ".join(
+            "%s %.3f s" % (name, timing.end - timing.start)
+            for name, timing in sorted(
+                self.timings.items(), key=lambda item: item[1].start - item[1].end
+            )
+        )
@@ -0,0 +1,154 @@
+"""
+Snapshot of motor positions, kept up to date by the motor signals.
+
+Projecting the shapes of the sample view to the screen, or saving a centred
+position, needs the positions of all the centring motors, often many times
+per second. PositionSnapshot keeps the last position of each motor, updated
+from its valueChanged (or legacy positionChanged) signal, instead of
+reading every motor from the hardware on every call. A generation counter
+is incremented by every update: a reader can tell if the positions changed
+since it last read them. The motors are only read from the hardware
+explicitly (read_live), or as a fallback for the motors which have not
+reported a position yet.
+
+The positions are updated in the signal handlers, in the gevent loop: a
+reader which does not yield between reading several positions reads a
+consistent set.
+"""
+
+import logging
+import types
+
+from mxcubecore.dispatcher import dispatcher
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Signals carrying the new position of a motor
+POSITION_SIGNALS = ("valueChanged", "positionChanged")
+
+
+def read_position(motor):
+    """Position of a motor, read from the hardware"""
+    get_value = getattr(motor, "get_value", None)
+    if callable(get_value):
+        return get_value()
+    return motor.get_position()
+
+
+class _PositionReceiver:
+    """Receiver of the position signals of a motor (the dispatcher only
+    keeps weak references to the receivers)"""
+
+    def __init__(self, snapshot, name):
+        self.snapshot = snapshot
+        self.name = name
+
+    def position_changed(self, position, *args):
+        self.snapshot.update(self.name, position)
+
+
+class PositionSnapshot:
+    """Last positions of motors, updated from their signals."""
+
+    def __init__(self):
+        self.motors = {}
+        self._positions = {}
+        self._receivers = {}
+        # read only view of the positions, shared by all the readers
+        self.positions = types.MappingProxyType(self._positions)
+
+        #: incremented on every position update
+        self.generation = 0
+        #: positions read from the snapshot instead of the hardware
+        self.cached_reads = 0
+        #: positions read from the hardware
+        self.live_reads = 0
+
+    def add_motor(self, name, motor, signals=POSITION_SIGNALS):
+        """Follow the position of a motor; its current position is read, if
+        it cannot be it is read by get_positions on first use.
+
+        Args:
+            name (str): motor name (role)
+            motor: motor hardware object
+            signals (tuple): signals carrying the new position
+        """
+        self.remove_motor(name)
+        receiver = _PositionReceiver(self, name)
+        for signal in signals:
+            dispatcher.connect(receiver.position_changed, signal, motor)
+            # some motors only send their signals once connected to
+            if hasattr(motor, "connect_notify"):
+                motor.connect_notify(signal)
+        self.motors[name] = motor
+        self._receivers[name] = (receiver, signals)
+        try:
+            self.read_live([name])
+        except Exception:
+            logging.getLogger("HWR").warning(
+                "Could not read the position of motor %s", name, exc_info=True
+            )
+
+    def remove_motor(self, name):
+        """Stop following the position of a motor"""
+        motor = self.motors.pop(name, None)
+        if motor is None:
+            return
+        receiver, signals = self._receivers.pop(name)
+        for signal in signals:
+            dispatcher.disconnect(receiver.position_changed, signal, motor)
+        self._positions.pop(name, None)
+        self.generation += 1
+
+    def update(self, name, position):
+        """Set the position of a motor (from its signal)"""
+        if position is not None:
+            self._positions[name] = position
+            self.generation += 1
+
+    def read_live(self, names=None):
+        """Read motor positions from the hardware into the snapshot.
+
+        Args:
+            names (Iterable): motor names, all the motors if None
+        Returns:
+            (Mapping): read only view of all the positions
+        """
+        for name in self.motors if names is None else names:
+            self.live_reads += 1
+            self.update(name, read_position(self.motors[name]))
+        return self.positions
+
+    def get_positions(self, names=None):
+        """Positions of motors, read from the hardware only for the motors
+        without a known position.
+
+        Args:
+            names (Iterable): motor names, all the motors if None
+        Returns:
+            (Mapping): read only view of all the positions (not a copy, it
+                follows the updates)
+        """
+        for name in self.motors if names is None else names:
+            if name in self._positions:
+                self.cached_reads += 1
+            else:
+                self.read_live((name,))
+        return self.positions
+
+    def get_position(self, name):
+        """Position of a motor, read from the hardware if not known"""
+        return self.get_positions((name,))[name]
+
+    def get_statistics(self):
+        """
+        Returns:
+            (dict): generation, number of positions read from the snapshot
+                (hardware reads saved) and from the hardware
+        """
+        return {
+            "generation": self.generation,
+            "cached_reads": self.cached_reads,
+            "live_reads": self.live_reads,
+        }
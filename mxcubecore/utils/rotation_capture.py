@@ -0,0 +1,290 @@
+"""
+Capture of video frames at several angles, during one continuous rotation.
+
+Instead of moving a motor (phi) to each angle, waiting for it to settle and
+grabbing a frame, RotationCapture moves the motor once, from the first to
+the last angle, and keeps the video frames passing the angles. The motor
+position is sampled with timestamps during the move: each frame is tagged
+with the position interpolated at its timestamp (the time it was published
+in the frame ring, less the camera latency), and the frame closest to each
+angle is kept.
+
+The frames are read from the camera FrameRing (camera.get_frames(), see
+mxcubecore.utils.video_frames) when it has one, or from
+camera.get_last_image(), polled into a FrameRing.
+"""
+
+import collections
+import time
+
+import gevent
+import numpy
+
+from mxcubecore.utils.video_frames import FrameRing
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Frame captured at an angle: requested angle, motor position interpolated
+#: at the frame timestamp, timestamp (time.monotonic), copy of the pixels
+AngleFrame = collections.namedtuple(
+    "AngleFrame", ("target", "angle", "timestamp", "data", "width", "height")
+)
+
+
+def minimal_sweep(angles, period=360.0):
+    """Shortest single move through angles on a rotation axis, where angles
+    differing by a multiple of period are the same: e.g. 350 then 370 for
+    [350, 10], instead of 10 to 350.
+
+    Args:
+        angles (list): angles [deg], in any order
+        period (float): rotation period [deg]
+    Returns:
+        (list): (index in angles, motor position) in the move order, the
+            first position is the angle as given
+    """
+    reduced = numpy.mod(numpy.asarray(angles, float), period)
+    order = numpy.argsort(reduced, kind="stable")
+    ordered = reduced[order]
+    # gap before each angle, the gap across 0 (no wrap-around) first
+    gaps = numpy.diff(ordered, prepend=ordered[-1] - period)
+    start = int(numpy.argmax(gaps))
+    order = numpy.roll(order, -start)
+    first = order[0]
+    return [
+        (
+            int(index),
+            float(angles[first] + (reduced[index] - reduced[first]) % period),
+        )
+        for index in order
+    ]
+
+
+class PositionTrace:
+    """Positions of a motor, sampled with their timestamps in a greenlet.
+
+    Args:
+        motor: motor, with get_value()
+        interval (float): sampling interval [s]
+    """
+
+    def __init__(self, motor, interval=0.005):
+        self.motor = motor
+        self.interval = interval
+        self.times = []
+        self.positions = []
+        self._sampling = None
+
+    def sample(self):
+        """Record the current position of the motor"""
+        before = time.monotonic()
+        position = float(self.motor.get_value())
+        # the position was read between before and now
+        self.times.append(0.5 * (before + time.monotonic()))
+        self.positions.append(position)
+
+    def start(self):
+        """Sample the position until stop is called"""
+        self.sample()
+        self._sampling = gevent.spawn(self._sample_forever)
+
+    def stop(self):
+        if self._sampling is not None:
+            self._sampling.kill()
+            self._sampling = None
+
+    def _sample_forever(self):
+        while True:
+            gevent.sleep(self.interval)
+            self.sample()
+
+    @property
+    def last_time(self):
+        """Timestamp of the last sample, None before the first one"""
+        return self.times[-1] if self.times else None
+
+    def position_at(self, timestamps):
+        """Positions interpolated at timestamps, the first or last sampled
+        position outside of the trace.
+
+        Args:
+            timestamps (float or numpy.ndarray): time.monotonic timestamps
+        Returns:
+            (float or numpy.ndarray): positions
+        """
+        return numpy.interp(timestamps, self.times, self.positions)
+
+
+class PolledFrames:
+    """FrameRing fed by polling camera.get_last_image(), for the cameras
+    without a frame ring.
+
+    Args:
+        camera: camera, with get_last_image() returning data, width, height
+        interval (float): polling interval [s]
+        size (int): number of frames kept
+    """
+
+    def __init__(self, camera, interval=0.02, size=4):
+        self.camera = camera
+        self.interval = interval
+        self.ring = FrameRing(size)
+        self._polling = None
+
+    def start(self):
+        self._polling = gevent.spawn(self._poll)
+
+    def stop(self):
+        if self._polling is not None:
+            self._polling.kill()
+            self._polling = None
+
+    def _poll(self):
+        while True:
+            start = time.monotonic()
+            data, width, height = self.camera.get_last_image()
+            if data is not None:
+                self.ring.publish(data, width, height)
+            gevent.sleep(max(self.interval - (time.monotonic() - start), 0))
+
+
+class RotationCapture:
+    """Frames at several angles of a motor, captured in one move.
+
+    Args:
+        motor: rotation motor, with get_value(), set_value(value, timeout)
+            and is_ready()
+        camera: camera, with get_frames() (FrameRing) or get_last_image()
+        latency (float): time from the exposure of a frame to its
+            publication in the frame ring [s]
+        sampling (float): motor position sampling interval [s]
+        frame_interval (float): polling interval of the cameras without
+            frame ring [s]
+        tolerance (float): angle reached within tolerance [motor units]
+    """
+
+    def __init__(
+        self,
+        motor,
+        camera,
+        latency=0.0,
+        sampling=0.005,
+        frame_interval=0.02,
+        tolerance=0.01,
+    ):
+        self.motor = motor
+        self.camera = camera
+        self.latency = latency
+        self.sampling = sampling
+        self.frame_interval = frame_interval
+        self.tolerance = tolerance
+
+    def _frames(self):
+        """Frame ring of the camera, or of a camera poller (started)"""
+        get_frames = getattr(self.camera, "get_frames", None)
+        frames = get_frames() if callable(get_frames) else None
+        if frames is not None and frames.latest() is not None:
+            return frames, None
+        poller = PolledFrames(self.camera, self.frame_interval)
+        poller.start()
+        return poller.ring, poller
+
+    def capture(self, angles, timeout=60, frame_cb=None):
+        """Move the motor to the first angle, then to the last one in a
+        single move, and capture the frame closest to each angle. Returns
+        when the motor has stopped.
+
+        Args:
+            angles (list): motor positions, ordered in the move direction
+            timeout (float): maximum time for the whole capture [s]
+            frame_cb (Callable): called with each AngleFrame, as soon as it
+                is captured
+        Returns:
+            (list): AngleFrame per angle
+        Raises:
+            ValueError: angles not ordered
+            RuntimeError: timeout, or motor stopped before the last angle
+        """
+        angles = [float(angle) for angle in angles]
+        direction = 1 if angles[-1] >= angles[0] else -1
+        if any(direction * (b - a) < 0 for a, b in zip(angles, angles[1:])):
+            raise ValueError("Angles must be ordered in the move direction")
+
+        with gevent.Timeout(timeout, RuntimeError("Timeout during rotation capture")):
+            if abs(self.motor.get_value() - angles[0]) > self.tolerance:
+                self.motor.set_value(angles[0], timeout=None)
+
+            frames, poller = self._frames()
+            trace = PositionTrace(self.motor, self.sampling)
+            try:
+                last = frames.latest()
+                trace.start()
+                self.motor.set_value(angles[-1])
+                captured = self._select(
+                    frames, last, trace, angles, direction, frame_cb
+                )
+                while not self.motor.is_ready():
+                    gevent.sleep(self.sampling)
+                return captured
+            finally:
+                trace.stop()
+                if poller is not None:
+                    poller.stop()
+
+    def _select(self, frames, last, trace, angles, direction, frame_cb):
+        """Tag the frames published after last with the motor position, and
+        keep the closest to each angle"""
+        captured = []
+        pending = collections.deque()
+        previous = None
+        stopped_at = None
+        while True:
+            frame = frames.wait(after=last, timeout=10 * self.sampling)
+            if frame is not None and (last is None or frame.sequence > last.sequence):
+                last = frame
+                pending.append(
+                    AngleFrame(
+                        None,
+                        None,
+                        frame.timestamp - self.latency,
+                        frame.data.copy(),
+                        frame.width,
+                        frame.height,
+                    )
+                )
+            # stopped once it has moved: it may not be busy yet at the start
+            if (
+                stopped_at is None
+                and abs(trace.positions[-1] - trace.positions[0]) > self.tolerance
+                and self.motor.is_ready()
+            ):
+                stopped_at = time.monotonic()
+
+            # the position is known once sampled after the frame timestamp
+            while pending and pending[0].timestamp <= trace.last_time:
+                current = pending.popleft()
+                current = current._replace(
+                    angle=float(trace.position_at(current.timestamp))
+                )
+                while len(captured) < len(angles):
+                    target = angles[len(captured)]
+                    if direction * (current.angle - target) < -self.tolerance:
+                        break
+                    best = current
+                    if previous is not None and abs(previous.angle - target) < abs(
+                        current.angle - target
+                    ):
+                        best = previous
+                    best = best._replace(target=target)
+                    captured.append(best)
+                    if callable(frame_cb):
+                        frame_cb(best)
+                if len(captured) == len(angles):
+                    return captured
+                if stopped_at is not None and current.timestamp > stopped_at:
+                    raise RuntimeError(
+                        "Motor stopped at %s, before %s"
+                        % (current.angle, angles[len(captured)])
+                    )
+                previous = current
@@ -0,0 +1,362 @@
+"""
+Thumbnails of diffraction images, generated in a pool of threads.
+
+A detector frame (CBF with byte offset compression, or HDF5 with h5py) is
+read once, downsampled (maximum of blocks of pixels, so that the spots
+remain visible), tone mapped with numpy (dark spots on a white background,
+up to a high percentile of the counts) and encoded in JPEG at each requested
+scale, instead of running an external converter per thumbnail, which reads
+the frame again.
+
+The frames are converted in a bounded pool of threads. While all the
+workers are busy, frames are skipped, except the first and last frames of a
+series and every Nth frame, which are queued.
+"""
+
+import collections
+import logging
+import os
+import re
+import time
+
+import gevent
+import gevent.threadpool
+import numpy
+from PIL import Image
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+CBF_BINARY_START = b"\x0c\x1a\x04\xd5"
+
+#: HDF5 dataset of the frames (NeXus / Eiger)
+HDF5_DATASET = "/entry/data/data"
+
+#: Scale factors of the PX1 JPEG image and thumbnail
+JPEG_SCALE = 0.4
+THUMBNAIL_SCALE = 0.1
+
+
+def _cbf_header_value(header, key, default=None):
+    match = re.search(rb"^" + key + rb":\s*(\S+)", header, re.M | re.I)
+    return match.group(1).decode() if match else default
+
+
+def _escape_lengths(raw, escapes):
+    """Lengths (escape byte included) of the values at escape bytes"""
+    padded = numpy.concatenate((raw.view(numpy.uint8), numpy.zeros(16, numpy.uint8)))
+
+    def is_escape(offset, width):
+        escape = padded[escapes + offset + width - 1] == 0x80
+        for byte in range(offset, offset + width - 1):
+            escape &= padded[escapes + byte] == 0
+        return escape
+
+    lengths = numpy.full(len(escapes), 3)
+    escape_16 = is_escape(1, 2)
+    lengths[escape_16] = 7
+    lengths[escape_16 & is_escape(3, 4)] = 15
+    return lengths
+
+
+def _escaped_values(raw, escapes, lengths):
+    """Values after the escape bytes (int16, int32 or int64)"""
+    padded = numpy.concatenate((raw.view(numpy.uint8), numpy.zeros(16, numpy.uint8)))
+    values = numpy.empty(len(escapes), numpy.int64)
+    for length, offset, dtype in ((3, 1, "<i2"), (7, 3, "<i4"), (15, 7, "<i8")):
+        selected = lengths == length
+        width = numpy.dtype(dtype).itemsize
+        positions = escapes[selected, None] + offset + numpy.arange(width)
+        values[selected] = padded[positions].copy().view(dtype)[:, 0]
+    return values
+
+
+def decode_byte_offset(data, size):
+    """Decode CBF byte offset compressed pixel values.
+
+    Each value is the difference with the previous one, stored in 1 byte,
+    or after a -128 escape byte in 2 bytes, or after a -32768 escape in 4
+    bytes (or 8 bytes), little endian.
+
+    The bytes -128 which are not escapes (inside a 2 to 8 bytes value) are
+    dropped with numpy, iterating only as many times as such bytes follow
+    each other, instead of decoding value by value.
+
+    Args:
+        data (bytes-like): compressed data
+        size (int): number of values
+    Returns:
+        (numpy.ndarray): values (int32)
+    """
+    raw = numpy.frombuffer(data, numpy.int8)
+    escapes = numpy.flatnonzero(raw == -128)
+    lengths = _escape_lengths(raw, escapes)
+
+    # an escape byte is real if not in the value of a previous real escape
+    real = numpy.ones(len(escapes), bool)
+    for _ in range(len(escapes)):
+        inside = numpy.zeros(len(escapes), bool)
+        for back in range(1, 15):
+            previous = real[:-back] & (
+                escapes[back:] < escapes[:-back] + lengths[:-back]
+            )
+            inside[back:] |= previous
+        if numpy.array_equal(real, ~inside):
+            break
+        real = ~inside
+    escapes = escapes[real]
+    lengths = lengths[real]
+
+    # first bytes of the values: all but the bytes after the escape bytes
+    skipped = numpy.zeros(len(raw) + 16, numpy.int32)
+    numpy.add.at(skipped, escapes + 1, 1)
+    numpy.add.at(skipped, escapes + lengths, -1)
+    starts = numpy.flatnonzero(numpy.cumsum(skipped[: len(raw)]) == 0)
+
+    deltas = raw[starts].astype(numpy.int64)
+    deltas[numpy.searchsorted(starts, escapes)] = _escaped_values(raw, escapes, lengths)
+    return numpy.cumsum(deltas[:size]).astype(numpy.int32)
+
+
+def read_cbf(path):
+    """Read a CBF frame (byte offset compression).
+
+    Args:
+        path (str): CBF file
+    Returns:
+        (numpy.ndarray): frame, height x width (int32)
+    Raises:
+        ValueError: not a byte offset compressed CBF frame
+    """
+    with open(path, "rb") as cbf_file:
+        content = cbf_file.read()
+    start = content.find(CBF_BINARY_START)
+    if start < 0:
+        raise ValueError("No binary section in %s" % path)
+    header = content[:start]
+    if b"x-cbf_byte_offset" not in header.lower():
+        raise ValueError("Unsupported CBF compression in %s" % path)
+
+    width = int(_cbf_header_value(header, rb"X-Binary-Size-Fastest-Dimension"))
+    height = int(_cbf_header_value(header, rb"X-Binary-Size-Second-Dimension"))
+    size = int(_cbf_header_value(header, rb"X-Binary-Size", len(content)))
+    start += len(CBF_BINARY_START)
+    values = decode_byte_offset(
+        memoryview(content)[start : start + size], width * height
+    )
+    return values.reshape(height, width)
+
+
+def read_hdf5(path, index=0, dataset=HDF5_DATASET):
+    """Read a frame of an HDF5 file.
+
+    Args:
+        path (str): HDF5 file
+        index (int): index of the frame in the dataset
+        dataset (str): dataset of the frames
+    Returns:
+        (numpy.ndarray): frame, height x width
+    """
+    if h5py is None:
+        raise ValueError("h5py is needed to read %s" % path)
+    with h5py.File(path, "r") as h5_file:
+        frames = h5_file[dataset]
+        return frames[index] if frames.ndim == 3 else frames[()]
+
+
+def read_frame(path):
+    """Read a detector frame, CBF or HDF5 from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".cbf":
+        return read_cbf(path)
+    if extension in (".h5", ".hdf5", ".nxs"):
+        return read_hdf5(path)
+    raise ValueError("Unsupported image format: %s" % path)
+
+
+def downsample_max(frame, factor):
+    """Maximum of the blocks of factor x factor pixels (the edges which do
+    not fill a block are dropped)"""
+    if factor <= 1:
+        return frame
+    height = frame.shape[0] // factor * factor
+    width = frame.shape[1] // factor * factor
+    # maximum of strided slices, much faster than a reduction of the blocks
+    rows = frame[:height:factor, :width].copy()
+    for offset in range(1, factor):
+        numpy.maximum(rows, frame[offset:height:factor, :width], out=rows)
+    binned = rows[:, ::factor].copy()
+    for offset in range(1, factor):
+        numpy.maximum(binned, rows[:, offset:width:factor], out=binned)
+    return binned
+
+
+def tone_map(frame, percentile=99.5):
+    """Grey levels of a frame: 255 (white) for no counts, 0 (black) from the
+    percentile of the counts. Negative values (detector gaps, bad pixels)
+    are white.
+
+    Returns:
+        (numpy.ndarray): grey levels (uint8)
+    """
+    counts = numpy.maximum(frame, 0).astype(numpy.float32)
+    top = max(float(numpy.percentile(counts, percentile)), 1.0)
+    levels = numpy.minimum(counts, top)
+    levels *= 255.0 / top
+    return (255 - levels).astype(numpy.uint8)
+
+
+def make_thumbnails(frame, targets, quality=75):
+    """JPEG thumbnails of a frame, written to files.
+
+    Args:
+        frame (numpy.ndarray): detector frame
+        targets (Iterable): (file name, scale factor) of each thumbnail
+        quality (int): JPEG quality
+    """
+    targets = sorted(targets, key=lambda target: -target[1])
+    height, width = frame.shape
+    # binned and tone mapped once, for the largest thumbnail
+    factor = max(int(1.0 / targets[0][1]), 1)
+    image = Image.fromarray(tone_map(downsample_max(frame, factor)))
+    for filename, scale in targets:
+        size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        if image.size != size:
+            image = image.resize(size, Image.BOX)
+        image.save(filename, "JPEG", quality=quality)
+
+
+class ThumbnailEngine:
+    """Pool of threads generating the thumbnails of frames.
+
+    Args:
+        workers (int): number of threads
+        every (int): frames of a series generated even when busy (every Nth)
+        quality (int): JPEG quality
+    """
+
+    def __init__(self, workers=2, every=100, quality=75):
+        self.workers = workers
+        self.every = every
+        self.quality = quality
+        self._pool = None
+        self._pending = 0
+        # recent jobs per frame file, a frame is not converted twice
+        self._jobs = collections.OrderedDict()
+        self._first_submit = None
+        self.statistics = {
+            "submitted": 0,
+            "generated": 0,
+            "skipped": 0,
+            "failed": 0,
+            "latency": 0.0,
+            "max_latency": 0.0,
+        }
+
+    @property
+    def pool(self):
+        """Thread pool, created on first use"""
+        if self._pool is None:
+            self._pool = gevent.threadpool.ThreadPool(self.workers)
+        return self._pool
+
+    def close(self):
+        """Stop the threads"""
+        if self._pool is not None:
+            self._pool.kill()
+            self._pool = None
+
+    def is_forced(self, index, count):
+        """Tell if a frame of a series is always generated: first, last
+        and every Nth frame"""
+        if index is None:
+            return True
+        return index == 0 or index == count - 1 or index % self.every == 0
+
+    def submit(self, filename, targets, index=None, count=None):
+        """Generate the thumbnails of a frame in the background.
+
+        Args:
+            filename (str): frame file
+            targets (list): (file name, scale factor) of each thumbnail
+            index (int): index of the frame in its series, None to always
+                generate the thumbnails
+            count (int): number of frames of the series
+        Returns:
+            (gevent.Greenlet): value True once the thumbnails are written,
+                False if they failed. None if the frame is skipped.
+        """
+        job = self._jobs.get(filename)
+        if job is not None:
+            return job
+
+        now = time.monotonic()
+        if self._first_submit is None:
+            self._first_submit = now
+        self.statistics["submitted"] += 1
+        if self._pending >= self.workers and not self.is_forced(index, count):
+            self.statistics["skipped"] += 1
+            return None
+
+        self._pending += 1
+        job = gevent.spawn(self._generate, filename, list(targets), now)
+        self._jobs[filename] = job
+        # forget the oldest finished jobs
+        while len(self._jobs) > 4 * self.workers:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.ready():
+                break
+            self._jobs.popitem(last=False)
+        return job
+
+    def _convert(self, filename, targets):
+        make_thumbnails(read_frame(filename), targets, self.quality)
+
+    def _generate(self, filename, targets, submit_time):
+        try:
+            self.pool.apply(self._convert, (filename, targets))
+        except Exception:
+            self.statistics["failed"] += 1
+            logging.getLogger("HWR").exception(
+                "Cannot generate thumbnails of %s" % filename
+            )
+            return False
+        finally:
+            self._pending -= 1
+
+        latency = time.monotonic() - submit_time
+        statistics = self.statistics
+        statistics["generated"] += 1
+        # exponential mean over about 20 frames
+        if statistics["generated"] == 1:
+            statistics["latency"] = latency
+        else:
+            statistics["latency"] += 0.05 * (latency - statistics["latency"])
+        statistics["max_latency"] = max(statistics["max_latency"], latency)
+        return True
+
+    def wait(self, timeout=None):
+        """Wait for the thumbnails being generated"""
+        gevent.joinall(list(self._jobs.values()), timeout)
+
+    def get_statistics(self):
+        """Generation statistics.
+
+        Returns:
+            (dict): numbers of frames submitted, generated, skipped (busy)
+                and failed, frames being generated (queue_depth), mean and
+                maximum time from submission to written thumbnails [s],
+                generated frames per second since the first submission
+        """
+        statistics = dict(self.statistics)
+        statistics["queue_depth"] = self._pending
+        elapsed = time.monotonic() - self._first_submit if self._first_submit else 0.0
+        statistics["frames_per_second"] = (
+            statistics["generated"] / elapsed if elapsed > 0 else 0.0
+        )
+        return statistics
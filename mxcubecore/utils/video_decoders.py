@@ -0,0 +1,295 @@
+"""
+Conversion of raw camera frames to 8 bit RGB.
+
+Each decoder converts frames of one size and encoding into an output buffer
+allocated once, the returned array is overwritten by the next frame. OpenCV
+is used when it is installed, the numpy implementations give the same
+results (within one grey level) otherwise.
+
+Encodings:
+    y8: 8 bit grey
+    y16: 16 bit grey, scaled to 8 bit with a lookup table, either fixed
+        (significant bits) or following the frame contrast
+    yuv422p: packed YUV 4:2:2, UYVY byte order (Lima YUV422), ITU-R BT.601
+    bayer_rg16: 16 bit (12 significant bits) Bayer mosaic, RGGB pattern,
+        bilinear demosaicing
+"""
+
+import numpy
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+class FrameDecoder:
+    """Base class of the decoders: converts raw frames of width x height
+    pixels to a height x width x 3 uint8 RGB array, reused for all frames.
+
+    Args:
+        width (int): frame width [pixels]
+        height (int): frame height [pixels]
+        use_cv2 (bool): use OpenCV, if installed (default)
+    """
+
+    #: input pixel type
+    dtype = numpy.uint8
+    #: input values per pixel
+    channels = 1
+
+    def __init__(self, width, height, use_cv2=True):
+        self.width = int(width)
+        self.height = int(height)
+        self.use_cv2 = use_cv2 and cv2 is not None
+        self.rgb = numpy.empty((self.height, self.width, 3), numpy.uint8)
+
+    @property
+    def shape(self):
+        """(width, height) of the decoded frames"""
+        return self.width, self.height
+
+    def frame(self, raw_buffer):
+        """Raw frame as a (height, width[, channels]) array, without copy"""
+        shape = (self.height, self.width)
+        if self.channels > 1:
+            shape += (self.channels,)
+        return numpy.frombuffer(raw_buffer, dtype=self.dtype).reshape(shape)
+
+    def decode(self, raw_buffer):
+        """Convert a raw frame.
+
+        Args:
+            raw_buffer (bytes-like): raw frame
+        Returns:
+            (numpy.ndarray): RGB frame, overwritten by the next call
+        """
+        raise NotImplementedError
+
+    def _grey_to_rgb(self, grey):
+        if self.use_cv2:
+            cv2.cvtColor(grey, cv2.COLOR_GRAY2RGB, dst=self.rgb)
+        else:
+            # one channel at a time is faster than broadcasting
+            for channel in range(3):
+                self.rgb[..., channel] = grey
+        return self.rgb
+
+
+class Y8Decoder(FrameDecoder):
+    """8 bit grey frames"""
+
+    def decode(self, raw_buffer):
+        return self._grey_to_rgb(self.frame(raw_buffer))
+
+
+class Y16Decoder(FrameDecoder):
+    """16 bit grey frames, scaled to 8 bit with a lookup table.
+
+    Args:
+        bits (int): significant bits, for the fixed scaling
+        auto_contrast (bool): scale the [low, high] percentiles of each frame
+            to the full 8 bit range
+        low (float): low percentile [%]
+        high (float): high percentile [%]
+        sampling (int): the percentiles are computed on one pixel in
+            sampling x sampling
+    """
+
+    dtype = numpy.uint16
+
+    def __init__(
+        self,
+        width,
+        height,
+        use_cv2=True,
+        bits=16,
+        auto_contrast=False,
+        low=0.5,
+        high=99.5,
+        sampling=4,
+    ):
+        super().__init__(width, height, use_cv2)
+        self.bits = bits
+        self.auto_contrast = auto_contrast
+        self.low = low
+        self.high = high
+        self.sampling = sampling
+        self.grey = numpy.empty((self.height, self.width), numpy.uint8)
+        self._lut = None
+        self._lut_range = None
+
+    def lookup_table(self, low, high):
+        """Lookup table mapping [low, high] to [0, 255], cached while the
+        range is unchanged.
+
+        Args:
+            low (int): value mapped to 0
+            high (int): value mapped to 255
+        Returns:
+            (numpy.ndarray): 65536 uint8 values
+        """
+        if self._lut_range != (low, high):
+            values = numpy.arange(65536, dtype=numpy.float32)
+            values -= low
+            values *= 255.0 / max(high - low, 1)
+            numpy.clip(values, 0, 255, out=values)
+            self._lut = numpy.rint(values).astype(numpy.uint8)
+            self._lut_range = (low, high)
+        return self._lut
+
+    def contrast_range(self, frame):
+        """[low, high] percentiles of a frame"""
+        sample = frame[:: self.sampling, :: self.sampling]
+        low, high = numpy.percentile(sample, (self.low, self.high))
+        return int(low), int(high)
+
+    def decode(self, raw_buffer):
+        frame = self.frame(raw_buffer)
+        if self.auto_contrast:
+            lut = self.lookup_table(*self.contrast_range(frame))
+        else:
+            lut = self.lookup_table(0, (1 << self.bits) - 1)
+        numpy.take(lut, frame, out=self.grey)
+        return self._grey_to_rgb(self.grey)
+
+
+class YUV422Decoder(FrameDecoder):
+    """Packed YUV 4:2:2 frames (U0 Y0 V0 Y1), ITU-R BT.601 video range, as
+    OpenCV COLOR_YUV2RGB_UYVY. The width must be even."""
+
+    channels = 2
+
+    # R, G, B = LUMA * (Y - 16) + CHROMA . (U - 128, V - 128)
+    LUMA = 1.164
+    CHROMA = ((0.0, 1.596), (-0.391, -0.813), (2.018, 0.0))
+
+    def __init__(self, width, height, use_cv2=True):
+        super().__init__(width, height, use_cv2)
+        if self.width % 2:
+            raise ValueError("YUV 4:2:2 frame width must be even")
+        if not self.use_cv2:
+            # the even and odd pixels, sharing their chroma, are computed
+            # separately on contiguous half width planes
+            half = (self.height, self.width // 2)
+            self._luma = numpy.empty((2,) + half, numpy.float32)
+            self._chroma = numpy.empty(half, numpy.float32)
+            self._term = numpy.empty(half, numpy.float32)
+            self._sum = numpy.empty(half, numpy.float32)
+
+    def decode(self, raw_buffer):
+        frame = self.frame(raw_buffer)
+        if self.use_cv2:
+            cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_UYVY, dst=self.rgb)
+            return self.rgb
+
+        # macro pixels: U, Y0, V, Y1
+        quads = frame.reshape(self.height, self.width // 2, 4)
+        for pixel in range(2):
+            luma = self._luma[pixel]
+            numpy.multiply(quads[..., 1 + 2 * pixel], self.LUMA, out=luma)
+            # + 0.5: rounded when stored
+            luma += 0.5 - 16 * self.LUMA
+        # output pixel pairs
+        rgb = self.rgb.reshape(self.height, self.width // 2, 2, 3)
+
+        chroma, term = self._chroma, self._term
+        for channel, (u_coefficient, v_coefficient) in enumerate(self.CHROMA):
+            chroma.fill(-128 * (u_coefficient + v_coefficient))
+            for index, coefficient in ((0, u_coefficient), (2, v_coefficient)):
+                if coefficient:
+                    numpy.multiply(quads[..., index], coefficient, out=term)
+                    chroma += term
+            for pixel in range(2):
+                numpy.add(self._luma[pixel], chroma, out=self._sum)
+                numpy.clip(self._sum, 0, 255, out=self._sum)
+                rgb[:, :, pixel, channel] = self._sum
+        return self.rgb
+
+
+class BayerRG16Decoder(FrameDecoder):
+    """16 bit Bayer frames, RGGB pattern (red pixel at the top left), with
+    bilinear demosaicing, as OpenCV COLOR_BayerRG2BGR (OpenCV names Bayer
+    patterns after their second row and column). The width and height must
+    be even.
+
+    Args:
+        bits (int): significant bits, scaled to 8 bit by a shift
+    """
+
+    dtype = numpy.uint16
+
+    def __init__(self, width, height, use_cv2=True, bits=12):
+        super().__init__(width, height, use_cv2)
+        if self.width % 2 or self.height % 2:
+            raise ValueError("Bayer frame width and height must be even")
+        self.bits = bits
+        if not self.use_cv2:
+            # frame with a one pixel mirrored border
+            self._padded = numpy.empty((self.height + 2, self.width + 2), numpy.uint32)
+            self._sum = numpy.empty((self.height // 2, self.width // 2), numpy.uint32)
+
+    def decode(self, raw_buffer):
+        frame = self.frame(raw_buffer)
+        if self.use_cv2:
+            rgb16 = cv2.cvtColor(frame, cv2.COLOR_BayerRG2BGR)
+            numpy.right_shift(rgb16, self.bits - 8, out=rgb16)
+            numpy.minimum(rgb16, 255, out=rgb16)
+            self.rgb[...] = rgb16
+            return self.rgb
+
+        padded = self._padded
+        padded[1:-1, 1:-1] = frame
+        # mirror without repeating the edge, which keeps the pattern
+        padded[0] = padded[2]
+        padded[-1] = padded[-3]
+        padded[:, 0] = padded[:, 2]
+        padded[:, -1] = padded[:, -3]
+
+        red, green, blue = (self.rgb[..., channel] for channel in range(3))
+        # 2 x 2 cells: red (0, 0), green (0, 1) and (1, 0), blue (1, 1)
+        self._average(red, 0, 0, [(0, 0)])
+        self._average(red, 0, 1, [(0, 0), (0, 2)])
+        self._average(red, 1, 0, [(0, 0), (2, 0)])
+        self._average(red, 1, 1, [(0, 0), (0, 2), (2, 0), (2, 2)])
+
+        self._average(green, 0, 0, [(-1, 0), (1, 0), (0, -1), (0, 1)])
+        self._average(green, 0, 1, [(0, 1)])
+        self._average(green, 1, 0, [(1, 0)])
+        self._average(green, 1, 1, [(0, 1), (2, 1), (1, 0), (1, 2)])
+
+        self._average(blue, 0, 0, [(-1, -1), (-1, 1), (1, -1), (1, 1)])
+        self._average(blue, 0, 1, [(-1, 1), (1, 1)])
+        self._average(blue, 1, 0, [(1, -1), (1, 1)])
+        self._average(blue, 1, 1, [(1, 1)])
+        return self.rgb
+
+    def _sites(self, row, col):
+        """Pixels at (row + 2i, col + 2j) of the frame, for row and col in
+        [-1, 2] (the mirrored border included)"""
+        return self._padded[row + 1 :: 2, col + 1 :: 2][
+            : self.height // 2, : self.width // 2
+        ]
+
+    def _average(self, channel, row, col, neighbours):
+        """Set the pixels at (row + 2i, col + 2j) of an output channel to the
+        mean of their neighbours of that colour, scaled to 8 bit.
+
+        Args:
+            channel (numpy.ndarray): output channel
+            row (int): row in the 2 x 2 cells
+            col (int): column in the 2 x 2 cells
+            neighbours (list): 1, 2 or 4 (row, col) of the neighbours, in the
+                cell coordinates
+        """
+        total = self._sum
+        numpy.copyto(total, self._sites(*neighbours[0]))
+        for neighbour in neighbours[1:]:
+            numpy.add(total, self._sites(*neighbour), out=total)
+        shift = len(neighbours).bit_length() - 1 + self.bits - 8
+        numpy.right_shift(total, shift, out=total)
+        numpy.minimum(total, 255, out=total)
+        channel[row::2, col::2] = total
@@ -0,0 +1,223 @@
+"""
+Video frames from Lima devices, shared between consumers.
+
+Lima video images (the ``video_last_image`` attribute) are a header
+followed by the raw pixels. decode_lima_image splits them without copying
+the pixels; FrameRing keeps the last frames in a fixed set of reusable
+buffers, so that several consumers (display, streaming, snapshots,
+centring) can read the same frame without copying it, and counts the
+frame rate and the frames dropped between two reads.
+
+Frames are read only views of the ring buffers: a frame is overwritten
+``size`` frames after it was published, consumers keeping a frame longer
+must copy it (or check it with FrameRing.is_current).
+"""
+
+import collections
+import struct
+import time
+
+import gevent.event
+import numpy
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+#: Lima video image header: magic, header version, image mode, frame number,
+#: width, height, endianness, header size, padding
+LIMA_HEADER_FORMAT = "IHHqiiHHHH"
+LIMA_MAGIC = 0x5644454F
+
+#: Lima video image modes
+LIMA_IMAGE_MODES = (
+    "Y8",
+    "Y16",
+    "Y32",
+    "Y64",
+    "RGB555",
+    "RGB565",
+    "RGB24",
+    "RGB32",
+    "BGR24",
+    "BGR32",
+    "BAYER_RG8",
+    "BAYER_RG16",
+    "BAYER_BG8",
+    "BAYER_BG16",
+    "I420",
+    "YUV411",
+    "YUV422",
+    "YUV444",
+    "YUV411PACKED",
+    "YUV422PACKED",
+    "YUV444PACKED",
+)
+
+LimaHeader = collections.namedtuple(
+    "LimaHeader", ("frame_number", "width", "height", "image_mode")
+)
+
+#: Frame in a FrameRing. data is a read only uint8 array.
+Frame = collections.namedtuple(
+    "Frame",
+    ("sequence", "frame_number", "width", "height", "image_mode", "timestamp", "data"),
+)
+
+_HEADER_STRUCTS = {
+    endian: struct.Struct(endian + LIMA_HEADER_FORMAT) for endian in "<>"
+}
+
+
+def decode_lima_image(data, endian=">"):
+    """Split a Lima video image into its header and its pixels
+
+    Args:
+        data (bytes): video_last_image value (the second item of the tuple)
+        endian (str): header byte order, ">" (big endian) or "<"
+
+    Returns:
+        (tuple): LimaHeader and memoryview of the pixel data (not a copy)
+
+    Raises:
+        ValueError: not a Lima video image
+    """
+    header_struct = _HEADER_STRUCTS[endian]
+    if len(data) < header_struct.size:
+        raise ValueError("Lima video image too short (%d bytes)" % len(data))
+    (
+        magic,
+        _,
+        image_mode,
+        frame_number,
+        width,
+        height,
+        _,
+        header_size,
+        _,
+        _,
+    ) = header_struct.unpack_from(data)
+    if magic != LIMA_MAGIC:
+        raise ValueError("Not a Lima video image (magic 0x%x)" % magic)
+
+    header = LimaHeader(frame_number, width, height, image_mode)
+    return header, memoryview(data)[header_size or header_struct.size :]
+
+
+class FrameRing:
+    """Last frames of a video source, in reusable buffers"""
+
+    def __init__(self, size=4):
+        """
+        Args:
+            size (int): number of frames kept
+        """
+        self.size = size
+        self._buffers = [None] * size
+        self._frames = [None] * size
+        self._sequence = 0
+        self._new_frame = gevent.event.Event()
+
+        self.received = 0
+        self.dropped = 0
+        self._last_frame_number = None
+        self._last_time = None
+        self._mean_interval = None
+
+    def publish(self, data, width, height, frame_number=None, image_mode=None):
+        """Copy a frame into the next buffer of the ring
+
+        Args:
+            data (bytes-like): pixel data
+            width (int): frame width [pixels]
+            height (int): frame height [pixels]
+            frame_number (int): source frame number, to count dropped frames
+            image_mode (int): source image mode
+
+        Returns:
+            (Frame): the published frame
+        """
+        pixels = numpy.frombuffer(data, dtype=numpy.uint8)
+        slot = self._sequence % self.size
+        buffer = self._buffers[slot]
+        if buffer is None or buffer.size < pixels.size:
+            buffer = self._buffers[slot] = numpy.empty(pixels.size, numpy.uint8)
+        view = buffer[: pixels.size]
+        numpy.copyto(view, pixels)
+        view = view.view()
+        view.flags.writeable = False
+
+        now = time.monotonic()
+        self._count(frame_number, now)
+
+        frame = Frame(
+            self._sequence, frame_number, width, height, image_mode, now, view
+        )
+        self._frames[slot] = frame
+        self._sequence += 1
+
+        new_frame, self._new_frame = self._new_frame, gevent.event.Event()
+        new_frame.set()
+        return frame
+
+    def _count(self, frame_number, now):
+        self.received += 1
+        if frame_number is not None:
+            last = self._last_frame_number
+            if last is not None and frame_number > last + 1:
+                self.dropped += frame_number - last - 1
+            self._last_frame_number = frame_number
+
+        if self._last_time is not None:
+            interval = now - self._last_time
+            if self._mean_interval is None:
+                self._mean_interval = interval
+            else:
+                self._mean_interval += 0.1 * (interval - self._mean_interval)
+        self._last_time = now
+
+    @property
+    def last_frame_number(self):
+        """Source frame number of the last frame published"""
+        return self._last_frame_number
+
+    def latest(self):
+        """
+        Returns:
+            (Frame): the last frame, None if none was published
+        """
+        if self._sequence == 0:
+            return None
+        return self._frames[(self._sequence - 1) % self.size]
+
+    def is_current(self, frame):
+        """
+        Returns:
+            (bool): True if the frame data was not overwritten yet
+        """
+        return self._sequence - frame.sequence <= self.size
+
+    def wait(self, after=None, timeout=None):
+        """Wait for a frame published after another one
+
+        Args:
+            after (Frame): frame already seen, None to wait for the next one
+            timeout (float): timeout [s], None to wait forever
+
+        Returns:
+            (Frame): the last frame, None on timeout
+        """
+        latest = self.latest()
+        if after is not None and latest is not None:
+            if latest.sequence > after.sequence:
+                return latest
+        if not self._new_frame.wait(timeout):
+            return None
+        return self.latest()
+
+    def get_statistics(self):
+        """
+        Returns:
+            (dict): frames received and dropped by the source, frame rate
+        """
+        fps = 1.0 / self._mean_interval if self._mean_interval else 0.0
+        return {"received": self.received, "dropped": self.dropped, "fps": fps}
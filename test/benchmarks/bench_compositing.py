@@ -0,0 +1,70 @@
+"""Overlay of the web client drawing on a 1280 x 1024 snapshot: former
+pixel by pixel SampleView.combine_images and the numpy compositing, plus
+a composition of several layers into a reused buffer.
+
+Usage: python -m test.benchmarks.bench_compositing [width] [height]
+"""
+
+import sys
+import time
+
+import numpy
+from PIL import Image
+
+from mxcubecore.HardwareObjects.SampleView import combine_images
+from mxcubecore.utils.compositing import (
+    Layer,
+    composite,
+    threshold_mask,
+)
+from test.pytest.test_compositing import legacy_combine_images
+
+REPEAT = 20
+
+
+def timed(function, repeat=REPEAT):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1280
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    rng = numpy.random.default_rng(0)
+    base = rng.integers(0, 256, (height, width, 3), numpy.uint8)
+    # overlay: mostly background, with a few drawn shapes
+    overlay = numpy.zeros((height, width, 3), numpy.uint8)
+    overlay[100:300, 100:400] = (0, 255, 0)
+    overlay[500:505, :] = (255, 255, 255)
+    base_image, overlay_image = Image.fromarray(base), Image.fromarray(overlay)
+
+    print(f"{width} x {height} snapshot (ms)")
+    legacy = timed(lambda: legacy_combine_images(base_image, overlay_image), 1)
+    print(f"  combine_images, pixel loop: {legacy:10.1f}")
+    print(
+        "  combine_images, numpy:      %10.1f"
+        % timed(lambda: combine_images(base_image, overlay_image))
+    )
+
+    heatmap = numpy.zeros((height, width, 3), numpy.uint8)
+    heatmap[200:600, 200:800, 0] = 255
+    cells = numpy.zeros((height, width), bool)
+    cells[200:600:20, 200:800] = True
+    beam_mark = numpy.zeros((40, 40, 4), numpy.uint8)
+    beam_mark[..., 3] = 128
+    layers = [
+        Layer(heatmap, alpha=0.4, mask=cells),
+        Layer(overlay, mask=threshold_mask(overlay)),
+        Layer(beam_mark, offset=(width // 2 - 20, height // 2 - 20)),
+    ]
+    out = numpy.empty_like(base)
+    print(
+        "  3 layers, reused buffer:    %10.1f"
+        % timed(lambda: composite(base, layers, out=out))
+    )
+
+
+if __name__ == "__main__":
+    main()
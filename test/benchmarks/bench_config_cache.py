@@ -0,0 +1,77 @@
+"""Parsing time of the configuration files, with and without the parsed
+configuration cache.
+
+Usage: python -m test.benchmarks.bench_config_cache [configuration dirs]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from mxcubecore.HardwareObjectFileParser import record_events
+from mxcubecore.HardwareRepository import yaml
+from mxcubecore.utils import config_cache
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+CONFIGURATION_DIRS = [
+    os.path.join(ROOT_DIR, "mxcubecore/configuration", name)
+    for name in ("mockup", "soleil_px1")
+]
+
+
+def configuration_files(paths):
+    for path in paths:
+        for dirpath, _, filenames in os.walk(path):
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1] in (".xml", ".yml", ".yaml"):
+                    yield os.path.join(dirpath, filename)
+
+
+def parse(file_path):
+    with open(file_path) as fp0:
+        text = fp0.read()
+    if file_path.endswith(".xml"):
+        return record_events(text)
+    return yaml.load(text)
+
+
+def main():
+    paths = sys.argv[1:] or CONFIGURATION_DIRS
+    files = []
+    for file_path in configuration_files(paths):
+        try:
+            parse(file_path)
+        except Exception:
+            continue
+        files.append(file_path)
+
+    start = time.perf_counter()
+    for file_path in files:
+        parse(file_path)
+    parse_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_file = os.path.join(tmp_dir, "config_cache.pickle")
+        cache = config_cache.ConfigCache(cache_file)
+        config_cache.warm(cache, paths)
+        cache.save()
+
+        start = time.perf_counter()
+        cache = config_cache.ConfigCache(cache_file)
+        load_time = time.perf_counter() - start
+        for file_path in files:
+            cache.get(file_path, parse)
+        cached_time = time.perf_counter() - start
+        size = os.path.getsize(cache_file)
+
+    print(f"{len(files)} configuration files in {', '.join(paths)}")
+    print(f"  parsing: {parse_time * 1000:8.1f} ms")
+    print(
+        f"   cached: {cached_time * 1000:8.1f} ms"
+        f" (cache file {size / 1024:.0f} kB loaded in {load_time * 1000:.1f} ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Energy scan around an absorption edge with the mockup monochromator, MCA,
+diode and shutter: sequential step scan with the monochromator state polled
+every 0.1 s (as PX1EnergyScan did), sequential, overlapped and on the fly
+scans with EnergyScanEngine. Reports the wall time per point.
+
+The durations are 1/10 of typical ones: 0.1 s MCA acquisition, 10 ms read
+out, 1 eV monochromator steps at 0.05 keV/s with 20 ms settling.
+
+Usage: python -m test.benchmarks.bench_energy_scan [points]
+"""
+
+import sys
+
+import numpy
+
+from mxcubecore.utils.energy_scan import (
+    ON_THE_FLY,
+    OVERLAPPED,
+    SEQUENTIAL,
+    EnergyScanEngine,
+)
+from test.pytest.energy_scan_mockup import (
+    EDGE,
+    EnergyScanHardwareMockup,
+)
+
+
+def run(label, energies, mode, poll_interval=0.01, **kwargs):
+    hardware = EnergyScanHardwareMockup(energies[0], mca_time=0.1)
+    engine = EnergyScanEngine(hardware, poll_interval)
+    points = engine.scan(energies, mode, **kwargs)
+    duration = engine.statistics["duration"]
+    print(
+        f"  {label:28}{len(points):8d}{duration:10.2f}"
+        f"{1000 * duration / len(points):10.1f}"
+        f"{engine.statistics['shutter_operations']:10d}"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    energies = numpy.round(EDGE - 0.02 + 0.001 * numpy.arange(count), 4)
+
+    print(f"{count} points, 1 eV steps")
+    print(f"  {'':28}{'points':>8}{'s':>10}{'ms/point':>10}{'shutter':>10}")
+    run("sequential, 0.1 s polling:", energies, SEQUENTIAL, 0.1)
+    run("sequential:", energies, SEQUENTIAL)
+    run("overlapped:", energies, OVERLAPPED)
+    # same range and counting time as the step scan
+    run("on the fly:", energies, ON_THE_FLY, speed=0.001 / 0.11)
+
+
+if __name__ == "__main__":
+    main()
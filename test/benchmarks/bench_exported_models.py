@@ -0,0 +1,42 @@
+"""Time to create the exported method models of many hardware objects, with
+and without the per class cache of exported methods and models.
+
+Usage: python -m test.benchmarks.bench_exported_models [number of objects]
+"""
+
+import sys
+import time
+
+from mxcubecore.BaseHardwareObjects import (
+    HardwareObjectMixin,
+    clear_exports_cache,
+)
+from mxcubecore.HardwareObjects.mockup.MotorMockup import MotorMockup
+
+EXPORTS = ["get_value", "set_value", "get_limits", "set_limits", "abort"]
+
+
+def export_models(count, cached):
+    start = time.perf_counter()
+    for index in range(count):
+        if not cached:
+            clear_exports_cache()
+        motor = MotorMockup(f"motor{index}")
+        motor._exports_config_list = list(EXPORTS)
+        HardwareObjectMixin.init(motor)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    uncached_time = export_models(count, cached=False)
+    clear_exports_cache()
+    cached_time = export_models(count, cached=True)
+
+    print(f"{count} MotorMockup objects exporting {len(EXPORTS)} methods")
+    print(f"  per object models: {uncached_time * 1000:8.1f} ms")
+    print(f"   per class models: {cached_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Exporter stream framing throughput and request latency, with and without
+pipelining, against the local exporter stand-in.
+
+Usage: python -m test.benchmarks.bench_exporter_client
+"""
+
+from gevent import monkey
+
+monkey.patch_all(thread=False)
+
+import time  # noqa: E402
+
+import gevent  # noqa: E402
+
+from mxcubecore.Command.exporter.ExporterClient import ExporterClient  # noqa: E402
+from mxcubecore.Command.exporter.StandardClient import (  # noqa: E402
+    MAX_SIZE_STREAM_MSG,
+    PROTOCOL,
+    StreamFramer,
+)
+from test.pytest.exporter_server_mockup import ExporterServerMockup  # noqa: E402
+
+STX = 2
+ETX = 3
+
+
+def bytewise_framer(chunks):
+    """Former recv_thread loop, one byte at a time"""
+    messages = []
+    buffer = b""
+    received_stx = False
+    for ret in chunks:
+        for b in ret:
+            if b == STX:
+                buffer = b""
+                received_stx = True
+            elif b == ETX:
+                if received_stx:
+                    messages.append(buffer.decode())
+                    received_stx = False
+                    buffer = b""
+            elif received_stx:
+                buffer += bytes([b])
+        if len(buffer) > MAX_SIZE_STREAM_MSG:
+            received_stx = False
+            buffer = b""
+    return messages
+
+
+def stream_framer(chunks):
+    framer = StreamFramer()
+    messages = []
+    for ret in chunks:
+        messages += framer.feed(ret)
+    return messages
+
+
+def bench_framing(size):
+    payload = ("1.2345\x1f" * (size // 7)).encode()
+    data = b"\x02RET:" + payload + b"\x03"
+    chunks = [data[i : i + 4096] for i in range(0, len(data), 4096)]
+    for name, framer in (("byte loop", bytewise_framer), ("find", stream_framer)):
+        start = time.perf_counter()
+        framer(chunks)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {name:>10}: {elapsed * 1000:9.2f} ms"
+            f" ({len(data) / elapsed / 1e6:8.2f} MB/s)"
+        )
+
+
+def bench_requests(pipelining, n_requests=200, concurrency=8):
+    server = ExporterServerMockup(
+        {f"prop{i}": str(i) for i in range(10)}, network_delay=0.002
+    ).start()
+    client = ExporterClient("127.0.0.1", server.port, PROTOCOL.STREAM, 3, 1, pipelining)
+    latencies = []
+
+    def worker(n):
+        for i in range(n):
+            start = time.perf_counter()
+            client.read_property(f"prop{i % 10}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    gevent.joinall(
+        [gevent.spawn(worker, n_requests // concurrency) for _ in range(concurrency)]
+    )
+    elapsed = time.perf_counter() - start
+    client.disconnect()
+    server.stop()
+
+    latencies.sort()
+    label = "pipelined" if pipelining else "serial"
+    print(
+        f"  {label:>10}: {len(latencies) / elapsed:8.1f} req/s,"
+        f" median latency {latencies[len(latencies) // 2] * 1000:6.2f} ms"
+    )
+
+
+def main():
+    for size in (50000, MAX_SIZE_STREAM_MSG - 100):
+        print(f"framing a {size} bytes reply")
+        bench_framing(size)
+    print("read_property from 8 greenlets, 2 ms network delay")
+    for pipelining in (False, True):
+        bench_requests(pipelining)
+
+
+if __name__ == "__main__":
+    main()
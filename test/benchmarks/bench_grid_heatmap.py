@@ -0,0 +1,121 @@
+"""Repaint of a mesh scan heatmap while the results arrive, one new cell
+score per repaint: the colour of every cell computed on every repaint, with
+the maximum score computed for every cell, as GraphicsItemGrid.paint did,
+and the cached heatmap rendering only the changed cells. With Qt installed,
+the repaints are also drawn offscreen: every cell outline and number drawn
+on every repaint, and the cached heatmap and labels images.
+
+Usage: python -m test.benchmarks.bench_grid_heatmap [cols] [rows]
+"""
+
+import colorsys
+import os
+import sys
+import time
+
+import numpy
+
+from mxcubecore.utils.grid_heatmap import GridHeatmap
+from test.pytest.test_grid_heatmap import grid_cells
+
+CELL = 20
+REPAINTS = 20
+
+
+def legacy_colors(score):
+    """Colour of every cell, as computed by the former paint method"""
+    colors = []
+    for index in range(len(score)):
+        cell_score = score[index]
+        if score.max() > 0:
+            cell_score = float(cell_score) / score.max()
+            colors.append(colorsys.hsv_to_rgb(60 * cell_score / 360, 1, cell_score))
+    return colors
+
+
+def repaints(render, score, first):
+    start = time.perf_counter()
+    for index in range(first, first + REPAINTS):
+        score[index] = index % 7
+        render(score)
+    return (time.perf_counter() - start) / REPAINTS * 1000
+
+
+def qt_repaints(cols, rows, heatmap, score, first):
+    from mxcubecore.utils import qt_import
+
+    qt_import.QApplication.instance() or qt_import.QApplication([])
+    target = qt_import.QImage(
+        cols * CELL + 200, rows * CELL + 200, qt_import.QImage.Format_ARGB32
+    )
+    centres = list(zip(*grid_cells(cols, rows, CELL)))
+
+    def legacy(score):
+        painter = qt_import.QPainter(target)
+        brush = qt_import.QBrush(qt_import.Qt.SolidPattern)
+        color = qt_import.QColor()
+        for index, (pos_x, pos_y) in enumerate(centres):
+            cell_score = float(score[index]) / score.max()
+            color.setHsv(int(60 * cell_score), 255, int(255 * cell_score), 120)
+            brush.setColor(color)
+            painter.setBrush(brush)
+            rect = qt_import.QRect(
+                int(pos_x - CELL / 2), int(pos_y - CELL / 2), CELL, CELL
+            )
+            painter.drawText(rect, qt_import.Qt.AlignCenter, str(index + 1))
+            painter.drawEllipse(rect)
+        painter.end()
+
+    labels = qt_import.QImage(
+        heatmap.image.shape[1],
+        heatmap.image.shape[0],
+        qt_import.QImage.Format_ARGB32_Premultiplied,
+    )
+    labels.fill(qt_import.Qt.transparent)
+
+    def cached(score):
+        heatmap.update(score)
+        image = qt_import.QImage(
+            heatmap.image.data,
+            heatmap.image.shape[1],
+            heatmap.image.shape[0],
+            heatmap.image.strides[0],
+            qt_import.QImage.Format_ARGB32,
+        )
+        painter = qt_import.QPainter(target)
+        painter.drawImage(heatmap.origin[0], heatmap.origin[1], image)
+        painter.drawImage(heatmap.origin[0], heatmap.origin[1], labels)
+        painter.end()
+
+    print(f"  offscreen, cell by cell:   {repaints(legacy, score, first):10.2f}")
+    print(f"  offscreen, cached images:  {repaints(cached, score, first):10.2f}")
+
+
+def main():
+    cols = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    num_cells = cols * rows
+    rng = numpy.random.default_rng(0)
+    score = numpy.zeros(num_cells)
+    first = num_cells // 2
+    score[:first] = rng.integers(0, 50, first)
+
+    heatmap = GridHeatmap(alpha=120)
+    heatmap.set_cells(*grid_cells(cols, rows, CELL), (CELL, CELL), (CELL, CELL))
+    heatmap.update(score)
+
+    print(f"{cols} x {rows} mesh, one new score per repaint (ms per repaint)")
+    print(f"  colours, cell by cell:     {repaints(legacy_colors, score, first):10.2f}")
+    print(
+        f"  colours, heatmap update:   {repaints(heatmap.update, score, first):10.2f}"
+    )
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        qt_repaints(cols, rows, heatmap, score, first + REPAINTS)
+    except (ImportError, AttributeError):
+        print("  Qt is not available, offscreen repaints skipped")
+
+
+if __name__ == "__main__":
+    main()
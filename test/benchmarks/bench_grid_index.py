@@ -0,0 +1,89 @@
+"""Alignment of the online processing results of a mesh scan, batch after
+batch: the column and row of every image computed image by image, as
+AbstractOnlineProcessing.align_processing_results did, and looked up in the
+grid index table; the motor positions of every cell computed cell by cell
+(with a deepcopy of the centred position per cell), and all at once.
+
+Usage: python -m test.benchmarks.bench_grid_index [cols] [rows] [batch]
+"""
+
+import copy
+import sys
+import time
+
+import numpy
+
+from mxcubecore.utils.grid_index import (
+    GridIndex,
+    grid_motor_positions,
+)
+from test.pytest.test_grid_index import (
+    MD2,
+    grid_parameters,
+    legacy_col_row,
+    legacy_motor_pos,
+)
+
+CENTRED = {"sampx": 0.1, "sampy": -0.2, "phiy": 1.5, "phi": 30.0, "kappa": 0.0}
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    cols = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    batch = int(sys.argv[3]) if len(sys.argv) > 3 else 400
+    parameters = grid_parameters(cols, rows, MD2)
+    num_images = cols * rows
+    raw = numpy.random.default_rng(0).random(num_images)
+    batches = [
+        (start, min(start + batch, num_images) - 1)
+        for start in range(0, num_images, batch)
+    ]
+
+    def align_legacy():
+        aligned = numpy.zeros((cols, rows))
+        for start, end in batches:
+            for cell_index in range(start, end + 1):
+                col, row = legacy_col_row(cell_index + 1, *parameters, MD2)
+                if col < aligned.shape[0] and row < aligned.shape[1]:
+                    aligned[col][row] = raw[cell_index]
+        return aligned
+
+    def align_table():
+        index = GridIndex(*parameters, MD2)
+        aligned = numpy.zeros((cols, rows))
+        for start, end in batches:
+            cell_indexes = numpy.arange(start, end + 1)
+            img_cols, img_rows = index.cols_rows(cell_indexes + 1)
+            in_grid = (img_cols < aligned.shape[0]) & (img_rows < aligned.shape[1])
+            aligned[img_cols[in_grid], img_rows[in_grid]] = raw[cell_indexes[in_grid]]
+        return aligned
+
+    motor_parameters = (cols, rows, (0.01 * cols, 0.01 * rows), 30.0, 0.1, MD2)
+
+    def motor_pos_legacy():
+        for col in range(cols):
+            for row in range(rows):
+                legacy_motor_pos(copy.deepcopy(CENTRED), col, row, *motor_parameters)
+
+    def motor_pos_table():
+        img_cols, img_rows = numpy.meshgrid(numpy.arange(cols), numpy.arange(rows))
+        grid_motor_positions(
+            CENTRED, img_cols.ravel(), img_rows.ravel(), *motor_parameters
+        )
+
+    assert (align_legacy() == align_table()).all()
+    print(f"{cols} x {rows} grid, batches of {batch} images (ms)")
+    print(f"  align, image by image:        {timed(align_legacy):10.1f}")
+    print(f"  align, index table:           {timed(align_table):10.1f}")
+    print(f"  motor positions, cell by cell:{timed(motor_pos_legacy):10.1f}")
+    print(f"  motor positions, table:       {timed(motor_pos_table):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Arrival of the images of a sweep written to a temporary directory: each
+image waited for with os.path.exists in a 0.1 s sleep loop, as
+PX1Collect.wait_image_on_disk did, and followed by the ImageWatcher
+(inotify, and directory listing only). Reports the number of filesystem
+calls and the arrival latencies.
+
+Usage: python -m test.benchmarks.bench_image_watcher [images] [frame period]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import gevent
+
+from mxcubecore.utils.image_watcher import ImageWatcher
+from test.pytest.test_image_watcher import (
+    TEMPLATE,
+    write_frames,
+)
+
+
+class CountedCalls:
+    """Counts the calls of module functions, given as (module, name)"""
+
+    def __init__(self, *functions):
+        self.functions = functions
+        self.count = 0
+        self._originals = []
+
+    def __enter__(self):
+        for module, name in self.functions:
+            function = getattr(module, name)
+            self._originals.append((module, name, function))
+            setattr(module, name, self._counted(function))
+        return self
+
+    def _counted(self, function):
+        def counted(*args, **kwargs):
+            self.count += 1
+            return function(*args, **kwargs)
+
+        return counted
+
+    def __exit__(self, *args):
+        for module, name, function in self._originals:
+            setattr(module, name, function)
+
+
+def legacy(directory, images):
+    latencies = []
+    for number in range(1, images + 1):
+        filename = os.path.join(directory, TEMPLATE % number)
+        while not os.path.exists(filename):
+            gevent.sleep(0.1)
+        latencies.append(time.time() - os.stat(filename).st_mtime)
+    return latencies
+
+
+def watched(directory, images, use_inotify):
+    watcher = ImageWatcher.from_template(
+        directory, TEMPLATE, 1, images, use_inotify=use_inotify
+    )
+    with watcher:
+        watcher.wait_all()
+    return [arrival.latency for arrival in watcher.arrivals.values()]
+
+
+def run(label, follow, images, period, calls):
+    with tempfile.TemporaryDirectory() as directory:
+        writer = gevent.spawn(write_frames, directory, range(1, images + 1), period)
+        with calls:
+            latencies = follow(directory)
+        writer.join()
+    print(
+        f"  {label:28}{calls.count:8d}{1000 * sum(latencies) / images:10.1f}"
+        f"{1000 * max(latencies):10.1f}"
+    )
+
+
+def main():
+    images = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    period = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+
+    print(f"{images} images, one every {period * 1000:.0f} ms")
+    print(f"  {'':28}{'fs calls':>8}{'mean ms':>10}{'max ms':>10}")
+    run(
+        "exists, 0.1 s sleep loop:",
+        lambda directory: legacy(directory, images),
+        images,
+        period,
+        CountedCalls((os.path, "exists")),
+    )
+    run(
+        "watcher, inotify:",
+        lambda directory: watched(directory, images, True),
+        images,
+        period,
+        CountedCalls((os, "listdir"), (os, "stat")),
+    )
+    run(
+        "watcher, listing only:",
+        lambda directory: watched(directory, images, False),
+        images,
+        period,
+        CountedCalls((os, "listdir"), (os, "stat")),
+    )
+
+
+if __name__ == "__main__":
+    main()
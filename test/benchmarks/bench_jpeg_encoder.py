@@ -0,0 +1,93 @@
+"""JPEG encoding of video frames on the calling greenlet (as formerly done
+by get_jpg_image) and in the encoder thread pool: frames per second and
+longest time the gevent hub was blocked, while a ticker greenlet runs.
+
+Usage: python -m test.benchmarks.bench_jpeg_encoder [width] [height]
+"""
+
+import io
+import sys
+import time
+
+import gevent
+import numpy
+from PIL import Image
+
+from mxcubecore.utils.jpeg_encoder import JpegEncoder
+
+FRAMES = 50
+
+
+def legacy_encode(image, width, height):
+    image = Image.frombytes("RGB", (width, height), image)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class Ticker:
+    """Greenlet measuring the longest interval between two 1 ms ticks"""
+
+    def __init__(self):
+        self.max_gap = 0
+        self._greenlet = gevent.spawn(self._run)
+
+    def _run(self):
+        last = time.perf_counter()
+        while True:
+            gevent.sleep(0.001)
+            now = time.perf_counter()
+            self.max_gap = max(self.max_gap, now - last)
+            last = now
+
+    def stop(self):
+        self._greenlet.kill()
+
+
+def run(name, encode, items):
+    gevent.sleep(0.01)
+    ticker = Ticker()
+    gevent.sleep(0.01)
+    start = time.perf_counter()
+    for item in items:
+        encode(item)
+    elapsed = time.perf_counter() - start
+    ticker.stop()
+    print(
+        f"  {name:>22}: {FRAMES / elapsed:7.1f} frames/s, "
+        f"hub blocked up to {ticker.max_gap * 1000:6.1f} ms"
+    )
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1360
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    # smooth gradient with noise, closer to a camera image than noise only
+    rng = numpy.random.default_rng(0)
+    gradient = numpy.linspace(0, 200, width, dtype=numpy.float32)
+    frames = [
+        (gradient[None, :, None] + rng.normal(0, 8, (height, width, 3)) + i)
+        .clip(0, 255)
+        .astype(numpy.uint8)
+        for i in range(4)
+    ]
+    frames = (frames * (FRAMES // len(frames) + 1))[:FRAMES]
+
+    print(f"{width} x {height} RGB frames")
+    run("greenlet (former)", lambda f: legacy_encode(f, width, height), frames)
+
+    encoder = JpegEncoder(workers=2)
+    run("pool, one by one", lambda f: encoder.encode(f, width, height), frames)
+
+    # several clients, each encoding its frames in the pool
+    def parallel(frames):
+        jobs = [gevent.spawn(encoder.encode, frame, width, height) for frame in frames]
+        gevent.joinall(jobs, raise_error=True)
+
+    run("pool, 2 clients", parallel, [frames[i : i + 2] for i in range(0, FRAMES, 2)])
+    print(f"  {encoder.get_statistics()}")
+    encoder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Time to read a Lima video frame, with the former PIL/BMP conversion and
+with the frame ring, for a camera sized synthetic frame.
+
+Usage: python -m test.benchmarks.bench_lima_video [width] [height]
+"""
+
+import io
+import struct
+import sys
+import time
+
+from PIL import Image
+
+from mxcubecore.HardwareObjects.TangoLimaVideo import TangoLimaVideo
+from mxcubecore.utils.video_frames import FrameRing
+from test.pytest.lima_device_mockup import lima_image
+
+FRAMES = 100
+
+
+def legacy_poll_image(lima_tango_device, video_mode, FORMATS):
+    img_data = lima_tango_device.video_last_image
+
+    hfmt = ">IHHqiiHHHH"
+    hsize = struct.calcsize(hfmt)
+    _, _, _, _, width, height, _, _, _, _ = struct.unpack(hfmt, img_data[1][:hsize])
+
+    raw_data = img_data[1][hsize:]
+    _from, _to = FORMATS.get(video_mode, (None, None))
+
+    if _from and _to:
+        img = Image.frombuffer(_from, (height, width), raw_data, "raw", _from, 0, 1)
+
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format=_to)
+        img = img.tobytes()
+    else:
+        img = raw_data
+
+    return img, width, height
+
+
+class StreamingDevice:
+    """Lima device serving one frame, only its frame number changes, so that
+    no time is spent generating the frames"""
+
+    def __init__(self, width, height):
+        self.image = bytearray(lima_image(0, width, height))
+        self.frame_number = 0
+
+    @property
+    def video_last_image(self):
+        self.frame_number += 1
+        # frame number: after the magic, version and image mode
+        struct.pack_into(">q", self.image, 8, self.frame_number)
+        return "VIDEO_IMAGE", self.image
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1360
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    device = StreamingDevice(width, height)
+    video = TangoLimaVideo("camera")
+    video.device = device
+    video._frames = FrameRing()
+    formats = video._FORMATS
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        legacy_poll_image(device, "RGB24", formats)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        video.read_frame()
+    ring_time = time.perf_counter() - start
+
+    print(f"{width} x {height} RGB24 frames (ms per frame)")
+    print(f"  PIL/BMP conversion: {legacy_time / FRAMES * 1000:8.2f}")
+    print(f"          frame ring: {ring_time / FRAMES * 1000:8.2f}")
+    print(f"  {video.get_frame_statistics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Loop detection over a directory of recorded loop snapshots: through a
+PNG snapshot on disk (as sample_centring.find_loop does for lucid) and in
+memory, and a simulated auto-centring rotation with LoopFinder: phi stopped
+at each angle, and images analysed while phi moves.
+
+Usage: python -m test.benchmarks.bench_loop_finder [snapshot directory]
+(default: the snapshots of the repository)
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy
+from PIL import Image
+
+from mxcubecore.HardwareObjects import sample_centring
+from mxcubecore.utils.loop_finder import LoopFinder
+from test.pytest.test_loop_finder import (
+    SNAPSHOTS,
+    CameraMockup,
+    MotorMockup,
+)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+N_POINTS = 3
+PHI_SPEED = 360
+PHI_SETTLING = 0.2
+
+
+def snapshots(directory=None):
+    if directory is None:
+        return [path for path, _ in SNAPSHOTS]
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def through_disk(finder, frame, filename):
+    """Former path: snapshot saved as PNG, then read by the loop finder"""
+    Image.fromarray(frame).convert("L").save(filename)
+    return finder.find(numpy.asarray(Image.open(filename)))
+
+
+def centring_rotation(frame, overlapped):
+    sample_view = type("SampleViewMockup", (), {"camera": CameraMockup(frame)})()
+    phi = sample_centring.CentringMotor(MotorMockup(0.0, PHI_SPEED, PHI_SETTLING))
+    positions = [i * 180 / (N_POINTS - 1) for i in range(N_POINTS)]
+    start = time.perf_counter()
+    if overlapped:
+        sample_centring.find_loops_while_rotating(sample_view, phi, positions, 0)
+    else:
+        for position in positions:
+            phi.set_value(position)
+            phi._move.join()
+            sample_centring.find_loop_result(sample_view, 0)
+    return time.perf_counter() - start
+
+
+def main():
+    sample_centring.USE_LOOP_FINDER = True
+    paths = snapshots(sys.argv[1] if len(sys.argv) > 1 else None)
+    frames = [numpy.asarray(Image.open(path).convert("RGB")) for path in paths]
+    filename = os.path.join(tempfile.gettempdir(), "bench_loop_snapshot.png")
+
+    finder = LoopFinder()
+    start = time.perf_counter()
+    for frame in frames:
+        through_disk(finder, frame, filename)
+    disk_time = (time.perf_counter() - start) / len(frames)
+    os.remove(filename)
+
+    finder = LoopFinder()
+    start = time.perf_counter()
+    results = [finder.find(frame) for frame in frames]
+    memory_time = (time.perf_counter() - start) / len(frames)
+
+    print(f"{len(frames)} snapshots (ms per snapshot)")
+    print(f"  through a PNG file: {disk_time * 1000:8.1f}")
+    print(f"  in memory:          {memory_time * 1000:8.1f}")
+    found = [result for result in results if result.x >= 0]
+    print(
+        f"  loop found in {len(found)}/{len(frames)}, mean score "
+        f"{numpy.mean([result.score for result in found] or [0]):.2f}"
+    )
+
+    print(
+        f"{N_POINTS} angles over 180 deg, phi at {PHI_SPEED} deg/s, "
+        f"{PHI_SETTLING} s settling per move (s)"
+    )
+    print(f"  phi stopped at each angle: {centring_rotation(frames[0], False):6.2f}")
+    print(f"  analysed while phi moves:  {centring_rotation(frames[0], True):6.2f}")
+
+
+if __name__ == "__main__":
+    main()
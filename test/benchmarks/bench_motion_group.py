@@ -0,0 +1,51 @@
+"""Five-axis centring move with mockup motors: one axis after the other (as
+PX1MiniDiff.move_motors did) and all the axes together (MotionGroup).
+
+Usage: python -m test.benchmarks.bench_motion_group
+"""
+
+import time
+
+from mxcubecore.utils.motion_group import MotionGroup
+from test.pytest.test_loop_finder import MotorMockup
+
+#: distance, speed [units/s] and settling time [s] of each axis
+AXES = {
+    "phi": (90, 360, 0.1),
+    "phiy": (0.5, 2, 0.05),
+    "phiz": (0.3, 2, 0.05),
+    "sampx": (0.2, 1, 0.05),
+    "sampy": (0.1, 1, 0.05),
+}
+
+
+def mover(motor, position):
+    motor.set_value(position, timeout=None)
+
+
+def moves():
+    return {
+        name: (MotorMockup(0.0, speed, settling), distance)
+        for name, (distance, speed, settling) in AXES.items()
+    }
+
+
+def main():
+    start = time.perf_counter()
+    for motor, position in moves().values():
+        mover(motor, position)
+    sequential = time.perf_counter() - start
+
+    group = MotionGroup(mover=mover)
+    start = time.perf_counter()
+    group.move(moves())
+    together = time.perf_counter() - start
+
+    print(f"{len(AXES)} axes (s)")
+    print(f"  one after the other: {sequential:6.2f}")
+    print(f"  together:            {together:6.2f}")
+    print(f"  per axis: {group.report()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Child and role lookups in a large tree of hardware object nodes, compared
+with the linear searches they replaced.
+
+Usage: python -m test.benchmarks.bench_object_tree [number of nodes]
+"""
+
+import sys
+import time
+
+from mxcubecore.BaseHardwareObjects import HardwareObjectNode
+
+FANOUT = 10
+REPEAT = 1000
+
+
+def build_tree(count):
+    """Tree of count nodes, each with up to FANOUT children with roles"""
+    root = HardwareObjectNode("root")
+    nodes = [root]
+    for index in range(1, count):
+        parent = nodes[(index - 1) // FANOUT]
+        node = HardwareObjectNode(f"node{index}")
+        parent.add_object(f"node{index}", node, role=f"role{index}")
+        nodes.append(node)
+    return root, nodes
+
+
+def linear_get_object_by_role(node, role):
+    objects = [node]
+    for curr in objects:
+        result = curr._objects_by_role.get(role)
+        if result is None:
+            objects.extend(obj for obj in curr if obj)
+        else:
+            return result
+
+
+def timed(function, args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for arg in args:
+            function(arg)
+    return (time.perf_counter() - start) / (REPEAT * len(args)) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    root, nodes = build_tree(count)
+    roles = [f"role{index}" for index in range(count - 10, count)] + ["missing"]
+    # a node with many children
+    wide = HardwareObjectNode("wide")
+    for index in range(count):
+        wide.add_object(f"child{index}", nodes[index])
+    names = [f"child{index}" for index in range(count - 10, count)]
+    wide_names = wide.objects_names()
+
+    print(f"{count} nodes, {FANOUT} children per node (times in us per call)")
+    print(
+        f"  get_object_by_role: {timed(root.get_object_by_role, roles):8.2f}"
+        f"  (breadth first search: "
+        f"{timed(lambda role: linear_get_object_by_role(root, role), roles):.2f})"
+    )
+    print(
+        f"  has_object:         {timed(wide.has_object, names):8.2f}"
+        f"  (list search: {timed(wide_names.__contains__, names):.2f})"
+    )
+    print(
+        f"  get_objects:        "
+        f"{timed(lambda name: list(wide.get_objects(name)), names):8.2f}"
+        f"  (list search: {timed(wide_names.index, names):.2f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Diffractometer state changes redrawing many shapes: the centring motor
+positions read from the motors (1 ms per hardware read) for every shape, as
+PX1MiniDiff.motor_positions_to_screen did, and from the position snapshot.
+
+Usage: python -m test.benchmarks.bench_position_snapshot [shapes] [changes]
+"""
+
+import sys
+import time
+
+from mxcubecore.dispatcher import dispatcher
+from mxcubecore.utils.position_snapshot import PositionSnapshot
+
+NAMES = ("phi", "sampx", "sampy", "phiy")
+READ_TIME = 0.001
+
+
+class Motor:
+    def __init__(self, value):
+        self.value = value
+
+    def get_value(self):
+        time.sleep(READ_TIME)
+        return self.value
+
+    def move(self, value):
+        self.value = value
+        dispatcher.send("valueChanged", self, value)
+
+
+def redraw_live(motors, shapes):
+    for _ in range(shapes):
+        [motors[name].get_value() for name in NAMES]
+
+
+def redraw_snapshot(snapshot, shapes):
+    for _ in range(shapes):
+        positions = snapshot.get_positions(NAMES)
+        [positions[name] for name in NAMES]
+
+
+def main():
+    shapes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    changes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    motors = {name: Motor(0.0) for name in NAMES}
+    snapshot = PositionSnapshot()
+    for name, motor in motors.items():
+        snapshot.add_motor(name, motor)
+
+    start = time.perf_counter()
+    for change in range(changes):
+        motors["phi"].value = change
+        redraw_live(motors, shapes)
+    live = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for change in range(changes):
+        motors["phi"].move(change)
+        redraw_snapshot(snapshot, shapes)
+    cached = time.perf_counter() - start
+
+    statistics = snapshot.get_statistics()
+    print(f"{changes} state changes, {shapes} shapes (ms)")
+    print(f"  motors read for each shape: {live * 1000:8.1f}")
+    print(f"  position snapshot:          {cached * 1000:8.1f}")
+    print(
+        f"  hardware reads: {statistics['live_reads']}, "
+        f"saved: {statistics['cached_reads']}, "
+        f"generation: {statistics['generation']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Time to build a large multi-sample queue on the mockup beamline, giving each
+data collection the next run number and checking it for path collisions, with
+the queue model indexes and with the walks of the whole model they replaced.
+
+Usage: python -m test.benchmarks.bench_queue_model [samples] [collections]
+"""
+
+import os
+import sys
+import time
+
+from mxcubecore import HardwareRepository as HWR
+from mxcubecore.HardwareObjects.QueueModel import QueueModel
+from mxcubecore.model import queue_model_objects
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+CONFIGURATION_PATH = ":".join(
+    os.path.join(ROOT_DIR, "mxcubecore/configuration", name)
+    for name in ("mockup", "mockup/test")
+)
+
+
+def legacy_next_run_number(queue_model, path_template):
+    run_numbers = [0]
+    for _, other in queue_model.get_path_templates():
+        if other is not path_template and other == path_template:
+            run_numbers.append(other.run_number)
+    return max(run_numbers) + 1
+
+
+def legacy_collisions(queue_model, path_template):
+    return any(
+        path_template.intersection(other)
+        for _, other in queue_model.get_path_templates()
+        if other is not path_template
+    )
+
+
+def build_queue(samples, collections, legacy=False):
+    session = HWR.beamline.session
+    queue_model = QueueModel("queue_model")
+    root = queue_model.get_model_root()
+
+    start = time.perf_counter()
+    for sample_index in range(samples):
+        sample = queue_model_objects.Sample()
+        queue_model.add_child(root, sample)
+        group = queue_model_objects.TaskGroup()
+        queue_model.add_child(sample, group)
+        directory = session.get_image_directory(f"sample{sample_index % 10}")
+
+        for _ in range(collections):
+            collection = queue_model_objects.DataCollection()
+            path_template = collection.get_path_template()
+            path_template.directory = directory
+            path_template.base_prefix = "protein"
+            path_template.start_num = 1
+            path_template.num_files = 100
+            if legacy:
+                run_number = legacy_next_run_number(queue_model, path_template)
+                path_template.run_number = run_number
+                assert not legacy_collisions(queue_model, path_template)
+            else:
+                run_number = queue_model.get_next_run_number(path_template)
+                path_template.run_number = run_number
+                assert not queue_model.check_for_path_collisions(path_template)
+            queue_model.add_child(group, collection)
+        queue_model.get_node(sample._node_id)
+
+    return time.perf_counter() - start
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    collections = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    HWR.init_hardware_repository(CONFIGURATION_PATH)
+    HWR.get_hardware_repository().connect()
+
+    legacy_time = build_queue(samples, collections, legacy=True)
+    indexed_time = build_queue(samples, collections)
+
+    print(f"{samples} samples with {collections} data collections each")
+    print(f"  model walks: {legacy_time * 1000:8.1f} ms")
+    print(f"      indexes: {indexed_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
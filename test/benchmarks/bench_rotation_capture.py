@@ -0,0 +1,63 @@
+"""Snapshot series over a phi rotation, with a mockup phi and camera: phi
+stopped at each angle with the 1 s wait of XMLRPCServer.save_multiple_snapshots,
+phi stopped at each angle without wait, and all the snapshots captured during
+one continuous rotation (RotationCapture).
+
+Usage: python -m test.benchmarks.bench_rotation_capture [number of angles]
+"""
+
+import sys
+import time
+
+import gevent
+
+from mxcubecore.utils.rotation_capture import RotationCapture
+from test.pytest.test_loop_finder import MotorMockup
+from test.pytest.test_rotation_capture import RotatingCamera
+
+PHI_SPEED = 360
+PHI_SETTLING = 0.2
+FRAME_INTERVAL = 0.04
+
+
+def stepped(phi, camera, angles, wait):
+    start = time.perf_counter()
+    for angle in angles:
+        phi.set_value(angle, timeout=None)
+        gevent.sleep(wait)
+        camera.get_last_image()
+    return time.perf_counter() - start
+
+
+def continuous(phi, camera, angles):
+    start = time.perf_counter()
+    frames = RotationCapture(phi, camera).capture(angles)
+    elapsed = time.perf_counter() - start
+    error = max(abs(frame.angle - frame.target) for frame in frames)
+    return elapsed, error
+
+
+def main():
+    n_angles = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    angles = [i * 360 / n_angles for i in range(n_angles)]
+
+    print(
+        f"{n_angles} snapshots over 360 deg, phi at {PHI_SPEED} deg/s, "
+        f"{PHI_SETTLING} s settling per move, {1 / FRAME_INTERVAL:.0f} fps (s)"
+    )
+    for label, wait in (("stopped, 1 s wait", 1.0), ("stopped, no wait", 0.0)):
+        phi = MotorMockup(0.0, PHI_SPEED, PHI_SETTLING)
+        camera = RotatingCamera(phi, FRAME_INTERVAL)
+        print(f"  {label + ':':28}{stepped(phi, camera, angles, wait):6.2f}")
+        camera.stop()
+
+    phi = MotorMockup(0.0, PHI_SPEED, PHI_SETTLING)
+    camera = RotatingCamera(phi, FRAME_INTERVAL)
+    elapsed, error = continuous(phi, camera, angles)
+    camera.stop()
+    print(f"  {'one continuous rotation:':28}{elapsed:6.2f}")
+    print(f"  largest angle error: {error:.1f} deg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Projection of many centred positions on the screen, one position at a time
+(reading the motors for each) and in one batched call, for
+GenericDiffractometer and CentringMath.
+
+Usage: python -m test.benchmarks.bench_screen_projection [positions]
+"""
+
+import sys
+import time
+
+import numpy
+
+from mxcubecore.HardwareObjects.CentringMath import CentringMath
+from mxcubecore.HardwareObjects.GenericDiffractometer import GenericDiffractometer
+from mxcubecore.utils.position_snapshot import PositionSnapshot
+
+NAMES = ("sampx", "sampy", "phiy", "phiz")
+
+
+class Motor:
+    def __init__(self, value, direction=1):
+        self.value = value
+        self.direction = direction
+
+    def get_value(self):
+        return self.value
+
+
+def make_diffractometer():
+    # Motor positions and calibration only, without hardware
+    GenericDiffractometer.update_zoom_calibration = lambda self: None
+    diffractometer = GenericDiffractometer.__new__(GenericDiffractometer)
+    diffractometer.use_sample_centring = True
+    diffractometer.pixels_per_mm_x = 1250.0
+    diffractometer.pixels_per_mm_y = 1300.0
+    diffractometer.beam_position = (400, 300)
+    diffractometer.centring_phi = Motor(123.0, -1)
+    diffractometer.centring_sampx = Motor(0.1)
+    diffractometer.centring_sampy = Motor(-0.2, -1)
+    diffractometer.centring_phiy = Motor(0.3)
+    diffractometer.centring_phiz = Motor(0.05)
+    diffractometer.position_snapshot = PositionSnapshot()
+    for name in ("phi", "sampx", "sampy", "phiy", "phiz"):
+        diffractometer.position_snapshot.add_motor(
+            name, getattr(diffractometer, "centring_" + name)
+        )
+    return diffractometer
+
+
+def make_centring_math():
+    centring = CentringMath("centring-math")
+    centring.gonioAxes = [
+        {"type": "translation", "direction": [1, 0, 0], "motor_name": "phiy"},
+        {"type": "translation", "direction": [0, -1, 0], "motor_name": "phiz"},
+        {"type": "rotation", "direction": [-1, 0, 0], "motor_name": "phi"},
+        {"type": "translation", "direction": [0, 0, 1], "motor_name": "sampx"},
+        {"type": "translation", "direction": [0, -1, 0], "motor_name": "sampy"},
+    ]
+    for axis, value in zip(centring.gonioAxes, (0.3, 0.05, 123.0, 0.1, -0.2)):
+        axis["motor_HO"] = Motor(value)
+    centring.cameraAxes = [
+        {"axis_name": "X", "direction": [1, 0, 0]},
+        {"axis_name": "Y", "direction": [0, 1, 0]},
+    ]
+    centring.motorConstraints = []
+    centring.mI = numpy.diag([1.0, 1.0, 1.0])
+    centring.calibrate()
+    return centring
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = numpy.random.default_rng(0)
+    positions = [dict(zip(NAMES, rng.uniform(-1, 1, 4))) for _ in range(count)]
+
+    diffractometer = make_diffractometer()
+    centring = make_centring_math()
+
+    def one_at_a_time(to_screen):
+        for cpos in positions:
+            to_screen(cpos)
+
+    print(f"{count} centred positions projected on the screen (ms)")
+    print(
+        f"  GenericDiffractometer: "
+        f"{timed(one_at_a_time, diffractometer.motor_positions_to_screen):8.2f}"
+        f" one at a time, "
+        f"{timed(diffractometer.motor_positions_list_to_screen, positions):.2f}"
+        f" batched"
+    )
+    print(
+        f"  CentringMath:          "
+        f"{timed(one_at_a_time, centring.centringToScreen):8.2f}"
+        f" one at a time, "
+        f"{timed(centring.centringsToScreen, positions):.2f} batched"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Network calls per second of polled Tango channels, with and without
+the per-device poll groups.
+
+Usage: python -m test.benchmarks.bench_tango_poll_group [n_attributes]
+"""
+
+import sys
+
+from gevent import monkey
+
+monkey.patch_all(thread=False)
+
+import gevent  # noqa: E402
+
+from mxcubecore import Poller  # noqa: E402
+from mxcubecore.Command import Tango  # noqa: E402
+from test.pytest import tango_device_mockup  # noqa: E402
+
+DEVICE = "bench/device/1"
+POLLING = 100
+DURATION = 3.0
+
+
+def run(n_attributes, batch_polling):
+    tango_device_mockup.reset()
+    Tango.TangoPollGroup._groups = {}
+    Tango.proxy_pool = Tango.DeviceProxyPool()
+    attributes = tango_device_mockup.DEVICES[DEVICE]
+    attributes.update({f"attr{i}": float(i) for i in range(n_attributes)})
+
+    channels = [
+        Tango.TangoChannel(
+            name,
+            name,
+            tangoname=DEVICE,
+            polling=POLLING,
+            batch_polling=batch_polling,
+        )
+        for name in attributes
+    ]
+    start_calls = tango_device_mockup.network_calls()
+    gevent.sleep(DURATION)
+    calls = tango_device_mockup.network_calls() - start_calls
+
+    for poller in list(Poller.POLLERS.values()):
+        poller.stop()
+    del channels
+    return calls / DURATION
+
+
+def main():
+    n_attributes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{n_attributes} attributes polled every {POLLING} ms on one device")
+    for batch_polling in (False, True):
+        label = "poll group" if batch_polling else "per channel"
+        print(f"{label:>12}: {run(n_attributes, batch_polling):8.1f} calls/s")
+
+
+if __name__ == "__main__":
+    Tango.DeviceProxy = tango_device_mockup.DeviceProxyMockup
+    main()
@@ -0,0 +1,99 @@
+"""JPEG image (0.4) and thumbnail (0.1) of synthetic CBF frames: an external
+converter process per thumbnail, as PX1Collect.generate_thumbnails did
+(modelled by a Python process converting one thumbnail), and the
+ThumbnailEngine with 1 to 4 workers, every frame converted. Then frames
+arriving at a detector frame rate, skipped while the pool is busy except the
+first, last and every Nth. Reports frames per second and latencies.
+
+Usage: python -m test.benchmarks.bench_thumbnails [frames] [size] [frame rate]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import gevent
+
+from mxcubecore.utils.thumbnails import (
+    JPEG_SCALE,
+    THUMBNAIL_SCALE,
+    ThumbnailEngine,
+)
+from test.pytest.test_thumbnails import (
+    synthetic_frame,
+    write_cbf,
+)
+
+CONVERTER = (
+    "import sys\n"
+    "from mxcubecore.utils.thumbnails import make_thumbnails, read_frame\n"
+    "make_thumbnails(read_frame(sys.argv[1]), [(sys.argv[2], float(sys.argv[3]))])\n"
+)
+
+
+def targets(directory, number):
+    return [
+        (os.path.join(directory, "image_%04d.jpeg" % number), JPEG_SCALE),
+        (os.path.join(directory, "image_%04d.thumb.jpeg" % number), THUMBNAIL_SCALE),
+    ]
+
+
+def external(frames, directory):
+    for number, frame in enumerate(frames):
+        for filename, scale in targets(directory, number):
+            subprocess.run(
+                [sys.executable, "-c", CONVERTER, frame, filename, str(scale)],
+                check=True,
+            )
+
+
+def pooled(frames, directory, workers, period=0.0, every=None):
+    engine = ThumbnailEngine(workers, every or 1)
+    for number, frame in enumerate(frames):
+        engine.submit(frame, targets(directory, number), number, len(frames))
+        gevent.sleep(period)
+    engine.wait()
+    engine.close()
+    return engine.get_statistics()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 2048
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 100.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        frames = []
+        for number in range(count):
+            frames.append(os.path.join(directory, "image_%04d.cbf" % number))
+            write_cbf(frames[-1], synthetic_frame(size, size, seed=number))
+
+        print(f"{count} CBF frames {size} x {size}")
+        print(f"  {'':28}{'frames/s':>10}{'mean ms':>10}{'max ms':>10}")
+        start = time.perf_counter()
+        external(frames, directory)
+        elapsed = time.perf_counter() - start
+        print(f"  {'external process, each:':28}{count / elapsed:10.1f}")
+        for workers in (1, 2, 4):
+            start = time.perf_counter()
+            statistics = pooled(frames, directory, workers)
+            elapsed = time.perf_counter() - start
+            print(
+                f"  {f'engine, {workers} workers:':28}{count / elapsed:10.1f}"
+                f"{1000 * statistics['latency']:10.1f}"
+                f"{1000 * statistics['max_latency']:10.1f}"
+            )
+
+        print(f"arriving at {rate:g} frames/s, 2 workers, every 10th frame kept")
+        statistics = pooled(frames, directory, 2, 1.0 / rate, 10)
+        print(
+            f"  generated {statistics['generated']}, skipped"
+            f" {statistics['skipped']}, max latency"
+            f" {1000 * statistics['max_latency']:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Frames per second of the video decoders on synthetic 2048 x 2048 frames,
+with numpy and, if installed, OpenCV.
+
+Usage: python -m test.benchmarks.bench_video_decoders [size]
+"""
+
+import sys
+import time
+
+import numpy
+
+from mxcubecore.utils import video_decoders
+
+FRAMES = 20
+
+
+def synthetic_frames(size):
+    rng = numpy.random.default_rng(0)
+    return {
+        video_decoders.Y8Decoder: rng.integers(0, 256, (size, size), numpy.uint8),
+        video_decoders.Y16Decoder: rng.integers(0, 4096, (size, size), numpy.uint16),
+        video_decoders.YUV422Decoder: rng.integers(
+            0, 256, (size, size * 2), numpy.uint8
+        ),
+        video_decoders.BayerRG16Decoder: rng.integers(
+            0, 4096, (size, size), numpy.uint16
+        ),
+    }
+
+
+def frames_per_second(decoder, raw_buffer):
+    decoder.decode(raw_buffer)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        decoder.decode(raw_buffer)
+    return FRAMES / (time.perf_counter() - start)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    implementations = [("numpy", False)]
+    if video_decoders.cv2 is not None:
+        implementations.append(("opencv", True))
+
+    print(f"{size} x {size} frames (frames per second)")
+    print("%-20s" % "" + "".join("%10s" % name for name, _ in implementations))
+    for decoder_class, frame in synthetic_frames(size).items():
+        raw_buffer = frame.tobytes()
+        rates = []
+        for _, use_cv2 in implementations:
+            options = {}
+            if decoder_class is video_decoders.Y16Decoder:
+                options["auto_contrast"] = True
+            decoder = decoder_class(size, size, use_cv2, **options)
+            rates.append(frames_per_second(decoder, raw_buffer))
+        print("%-20s" % decoder_class.__name__ + "".join("%10.1f" % r for r in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Comparison of the loop positions found by lucid and by LoopFinder on a
+directory of recorded snapshots, to validate LoopFinder before enabling it
+(sample_centring.USE_LOOP_FINDER). The snapshots are analysed in file name
+order, as the frames of a centring, by one LoopFinder.
+
+Reports, per snapshot, both positions and their distance, then the number
+of snapshots where both agree within the tolerance, where only one finds a
+loop, and where they disagree.
+
+Usage: python -m test.benchmarks.compare_loop_finders snapshot_directory
+    [chi (deg), default 0] [tolerance (pixels), default 20]
+"""
+
+import math
+import sys
+
+import numpy
+from PIL import Image
+
+from mxcubecore.HardwareObjects import sample_centring
+from mxcubecore.utils.loop_finder import LoopFinder
+from test.benchmarks.bench_loop_finder import snapshots
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    paths = snapshots(sys.argv[1])
+    chi = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    tolerance = float(sys.argv[3]) if len(sys.argv) > 3 else 20.0
+    if not hasattr(sample_centring, "lucid"):
+        sys.exit("lucid is not installed")
+
+    sample_centring.LOOP_FINDER = LoopFinder()
+    counts = {"agree": 0, "disagree": 0, "lucid only": 0, "finder only": 0}
+    distances = []
+    print(f"{'snapshot':40}{'lucid':>16}{'LoopFinder':>16}{'distance':>10}")
+    for path in paths:
+        frame = numpy.asarray(Image.open(path).convert("RGB"))
+        sample_centring.USE_LOOP_FINDER = False
+        lucid = sample_centring.find_loop_in_frame(frame, chi)
+        sample_centring.USE_LOOP_FINDER = True
+        finder = sample_centring.find_loop_in_frame(frame, chi)
+
+        distance = ""
+        if lucid.x < 0 and finder.x < 0:
+            counts["agree"] += 1
+        elif finder.x < 0:
+            counts["lucid only"] += 1
+        elif lucid.x < 0:
+            counts["finder only"] += 1
+        else:
+            gap = math.hypot(lucid.x - finder.x, lucid.y - finder.y)
+            distances.append(gap)
+            distance = f"{gap:.1f}"
+            counts["agree" if gap <= tolerance else "disagree"] += 1
+        print(
+            f"{path[-40:]:40}{lucid.x:8.0f}{lucid.y:8.0f}"
+            f"{finder.x:8.0f}{finder.y:8.0f}{distance:>10}"
+        )
+
+    print(f"{len(paths)} snapshots, tolerance {tolerance} pixels")
+    for name, count in counts.items():
+        print(f"  {name:12}{count:6d}")
+    if distances:
+        print(
+            f"  distance median {numpy.median(distances):.1f}, "
+            f"90% {numpy.percentile(distances, 90):.1f} pixels"
+        )
+
+
+if __name__ == "__main__":
+    main()
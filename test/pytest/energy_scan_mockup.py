@@ -0,0 +1,123 @@
+"""Stand-in for the monochromator, fluorescence detector (MCA), diode and
+fast shutter of an energy scan, with the durations of the operations"""
+
+import math
+import time
+
+import gevent
+
+#: Energy of the absorption edge of the simulated sample [keV]
+EDGE = 12.658
+
+TICK = 0.005
+
+
+def fluorescence(energy):
+    """Counts per second: absorption edge with a white line"""
+    step = 1.0 / (1.0 + math.exp(-(energy - EDGE) / 0.0008))
+    white_line = 0.6 * math.exp(-(((energy - EDGE - 0.003) / 0.002) ** 2))
+    return 1000.0 * (0.05 + step + white_line)
+
+
+class EnergyScanHardwareMockup:
+    """Hardware of EnergyScanEngine.
+
+    Args:
+        energy (float): initial monochromator energy [keV]
+        mono_speed (float): monochromator speed [keV/s]
+        mono_settling (float): settling time of a monochromator move [s]
+        mca_time (float): MCA acquisition time [s]
+        mca_readout (float): MCA read out time [s]
+        shutter_time (float): shutter opening or closing time [s]
+    """
+
+    def __init__(
+        self,
+        energy=EDGE - 0.01,
+        mono_speed=0.05,
+        mono_settling=0.02,
+        mca_time=0.02,
+        mca_readout=0.01,
+        shutter_time=0.005,
+    ):
+        self.mono_speed = mono_speed
+        self.mono_settling = mono_settling
+        self.mca_time = mca_time
+        self.mca_readout = mca_readout
+        self.shutter_time = shutter_time
+
+        self.energy = energy
+        self.shutter_open = False
+        #: time with the shutter open while the monochromator moves [s]
+        self.exposed_moving = 0.0
+        self._move = None
+        self._mca = None
+        self._counts = 0.0
+
+    # monochromator
+    def start_mono_move(self, energy):
+        if self._move is not None:
+            self._move.kill()
+        self._move = gevent.spawn(self._moving, float(energy))
+
+    def is_mono_moving(self):
+        return self._move is not None and not self._move.dead
+
+    def get_mono_energy(self):
+        return self.energy
+
+    def get_mono_speed(self):
+        return self.mono_speed
+
+    def set_mono_speed(self, speed):
+        self.mono_speed = speed
+
+    def _moving(self, target):
+        last = time.monotonic()
+        while self.energy != target:
+            gevent.sleep(TICK)
+            now = time.monotonic()
+            step = self.mono_speed * (now - last)
+            if self.shutter_open:
+                self.exposed_moving += now - last
+            last = now
+            if abs(target - self.energy) <= step:
+                self.energy = target
+            else:
+                self.energy += math.copysign(step, target - self.energy)
+        gevent.sleep(self.mono_settling)
+
+    # MCA
+    def start_mca(self):
+        self._counts = 0.0
+        self._mca = gevent.spawn(self._acquiring)
+
+    def wait_mca(self):
+        self._mca.join()
+
+    def read_roi_counts(self):
+        gevent.sleep(self.mca_readout)
+        return self._counts
+
+    def _acquiring(self):
+        end = time.monotonic() + self.mca_time
+        last = time.monotonic()
+        while last < end:
+            gevent.sleep(min(TICK, end - last))
+            now = time.monotonic()
+            if self.shutter_open:
+                self._counts += fluorescence(self.energy) * (now - last)
+            last = now
+
+    # diode
+    def read_intensity(self):
+        return 2.0 if self.shutter_open else 0.0
+
+    # shutter
+    def open_fast_shutter(self):
+        gevent.sleep(self.shutter_time)
+        self.shutter_open = True
+
+    def close_fast_shutter(self):
+        gevent.sleep(self.shutter_time)
+        self.shutter_open = False
@@ -0,0 +1,106 @@
+"""Local TCP server answering like the MD2/MD3 exporter.
+
+Supports the READ, WRTE, EXEC, LIST, PLST and NAME commands on a dictionary
+of properties; requests of a connection are answered in order, as the real
+server does.
+"""
+
+import gevent
+from gevent.server import StreamServer
+
+from mxcubecore.Command.exporter.StandardClient import StreamFramer
+
+ARRAY_SEPARATOR = "\x1f"
+
+
+class ExporterServerMockup:
+    """Exporter stand-in listening on localhost.
+    Args:
+        properties (dict): property name: value (str, or list for arrays)
+        latency (float): processing time of each request [s]
+        chunk_size (int): replies are sent in chunks of this size [bytes]
+        network_delay (float): one way transmission delay of the replies [s]
+    """
+
+    def __init__(
+        self, properties=None, latency=0.0, chunk_size=None, network_delay=0.0
+    ):
+        self.properties = dict(properties or {})
+        self.latency = latency
+        self.network_delay = network_delay
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self._server = StreamServer(("127.0.0.1", 0), self._handle)
+
+    @property
+    def port(self):
+        return self._server.server_port
+
+    def start(self):
+        self._server.start()
+        return self
+
+    def stop(self):
+        self._server.stop()
+
+    def _handle(self, sock, address):
+        framer = StreamFramer()
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            for request in framer.feed(data):
+                self.requests += 1
+                if self.latency:
+                    gevent.sleep(self.latency)
+                if self.network_delay:
+                    gevent.spawn_later(
+                        self.network_delay, self._send, sock, self.reply(request)
+                    )
+                else:
+                    self._send(sock, self.reply(request))
+
+    def _send(self, sock, msg):
+        pack = StreamFramer.STX + msg.encode() + StreamFramer.ETX
+        if self.chunk_size is None:
+            sock.sendall(pack)
+            return
+        for start in range(0, len(pack), self.chunk_size):
+            sock.sendall(pack[start : start + self.chunk_size])
+            gevent.sleep(0)
+
+    def _format(self, value):
+        if isinstance(value, (list, tuple)):
+            return ARRAY_SEPARATOR + "".join(
+                str(item) + ARRAY_SEPARATOR for item in value
+            )
+        return str(value)
+
+    def reply(self, request):
+        """Answer to one request.
+        Args:
+            request (str): exporter command
+        Returns:
+            (str): exporter reply
+        """
+        command, _, args = request.partition(" ")
+        if command == "READ":
+            if args not in self.properties:
+                return "ERR:no property " + args
+            return "RET:" + self._format(self.properties[args])
+        if command == "WRTE":
+            name, _, value = args.partition(" ")
+            self.properties[name] = value
+            return "NULL"
+        if command == "EXEC":
+            method = args.split(" ")[0]
+            if method == "getState":
+                return "RET:" + self.properties.get("State", "Ready")
+            return "NULL"
+        if command == "PLST":
+            return "RET:" + "\t".join(self.properties) + "\t"
+        if command == "NAME":
+            return "RET:MD mockup"
+        if command == "LIST":
+            return "RET:getState\t"
+        return "ERR:unknown command " + command
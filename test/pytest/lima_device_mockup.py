@@ -0,0 +1,69 @@
+"""Stand-in for a Lima Tango device serving synthetic video frames"""
+
+import struct
+
+import numpy
+
+from mxcubecore.utils.video_frames import (
+    LIMA_HEADER_FORMAT,
+    LIMA_IMAGE_MODES,
+    LIMA_MAGIC,
+)
+
+
+def lima_image(frame_number, width, height, image_mode="RGB24", endian=">"):
+    """Lima video image (header and pixels) of a synthetic frame: a gradient
+    shifted by the frame number"""
+    channels = {"Y8": 1, "RGB24": 3, "RGB32": 4}[image_mode]
+    header_size = struct.calcsize(endian + LIMA_HEADER_FORMAT)
+    header = struct.pack(
+        endian + LIMA_HEADER_FORMAT,
+        LIMA_MAGIC,
+        1,
+        LIMA_IMAGE_MODES.index(image_mode),
+        frame_number,
+        width,
+        height,
+        0,
+        header_size,
+        0,
+        0,
+    )
+    pixels = numpy.arange(width * height * channels, dtype=numpy.uint32)
+    pixels = ((pixels + frame_number) % 256).astype(numpy.uint8)
+    return header + pixels.tobytes()
+
+
+class LimaDeviceMockup:
+    """Lima device attributes used by the video hardware objects. Each read of
+    video_last_image returns a new frame, frame_step frames after the
+    previous one (frame_step > 1 simulates frames dropped between reads)."""
+
+    def __init__(self, name="test/limaccd/camera", width=64, height=48):
+        self.name = name
+        self.image_width = width
+        self.image_height = height
+        self.video_mode = "RGB24"
+        self.video_live = False
+        self.video_exposure = 0.01
+        self.frame_number = -1
+        self.frame_step = 1
+        self.reads = 0
+
+    def ping(self):
+        return 1
+
+    @property
+    def video_last_image(self):
+        self.reads += 1
+        if self.frame_step:
+            self.frame_number += self.frame_step
+        return (
+            "VIDEO_IMAGE",
+            lima_image(
+                self.frame_number,
+                self.image_width,
+                self.image_height,
+                self.video_mode,
+            ),
+        )
@@ -0,0 +1,93 @@
+"""Stand-in for the Tango DeviceProxy, counting the calls to the device"""
+
+import collections
+from types import SimpleNamespace
+
+import PyTango
+
+#: Number of calls per device name and method, shared by all the proxies
+CALLS = collections.Counter()
+
+#: Attribute values per device name
+DEVICES = collections.defaultdict(dict)
+
+#: Number of next reads failing with CommunicationFailed, per device name
+COMMUNICATION_FAILURES = collections.Counter()
+
+
+def reset():
+    CALLS.clear()
+    DEVICES.clear()
+    COMMUNICATION_FAILURES.clear()
+
+
+def dev_failed(desc, exception=PyTango.DevFailed):
+    error = PyTango.DevError()
+    error.desc = desc
+    return exception(error)
+
+
+def network_calls():
+    """Total number of calls which would have been a network round trip"""
+    return sum(CALLS.values())
+
+
+class DeviceProxyMockup:
+    """Minimal DeviceProxy: attributes are stored in DEVICES[device_name]"""
+
+    def __init__(self, device_name):
+        self.device_name = device_name
+        self._timeout = 3000
+        CALLS[device_name, "DeviceProxy"] += 1
+
+    @property
+    def attributes(self):
+        return DEVICES[self.device_name]
+
+    def _call(self, method):
+        CALLS[self.device_name, method] += 1
+
+    def _communicate(self):
+        if COMMUNICATION_FAILURES[self.device_name] > 0:
+            COMMUNICATION_FAILURES[self.device_name] -= 1
+            raise dev_failed("communication failed", PyTango.CommunicationFailed)
+
+    def ping(self):
+        self._call("ping")
+        return 1
+
+    def set_timeout_millis(self, timeout):
+        self._timeout = timeout
+
+    def attribute_list_query(self):
+        self._call("attribute_list_query")
+        return [SimpleNamespace(name=name) for name in self.attributes]
+
+    def get_attribute_config(self, attribute_name):
+        self._call("get_attribute_config")
+        return SimpleNamespace(name=attribute_name)
+
+    def _device_attribute(self, attribute_name):
+        # as PyTango: an unknown attribute fails the whole call
+        try:
+            value = self.attributes[attribute_name]
+        except KeyError:
+            raise dev_failed(f"{attribute_name}: attribute not found")
+        return SimpleNamespace(name=attribute_name, value=value, has_failed=False)
+
+    def read_attribute(self, attribute_name, *args):
+        self._call("read_attribute")
+        self._communicate()
+        return self._device_attribute(attribute_name)
+
+    def read_attributes(self, attribute_names, *args):
+        self._call("read_attributes")
+        self._communicate()
+        return [self._device_attribute(name) for name in attribute_names]
+
+    def write_attribute(self, attribute_name, value):
+        self._call("write_attribute")
+        self.attributes[attribute_name] = value
+
+    def subscribe_event(self, *args):
+        self._call("subscribe_event")
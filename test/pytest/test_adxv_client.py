@@ -0,0 +1,101 @@
+import socket
+
+import gevent
+import gevent.server
+
+from mxcubecore.utils.adxv_client import AdxvClient
+
+
+class AdxvStub:
+    """Local TCP server standing in for ADXV: records the commands"""
+
+    def __init__(self, port=0):
+        self.commands = []
+        self.connections = []
+        self.server = gevent.server.StreamServer(("127.0.0.1", port), self.handle)
+        self.server.start()
+        self.port = self.server.server_port
+
+    def handle(self, connection, address):
+        self.connections.append(connection)
+        data = b""
+        while True:
+            chunk = connection.recv(1024)
+            if not chunk:
+                break
+            data += chunk
+            *lines, data = data.split(b"\n")
+            self.commands.extend(line.decode() for line in lines)
+
+    def drop_connections(self):
+        for connection in self.connections:
+            connection.shutdown(socket.SHUT_RDWR)
+            connection.close()
+        self.connections = []
+
+    def stop(self):
+        self.drop_connections()
+        self.server.stop()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_coalesced_burst():
+    stub = AdxvStub()
+    client = AdxvClient(port=stub.port, min_interval=0.05)
+    try:
+        client.show("/data/image_0001.cbf")
+        assert client.flush(timeout=2)
+        # burst within the refresh interval: only the newest is displayed
+        for number in range(2, 51):
+            client.show("/data/image_%04d.cbf" % number)
+        assert client.flush(timeout=2)
+        gevent.sleep(0.05)
+    finally:
+        client.close()
+        stub.stop()
+
+    assert stub.commands == [
+        "load_image /data/image_0001.cbf",
+        "load_image /data/image_0050.cbf",
+    ]
+    statistics = client.get_statistics()
+    assert statistics["requested"] == 50
+    assert statistics["sent"] == 2
+    assert statistics["coalesced"] == 48
+    assert statistics["connects"] == 1
+    assert 0.0 <= statistics["lag"] <= statistics["max_lag"] < 1.0
+
+
+def test_reconnect():
+    port = free_port()
+    client = AdxvClient(port=port, min_retry=0.02, max_retry=0.1)
+    stub = None
+    try:
+        # ADXV not started yet: the newest image is displayed once it is
+        client.show("/data/image_0001.cbf")
+        client.show("/data/image_0002.cbf")
+        assert not client.flush(timeout=0.2)
+        assert client.get_statistics()["errors"] > 1
+
+        stub = AdxvStub(port)
+        assert client.flush(timeout=2)
+        gevent.sleep(0.05)
+        assert stub.commands == ["load_image /data/image_0002.cbf"]
+
+        # ADXV closed the connection
+        stub.drop_connections()
+        gevent.sleep(0.05)
+        client.show("/data/image_0003.cbf")
+        assert client.flush(timeout=2)
+        gevent.sleep(0.05)
+        assert stub.commands[-1] == "load_image /data/image_0003.cbf"
+        assert client.get_statistics()["connects"] == 2
+    finally:
+        client.close()
+        if stub is not None:
+            stub.stop()
@@ -25,6 +25,7 @@ from mxcubecore.BaseHardwareObjects import (
     HardwareObjectNode,
     HardwareObjectYaml,
     PropertySet,
+    clear_exports_cache,
 )
 
 if TYPE_CHECKING:
@@ -1168,6 +1169,31 @@ class TestHardwareObjectNode:
         # Call method and verify output matches initial values
         assert hw_obj_node.objects_names() == initial_obj_names
 
+    def test_lookups_follow_tree_changes(self, hw_obj_node: HardwareObjectNode):
+        """Test that name and role lookups stay up to date as objects are added.
+
+        Args:
+            hw_obj_node (HardwareObjectNode): Object instance.
+        """
+
+        child = HardwareObject(rootName="child")
+        hw_obj_node.add_object("child", child, role="child")
+        assert hw_obj_node.get_object_by_role("grandchild") is None
+
+        grandchild = HardwareObject(rootName="grandchild")
+        child.add_object("grandchild", grandchild, role="grandchild")
+        assert hw_obj_node.get_object_by_role("GrandChild") is grandchild
+
+        other = HardwareObject(rootName="other")
+        hw_obj_node.add_object("other", other)
+        hw_obj_node.add_object("child", other)
+        assert hw_obj_node.objects_names() == ["child", "other"]
+        assert list(hw_obj_node) == [child, other, other]
+        assert hw_obj_node["child"] == [child, other]
+        assert list(hw_obj_node.get_objects("other")) == [other]
+        assert hw_obj_node.has_object("other")
+        assert not hw_obj_node.has_object("grandchild")
+
     @pytest.mark.parametrize(
         ("name", "value", "output_value"),
         (
@@ -1347,7 +1373,46 @@ class TestHardwareObjectMixin:
     #     # pydantic_model
     #     # exported_attributes
 
-    # def test_get_type_annotations(self): ...
+    def test_get_type_annotations(self):
+        """Test that exported method models are created once per class."""
+
+        class ExportingObject(HardwareObjectMixin):
+            def move(self, position: float, wait: bool = False) -> None: ...
+
+            def scan(self, start: float, end: float) -> None: ...
+
+        class OverridingObject(ExportingObject):
+            def move(self, position: int) -> None: ...
+
+        objects = []
+        for cls in (ExportingObject, ExportingObject, OverridingObject):
+            obj = cls()
+            obj._exports_config_list = ["move", "scan"]
+            obj.init()
+            objects.append(obj)
+        first, second, overriding = objects
+
+        assert first._exports == {
+            "move": ["position", "wait"],
+            "scan": ["start", "end"],
+        }
+        assert first.exported_attributes["move"]["signature"] == ["position", "wait"]
+        assert "position" in first.exported_attributes["move"]["schema"]
+        assert first.pydantic_model["move"] is second.pydantic_model["move"]
+        assert first.pydantic_model["all"] is second.pydantic_model["all"]
+        # Signatures are copied per instance
+        assert first._exports["move"] is not second._exports["move"]
+
+        assert overriding._exports["move"] == ["position"]
+        assert overriding.pydantic_model["move"] is not first.pydantic_model["move"]
+        assert overriding.pydantic_model["scan"] is first.pydantic_model["scan"]
+
+        clear_exports_cache()
+        third = ExportingObject()
+        third._exports_config_list = ["move"]
+        third.init()
+        assert third.pydantic_model["move"] is not first.pydantic_model["move"]
+        assert list(third.pydantic_model) == ["move", "all"]
 
     # def test_execute_exported_command(self): ...
 
@@ -0,0 +1,196 @@
+import math
+from types import SimpleNamespace
+
+import numpy
+import pytest
+
+from mxcubecore.dispatcher import dispatcher
+from mxcubecore.HardwareObjects.CentringMath import CentringMath
+from mxcubecore.HardwareObjects.GenericDiffractometer import GenericDiffractometer
+from mxcubecore.utils.position_snapshot import PositionSnapshot
+
+GONIO_AXES = (
+    ("phiy", [1, 0, 0], "translation", 0.12),
+    ("phiz", [0, -1, 0], "translation", -0.3),
+    ("phi", [-1, 0, 0], "rotation", 37.0),
+    ("sampx", [0, 0, 1], "translation", 0.05),
+    ("sampy", [0, -1, 0], "translation", 0.21),
+)
+
+
+class Motor:
+    def __init__(self, value, direction=1):
+        self.value = value
+        self.direction = direction
+
+    def get_value(self):
+        return self.value
+
+    def set_value(self, value):
+        self.value = value
+        dispatcher.send("valueChanged", self, value)
+
+
+@pytest.fixture
+def centring_math():
+    centring = CentringMath("centring-math")
+    centring.gonioAxes = [
+        {
+            "type": axis_type,
+            "direction": direction,
+            "motor_name": name,
+            "motor_HO": Motor(value),
+        }
+        for name, direction, axis_type, value in GONIO_AXES
+    ]
+    centring.cameraAxes = [
+        {"axis_name": "X", "direction": [1, 0, 0]},
+        {"axis_name": "Y", "direction": [0, 1, 0]},
+    ]
+    centring.motorConstraints = []
+    centring.mI = numpy.diag([1.0, 1.0, 1.0])
+    centring.calibrate()
+    yield centring
+
+
+def loop_centred_position(centring):
+    """centeredPosition M and V matrices, computed as before vectorisation"""
+    count = centring.translationAxesCount
+    M = numpy.zeros(shape=(count, count))
+    V = numpy.zeros(shape=(count))
+    for l in range(count):
+        for i in range(len(centring.centringDataMatrix)):
+            for k in range(len(centring.cameraAxes)):
+                V[l] += (
+                    centring.centringDataTensor[i][l][k]
+                    * centring.centringDataMatrix[i][k]
+                )
+        for m in range(count):
+            for i in range(len(centring.centringDataMatrix)):
+                for k in range(len(centring.cameraAxes)):
+                    M[l][m] += (
+                        centring.centringDataTensor[i][l][k]
+                        * centring.centringDataTensor[i][m][k]
+                    )
+    return M, V
+
+
+def test_centred_position(centring_math):
+    phi = centring_math.gonioAxes[2]["motor_HO"]
+    centring_math.initCentringProcedure()
+    for angle, click in ((0, (0.1, -0.05)), (90, (0.02, 0.07)), (180, (-0.08, 0.01))):
+        phi.value = angle
+        centring_math.appendCentringDataPoint({"X": click[0], "Y": click[1]})
+
+    M, V = loop_centred_position(centring_math)
+    expected = numpy.dot(numpy.linalg.pinv(M, rcond=1e-6), V)
+    expected = -expected + centring_math.translation_datum()
+
+    result = centring_math.centeredPosition(return_by_name=True)
+    names = ("phiy", "phiz", "sampx", "sampy")
+    numpy.testing.assert_allclose([result[name] for name in names], expected)
+
+
+def test_list_of_centrings_to_screen(centring_math):
+    rng = numpy.random.default_rng(1)
+    centrings = [
+        dict(zip(("phiy", "phiz", "sampx", "sampy"), rng.uniform(-1, 1, 4)))
+        for _ in range(20)
+    ]
+    centrings[3]["sampx"] = None
+
+    result = centring_math.listOfCentringsToScreen(centrings)
+
+    assert result[3] is None
+    for centring, screen in zip(centrings, result):
+        expected = centring_math.centringToScreen(centring)
+        if expected is not None:
+            assert screen == pytest.approx(expected)
+
+
+def legacy_motor_positions_to_screen(diffractometer, cpos):
+    """GenericDiffractometer.motor_positions_to_screen before vectorisation"""
+    phi_angle = math.radians(
+        diffractometer.centring_phi.direction * diffractometer.centring_phi.get_value()
+    )
+    sampx = diffractometer.centring_sampx.direction * (
+        cpos["sampx"] - diffractometer.centring_sampx.get_value()
+    )
+    sampy = diffractometer.centring_sampy.direction * (
+        cpos["sampy"] - diffractometer.centring_sampy.get_value()
+    )
+    phiy = diffractometer.centring_phiy.direction * (
+        cpos["phiy"] - diffractometer.centring_phiy.get_value()
+    )
+    phiz = diffractometer.centring_phiz.direction * (
+        cpos["phiz"] - diffractometer.centring_phiz.get_value()
+    )
+    rot_matrix = numpy.matrix(
+        [
+            math.cos(phi_angle),
+            -math.sin(phi_angle),
+            math.sin(phi_angle),
+            math.cos(phi_angle),
+        ]
+    )
+    rot_matrix.shape = (2, 2)
+    inv_rot_matrix = numpy.array(rot_matrix.I)
+    dx, dy = (
+        numpy.dot(numpy.array([sampx, sampy]), inv_rot_matrix)
+        * diffractometer.pixels_per_mm_x
+    )
+    x = (phiy * diffractometer.pixels_per_mm_x) + diffractometer.beam_position[0]
+    y = dy + (phiz * diffractometer.pixels_per_mm_y) + diffractometer.beam_position[1]
+    return x, y
+
+
+@pytest.fixture
+def diffractometer(monkeypatch):
+    monkeypatch.setattr(
+        GenericDiffractometer, "update_zoom_calibration", lambda self: None
+    )
+    diffractometer = GenericDiffractometer.__new__(GenericDiffractometer)
+    diffractometer.use_sample_centring = True
+    diffractometer.pixels_per_mm_x = 1250.0
+    diffractometer.pixels_per_mm_y = 1300.0
+    diffractometer.beam_position = (400, 300)
+    diffractometer.centring_phi = Motor(123.0, -1)
+    diffractometer.centring_sampx = Motor(0.1)
+    diffractometer.centring_sampy = Motor(-0.2, -1)
+    diffractometer.centring_phiy = Motor(0.3)
+    diffractometer.centring_phiz = Motor(0.05)
+    diffractometer.position_snapshot = PositionSnapshot()
+    for name in ("phi", "sampx", "sampy", "phiy", "phiz"):
+        diffractometer.position_snapshot.add_motor(
+            name, getattr(diffractometer, "centring_" + name)
+        )
+    yield diffractometer
+
+
+def test_motor_positions_to_screen(diffractometer):
+    rng = numpy.random.default_rng(2)
+    cpos_list = [
+        dict(zip(("sampx", "sampy", "phiy", "phiz"), rng.uniform(-1, 1, 4)))
+        for _ in range(50)
+    ]
+
+    screen = diffractometer.motor_positions_list_to_screen(cpos_list)
+
+    assert screen.shape == (50, 2)
+    for cpos, xy in zip(cpos_list, screen):
+        expected = legacy_motor_positions_to_screen(diffractometer, cpos)
+        numpy.testing.assert_allclose(xy, expected)
+        numpy.testing.assert_allclose(
+            diffractometer.motor_positions_to_screen(cpos), expected
+        )
+
+    snapshot = dict(diffractometer.get_centring_motor_positions())
+    diffractometer.centring_phi.set_value(0)
+    numpy.testing.assert_allclose(
+        diffractometer.motor_positions_list_to_screen(cpos_list, snapshot), screen
+    )
+    # the new phi position, without reading the motors
+    live_reads = diffractometer.position_snapshot.live_reads
+    moved = diffractometer.motor_positions_list_to_screen(cpos_list)
+    assert not numpy.allclose(moved, screen)
+    assert diffractometer.position_snapshot.live_reads == live_reads
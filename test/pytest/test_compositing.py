@@ -0,0 +1,120 @@
+import numpy
+import pytest
+from PIL import Image
+
+from mxcubecore.HardwareObjects.SampleView import combine_images
+from mxcubecore.utils.compositing import (
+    Layer,
+    composite,
+    threshold_mask,
+)
+
+WIDTH, HEIGHT = 40, 30
+
+
+def legacy_combine_images(img1, img2):
+    """Former SampleView.combine_images, pixel by pixel"""
+    combined_img = Image.new("RGB", img1.size)
+    pixels1 = img1.load()
+    pixels2 = img2.load()
+    combined_pixels = combined_img.load()
+    width, height = img1.size
+    for x in range(width):
+        for y in range(height):
+            pixel1 = pixels1[x, y]
+            pixel2 = pixels2[x, y]
+            if pixel2[0] <= 200 and pixel2[1] <= 60 and pixel2[2] <= 140:
+                combined_pixels[x, y] = pixel1
+            else:
+                combined_pixels[x, y] = pixel2
+    return combined_img
+
+
+@pytest.fixture
+def images():
+    rng = numpy.random.default_rng(0)
+    base = rng.integers(0, 256, (HEIGHT, WIDTH, 3), numpy.uint8)
+    overlay = rng.integers(0, 256, (HEIGHT, WIDTH, 3), numpy.uint8)
+    # pixels on the thresholds, and just above them
+    overlay[0, :4] = [(200, 60, 140), (201, 60, 140), (200, 61, 140), (200, 60, 141)]
+    overlay[1] = 0
+    return base, overlay
+
+
+def test_combine_images_as_legacy(images):
+    base, overlay = (Image.fromarray(image) for image in images)
+    expected = numpy.asarray(legacy_combine_images(base, overlay))
+    assert (numpy.asarray(combine_images(base, overlay)) == expected).all()
+
+    out = numpy.zeros((HEIGHT, WIDTH, 3), numpy.uint8)
+    combine_images(base, overlay, out=out)
+    assert (out == expected).all()
+
+
+def test_combine_images_sizes(images):
+    base = Image.fromarray(images[0])
+    with pytest.raises(ValueError):
+        combine_images(base, base.resize((WIDTH // 2, HEIGHT)))
+
+
+def test_threshold_mask(images):
+    mask = threshold_mask(images[1])
+    assert mask[0, :4].tolist() == [False, True, True, True]
+    assert not mask[1].any()
+
+
+def test_alpha_blending(images):
+    base, overlay = images
+    blended = composite(base, [Layer(overlay, alpha=0.5)])
+    expected = (base.astype(int) + overlay + 1) // 2
+    assert numpy.abs(blended.astype(int) - expected).max() <= 1
+
+    assert (composite(base, [Layer(overlay, alpha=0)]) == base).all()
+    assert (composite(base, [Layer(overlay, alpha=1.0)]) == overlay).all()
+
+
+def test_rgba_layer_with_offset(images):
+    base, _ = images
+    mark = numpy.zeros((10, 10, 4), numpy.uint8)
+    mark[..., 0] = 255
+    mark[2:8, 2:8, 3] = 255
+
+    out = composite(base, [Layer(mark, offset=(35, -5))])
+
+    # only the part of the layer inside the image, and the opaque pixels
+    assert (out[:, :35] == base[:, :35]).all()
+    assert (out[3:, 35:] == base[3:, 35:]).all()
+    assert (out[:3, 37:40] == (255, 0, 0)).all()
+    assert (out[:3, 35:37] == base[:3, 35:37]).all()
+
+
+def test_layers_in_order_into_buffer(images):
+    base, overlay = images
+    heatmap = numpy.zeros((HEIGHT, WIDTH, 3), numpy.uint8)
+    heatmap[..., 2] = 200
+    cell = numpy.zeros((HEIGHT, WIDTH), bool)
+    cell[10:20, 10:20] = True
+    shapes = numpy.full((5, 5, 3), 255, numpy.uint8)
+
+    out = base.copy()
+    result = composite(
+        out,
+        [
+            Layer(heatmap, alpha=0.5, mask=cell),
+            Layer(shapes, offset=(12, 12)),
+            Layer(overlay, alpha=numpy.zeros((HEIGHT, WIDTH), numpy.uint8)),
+        ],
+        out=out,
+    )
+
+    assert result is out
+    assert (out[:10] == base[:10]).all()
+    assert (out[12:17, 12:17] == 255).all()
+    expected = (base[18, 18, 2].astype(int) + 200 + 1) // 2
+    assert abs(int(out[18, 18, 2]) - expected) <= 1
+    assert layer_outside_is_ignored(base)
+
+
+def layer_outside_is_ignored(base):
+    layer = Layer(numpy.zeros((5, 5, 3), numpy.uint8), offset=(WIDTH, 0))
+    return (composite(base, [layer]) == base).all()
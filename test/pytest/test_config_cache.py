@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from mxcubecore import HardwareObjectFileParser
+from mxcubecore import HardwareRepository as HWR
+from mxcubecore.utils import config_cache
+
+from .conftest import ROOT_DIR
+
+MOCKUP_DIR = os.path.join(ROOT_DIR, "mxcubecore/configuration/mockup")
+
+XML = """<object>
+  <username>Test</username>
+  <tolerance>1e-3</tolerance>
+  <channel type="tango" name="pos" polling="500" timeout="3.5">position</channel>
+  <object href="/energy-mockup" role="energy"/>
+</object>
+"""
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    path = str(tmp_path / "config_cache.pickle")
+    config_cache.set_cache_file(path)
+    yield path
+    config_cache.set_cache_file(None)
+
+
+def test_recorded_events_convert_attributes():
+    events = HardwareObjectFileParser.record_events(XML)
+    channel = [event for event in events if event[:2] == ("start", "channel")][0]
+    assert channel[2] == {
+        "type": "tango",
+        "name": "pos",
+        "polling": 500,
+        "timeout": 3.5,
+    }
+
+
+def test_replayed_object_equals_parsed_object(cache_file, tmp_path):
+    xml_file = tmp_path / "test.xml"
+    xml_file.write_text(XML)
+
+    config_cache.set_cache_file(None)
+    parsed = HardwareObjectFileParser.parse_string(XML, "/test")
+    config_cache.set_cache_file(cache_file)
+    for _ in range(2):
+        cached = HardwareObjectFileParser.parse_string(XML, "/test", str(xml_file))
+        assert cached.get_properties() == parsed.get_properties()
+        assert cached.get_property("tolerance") == 0.001
+        assert (
+            cached._CommandContainer__channels_to_add
+            == parsed._CommandContainer__channels_to_add
+        )
+
+    assert config_cache.get_cache().statistics == {
+        "hits": 1,
+        "misses": 1,
+        "stale": 0,
+    }
+
+
+def test_stale_entries_are_parsed_again(cache_file, tmp_path):
+    yaml_file = tmp_path / "test.yml"
+    yaml_file.write_text("value: 1\n")
+    cache = config_cache.get_cache()
+
+    assert config_cache.load_yaml(str(yaml_file)) == {"value": 1}
+    # modified
+    yaml_file.write_text("value: 22\n")
+    assert config_cache.load_yaml(str(yaml_file)) == {"value": 22}
+    # touched only
+    os.utime(yaml_file, ns=(0, 0))
+    assert config_cache.load_yaml(str(yaml_file)) == {"value": 22}
+    assert cache.statistics == {"hits": 1, "misses": 1, "stale": 1}
+
+    # the caller may modify the result
+    config_cache.load_yaml(str(yaml_file)).pop("value")
+    assert config_cache.load_yaml(str(yaml_file)) == {"value": 22}
+
+
+def test_cache_file_round_trip(cache_file):
+    assert config_cache.main(["--cache-file", cache_file, "warm", MOCKUP_DIR]) == 0
+    cache = config_cache.ConfigCache(cache_file)
+    assert len(cache) > 40
+    energy_file = os.path.join(MOCKUP_DIR, "energy-mockup.xml")
+    with open(energy_file) as fp0:
+        events = HardwareObjectFileParser.record_events(fp0.read())
+    assert cache.get(energy_file, None) == events
+    assert cache.statistics["hits"] == 1
+
+    config_cache.main(["--cache-file", cache_file, "clear"])
+    assert not os.path.exists(cache_file)
+
+
+def test_beamline_loads_from_cache(cache_file):
+    hwr_path = os.path.pathsep.join((MOCKUP_DIR, os.path.join(MOCKUP_DIR, "test")))
+    for _ in range(2):
+        config_cache.set_cache_file(cache_file)
+        HWR._instance = HWR.beamline = None
+        HWR.init_hardware_repository(hwr_path)
+        assert HWR.beamline.energy.get_value() is not None
+        assert os.path.exists(cache_file)
+
+    statistics = config_cache.get_cache().statistics
+    assert statistics["misses"] == 0
+    assert statistics["hits"] > 10
@@ -0,0 +1,109 @@
+import os
+
+import numpy
+import pytest
+
+from mxcubecore.utils import edge_analysis
+from mxcubecore.utils.edge_analysis import (
+    FPP_EDGES,
+    analyse_edge,
+    edge_fpp,
+    format_chooch_results,
+    kramers_kronig,
+    read_scan,
+    render_plot_async,
+    write_efs,
+)
+
+SCANS_DIR = os.path.join(os.path.dirname(__file__), "data", "energy_scans")
+
+#: archived scans: theoretical edge [keV], inflection and peak energies [eV]
+SCANS = {
+    "os_l3.raw": (10.871, 10870.0, 10873.0),
+    "se_k.raw": (12.658, 12658.5, 12661.0),
+}
+
+
+def test_kramers_kronig():
+    # Lorentzian f'' (odd extension): f' = (E - E0) / ((E - E0)^2 + width^2)
+    energies = numpy.arange(6000.0, 25000.0, 0.5)
+    edge, width = 12658.0, 5.0
+    fp = kramers_kronig(energies, width / ((energies - edge) ** 2 + width**2))
+    near = abs(energies - edge) < 100
+    expected = (energies - edge) / ((energies - edge) ** 2 + width**2)
+    numpy.testing.assert_allclose(fp[near], expected[near], atol=1e-4)
+
+
+@pytest.mark.parametrize("scan_file", sorted(SCANS))
+def test_archived_scans(scan_file):
+    edge, inflection, peak = SCANS[scan_file]
+    energies, counts = read_scan(os.path.join(SCANS_DIR, scan_file))
+    result = analyse_edge(energies, counts, edge)
+
+    assert result.inflection == pytest.approx(inflection, abs=0.5)
+    assert result.peak == pytest.approx(peak, abs=0.5)
+    assert result.remote == result.peak + 30
+    # f' minimum at the inflection, f'' rising through it
+    assert result.fp_inflection == pytest.approx(result.fp.min(), abs=0.5)
+    assert result.fp_inflection < -5
+    assert 0.5 < result.fpp_inflection < result.fpp_peak
+    numpy.testing.assert_array_equal(result.energies, energies)
+
+
+def test_edge_fpp(monkeypatch):
+    monkeypatch.setattr(edge_analysis, "xraylib", None)
+    assert edge_fpp("os", "l3") == FPP_EDGES[("Os", "L3")]
+    assert edge_fpp("Xx", "K") is None
+
+    # f' and f'' of the Os L3 edge, not of a K edge
+    fpp_below, fpp_above = edge_fpp("Os", "L3")
+    energies, counts = read_scan(os.path.join(SCANS_DIR, "os_l3.raw"))
+    result = analyse_edge(energies, counts, 10.871, fpp_below, fpp_above)
+    assert result.inflection == pytest.approx(10870.0, abs=0.5)
+    assert result.peak == pytest.approx(10873.0, abs=0.5)
+    assert fpp_below < result.fpp_inflection < result.fpp_peak
+    assert result.fpp_peak > 9
+    assert result.fpp[0] == pytest.approx(fpp_below, abs=0.5)
+
+
+def test_edge_fpp_xraylib():
+    pytest.importorskip("xraylib")
+    fpp_below, fpp_above = edge_fpp("Se", "K")
+    assert fpp_below == pytest.approx(FPP_EDGES[("Se", "K")][0], abs=0.3)
+    assert fpp_above == pytest.approx(FPP_EDGES[("Se", "K")][1], abs=0.5)
+
+
+def test_chooch_output(tmp_path):
+    energies, counts = read_scan(os.path.join(SCANS_DIR, "se_k.raw"))
+    result = analyse_edge(energies / 1000, counts, 12.658)
+
+    # parsed as the run_chooch output in PX1EnergyScan
+    lines = format_chooch_results(result).split("\n")
+    chooch = eval(lines[lines.index("chooch_results") + 1])
+    pk, fpp_peak, fp_peak, ip, fpp_infl, fp_infl, graph = chooch
+    assert (pk, ip) == (result.peak, result.inflection)
+    assert (fpp_peak, fp_peak) == (result.fpp_peak, result.fp_peak)
+    assert len(graph) == len(energies)
+    assert graph[0][0] == energies[0]
+
+    # read as the efs file of chooch in ESRFEnergyScan
+    efs_file = tmp_path / "se_k.efs"
+    write_efs(efs_file, result)
+    with open(efs_file) as efs:
+        for _ in range(3):
+            next(efs)
+        efs_data = numpy.array([list(map(float, line.split())) for line in efs])
+    numpy.testing.assert_allclose(efs_data[:, 0], energies)
+    numpy.testing.assert_allclose(efs_data[:, 1], result.fpp, atol=1e-3)
+    numpy.testing.assert_allclose(efs_data[:, 2], result.fp, atol=1e-3)
+
+
+def test_render_plot(tmp_path):
+    energies, counts = read_scan(os.path.join(SCANS_DIR, "os_l3.raw"))
+    result = analyse_edge(energies, counts)
+    png_files = [str(tmp_path / "scan.png"), str(tmp_path / "archive.png")]
+
+    render_plot_async(png_files, energies, counts, result, "Os L3").get(timeout=30)
+    for png_file in png_files:
+        with open(png_file, "rb") as png:
+            assert png.read(8) == b"\x89PNG\r\n\x1a\n"
@@ -0,0 +1,92 @@
+import numpy
+import pytest
+
+from mxcubecore.utils.energy_scan import (
+    ON_THE_FLY,
+    OVERLAPPED,
+    SEQUENTIAL,
+    EnergyScanEngine,
+)
+from test.pytest.energy_scan_mockup import (
+    EDGE,
+    EnergyScanHardwareMockup,
+)
+
+#: 1 eV steps around the edge [keV]
+ENERGIES = numpy.round(numpy.linspace(EDGE - 0.01, EDGE + 0.01, 21), 4)
+
+
+def edge_position(points):
+    energies = numpy.array([point.energy for point in points])
+    values = numpy.array([point.value for point in points])
+    return energies[numpy.argmax(numpy.diff(values))]
+
+
+def test_overlapped_step_scan():
+    sequential = EnergyScanEngine(EnergyScanHardwareMockup())
+    reference = sequential.scan(ENERGIES, SEQUENTIAL)
+    hardware = EnergyScanHardwareMockup()
+    overlapped = EnergyScanEngine(hardware)
+    points = []
+    result = overlapped.scan(ENERGIES, OVERLAPPED, callback=points.append)
+
+    assert result == points
+    assert [point.energy for point in points] == list(ENERGIES)
+    for point, expected in zip(points, reference):
+        assert point.value == pytest.approx(expected.value, rel=0.3)
+    assert abs(edge_position(points) - EDGE) <= 0.0015
+
+    # the moves overlap the read out, the shutter stays open
+    assert overlapped.statistics["duration"] < 0.9 * sequential.statistics["duration"]
+    assert overlapped.statistics["shutter_operations"] == 4
+    assert sequential.statistics["shutter_operations"] == 2 * len(ENERGIES)
+    assert not hardware.shutter_open
+
+
+def test_shutter_closed_on_long_moves():
+    hardware = EnergyScanHardwareMockup()
+    engine = EnergyScanEngine(hardware, keep_shutter_open=0.01)
+    points = engine.scan(ENERGIES[:5], OVERLAPPED)
+
+    assert len(points) == 5
+    assert engine.statistics["max_gap"] > 0.01
+    assert engine.statistics["shutter_operations"] == 10
+    assert hardware.exposed_moving == 0.0
+
+
+def test_on_the_fly_scan():
+    hardware = EnergyScanHardwareMockup()
+    engine = EnergyScanEngine(hardware)
+    mono_speed = hardware.mono_speed
+    points = engine.scan(ENERGIES, ON_THE_FLY, speed=0.02)
+    # speed of the moves after the scan
+    assert hardware.mono_speed == mono_speed
+
+    energies = [point.energy for point in points]
+    assert energies == sorted(energies)
+    assert ENERGIES[0] <= energies[0] and energies[-1] <= ENERGIES[-1]
+    # 1 s move, 30 ms per frame (more under load)
+    assert len(points) > 5
+    # the edge, within the energy span of the frames next to it (which
+    # depends on the timing of the frames)
+    edge = edge_position(points)
+    index = energies.index(edge)
+    frame_span = max(numpy.diff(energies[max(index - 1, 0) : index + 2]), default=0.0)
+    assert abs(edge - EDGE) <= 0.0015 + frame_span
+    assert not hardware.shutter_open
+
+
+def test_stop():
+    engine = EnergyScanEngine(EnergyScanHardwareMockup())
+
+    def stop_after_3(point):
+        if len(points) == 2:
+            engine.stop()
+        points.append(point)
+
+    points = []
+    engine.scan(ENERGIES, OVERLAPPED, callback=stop_after_3)
+    assert len(points) == 3
+
+    with pytest.raises(ValueError):
+        engine.scan(ENERGIES, "continuous")
@@ -0,0 +1,96 @@
+import gevent
+import pytest
+
+from mxcubecore.Command.exporter.ExporterClient import ExporterClient
+from mxcubecore.Command.exporter.StandardClient import (
+    MAX_SIZE_STREAM_MSG,
+    PROTOCOL,
+    ProtocolError,
+    StreamFramer,
+    TimeoutError,
+)
+from test.pytest.exporter_server_mockup import ExporterServerMockup
+
+
+def test_framer_splits_messages():
+    framer = StreamFramer()
+    assert framer.feed(b"junk\x02RET:1\x03\x02RET:") == ["RET:1"]
+    assert framer.feed(b"2") == []
+    assert framer.feed(b"\x03trailing") == ["RET:2"]
+
+
+def test_framer_restarts_on_stx():
+    framer = StreamFramer()
+    assert framer.feed(b"\x02lost\x02RET:ok\x03") == ["RET:ok"]
+
+
+def test_framer_drops_oversized_messages():
+    framer = StreamFramer(max_size=10)
+    assert framer.feed(b"\x02" + b"x" * 20) == []
+    assert framer.feed(b"\x03\x02RET:\x03") == ["RET:"]
+
+
+def test_framer_large_message_in_small_chunks():
+    payload = ("\x1f".join(str(i) for i in range(60000)))[: MAX_SIZE_STREAM_MSG - 10]
+    data = b"\x02" + payload.encode() + b"\x03"
+    framer = StreamFramer()
+    messages = []
+    for start in range(0, len(data), 4096):
+        messages += framer.feed(data[start : start + 4096])
+    assert messages == [payload]
+
+
+def test_framer_rejects_invalid_utf8():
+    framer = StreamFramer()
+    with pytest.raises(ProtocolError):
+        framer.feed(b"\x02\xff\xfe\x03")
+    assert framer.feed(b"\x02RET:\x03") == ["RET:"]
+
+
+@pytest.fixture
+def server():
+    server = ExporterServerMockup(
+        {"State": "Ready", "CoaxCamScaleX": "0.5", "Positions": [1, 2, 3]},
+        latency=0.01,
+        chunk_size=7,
+    ).start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize("pipelining", [False, True])
+def test_client_reads_properties(server, pipelining):
+    client = ExporterClient("127.0.0.1", server.port, PROTOCOL.STREAM, 3, 1, pipelining)
+    try:
+        assert client.read_property("CoaxCamScaleX") == "0.5"
+        assert client.parse_array(client.read_property("Positions")) == [
+            "1",
+            "2",
+            "3",
+        ]
+        client.write_property("CoaxCamScaleX", 0.25)
+        assert client.read_property("CoaxCamScaleX") == "0.25"
+    finally:
+        client.disconnect()
+
+
+def test_pipelined_replies_match_requests(server):
+    client = ExporterClient("127.0.0.1", server.port, PROTOCOL.STREAM, 3, 1, True)
+    server.properties.update({f"prop{i}": str(i) for i in range(20)})
+    try:
+        jobs = [gevent.spawn(client.read_property, f"prop{i}") for i in range(20)]
+        gevent.joinall(jobs, raise_error=True)
+        assert [job.value for job in jobs] == [str(i) for i in range(20)]
+    finally:
+        client.disconnect()
+
+
+def test_pipelined_timeout_does_not_shift_replies(server):
+    client = ExporterClient("127.0.0.1", server.port, PROTOCOL.STREAM, 3, 1, True)
+    server.latency = 0.1
+    try:
+        with pytest.raises(TimeoutError):
+            client.send_receive("READ State", timeout=0.01)
+        assert client.read_property("CoaxCamScaleX") == "0.5"
+    finally:
+        client.disconnect()
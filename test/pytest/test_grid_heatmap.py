@@ -0,0 +1,134 @@
+import colorsys
+
+import numpy
+import pytest
+
+from mxcubecore.utils.grid_heatmap import (
+    TRANSPARENT,
+    GridHeatmap,
+    argb,
+    cell_mask,
+    score_lut,
+)
+
+COLS, ROWS = 4, 3
+CELL = 20
+
+
+def grid_cells(cols=COLS, rows=ROWS, cell=CELL, origin=(100, 50)):
+    """Cell centres in a serpentine (reversing) scan order"""
+    centres_x, centres_y = [], []
+    for row in range(rows):
+        for col in range(cols) if row % 2 == 0 else reversed(range(cols)):
+            centres_x.append(origin[0] + (col + 0.5) * cell)
+            centres_y.append(origin[1] + (row + 0.5) * cell)
+    return centres_x, centres_y
+
+
+@pytest.fixture
+def heatmap():
+    heatmap = GridHeatmap(alpha=120, base_color=argb(70, 70, 165, 120))
+    heatmap.set_cells(*grid_cells(), (CELL, CELL), (CELL, CELL))
+    return heatmap
+
+
+def cell_centre_color(heatmap, index):
+    centres_x, centres_y = grid_cells()
+    pos_x = int(centres_x[index]) - heatmap.origin[0]
+    pos_y = int(centres_y[index]) - heatmap.origin[1]
+    return heatmap.image[pos_y, pos_x]
+
+
+def test_score_lut():
+    lut = score_lut(alpha=200)
+    assert lut.dtype == numpy.uint32
+    assert lut[0] == argb(0, 0, 0, 200)
+    assert lut[-1] == argb(255, 255, 0, 200)
+    for level in (64, 128, 192):
+        score = level / (len(lut) - 1)
+        hue = int(60 * score)
+        red, green, blue = colorsys.hsv_to_rgb(hue / 360.0, 1.0, int(255 * score))
+        color = int(lut[level])
+        assert color >> 16 & 0xFF == pytest.approx(red, abs=1)
+        assert color >> 8 & 0xFF == pytest.approx(green, abs=1)
+        assert color & 0xFF == 0
+
+
+def test_cell_mask():
+    ellipse = cell_mask(10, 10, 10, 10)
+    assert ellipse[5, 5] and ellipse[0, 5] and ellipse[5, 9]
+    assert not ellipse[0, 0] and not ellipse[9, 9]
+
+    rectangle = cell_mask(10, 10, 6, 4, ellipse=False)
+    assert rectangle.sum() == 24
+    assert rectangle[3:7, 2:8].all()
+
+
+def test_render_scores(heatmap):
+    assert heatmap.image.shape == (ROWS * CELL, COLS * CELL)
+    assert heatmap.origin == (100, 50)
+
+    score = numpy.arange(COLS * ROWS)
+    assert heatmap.update(score) == COLS * ROWS
+    assert cell_centre_color(heatmap, len(score) - 1) == heatmap.lut[255]
+    assert cell_centre_color(heatmap, 0) == heatmap.lut[0]
+    # outside of the beam
+    assert heatmap.image[0, 0] == TRANSPARENT
+
+    # the last row of the serpentine scan is filled right to left
+    assert cell_centre_color(heatmap, 8) == heatmap.lut[8 * 255 // 11]
+
+
+def test_only_changed_cells_rendered(heatmap):
+    score = numpy.arange(COLS * ROWS)
+    heatmap.update(score)
+    version = heatmap.version
+
+    assert heatmap.update(score) == 0
+    assert heatmap.version == version
+
+    score[3] = 4
+    assert heatmap.update(score) == 1
+    assert cell_centre_color(heatmap, 3) == heatmap.lut[4 * 255 // 11]
+    assert heatmap.version == version + 1
+
+    # a new maximum changes the colours of all the cells
+    score[0] = 100
+    assert heatmap.update(score) == COLS * ROWS
+    assert heatmap.rendered_cells == 2 * COLS * ROWS + 1
+
+
+def test_base_color_and_transparent_cells(heatmap):
+    heatmap.update(None)
+    assert cell_centre_color(heatmap, 5) == argb(70, 70, 165, 120)
+
+    heatmap.update(numpy.zeros(COLS * ROWS))
+    assert not heatmap.image.any()
+
+    heatmap.update(numpy.ones(COLS * ROWS), visible=False)
+    assert not heatmap.image.any()
+
+
+def test_partial_score(heatmap):
+    # results of the first cells only
+    heatmap.update([1.0, 2.0])
+    assert cell_centre_color(heatmap, 1) == heatmap.lut[255]
+    assert cell_centre_color(heatmap, 2) == heatmap.lut[0]
+
+
+def test_alpha_renders_all_cells(heatmap):
+    score = numpy.arange(COLS * ROWS)
+    heatmap.update(score)
+    heatmap.set_alpha(120)
+    assert heatmap.update(score) == 0
+
+    heatmap.set_alpha(255)
+    assert heatmap.update(score) == COLS * ROWS
+    assert cell_centre_color(heatmap, 11) == argb(255, 255, 0)
+
+
+def test_no_cells():
+    heatmap = GridHeatmap()
+    heatmap.set_cells([], [], (CELL, CELL), (CELL, CELL))
+    assert heatmap.update(numpy.zeros(0)) == 0
+    assert heatmap.image.shape == (0, 0)
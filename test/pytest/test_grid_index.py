@@ -0,0 +1,140 @@
+import math
+
+import numpy
+import pytest
+
+from mxcubecore.utils.grid_index import (
+    GridIndex,
+    grid_motor_positions,
+)
+
+MD2 = {"fast": (1, 0), "slow": (0, 1), "omega_ref": 0}
+MD3 = {"fast": (0, -1), "slow": (1, 0), "omega_ref": 90}
+
+
+def grid_parameters(num_cols, num_rows, direction):
+    num_lines = abs(direction["fast"][1] * num_cols) + abs(
+        direction["slow"][1] * num_rows
+    )
+    num_images_per_line = abs(direction["fast"][0] * num_cols) + abs(
+        direction["slow"][0] * num_rows
+    )
+    return num_cols, num_rows, num_lines, num_images_per_line
+
+
+def legacy_col_row(
+    serial, num_cols, num_rows, num_lines, per_line, direction, first=1, reversing=True
+):
+    """GraphicsItemGrid.get_col_row_from_image_serial, image by image"""
+    line = int((serial - first) / per_line)
+    image = serial - first - line * per_line
+    fast_ref = 0.5
+    if per_line > 1:
+        fast_ref = 0.5 - float(image) / (per_line - 1)
+    if reversing:
+        fast_ref = pow(-1, line % 2) * fast_ref
+    slow_ref = 0.5
+    if num_lines > 1:
+        slow_ref = 0.5 - float(line) / (num_lines - 1)
+    col = (
+        num_cols / 2.0
+        + (per_line - 1) * direction["fast"][0] * fast_ref
+        + (num_lines - 1) * direction["slow"][0] * slow_ref
+    )
+    row = (
+        num_rows / 2.0
+        + (per_line - 1) * direction["fast"][1] * fast_ref
+        + (num_lines - 1) * direction["slow"][1] * slow_ref
+    )
+    return int(col), int(row)
+
+
+@pytest.mark.parametrize("direction", (MD2, MD3))
+@pytest.mark.parametrize("reversing", (True, False))
+@pytest.mark.parametrize("size", ((5, 4), (1, 6), (7, 1)))
+def test_cols_rows_as_legacy(direction, reversing, size):
+    parameters = grid_parameters(*size, direction)
+    index = GridIndex(*parameters, direction, reversing_rotation=reversing)
+
+    assert index.num_images == size[0] * size[1]
+    for serial in range(1, index.num_images + 1):
+        expected = legacy_col_row(serial, *parameters, direction, reversing=reversing)
+        assert index.col_row(serial) == expected
+    # every cell is scanned once
+    assert len(set(zip(index.cols, index.rows))) == index.num_images
+
+
+def test_meander_order():
+    index = GridIndex(*grid_parameters(3, 2, MD2), MD2)
+    # from the bottom right corner, every other line backwards
+    assert list(zip(index.cols.tolist(), index.rows.tolist())) == [
+        (2, 1),
+        (1, 1),
+        (0, 1),
+        (0, 0),
+        (1, 0),
+        (2, 0),
+    ]
+    assert index.lines.tolist() == [0, 0, 0, 1, 1, 1]
+    assert index.images.tolist() == [0, 1, 2, 0, 1, 2]
+
+
+def test_serials_outside_of_grid():
+    parameters = grid_parameters(3, 2, MD2)
+    index = GridIndex(*parameters, MD2, first_image_num=10)
+    assert index.col_row(10) == (2, 1)
+    assert index.col_row(20) == legacy_col_row(20, *parameters, MD2, first=10)
+
+    cols, rows = index.cols_rows(numpy.array([10, 13, 20]))
+    assert list(zip(cols.tolist(), rows.tolist())) == [
+        (2, 1),
+        (0, 0),
+        legacy_col_row(20, *parameters, MD2, first=10),
+    ]
+
+
+def test_image_centres():
+    index = GridIndex(*grid_parameters(3, 2, MD2), MD2)
+    # 20 pix cells, centre of the grid at (100, 50)
+    pos_x, pos_y = index.image_centres((100, 50), {"fast": 40, "slow": 20})
+    assert pos_x.tolist() == [120, 100, 80, 80, 100, 120]
+    assert pos_y.tolist() == [60, 60, 60, 40, 40, 40]
+
+
+def legacy_motor_pos(
+    centred, col, row, num_cols, num_rows, size_mm, osc_start, osc_range, direction
+):
+    """GraphicsItemGrid.get_motor_pos_from_col_row, point by point"""
+    new_point = dict(centred)
+    hor_range = -size_mm[0] * (num_cols / 2.0 - col) / num_cols
+    ver_range = -size_mm[1] * (num_rows / 2.0 - row) / num_rows
+    angle = math.pi * (osc_start - direction["omega_ref"]) / 180.0
+    if direction["fast"][0] == 1:
+        new_point["sampx"] += ver_range * math.sin(angle)
+        new_point["sampy"] -= ver_range * math.cos(angle)
+        new_point["phiy"] -= hor_range
+        new_point["phi"] += -osc_range * num_cols / 2 + (num_cols - col) * osc_range
+    else:
+        new_point["sampx"] -= hor_range * math.sin(angle)
+        new_point["sampy"] += hor_range * math.cos(angle)
+        new_point["phiy"] += ver_range
+        new_point["phi"] += -osc_range * num_rows / 2 + (num_rows - row) * osc_range
+    return new_point
+
+
+@pytest.mark.parametrize("direction", (MD2, MD3))
+def test_motor_positions_as_legacy(direction):
+    centred = {"sampx": 0.1, "sampy": -0.2, "phiy": 1.5, "phi": 30.0, "kappa": None}
+    cols = numpy.array([0, 0.5, 2.25, 4])
+    rows = numpy.array([3, 1.5, 0.75, 0])
+    parameters = (5, 4, (0.1, 0.08), 30.0, 0.5, direction)
+
+    positions = grid_motor_positions(centred, cols, rows, *parameters)
+
+    assert positions is not centred
+    assert centred["sampx"] == 0.1
+    assert positions["kappa"] is None
+    for point, (col, row) in enumerate(zip(cols, rows)):
+        expected = legacy_motor_pos(centred, col, row, *parameters)
+        for motor in ("sampx", "sampy", "phiy", "phi"):
+            assert positions[motor][point] == pytest.approx(expected[motor])
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from mxcubecore import HardwareRepository as HWR
+
+from .conftest import ROOT_DIR
+
+HWR_PATH = os.path.pathsep.join(
+    (
+        os.path.join(ROOT_DIR, "mxcubecore/configuration/mockup"),
+        os.path.join(ROOT_DIR, "mxcubecore/configuration/mockup/test"),
+    )
+)
+
+
+@pytest.fixture
+def load_mode():
+    mode = HWR.load_mode
+    yield
+    HWR.load_mode = mode
+
+
+def load_beamline(mode):
+    HWR._instance = HWR.beamline = None
+    HWR.init_hardware_repository(HWR_PATH, mode=mode)
+    return HWR.beamline
+
+
+def loaded_objects(bl):
+    return {
+        role: type(getattr(bl, role)).__name__
+        for role in bl.all_roles
+        if getattr(bl, role) is not None
+    }
+
+
+def test_parallel_and_serial_loads_are_equivalent(load_mode, capsys):
+    serial = loaded_objects(load_beamline("serial"))
+    serial_report = capsys.readouterr().out
+    parallel = loaded_objects(load_beamline("parallel"))
+    parallel_report = capsys.readouterr().out
+
+    assert parallel == serial
+    assert "diffractometer" in serial
+    assert "serial load of contents" in serial_report
+    assert "critical path" not in serial_report
+    assert "critical path" in parallel_report
+    assert "parallel load of contents" in parallel_report
+
+
+def test_dependency_graph_is_built_in_parallel_mode_only(load_mode, monkeypatch):
+    graphs = []
+    dependency_graph = HWR._dependency_graph
+
+    def counting_graph(*args):
+        graphs.append(args)
+        return dependency_graph(*args)
+
+    monkeypatch.setattr(HWR, "_dependency_graph", counting_graph)
+    load_beamline("serial")
+    assert not graphs
+    load_beamline("parallel")
+    assert graphs
+
+
+def test_parallel_load_error_is_raised(load_mode, monkeypatch):
+    load_beamline("serial")
+    load_content = HWR._load_content
+
+    def failing_load(container, class_name, role, config_file, table):
+        if role == "energy":
+            raise RuntimeError("energy failed")
+        return load_content(container, class_name, role, config_file, table)
+
+    monkeypatch.setattr(HWR, "_load_content", failing_load)
+    HWR.load_mode = "parallel"
+    objects = {"omega": "diff-omega-mockup.xml", "energy": "energy-mockup.xml"}
+    table = []
+    with pytest.raises(RuntimeError, match="energy failed"):
+        HWR._load_contents(HWR.beamline, "Beamline", objects, {}, table)
+
+
+def test_unknown_load_mode(load_mode):
+    with pytest.raises(ValueError):
+        load_beamline("random")
+
+
+def test_dependency_graph(load_mode):
+    load_beamline("serial")
+    objects = {
+        "diffractometer": "diffractometer-mockup.xml",
+        "omega": "diff-omega-mockup.xml",
+        "energy": "energy-mockup.xml",
+        "resolution": "resolution-mockup.xml",
+    }
+    graph = HWR._dependency_graph(objects, {"resolution": ["energy"]})
+
+    # omega is referenced by the diffractometer configuration
+    assert graph["omega"] == ["diffractometer"]
+    assert graph["energy"] == []
+    assert "energy" in graph["resolution"]
+
+    path, total = HWR._critical_path(
+        graph, {"diffractometer": 30, "omega": 5, "energy": 10, "resolution": 10}
+    )
+    assert path == ["diffractometer", "omega"]
+    assert total == 35
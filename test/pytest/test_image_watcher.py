@@ -0,0 +1,132 @@
+import os
+
+import gevent
+import pytest
+
+from mxcubecore.utils.image_watcher import (
+    ImageWatcher,
+    Inotify,
+)
+
+TEMPLATE = "test_1_%04d.cbf"
+
+
+def write_frames(directory, numbers, interval=0.005, template=TEMPLATE):
+    """Writes fake frame files, one every interval"""
+    for number in numbers:
+        with open(os.path.join(directory, template % number), "wb") as frame:
+            frame.write(b"\0" * 1024)
+        gevent.sleep(interval)
+
+
+def inotify_available():
+    try:
+        Inotify().close()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+@pytest.mark.parametrize(
+    "use_inotify",
+    (
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(
+                not inotify_available(), reason="inotify not available"
+            ),
+        ),
+        False,
+    ),
+)
+def test_collection_progress(tmp_path, use_inotify):
+    batches = []
+    watcher = ImageWatcher.from_template(
+        str(tmp_path),
+        TEMPLATE,
+        1,
+        50,
+        callback=batches.append,
+        batch_interval=0.05,
+        poll_interval=None if use_inotify else 0.02,
+        use_inotify=use_inotify,
+    )
+    with watcher:
+        writer = gevent.spawn(write_frames, str(tmp_path), range(1, 51))
+        assert watcher.wait_for(tmp_path / (TEMPLATE % 1), timeout=2)
+        assert watcher.wait_all(timeout=5)
+        writer.join()
+
+    assert watcher.is_complete()
+    # batched: fewer callbacks than images, all the images reported once
+    assert 1 < len(batches) < 50
+    reported = [arrival.number for batch in batches for arrival in batch.arrivals]
+    assert sorted(reported) == list(range(1, 51))
+    assert [batch.arrived for batch in batches] == sorted(
+        batch.arrived for batch in batches
+    )
+    assert batches[-1].arrived == batches[-1].expected == 50
+
+    latencies = [arrival.latency for arrival in watcher.arrivals.values()]
+    # measured for every image (compared by bench_image_watcher)
+    assert len(latencies) == 50
+    assert all(latency is not None and latency >= 0 for latency in latencies)
+    assert watcher.latest.number == 50
+    assert watcher.has_arrived(tmp_path / (TEMPLATE % 50))
+
+
+def test_files_already_there(tmp_path):
+    write_frames(str(tmp_path), range(1, 4), interval=0)
+    batches = []
+    watcher = ImageWatcher.from_template(
+        str(tmp_path), TEMPLATE, 1, 5, callback=batches.append
+    )
+    with watcher:
+        assert [arrival.number for arrival in batches[0].arrivals] == [1, 2, 3]
+        assert not watcher.wait_for(tmp_path / (TEMPLATE % 4), timeout=0.05)
+        assert not watcher.wait_all(timeout=0.05)
+        assert not watcher.is_expected(tmp_path / (TEMPLATE % 6))
+
+
+def test_renamed_and_linked_files(tmp_path):
+    """Files moved in place are reported by inotify; files not reported by
+    inotify (as written by another host on NFS) by the directory listing"""
+    watcher = ImageWatcher(
+        [tmp_path / "renamed.cbf", tmp_path / "linked.cbf"],
+        poll_interval=0.05,
+    )
+    with watcher:
+        write_frames(str(tmp_path), [0], template="tmp_%d")
+        os.rename(tmp_path / "tmp_0", tmp_path / "renamed.cbf")
+        write_frames(str(tmp_path), [1], template="tmp_%d")
+        os.link(tmp_path / "tmp_1", tmp_path / "linked.cbf")
+        assert watcher.wait_all(timeout=1)
+
+    assert watcher.arrivals[str(tmp_path / "renamed.cbf")].number == 1
+    assert watcher.arrivals[str(tmp_path / "linked.cbf")].number == 2
+
+
+def test_directory_created_later(tmp_path):
+    directory = tmp_path / "run_1"
+    watcher = ImageWatcher.from_template(
+        str(directory), TEMPLATE, 1, 2, poll_interval=0.02
+    )
+    with watcher:
+        directory.mkdir()
+        write_frames(str(directory), [1, 2])
+        assert watcher.wait_all(timeout=1)
+
+
+def test_path_template(tmp_path):
+    class PathTemplate:
+        start_num = 10
+        num_files = 3
+
+        def get_files_to_be_written(self):
+            return [str(tmp_path / (TEMPLATE % n)) for n in range(10, 13)]
+
+    watcher = ImageWatcher.from_path_template(PathTemplate())
+    with watcher:
+        write_frames(str(tmp_path), range(10, 13))
+        assert watcher.wait_all(timeout=2)
+    assert watcher.latest.number == 12
@@ -0,0 +1,157 @@
+import io
+import time
+
+import gevent
+import numpy
+import pytest
+from PIL import Image
+
+from mxcubecore.HardwareObjects.abstract.AbstractVideoDevice import (
+    AbstractVideoDevice,
+)
+from mxcubecore.utils.jpeg_encoder import (
+    TARGET_LADDER,
+    JpegEncoder,
+    encode_jpeg,
+)
+
+WIDTH, HEIGHT = 320, 240
+
+
+@pytest.fixture
+def encoder():
+    encoder = JpegEncoder(workers=2)
+    yield encoder
+    encoder.close()
+
+
+@pytest.fixture
+def frame():
+    """Noise, which does not compress"""
+    rng = numpy.random.default_rng(0)
+    return rng.integers(0, 256, (HEIGHT, WIDTH, 3), numpy.uint8)
+
+
+class Received:
+    """Receiver of the encoded frames"""
+
+    def __init__(self):
+        self.frames = []
+
+    def __call__(self, jpeg, width, height):
+        self.frames.append((jpeg, width, height))
+
+
+def image_size(jpeg):
+    return Image.open(io.BytesIO(jpeg)).size
+
+
+def test_encode_jpeg(frame):
+    jpeg, width, height = encode_jpeg(frame, WIDTH, HEIGHT)
+    assert jpeg[:2] == b"\xff\xd8"
+    assert (width, height) == image_size(jpeg) == (WIDTH, HEIGHT)
+
+    small, width, height = encode_jpeg(frame, WIDTH, HEIGHT, quality=40, scale=0.5)
+    assert (width, height) == image_size(small) == (WIDTH // 2, HEIGHT // 2)
+    assert len(small) < len(jpeg)
+
+
+def test_encode_in_pool(encoder, frame):
+    jpeg = encoder.encode(frame, WIDTH, HEIGHT)
+    assert image_size(jpeg) == (WIDTH, HEIGHT)
+    statistics = encoder.get_statistics()
+    assert statistics["encoded"] == 1
+    assert statistics["latency"] > 0
+    assert statistics["queue_depth"] == 0
+
+
+def test_frames_without_consumers_are_skipped(encoder, frame):
+    wanted = False
+    received = Received()
+    encoder.subscribe(received, active=lambda: wanted)
+
+    assert not encoder.has_consumers()
+    assert encoder.submit(frame, WIDTH, HEIGHT) is None
+
+    wanted = True
+    assert encoder.has_consumers()
+    encoder.submit(frame, WIDTH, HEIGHT).join()
+
+    statistics = encoder.get_statistics()
+    assert statistics["skipped"] == 1
+    assert statistics["encoded"] == 1
+    assert len(received.frames) == 1
+
+
+def test_frame_encoded_once_per_target(encoder, frame):
+    first, second, small = Received(), Received(), Received()
+    encoder.subscribe(first)
+    encoder.subscribe(second)
+    encoder.subscribe(small, bytes_per_second=1e9)
+
+    encoder.submit(frame, WIDTH, HEIGHT).join()
+
+    assert encoder.get_statistics()["encoded"] == 2
+    assert first.frames[0][0] is second.frames[0][0]
+    assert small.frames[0][0] is not first.frames[0][0]
+
+
+def test_frames_are_dropped_while_busy(encoder, frame):
+    received = Received()
+    encoder.subscribe(received)
+
+    delivery = encoder.submit(frame, WIDTH, HEIGHT)
+    assert encoder.get_statistics()["queue_depth"] == 1
+    assert encoder.submit(frame, WIDTH, HEIGHT) is None
+    delivery.join()
+
+    assert encoder.get_statistics()["dropped"] == 1
+    assert len(received.frames) == 1
+
+
+def test_budget_adapts_target(encoder, frame):
+    budget = 200000
+    received = Received()
+    subscription = encoder.subscribe(received, bytes_per_second=budget)
+    assert subscription.target == TARGET_LADDER[0]
+
+    start = time.monotonic()
+    for _ in range(50):
+        delivery = encoder.submit(frame, WIDTH, HEIGHT)
+        if delivery is not None:
+            delivery.join()
+        gevent.sleep(0.02)
+    elapsed = time.monotonic() - start
+
+    # smaller images, and frames skipped to stay within the budget
+    assert subscription.skipped > 0
+    assert subscription.target.scale < 1
+    assert image_size(received.frames[-1][0]) < (WIDTH, HEIGHT)
+    assert sum(len(jpeg) for jpeg, _, _ in received.frames[1:]) < budget * elapsed
+
+
+def test_unsubscribe(encoder, frame):
+    received = Received()
+    subscription = encoder.subscribe(received)
+    encoder.unsubscribe(subscription)
+
+    assert encoder.submit(frame, WIDTH, HEIGHT) is None
+    assert encoder.get_statistics()["subscriptions"] == 0
+
+
+def test_video_device_streams_to_receivers(frame):
+    camera = AbstractVideoDevice("camera")
+    camera.get_image = lambda: (frame, WIDTH, HEIGHT)
+    received = Received()
+    try:
+        assert camera.stream_jpg_image() is None
+
+        camera.connect("imageReceived", received)
+        camera.stream_jpg_image().join()
+        assert image_size(received.frames[0][0]) == (WIDTH, HEIGHT)
+
+        camera.disconnect("imageReceived", received)
+        assert camera.stream_jpg_image() is None
+        assert camera.get_jpeg_statistics()["skipped"] == 2
+    finally:
+        camera.jpeg_encoder.close()
@@ -0,0 +1,230 @@
+import os
+
+import gevent
+import numpy
+import pytest
+from PIL import Image
+
+from mxcubecore.HardwareObjects import sample_centring
+from mxcubecore.utils.loop_finder import (
+    NOT_FOUND,
+    LoopFinder,
+    frame_from_image,
+)
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#: Recorded snapshots, pin on the left, and the expected loop area
+SNAPSHOTS = [
+    (os.path.join(TEST_DIR, "fakeimg.jpg"), (300, 530, 150, 330)),
+    (
+        os.path.join(
+            TEST_DIR,
+            os.pardir,
+            "mxcubecore",
+            "configuration",
+            "mockup",
+            "web",
+            "mxcube_sample_snapshot.jpeg",
+        ),
+        (300, 430, 260, 330),
+    ),
+]
+
+
+def load(path):
+    return numpy.asarray(Image.open(path).convert("RGB"))
+
+
+@pytest.mark.parametrize("path, area", SNAPSHOTS)
+def test_loop_found(path, area):
+    result = LoopFinder().find(load(path))
+    x_min, x_max, y_min, y_max = area
+    assert x_min < result.x < x_max
+    assert y_min < result.y < y_max
+    assert result.score > 0.1
+
+
+def test_rotation():
+    frame = load(SNAPSHOTS[0][0])
+    result = LoopFinder().find(frame)
+    mirrored = LoopFinder().find(frame[:, ::-1], rotation=180)
+    width = frame.shape[1]
+    assert abs(mirrored.x - (width - 1 - result.x)) < 2
+    assert abs(mirrored.y - result.y) < 2
+
+
+def test_empty_frame():
+    finder = LoopFinder()
+    frame = numpy.full((480, 640, 3), 180, numpy.uint8)
+    frame += numpy.random.default_rng(0).integers(0, 10, frame.shape, numpy.uint8)
+    assert finder.find(frame) == NOT_FOUND
+
+
+def test_background_model_is_kept():
+    finder = LoopFinder()
+    frame = load(SNAPSHOTS[0][0])
+    first = finder.find(frame)
+    background = finder._background
+    assert finder.find(frame) == first
+    assert finder._background is background
+
+    finder.reset()
+    assert finder._background is None
+
+
+def test_frame_from_image():
+    assert frame_from_image(bytes(12), 4, 3).shape == (3, 4)
+    assert frame_from_image(bytes(36), 4, 3).shape == (3, 4, 3)
+    assert frame_from_image(bytes(48), 4, 3).shape == (3, 4, 3)
+
+
+class MotorMockup:
+    """Motor moving at speed [units/s] in a greenlet, with a settling time
+    [s] (acceleration, deceleration) per move"""
+
+    def __init__(self, value=0.0, speed=0.0, settling=0.0):
+        self.value = value
+        self.speed = speed
+        self.settling = settling
+        self._move = None
+
+    def get_value(self):
+        return self.value
+
+    def is_ready(self):
+        return self._move is None or self._move.dead
+
+    def set_value(self, value, timeout=0):
+        self._move = gevent.spawn(self._moving, value)
+        if timeout is None:
+            self._move.join()
+
+    def _moving(self, target):
+        step = 0.01 * self.speed * (1 if target > self.value else -1)
+        while abs(target - self.value) > abs(step):
+            gevent.sleep(0.01)
+            self.value += step
+        gevent.sleep(self.settling)
+        self.value = target
+
+
+class CameraMockup:
+    def __init__(self, frame):
+        self.frame = frame
+
+    def get_last_image(self):
+        height, width = self.frame.shape[:2]
+        return self.frame.tobytes(), width, height
+
+
+class SampleViewMockup:
+    def __init__(self, frame):
+        self.camera = CameraMockup(frame)
+        self.camera.get_width = lambda: frame.shape[1]
+        self.camera.get_height = lambda: frame.shape[0]
+
+
+@pytest.fixture
+def sample_view(monkeypatch):
+    monkeypatch.setattr(sample_centring, "USE_LOOP_FINDER", True)
+    sample_centring.LOOP_FINDER.reset()
+    return SampleViewMockup(load(SNAPSHOTS[0][0]))
+
+
+class LucidMockup:
+    def __init__(self, x="320", y="240"):
+        self.x, self.y = x, y
+        self.calls = []
+
+    def find_loop(self, image, rotation=None, **kwargs):
+        self.calls.append((image, rotation))
+        return "Coord", self.x, self.y
+
+
+def test_lucid_is_the_default(monkeypatch):
+    lucid = LucidMockup()
+    monkeypatch.setattr(sample_centring, "lucid", lucid, raising=False)
+    frame = load(SNAPSHOTS[0][0])
+
+    assert not sample_centring.USE_LOOP_FINDER
+    assert not sample_centring.ROTATION_SCAN
+    result = sample_centring.find_loop_in_frame(frame, 0)
+    assert (result.x, result.y) == (320, 240)
+    assert result.score is None
+    image, rotation = lucid.calls[-1]
+    assert image.shape == frame.shape[:2]
+    # lucid reference frame: no rotation for chi 0, reversed chi
+    assert rotation is None
+    sample_centring.find_loop_in_frame(frame, 30)
+    assert lucid.calls[-1][1] == -30
+
+    lucid.x = "no loop"
+    assert sample_centring.find_loop_in_frame(frame, 0) == NOT_FOUND
+
+
+def test_loop_finder_chi_sign(sample_view, monkeypatch):
+    rotations = []
+    finder = LoopFinder()
+    monkeypatch.setattr(
+        finder, "find", lambda frame, rotation: rotations.append(rotation)
+    )
+    monkeypatch.setattr(sample_centring, "LOOP_FINDER", finder)
+    sample_centring.find_loop_in_frame(sample_view.camera.frame, 30)
+    assert rotations == [-30]
+
+
+def test_auto_center_falls_back_to_point_by_point(sample_view, monkeypatch):
+    calls = {"clicks": [], "end": []}
+
+    def failing_scan(*args):
+        raise RuntimeError("camera failed")
+
+    monkeypatch.setattr(sample_centring, "ROTATION_SCAN", True)
+    monkeypatch.setattr(sample_centring, "rotation_scan_centre", failing_scan)
+    monkeypatch.setattr(sample_centring, "center", lambda *args: {"centred": True})
+    monkeypatch.setattr(
+        sample_centring, "user_click", lambda x, y, wait: calls["clicks"].append(x)
+    )
+    monkeypatch.setattr(sample_centring, "end", calls["end"].append)
+    sample_centring.LOOP_FINDER._background = numpy.zeros((2, 2))
+    phi = sample_centring.CentringMotor(MotorMockup(0.0))
+    motors = [sample_centring.CentringMotor(MotorMockup(1.0)) for _ in range(4)]
+
+    centred_pos = sample_centring.auto_center(
+        sample_view, phi, *motors, 1000, 1000, 320, 240, 0, 3, None, None
+    )
+
+    assert centred_pos == {"centred": True}
+    assert calls["end"] == [centred_pos]
+    assert len(calls["clicks"]) == 3
+    # the background of the previous sample was dropped
+    assert sample_centring.LOOP_FINDER._background.shape != (2, 2)
+
+
+def test_find_loops_while_rotating(sample_view):
+    phi = sample_centring.CentringMotor(MotorMockup(10.0, speed=600))
+
+    results = sample_centring.find_loops_while_rotating(
+        sample_view, phi, [10, 100, 190], 0
+    )
+
+    assert phi.get_value() == 190
+    for (angle, result), position in zip(results, [10, 100, 190]):
+        # the camera is polled every 20 ms, phi moves by 6 deg every 10 ms
+        assert abs(angle - position) < 12
+        assert result.x > 0
+
+
+def test_rotation_scan_centre(sample_view):
+    # the loop does not move with phi: it is on the rotation axis, and at
+    # the beam position: nothing to move
+    x, y, _, _ = LoopFinder().find(sample_view.camera.frame)
+    phi = sample_centring.CentringMotor(MotorMockup(0.0, speed=900))
+    motors = [sample_centring.CentringMotor(MotorMockup(1.0)) for _ in range(4)]
+
+    centred_pos = sample_centring.rotation_scan_centre(
+        sample_view, phi, *motors, 1000, 1000, x, y, 0, 3
+    )
+
+    for motor in motors:
+        assert centred_pos[motor.motor] == pytest.approx(1.0, abs=1e-3)
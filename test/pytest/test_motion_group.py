@@ -0,0 +1,122 @@
+import time
+
+import gevent
+import pytest
+
+from mxcubecore.utils.motion_group import MotionGroup
+
+#: move durations [s] of the centring motors
+DURATIONS = {"phi": 0.3, "phiy": 0.2, "phiz": 0.1, "sampx": 0.15, "sampy": 0.25}
+
+
+@pytest.fixture
+def diffractometer(beamline):
+    diffractometer = beamline.diffractometer
+    motors = diffractometer.motor_hwobj_dict
+    # stop the move to the initial position of the diffractometer
+    for role in DURATIONS:
+        if not motors[role].is_ready():
+            motors[role].abort()
+        motors[role].update_value(0)
+    return diffractometer
+
+
+def targets(diffractometer, scale=1.0):
+    # distance = velocity (default 100) * duration
+    return {role: 100 * duration * scale for role, duration in DURATIONS.items()}
+
+
+def test_move_motors_takes_the_slowest_axis(diffractometer):
+    positions = targets(diffractometer)
+    start = time.monotonic()
+    diffractometer.move_motors(positions, wait=True)
+    elapsed = time.monotonic() - start
+
+    # 1.0 s one axis after the other
+    assert max(DURATIONS.values()) <= elapsed < 0.6
+    for role, position in positions.items():
+        assert diffractometer.motor_hwobj_dict[role].get_value() == position
+    timings = diffractometer.motion_group.timings
+    assert set(timings) == set(DURATIONS)
+    for role, duration in DURATIONS.items():
+        assert timings[role].start < 0.05
+        assert timings[role].end - timings[role].start >= duration
+    assert diffractometer.motion_group.report().startswith("phi ")
+
+
+def test_move_motors_does_not_wait(diffractometer):
+    positions = targets(diffractometer)
+    start = time.monotonic()
+    diffractometer.move_motors(positions)
+    assert time.monotonic() - start < min(DURATIONS.values())
+
+    motors = diffractometer.motor_hwobj_dict
+    assert not any(motors[role].is_ready() for role in DURATIONS)
+    for role, position in positions.items():
+        motors[role].wait_ready(timeout=1)
+        assert motors[role].get_value() == position
+
+
+def test_move_motors_by_hardware_object(diffractometer):
+    motors = diffractometer.motor_hwobj_dict
+    diffractometer.move_motors(
+        {motors["phiy"]: 1.0, "phiz": 2.0, "sampx": None}, wait=True
+    )
+    assert motors["phiy"].get_value() == 1.0
+    assert motors["phiz"].get_value() == 2.0
+    assert set(diffractometer.motion_group.timings) == {"phiy", "phiz"}
+
+
+def test_exclusive_axes(diffractometer):
+    motors = diffractometer.motor_hwobj_dict
+    group = MotionGroup(exclusive=[("phiy", "sampx")])
+
+    timings = group.move(
+        {role: (motors[role], 10) for role in ("phiy", "sampx", "phiz")}
+    )
+
+    first, second = sorted((timings["phiy"], timings["sampx"]))
+    assert first.end <= second.start
+    assert timings["phiz"].start < first.end
+
+
+class FailingMotor:
+    def set_value(self, value):
+        raise ValueError("Invalid value %s" % value)
+
+
+def test_errors_and_timeout(diffractometer):
+    motors = diffractometer.motor_hwobj_dict
+    group = MotionGroup()
+    with pytest.raises(ValueError):
+        group.move({"phiz": (motors["phiz"], 5), "bad": (FailingMotor(), 1)})
+    # the other axes are moved
+    assert motors["phiz"].get_value() == 5
+
+    with pytest.raises(RuntimeError):
+        group.move({"phi": (motors["phi"], 100)}, timeout=0.1)
+
+
+def test_custom_mover():
+    moved = []
+
+    def mover(motor, position):
+        gevent.sleep(0.05)
+        moved.append((motor, position))
+
+    group = MotionGroup(mover=mover)
+    start = time.monotonic()
+    group.move({name: (name, i) for i, name in enumerate("abcd")})
+    assert time.monotonic() - start < 0.15
+    assert sorted(moved) == [("a", 0), ("b", 1), ("c", 2), ("d", 3)]
+
+
+def test_serial_group():
+    def mover(motor, position):
+        gevent.sleep(0.02)
+
+    group = MotionGroup(mover=mover, serial=True)
+    timings = group.move({name: (name, 0) for name in "abc"})
+    ordered = sorted(timings.values())
+    for first, second in zip(ordered, ordered[1:]):
+        assert first.end <= second.start
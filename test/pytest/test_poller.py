@@ -0,0 +1,157 @@
+import time
+
+import gevent
+import pytest
+
+from mxcubecore import Poller
+
+
+class Source:
+    """Polled object returning a scripted sequence of values"""
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.calls = 0
+
+    def read(self):
+        self.calls += 1
+        value = self.values[min(self.calls, len(self.values)) - 1]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+@pytest.fixture
+def received():
+    result = {"values": [], "errors": []}
+
+    def on_value(value):
+        result["values"].append(value)
+
+    def on_error(exc, poller_id):
+        result["errors"].append(exc)
+
+    result["callbacks"] = (on_value, on_error)
+    yield result
+    for poller in list(Poller.POLLERS.values()):
+        poller.stop()
+
+
+def test_poll_reports_changed_values_only(received):
+    source = Source([1, 1, 2, 2, 3])
+    on_value, on_error = received["callbacks"]
+    poller = Poller.poll(source.read, (), 10, on_value, on_error)
+
+    with gevent.Timeout(2):
+        while received["values"] != [1, 2, 3]:
+            gevent.sleep(0.01)
+
+    stats = poller.get_statistics()
+    assert stats["count"] >= 5
+    assert stats["errors"] == 0
+    assert stats["period"] == 10
+    assert stats["latency_max"] >= stats["latency_mean"] >= 0
+
+
+def test_poll_returns_existing_poller(received):
+    source = Source([1])
+    on_value, on_error = received["callbacks"]
+    poller = Poller.poll(source.read, (), 100, on_value, on_error)
+
+    assert Poller.poll(source.read, (), 50, on_value, on_error) is poller
+    assert poller.get_polling_period() == 50
+    assert Poller.get_poller(poller.get_id()) is poller
+
+
+def test_same_period_pollers_share_a_group(received):
+    on_value, on_error = received["callbacks"]
+    first = Poller.poll(Source([1]).read, (), 20, on_value, on_error)
+    second = Poller.poll(Source([2]).read, (), 20, on_value, on_error)
+
+    group = Poller.get_scheduler()._groups[20]
+    assert list(group.pollers) == [first, second]
+
+    first.set_polling_period(30)
+    assert list(group.pollers) == [second]
+    assert first in Poller.get_scheduler()._groups[30].pollers
+
+
+def test_failing_poll_backs_off_and_recovers(received):
+    source = Source([1, RuntimeError("read failed"), 1])
+    on_value, on_error = received["callbacks"]
+    poller = Poller.poll(source.read, (), 10, on_value, on_error)
+
+    with gevent.Timeout(2):
+        while len(received["values"]) < 2:
+            gevent.sleep(0.01)
+
+    # the value after the error is reported even if it did not change
+    assert received["values"] == [1, 1]
+    assert len(received["errors"]) == 1
+    assert not poller.is_stopped()
+    assert poller.get_statistics()["errors"] == 1
+
+
+def test_stopped_poller_is_not_called(received):
+    source = Source([1])
+    on_value, on_error = received["callbacks"]
+    poller = Poller.poll(source.read, (), 10, on_value, on_error)
+
+    with gevent.Timeout(2):
+        while not received["values"]:
+            gevent.sleep(0.01)
+    poller.stop()
+    gevent.sleep(0.05)
+    calls = source.calls
+    gevent.sleep(0.05)
+
+    assert source.calls == calls
+    assert Poller.get_poller(poller.get_id()) is None
+
+
+def test_restart_keeps_failure_count(received):
+    source = Source([RuntimeError("read failed")])
+    on_value, on_error = received["callbacks"]
+    poller = Poller.poll(source.read, (), 10, on_value, on_error)
+
+    with gevent.Timeout(2):
+        while not received["errors"]:
+            gevent.sleep(0.01)
+    restarted = poller.restart(0)
+
+    assert poller.is_stopped()
+    assert restarted is not poller
+    assert restarted.failures == 1
+    assert restarted.slow
+    with gevent.Timeout(2):
+        while len(received["errors"]) < 2:
+            gevent.sleep(0.01)
+    assert restarted.failures == 2
+
+
+def test_slow_polls_do_not_stall_other_polls(received):
+    def blocking_read(index):
+        # unreachable device: every read waits for the timeout
+        time.sleep(0.2)
+        raise RuntimeError("timeout")
+
+    on_value, on_error = received["callbacks"]
+    scheduler = Poller.get_scheduler()
+    counts = scheduler.get_worker_count()
+    Poller.set_worker_count(1, 1)
+    try:
+        blocking = [
+            Poller.poll(blocking_read, (index,), 10, on_value, on_error)
+            for index in range(3)
+        ]
+        # the blocking pollers are moved to the slow worker after one failure
+        gevent.sleep(0.8)
+        assert all(poller.slow for poller in blocking)
+        source = Source([1, 2, 3])
+        Poller.poll(source.read, (), 10, on_value, on_error)
+        with gevent.Timeout(1):
+            while received["values"] != [1, 2, 3]:
+                gevent.sleep(0.01)
+    finally:
+        Poller.set_worker_count(*counts)
+    assert scheduler.get_worker_count() == counts
@@ -0,0 +1,107 @@
+import pytest
+
+from mxcubecore.dispatcher import dispatcher
+from mxcubecore.utils.position_snapshot import PositionSnapshot
+
+
+class Motor:
+    """Motor sending valueChanged, or the legacy positionChanged"""
+
+    def __init__(self, value, signal="valueChanged"):
+        self.value = value
+        self.signal = signal
+        self.reads = 0
+        self.notified = []
+
+    def get_value(self):
+        self.reads += 1
+        return self.value
+
+    def connect_notify(self, signal):
+        self.notified.append(signal)
+
+    def move(self, value):
+        self.value = value
+        dispatcher.send(self.signal, self, value)
+
+
+@pytest.fixture
+def motors():
+    return {"phi": Motor(10.0), "sampx": Motor(0.5, "positionChanged")}
+
+
+@pytest.fixture
+def snapshot(motors):
+    snapshot = PositionSnapshot()
+    for name, motor in motors.items():
+        snapshot.add_motor(name, motor)
+    return snapshot
+
+
+def test_positions_follow_signals(snapshot, motors):
+    positions = snapshot.get_positions()
+    assert dict(positions) == {"phi": 10.0, "sampx": 0.5}
+    assert motors["phi"].notified == ["valueChanged", "positionChanged"]
+    generation = snapshot.generation
+
+    motors["phi"].move(20.0)
+    motors["sampx"].move(-0.5)
+
+    # the same read only view, updated
+    assert snapshot.get_positions() is positions
+    assert dict(positions) == {"phi": 20.0, "sampx": -0.5}
+    assert snapshot.generation == generation + 2
+    with pytest.raises(TypeError):
+        positions["phi"] = 0
+
+
+def test_hardware_reads_saved(snapshot, motors):
+    for _ in range(10):
+        snapshot.get_positions(("phi", "sampx"))
+    assert snapshot.get_position("phi") == 10.0
+
+    assert motors["phi"].reads == 1
+    statistics = snapshot.get_statistics()
+    assert statistics["live_reads"] == 2
+    assert statistics["cached_reads"] == 21
+
+
+def test_live_reads(snapshot, motors):
+    # moved without signal
+    motors["phi"].value = 30.0
+    assert snapshot.get_position("phi") == 10.0
+    assert snapshot.read_live(["phi"])["phi"] == 30.0
+    assert snapshot.live_reads == 3
+
+    # no position reported yet: read from the hardware
+    motors["sampx"].value = None
+    snapshot.remove_motor("sampx")
+    snapshot.add_motor("sampx", motors["sampx"])
+    motors["sampx"].value = 1.5
+    assert snapshot.get_position("sampx") == 1.5
+
+
+def test_remove_motor(snapshot, motors):
+    snapshot.remove_motor("phi")
+    motors["phi"].move(20.0)
+    assert "phi" not in snapshot.positions
+    assert list(snapshot.motors) == ["sampx"]
+
+
+class FailingMotor(Motor):
+    """Motor of a device which is down"""
+
+    def get_value(self):
+        if self.value is None:
+            raise RuntimeError("device down")
+        return Motor.get_value(self)
+
+
+def test_unreadable_motor_is_read_on_first_use(snapshot):
+    motor = FailingMotor(None)
+    snapshot.add_motor("phiz", motor)
+    assert "phiz" not in snapshot.positions
+
+    motor.value = 1.5
+    assert snapshot.get_position("phiz") == 1.5
+    assert snapshot.get_positions()["phi"] == 10.0
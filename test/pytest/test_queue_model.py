@@ -0,0 +1,158 @@
+import pytest
+
+from mxcubecore.HardwareObjects.QueueModel import QueueModel
+from mxcubecore.model import queue_model_objects
+
+
+@pytest.fixture
+def queue_model():
+    yield QueueModel("queue_model")
+
+
+def make_collection(prefix, run_number=1, start_num=1, num_files=100):
+    collection = queue_model_objects.DataCollection()
+    path_template = collection.get_path_template()
+    path_template.directory = "/data/visitor/mx1/20240101/RAW_DATA"
+    path_template.base_prefix = prefix
+    path_template.run_number = run_number
+    path_template.start_num = start_num
+    path_template.num_files = num_files
+    return collection
+
+
+def brute_force_collisions(queue_model, path_template):
+    return any(
+        path_template.intersection(other)
+        for _, other in queue_model.get_path_templates()
+        if other is not path_template
+    )
+
+
+def test_get_node(queue_model):
+    root = queue_model.get_model_root()
+    sample = queue_model_objects.Sample()
+    group = queue_model_objects.TaskGroup()
+    collection = make_collection("insulin")
+    queue_model.add_child(root, sample)
+    sample_id = sample._node_id
+    group_id = queue_model.add_child_at_id(sample_id, group)
+    collection_id = queue_model.add_child_at_id(group_id, collection)
+
+    assert queue_model.get_node(group_id) is group
+    assert queue_model.get_node(collection_id) is collection
+    assert queue_model.get_node(collection_id, parent=group) is collection
+    assert queue_model.get_node(sample_id, parent=group) is None
+
+    queue_model.del_child(root, sample)
+    assert queue_model.get_node(collection_id) is None
+    assert len(queue_model._get_index()[1]) == 0
+
+
+def test_run_numbers_and_collisions(queue_model):
+    sample = queue_model_objects.Sample()
+    queue_model.add_child(queue_model.get_model_root(), sample)
+
+    collections = []
+    for prefix in ("insulin", "insulin", "lysozyme", "insulin"):
+        collection = make_collection(prefix)
+        path_template = collection.get_path_template()
+        path_template.run_number = queue_model.get_next_run_number(path_template)
+        queue_model.add_child(sample, collection)
+        collections.append(collection)
+
+    assert [c.get_path_template().run_number for c in collections] == [1, 2, 1, 3]
+    last = collections[-1].get_path_template()
+    assert queue_model.get_next_run_number(last) == 3
+    assert queue_model.get_next_run_number(last, exclude_current=False) == 4
+
+    new = make_collection("insulin", run_number=2, start_num=50).get_path_template()
+    assert queue_model.check_for_path_collisions(new)
+    new.start_num = 101
+    assert not queue_model.check_for_path_collisions(new)
+
+    # Changes of path templates in the model are tracked
+    second = collections[1].get_path_template()
+    second.num_files = 200
+    assert queue_model.check_for_path_collisions(new)
+    second.base_prefix = "thaumatin"
+    assert not queue_model.check_for_path_collisions(new)
+    assert queue_model.get_next_run_number(new) == 4
+
+    queue_model.del_child(sample, collections[-1])
+    assert queue_model.get_next_run_number(new) == 2
+
+    for collection in collections[:-1]:
+        path_template = collection.get_path_template()
+        assert queue_model.check_for_path_collisions(
+            path_template
+        ) == brute_force_collisions(queue_model, path_template)
+
+
+def test_copied_path_templates_are_not_indexed(queue_model):
+    sample = queue_model_objects.Sample()
+    queue_model.add_child(queue_model.get_model_root(), sample)
+    collection = make_collection("insulin")
+    queue_model.add_child(sample, collection)
+
+    copy = queue_model.copy_node(collection)
+    assert copy.get_path_template().run_number == 2
+    assert not queue_model.check_for_path_collisions(copy.get_path_template())
+    assert len(queue_model._get_index()[1]) == 1
+
+
+def test_replaced_path_templates_are_reindexed(queue_model):
+    sample = queue_model_objects.Sample()
+    queue_model.add_child(queue_model.get_model_root(), sample)
+    collection = make_collection("insulin")
+    energy_scan = queue_model_objects.EnergyScan()
+    energy_scan.path_template = make_collection("insulin", 2).get_path_template()
+    queue_model.add_child(sample, collection)
+    queue_model.add_child(sample, energy_scan)
+    old = collection.get_path_template()
+    new = make_collection("insulin", start_num=50).get_path_template()
+    assert queue_model.check_for_path_collisions(new)
+
+    # Replaced in the acquisition of a data collection
+    collection.acquisitions[0].path_template = make_collection(
+        "lysozyme"
+    ).get_path_template()
+    assert not queue_model.check_for_path_collisions(new)
+    old.run_number = 1
+    assert not queue_model.check_for_path_collisions(new)
+    assert queue_model.get_next_run_number(new) == 3
+
+    # Replaced in the node
+    energy_scan.path_template = make_collection("thaumatin").get_path_template()
+    assert queue_model.get_next_run_number(new) == 1
+    assert len(queue_model._get_index()[1]) == 2
+
+    # Acquisition replaced in place
+    collection.acquisitions[0] = make_collection("lysozyme", 4).acquisitions[0]
+    assert queue_model.get_next_run_number(new) == 1
+    lysozyme = make_collection("lysozyme").get_path_template()
+    assert queue_model.get_next_run_number(lysozyme) == 5
+
+    queue_model.del_child(queue_model.get_model_root(), sample)
+    assert len(queue_model._get_index()[1]) == 0
+
+
+def test_shared_path_templates(queue_model):
+    sample = queue_model_objects.Sample()
+    queue_model.add_child(queue_model.get_model_root(), sample)
+    collection = make_collection("insulin")
+    path_template = collection.get_path_template()
+    energy_scan = queue_model_objects.EnergyScan()
+    energy_scan.path_template = path_template
+    queue_model.add_child(sample, collection)
+    queue_model.add_child(sample, energy_scan)
+    assert len(queue_model._get_index()[1]) == 1
+
+    # Changed through the other node
+    energy_scan.get_path_template().run_number = 5
+    new = make_collection("insulin").get_path_template()
+    assert queue_model.get_next_run_number(new) == 6
+
+    queue_model.del_child(sample, energy_scan)
+    assert queue_model.get_next_run_number(new) == 6
+    queue_model.del_child(sample, collection)
+    assert queue_model.get_next_run_number(new) == 1
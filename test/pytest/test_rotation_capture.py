@@ -0,0 +1,154 @@
+import time
+
+import gevent
+import numpy
+import pytest
+
+from mxcubecore.utils.rotation_capture import (
+    PositionTrace,
+    RotationCapture,
+    minimal_sweep,
+)
+from mxcubecore.utils.video_frames import FrameRing
+
+WIDTH, HEIGHT = 8, 4
+
+
+class RotatingCamera:
+    """Camera publishing a frame every interval, the motor position in
+    the pixels (position / 2)"""
+
+    def __init__(self, motor, interval=0.01, ring=True):
+        self.motor = motor
+        self.frames = FrameRing()
+        self.images = 0
+        self._ring = ring
+        self._polling = gevent.spawn(self._poll, interval)
+
+    def image(self):
+        self.images += 1
+        position = self.motor.get_value() / 2
+        return numpy.full(WIDTH * HEIGHT, position, numpy.uint8).tobytes()
+
+    def _poll(self, interval):
+        while True:
+            self.frames.publish(self.image(), WIDTH, HEIGHT)
+            gevent.sleep(interval)
+
+    def get_frames(self):
+        return self.frames if self._ring else None
+
+    def get_last_image(self):
+        return self.image(), WIDTH, HEIGHT
+
+    def stop(self):
+        self._polling.kill()
+
+
+@pytest.fixture
+def phi(beamline):
+    motor = beamline.diffractometer.motor_hwobj_dict["phi"]
+    # stop the move to the initial position of the diffractometer
+    if not motor.is_ready():
+        motor.abort()
+    motor.set_velocity(450)
+    motor.set_value(0, timeout=None)
+    return motor
+
+
+@pytest.fixture
+def camera(phi):
+    camera = RotatingCamera(phi)
+    yield camera
+    camera.stop()
+
+
+def test_position_trace():
+    motor = type("Motor", (), {"value": 0.0, "get_value": lambda self: self.value})()
+    trace = PositionTrace(motor)
+    trace.sample()
+    motor.value = 10.0
+    gevent.sleep(0.01)
+    trace.sample()
+
+    middle = 0.5 * (trace.times[0] + trace.times[1])
+    assert trace.position_at(middle) == pytest.approx(5.0)
+    assert trace.position_at(trace.last_time + 1) == 10.0
+
+
+def test_capture_in_one_rotation(phi, camera):
+    angles = [10, 100, 190]
+    received = []
+    start = time.monotonic()
+
+    frames = RotationCapture(phi, camera).capture(angles, frame_cb=received.append)
+
+    # to 10 deg, then to 190 deg at 450 deg/s, without stopping
+    assert time.monotonic() - start < 1.0
+    assert received == frames
+    assert phi.get_value() == pytest.approx(190)
+    for frame, angle in zip(frames, angles):
+        assert frame.target == angle
+        # the mockup motor position is updated every 20 ms (9 deg), and may
+        # overshoot by as much at the end of the move; the position in the
+        # frame is truncated to 2 deg
+        assert abs(frame.angle - angle) < 10
+        assert abs(frame.data[0] * 2 - frame.angle) < 12
+        assert (frame.width, frame.height) == (WIDTH, HEIGHT)
+
+
+def test_capture_backwards_with_polled_camera(phi):
+    camera = RotatingCamera(phi, ring=False)
+    try:
+        frames = RotationCapture(phi, camera).capture([90, 60, 30])
+    finally:
+        camera.stop()
+    assert [frame.target for frame in frames] == [90, 60, 30]
+    for frame in frames:
+        assert abs(frame.angle - frame.target) < 10
+
+
+def test_motor_stopped(phi, camera):
+    capture = RotationCapture(phi, camera)
+    phi.update_limits((-360, 50))
+    with pytest.raises(ValueError):
+        capture.capture([0, 100])
+
+    gevent.spawn_later(0.05, phi.abort)
+    with pytest.raises(RuntimeError):
+        capture.capture([0, 45], timeout=5)
+
+
+def test_angles_in_order(phi, camera):
+    with pytest.raises(ValueError):
+        RotationCapture(phi, camera).capture([0, 90, 45])
+
+
+def test_sample_view_rotation_snapshots(beamline, phi, monkeypatch):
+    camera = RotatingCamera(phi)
+    # RGB frames
+    monkeypatch.setattr(camera, "image", lambda: bytes(WIDTH * HEIGHT * 3))
+    monkeypatch.setattr(beamline.sample_view, "_camera", camera)
+    try:
+        snapshots = beamline.sample_view.take_rotation_snapshots(phi, [0, 45, 90])
+    finally:
+        camera.stop()
+    assert len(snapshots) == 3
+    for angle, image in snapshots:
+        assert image.size == (WIDTH, HEIGHT)
+        assert image.mode == "RGB"
+
+
+@pytest.mark.parametrize(
+    "angles, sweep",
+    [
+        ([0, 90, 180, 270], [(0, 0), (1, 90), (2, 180), (3, 270)]),
+        ([180, 0], [(1, 0), (0, 180)]),
+        # wrap-around: 20 deg instead of 340 deg
+        ([350, 10], [(0, 350), (1, 370)]),
+        ([10, 350], [(1, 350), (0, 370)]),
+        ([30, -30, 0], [(1, -30), (2, 0), (0, 30)]),
+    ],
+)
+def test_minimal_sweep(angles, sweep):
+    assert minimal_sweep(angles) == sweep
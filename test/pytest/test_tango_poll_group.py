@@ -0,0 +1,202 @@
+import gevent
+import pytest
+
+from mxcubecore import Poller
+from mxcubecore.Command import Tango
+from test.pytest import tango_device_mockup
+
+
+@pytest.fixture
+def device(monkeypatch):
+    monkeypatch.setattr(Tango, "DeviceProxy", tango_device_mockup.DeviceProxyMockup)
+    monkeypatch.setattr(Tango.TangoPollGroup, "_groups", {})
+    monkeypatch.setattr(Tango, "proxy_pool", Tango.DeviceProxyPool())
+    tango_device_mockup.reset()
+    attributes = tango_device_mockup.DEVICES["test/motor/1"]
+    attributes.update({"position": 1.0, "velocity": 2.0, "state": "ON"})
+    yield attributes
+    for poller in list(Poller.POLLERS.values()):
+        poller.stop()
+
+
+class Values(list):
+    """Receiver of the channel update signal"""
+
+    def update(self, value):
+        self.append(value)
+
+
+def make_channel(attribute_name, polling=20, **kwargs):
+    channel = Tango.TangoChannel(
+        attribute_name,
+        attribute_name,
+        tangoname="test/motor/1",
+        polling=polling,
+        **kwargs,
+    )
+    values = Values()
+    channel.connect_signal("update", values.update)
+    # keep the (weakly connected) receiver alive with the channel
+    channel.values = values
+    return channel, values
+
+
+def wait_for(condition, timeout=2):
+    with gevent.Timeout(timeout):
+        while not condition():
+            gevent.sleep(0.01)
+
+
+def test_polled_channels_share_one_read(device):
+    channels = [make_channel(name) for name in ("position", "velocity", "state")]
+
+    wait_for(lambda: all(values for _, values in channels))
+
+    assert [values for _, values in channels] == [[1.0], [2.0], ["ON"]]
+    assert len(Tango.TangoPollGroup._groups) == 1
+    calls = tango_device_mockup.CALLS
+    assert calls["test/motor/1", "read_attributes"] > 0
+    assert calls["test/motor/1", "read_attribute"] == 0
+
+
+def test_only_changed_values_are_dispatched(device):
+    channels = [make_channel("position"), make_channel("velocity")]
+    (_, position), (_, velocity) = channels
+    wait_for(lambda: position and velocity)
+
+    device["position"] = 3.0
+    wait_for(lambda: len(position) == 2)
+    gevent.sleep(0.05)
+
+    assert position == [1.0, 3.0]
+    assert velocity == [2.0]
+
+
+def test_periods_and_string_reads_are_not_grouped(device):
+    make_channel("position", polling=20)
+    make_channel("velocity", polling=50)
+    _, state = make_channel("state", read_as_str=True)
+
+    assert set(Tango.TangoPollGroup._groups) == {
+        ("test/motor/1", 20, 10000),
+        ("test/motor/1", 50, 10000),
+    }
+    wait_for(lambda: state)
+    assert tango_device_mockup.CALLS["test/motor/1", "read_attribute"] > 0
+
+
+def test_device_proxies_are_pooled(device):
+    channels = [make_channel(name) for name in ("position", "velocity", "state")]
+    command = Tango.TangoCommand("stop", "Stop", tangoname="test/motor/1")
+    command.init_device()
+
+    calls = tango_device_mockup.CALLS
+    # one proxy for the channels (client timeout 10 s), one for the command
+    assert calls["test/motor/1", "DeviceProxy"] == 2
+    assert calls["test/motor/1", "attribute_list_query"] == 1
+    assert channels[0][0].device is channels[1][0].device
+    assert channels[0][0].raw_device is channels[0][0].device
+
+    statistics = Tango.proxy_pool.get_statistics()
+    assert statistics["misses"] == 2
+    assert statistics["hits"] == 4
+    assert statistics["attribute_misses"] == 1
+    assert statistics["attribute_hits"] == 2
+    assert statistics["devices"] == 1
+
+    Tango.proxy_pool.invalidate("TEST/motor/1")
+    make_channel("state", polling=None)
+    assert calls["test/motor/1", "DeviceProxy"] == 3
+    assert calls["test/motor/1", "attribute_list_query"] == 2
+
+
+def test_failed_attribute_read(device):
+    channel, values = make_channel("position")
+    wait_for(lambda: values)
+
+    del device["position"]
+    wait_for(lambda: len(values) == 2)
+    assert values == [1.0, None]
+
+    device["position"] = 1.0
+    wait_for(lambda: len(values) == 3)
+    assert values == [1.0, None, 1.0]
+
+
+def test_failed_attribute_does_not_fail_the_group(device):
+    channels = [make_channel("position"), make_channel("velocity")]
+    (_, position), (_, velocity) = channels
+    wait_for(lambda: position and velocity)
+
+    # the device is reachable, one attribute cannot be read
+    del device["velocity"]
+    device["position"] = 3.0
+    wait_for(lambda: len(position) == 2 and len(velocity) == 2)
+    assert position == [1.0, 3.0]
+    assert velocity == [2.0, None]
+
+
+def test_failed_attribute_is_reported_once(device, monkeypatch):
+    monkeypatch.setattr(Tango.TangoPollGroup, "RETRY_DELAY", 0.5)
+    channels = [make_channel(name) for name in ("position", "velocity", "state")]
+    (_, position), (_, velocity), (_, state) = channels
+    wait_for(lambda: position and velocity and state)
+
+    del device["velocity"]
+    wait_for(lambda: len(velocity) == 2)
+    calls = tango_device_mockup.CALLS
+    calls.clear()
+    device["position"] = 3.0
+    wait_for(lambda: len(position) == 2)
+    gevent.sleep(0.1)
+
+    assert velocity == [2.0, None]
+    assert position == [1.0, 3.0]
+    # the healthy attributes are still read together, the failed one alone
+    assert calls["test/motor/1", "read_attributes"] > 3
+    assert calls["test/motor/1", "read_attribute"] <= 1
+
+    device["velocity"] = 2.0
+    wait_for(lambda: len(velocity) == 3)
+    assert velocity == [2.0, None, 2.0]
+    assert state == ["ON"]
+
+
+def test_group_proxy_follows_the_pool(device):
+    channel, position = make_channel("position")
+    wait_for(lambda: position)
+    group = channel.poll_group
+    raw_device = group.raw_device
+
+    Tango.proxy_pool.invalidate("test/motor/1")
+    wait_for(lambda: group.raw_device is not raw_device)
+    assert Tango.proxy_pool.has_proxy("test/motor/1", 10000)
+    device["position"] = 3.0
+    wait_for(lambda: len(position) == 2)
+
+
+def test_missing_attribute_is_not_grouped(device):
+    channels = [
+        make_channel("focus"),
+        make_channel("position", timeout=3000),
+        make_channel("velocity"),
+    ]
+    (channel, _), (_, position), _ = channels
+
+    assert channel.device is None
+    assert channel.poll_group is None
+    wait_for(lambda: position)
+    groups = Tango.TangoPollGroup._groups
+    assert set(groups) == {("test/motor/1", 20, 3000), ("test/motor/1", 20, 10000)}
+    assert groups["test/motor/1", 20, 10000].attribute_names == ["velocity"]
+
+
+def test_communication_failure_is_retried(device):
+    channel, position = make_channel("position")
+    wait_for(lambda: position)
+
+    tango_device_mockup.COMMUNICATION_FAILURES["test/motor/1"] = 2
+    device["position"] = 3.0
+    wait_for(lambda: len(position) == 2)
+    assert position == [1.0, 3.0]
+    assert tango_device_mockup.COMMUNICATION_FAILURES["test/motor/1"] == 0
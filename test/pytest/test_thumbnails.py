@@ -0,0 +1,140 @@
+import numpy
+import pytest
+from PIL import Image
+
+from mxcubecore.utils.thumbnails import (
+    ThumbnailEngine,
+    decode_byte_offset,
+    downsample_max,
+    read_cbf,
+    read_frame,
+    tone_map,
+)
+
+
+def encode_byte_offset(values):
+    """CBF byte offset compression of values (int32)"""
+    deltas = numpy.diff(numpy.asarray(values, numpy.int64).ravel(), prepend=0)
+    small = numpy.abs(deltas) < 128
+    medium = ~small & (numpy.abs(deltas) < 32768)
+    large = ~small & ~medium
+    lengths = numpy.where(small, 1, numpy.where(medium, 3, 7))
+    offsets = numpy.cumsum(lengths) - lengths
+    data = numpy.zeros(int(lengths.sum()), numpy.uint8)
+    data[offsets[small]] = deltas[small].astype(numpy.int8).view(numpy.uint8)
+    data[offsets[~small]] = 0x80
+    for mask, start, dtype in ((medium, 1, "<i2"), (large, 3, "<i4")):
+        width = numpy.dtype(dtype).itemsize
+        values = deltas[mask].astype(dtype).view(numpy.uint8).reshape(-1, width)
+        data[offsets[mask, None] + start + numpy.arange(width)] = values
+    # 4 bytes escape of the large values
+    data[offsets[large, None] + numpy.arange(1, 3)] = [0x00, 0x80]
+    return data.tobytes()
+
+
+def write_cbf(path, frame):
+    """Writes a CBF file (byte offset compression) of a frame"""
+    binary = encode_byte_offset(frame)
+    header = (
+        "###CBF: VERSION 1.5\r\n"
+        "data_test\r\n"
+        "_array_data.data\r\n"
+        ";\r\n"
+        "--CIF-BINARY-FORMAT-SECTION--\r\n"
+        'Content-Type: application/octet-stream;conversions="x-CBF_BYTE_OFFSET"\r\n'
+        "X-Binary-Size: %d\r\n"
+        'X-Binary-Element-Type: "signed 32-bit integer"\r\n'
+        "X-Binary-Size-Fastest-Dimension: %d\r\n"
+        "X-Binary-Size-Second-Dimension: %d\r\n"
+        "\r\n" % (len(binary), frame.shape[1], frame.shape[0])
+    )
+    with open(path, "wb") as cbf_file:
+        cbf_file.write(header.encode() + b"\x0c\x1a\x04\xd5" + binary)
+        cbf_file.write(b"\r\n--CIF-BINARY-FORMAT-SECTION----\r\n;\r\n")
+
+
+def synthetic_frame(height=400, width=500, seed=0):
+    """Background counts with a few strong spots and detector gaps (-1)"""
+    rng = numpy.random.default_rng(seed)
+    frame = rng.poisson(5, (height, width)).astype(numpy.int32)
+    spots = rng.integers(0, height * width, 50)
+    frame.ravel()[spots] = rng.integers(1000, 1 << 20, 50)
+    frame[:, width // 2 : width // 2 + 4] = -1
+    return frame
+
+
+def test_byte_offset():
+    values = numpy.array([0, 5, -3, 200, 100000, -100000, 7, 7, 1 << 30], numpy.int32)
+    # -128 bytes inside the values (not escapes): deltas 0x8080, -0x7F80
+    values = numpy.append(values, [(1 << 30) + 0x8080, (1 << 30) + 0x100])
+    decoded = decode_byte_offset(encode_byte_offset(values), len(values))
+    numpy.testing.assert_array_equal(decoded, values)
+
+
+def test_read_cbf(tmp_path):
+    frame = synthetic_frame()
+    write_cbf(tmp_path / "image_1_0001.cbf", frame)
+    numpy.testing.assert_array_equal(read_cbf(tmp_path / "image_1_0001.cbf"), frame)
+    numpy.testing.assert_array_equal(
+        read_frame(str(tmp_path / "image_1_0001.cbf")), frame
+    )
+    with pytest.raises(ValueError):
+        read_frame(str(tmp_path / "image_1_0001.img"))
+
+
+def test_downsample_tone_map():
+    frame = numpy.zeros((10, 11), numpy.int32)
+    frame[3, 4] = 1000
+    frame[9, 0] = -1
+    binned = downsample_max(frame, 2)
+    assert binned.shape == (5, 5)
+    # a single strong pixel remains in its block
+    assert binned[1, 2] == 1000
+
+    levels = tone_map(binned)
+    assert levels.dtype == numpy.uint8
+    assert levels[1, 2] == 0
+    assert levels[4, 0] == 255
+
+
+def test_engine(tmp_path):
+    frame = synthetic_frame()
+    write_cbf(tmp_path / "image.cbf", frame)
+    engine = ThumbnailEngine(workers=2)
+    targets = [(str(tmp_path / "image.jpeg"), 0.4), (str(tmp_path / "thumb.jpeg"), 0.1)]
+
+    job = engine.submit(str(tmp_path / "image.cbf"), targets)
+    # submitted twice (e.g. arrival, then first image of the collection)
+    assert engine.submit(str(tmp_path / "image.cbf"), targets) is job
+    assert job.get(timeout=10)
+    assert Image.open(targets[0][0]).size == (200, 160)
+    assert Image.open(targets[1][0]).size == (50, 40)
+
+    failed = engine.submit(str(tmp_path / "missing.cbf"), targets)
+    assert failed.get(timeout=10) is False
+
+    statistics = engine.get_statistics()
+    assert statistics["submitted"] == 2
+    assert statistics["generated"] == 1
+    assert statistics["failed"] == 1
+    assert statistics["queue_depth"] == 0
+    assert statistics["frames_per_second"] > 0
+    engine.close()
+
+
+def test_engine_backpressure():
+    engine = ThumbnailEngine(workers=1, every=4)
+    converted = []
+    engine._convert = lambda filename, targets: converted.append(filename)
+    # submitted at once: the worker is busy from the first image
+    jobs = [engine.submit("image_%d" % index, [], index, 10) for index in range(10)]
+    engine.wait(timeout=10)
+
+    # while busy: first, every 4th and last images only
+    assert [job is not None for job in jobs] == [
+        index in (0, 4, 8, 9) for index in range(10)
+    ]
+    assert converted == ["image_0", "image_4", "image_8", "image_9"]
+    statistics = engine.get_statistics()
+    assert statistics["skipped"] == 6
+    assert statistics["generated"] == 4
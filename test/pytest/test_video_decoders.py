@@ -0,0 +1,148 @@
+import numpy
+import pytest
+
+from mxcubecore.utils import video_decoders
+
+WIDTH, HEIGHT = 8, 6
+
+# YUV (BT.601 video range) of reference colours and their RGB values
+YUV_COLOURS = [
+    ((16, 128, 128), (0, 0, 0)),
+    ((235, 128, 128), (255, 255, 255)),
+    ((126, 128, 128), (128, 128, 128)),
+    ((81, 90, 240), (255, 0, 0)),
+    ((145, 54, 34), (0, 255, 1)),
+    ((41, 240, 110), (0, 0, 255)),
+]
+
+
+def bayer_mosaic(rgb):
+    """RGGB mosaic of a 16 bit RGB image"""
+    mosaic = numpy.empty(rgb.shape[:2], numpy.uint16)
+    mosaic[0::2, 0::2] = rgb[0::2, 0::2, 0]
+    mosaic[0::2, 1::2] = rgb[0::2, 1::2, 1]
+    mosaic[1::2, 0::2] = rgb[1::2, 0::2, 1]
+    mosaic[1::2, 1::2] = rgb[1::2, 1::2, 2]
+    return mosaic
+
+
+def bilinear_demosaic(mosaic):
+    """Reference RGGB bilinear demosaicing, pixel by pixel, 12 to 8 bit"""
+    height, width = mosaic.shape
+    colours = [[0, 1], [1, 2]]
+
+    def value(row, col):
+        # mirrored border
+        row = abs(row) if row < height else 2 * height - 2 - row
+        col = abs(col) if col < width else 2 * width - 2 - col
+        return int(mosaic[row, col]), colours[row % 2][col % 2]
+
+    result = numpy.empty((height, width, 3), numpy.uint8)
+    for row in range(height):
+        for col in range(width):
+            for channel in range(3):
+                values = [
+                    val
+                    for drow in (-1, 0, 1)
+                    for dcol in (-1, 0, 1)
+                    for val, colour in [value(row + drow, col + dcol)]
+                    if colour == channel
+                    and (colours[row % 2][col % 2] != channel or drow == dcol == 0)
+                    # bilinear green: the 4 direct neighbours only
+                    and not (channel == 1 and drow and dcol)
+                ]
+                result[row, col, channel] = (sum(values) // len(values)) >> 4
+    return result
+
+
+@pytest.fixture(params=[False, True], ids=["numpy", "opencv"])
+def use_cv2(request):
+    if request.param and video_decoders.cv2 is None:
+        pytest.skip("OpenCV is not installed")
+    return request.param
+
+
+def test_y8(use_cv2):
+    grey = numpy.arange(WIDTH * HEIGHT, dtype=numpy.uint8).reshape(HEIGHT, WIDTH)
+    decoder = video_decoders.Y8Decoder(WIDTH, HEIGHT, use_cv2)
+    rgb = decoder.decode(grey.tobytes())
+    assert rgb.shape == (HEIGHT, WIDTH, 3)
+    for channel in range(3):
+        assert (rgb[..., channel] == grey).all()
+
+
+def test_y16_fixed_range(use_cv2):
+    grey = numpy.linspace(0, 4095, WIDTH * HEIGHT).astype(numpy.uint16)
+    decoder = video_decoders.Y16Decoder(WIDTH, HEIGHT, use_cv2, bits=12)
+    rgb = decoder.decode(grey.tobytes())
+    expected = numpy.rint(grey * (255 / 4095)).reshape(HEIGHT, WIDTH)
+    assert (rgb[..., 1] == expected).all()
+    assert rgb[0, 0].tolist() == [0, 0, 0]
+    assert rgb[-1, -1].tolist() == [255, 255, 255]
+
+
+def test_y16_auto_contrast(use_cv2):
+    decoder = video_decoders.Y16Decoder(
+        WIDTH, HEIGHT, use_cv2, auto_contrast=True, low=0, high=100, sampling=1
+    )
+    grey = numpy.linspace(1000, 1100, WIDTH * HEIGHT).astype(numpy.uint16)
+    rgb = decoder.decode(grey.tobytes())
+    assert rgb[..., 0].min() == 0
+    assert rgb[..., 0].max() == 255
+    lut = decoder._lut
+
+    # the lookup table is only rebuilt when the range changes
+    decoder.decode(grey[::-1].tobytes())
+    assert decoder._lut is lut
+    rgb = decoder.decode((grey * 2).tobytes())
+    assert decoder._lut_range == (2000, 2200)
+    assert rgb[..., 0].max() == 255
+
+
+@pytest.mark.parametrize("yuv, expected", YUV_COLOURS)
+def test_yuv422_colours(use_cv2, yuv, expected):
+    y, u, v = yuv
+    frame = numpy.tile(numpy.array([u, y, v, y], numpy.uint8), WIDTH * HEIGHT // 2)
+    decoder = video_decoders.YUV422Decoder(WIDTH, HEIGHT, use_cv2)
+    rgb = decoder.decode(frame.tobytes())
+    assert numpy.abs(rgb.astype(int) - expected).max() <= 1
+
+
+def test_yuv422_chroma_shared_by_pixel_pairs(use_cv2):
+    # U Y0 V Y1: two grey levels with the same (neutral) chroma
+    frame = numpy.tile(
+        numpy.array([128, 16, 128, 235], numpy.uint8), WIDTH * HEIGHT // 2
+    )
+    rgb = video_decoders.YUV422Decoder(WIDTH, HEIGHT, use_cv2).decode(frame)
+    assert (rgb[:, 0::2] == 0).all()
+    assert (rgb[:, 1::2] == 255).all()
+
+
+def test_bayer_uniform_colour(use_cv2):
+    rgb16 = numpy.empty((HEIGHT, WIDTH, 3), numpy.uint16)
+    rgb16[...] = (4000, 2048, 160)
+    decoder = video_decoders.BayerRG16Decoder(WIDTH, HEIGHT, use_cv2)
+    rgb = decoder.decode(bayer_mosaic(rgb16).tobytes())
+    assert (rgb == (250, 128, 10)).all()
+
+
+def test_bayer_bilinear():
+    mosaic = numpy.random.default_rng(0).integers(
+        0, 4096, (HEIGHT, WIDTH), dtype=numpy.uint16
+    )
+    decoder = video_decoders.BayerRG16Decoder(WIDTH, HEIGHT, use_cv2=False)
+    assert (decoder.decode(mosaic.tobytes()) == bilinear_demosaic(mosaic)).all()
+
+
+def test_output_buffer_is_reused():
+    decoder = video_decoders.Y8Decoder(WIDTH, HEIGHT, use_cv2=False)
+    first = decoder.decode(bytes(WIDTH * HEIGHT))
+    second = decoder.decode(bytes(range(WIDTH * HEIGHT)))
+    assert first is second
+
+
+def test_odd_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        video_decoders.YUV422Decoder(7, 6)
+    with pytest.raises(ValueError):
+        video_decoders.BayerRG16Decoder(8, 5)
@@ -0,0 +1,108 @@
+import gevent
+import numpy
+import pytest
+
+from mxcubecore.HardwareObjects import TangoLimaVideo as tango_lima_video
+from mxcubecore.utils.video_frames import (
+    FrameRing,
+    decode_lima_image,
+)
+from test.pytest.lima_device_mockup import (
+    LimaDeviceMockup,
+    lima_image,
+)
+
+
+@pytest.mark.parametrize("endian", ("<", ">"))
+def test_decode_lima_image(endian):
+    data = lima_image(7, 4, 2, "RGB24", endian)
+
+    header, pixels = decode_lima_image(data, endian)
+
+    assert header.frame_number == 7
+    assert (header.width, header.height) == (4, 2)
+    assert len(pixels) == 4 * 2 * 3
+    assert bytes(pixels[:2]) == bytes([7, 8])
+
+    with pytest.raises(ValueError):
+        decode_lima_image(b"\0" * len(data), endian)
+
+
+def test_frame_ring():
+    ring = FrameRing(size=2)
+    assert ring.latest() is None
+
+    first = ring.publish(b"\1\2\3", 1, 1, frame_number=10)
+    second = ring.publish(b"\4\5\6", 1, 1, frame_number=11)
+    assert ring.latest() is second
+    assert bytes(first.data) == b"\1\2\3"
+    assert not first.data.flags.writeable
+    assert ring.is_current(first)
+
+    third = ring.publish(b"\7\10\11", 1, 1, frame_number=15)
+    # the buffer of the first frame is reused
+    assert not ring.is_current(first)
+    assert numpy.shares_memory(first.data, third.data)
+    assert ring.get_statistics()["received"] == 3
+    assert ring.get_statistics()["dropped"] == 3
+
+
+def test_wait_for_frame():
+    ring = FrameRing()
+    first = ring.publish(b"\0", 1, 1)
+
+    assert ring.wait(after=first, timeout=0.01) is None
+    gevent.spawn_later(0.01, ring.publish, b"\1", 1, 1)
+    second = ring.wait(after=first, timeout=1)
+    assert second.sequence == first.sequence + 1
+    assert ring.wait(after=first, timeout=0) is second
+
+
+@pytest.fixture
+def video(monkeypatch):
+    device = LimaDeviceMockup()
+    monkeypatch.setattr(tango_lima_video, "DeviceProxy", lambda name: device)
+    video = tango_lima_video.TangoLimaVideo("camera")
+    video.set_property("tangoname", device.name)
+    video.set_property("interval", 10)
+    video.set_property("frame_ring_size", 3)
+    video.init()
+    yield video, device
+    polling = video._TangoLimaVideo__polling
+    if polling is not None:
+        polling.kill()
+
+
+class Receiver:
+    def __init__(self):
+        self.frames = []
+
+    def image_received(self, data, width, height, _):
+        self.frames.append((bytes(data[:3]), width, height))
+
+
+def test_tango_lima_video(video):
+    video, device = video
+    assert device.video_live
+
+    device.frame_step = 2
+    receiver = Receiver()
+    video.connect("imageReceived", receiver.image_received)
+    with gevent.Timeout(2):
+        while len(receiver.frames) < 3:
+            gevent.sleep(0.01)
+
+    assert receiver.frames[0][1:] == (64, 48)
+    statistics = video.get_frame_statistics()
+    assert statistics["received"] >= 3
+    assert statistics["dropped"] == statistics["received"] - 1
+
+    # Frames are not read again when the device has no new frame
+    device.frame_step = 0
+    received = video.get_frame_statistics()["received"]
+    gevent.sleep(0.05)
+    assert video.get_frame_statistics()["received"] == received
+
+    data, width, height = video.get_last_image()
+    frame = video.get_frames().latest()
+    assert numpy.shares_memory(data, frame.data)